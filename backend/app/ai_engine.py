@@ -1,11 +1,33 @@
 import os
 import json
 import random
-from typing import Dict, Any, List, Optional
+import asyncio
+from typing import Callable, Dict, Any, List, Optional
 
-# Placeholder for OpenAI integration
-# from openai import OpenAI
-# client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import httpx
+
+from .model_client import model_client
+from .model_scheduler import scheduler
+
+# Connection settings (OPENAI_BASE_URL, timeouts, pool size) are in model_client
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+# A batch call generates every analysis in one response, so it may take longer than OPENAI_TIMEOUT_SECONDS
+OPENAI_BATCH_TIMEOUT_SECONDS = float(os.getenv("OPENAI_BATCH_TIMEOUT_SECONDS", "180"))
+
+# How analyze_responses scores the answers of an interview:
+#   serial      one model call after another
+#   concurrent  one call per answer, at most ANALYSIS_CONCURRENCY in flight
+#   batch       a single call that scores every answer
+ANALYSIS_MODES = ("serial", "concurrent", "batch")
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "concurrent")
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "5"))
+
+# Called with the position and analysis of each response as soon as it is scored
+ResultCallback = Callable[[int, Optional[Dict[str, Any]]], None]
+
+# Bump when the prompts or function schemas change, so that cached analyses
+# produced by the previous version are no longer used (see analysis_cache)
+PROMPT_VERSION = 2
 
 # Mock data and functionality for development
 MOCK_STRENGTHS = [
@@ -53,12 +75,24 @@ MOCK_RECOMMENDATIONS = [
     "Technical skills meet requirements but cultural fit is uncertain"
 ]
 
+def use_mock_analysis() -> bool:
+    """Mock results in development and whenever no OpenAI key is configured."""
+    return os.getenv("APP_ENV") == "development" or not os.getenv("OPENAI_API_KEY")
+
+def scorer_version() -> str:
+    """Identifies what produces response analyses: the mock scorer or the model and prompt version."""
+    if use_mock_analysis():
+        return f"mock:{PROMPT_VERSION}"
+    return f"{OPENAI_MODEL}:{PROMPT_VERSION}"
+
 def analyze_response(
     question_type: str,
     question_text: str,
     response_text: Optional[str] = None,
     selected_option: Optional[str] = None,
-    options: Optional[List[str]] = None
+    options: Optional[List[str]] = None,
+    reference_answer: Optional[str] = None,
+    rubric: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Analyze a candidate's response to an interview question.
@@ -70,12 +104,14 @@ def analyze_response(
         response_text: The candidate's text response or video transcript
         selected_option: For MCQ questions, the option selected
         options: For MCQ questions, the list of available options
+        reference_answer: An example of a strong answer, if the question has one
+        rubric: Points a strong answer covers, if the question has them
         
     Returns:
         A dictionary containing the analysis results
     """
     # In development mode, return mock data
-    if os.getenv("APP_ENV") == "development" or not os.getenv("OPENAI_API_KEY"):
+    if use_mock_analysis():
         # Generate a score between 1 and 5, with weights to simulate a normal distribution
         score_weights = [0.05, 0.15, 0.55, 0.20, 0.05]
         score = random.choices([1, 2, 3, 4, 5], weights=score_weights)[0]
@@ -93,12 +129,12 @@ def analyze_response(
         # Generate some mock notes
         notes = f"Response scored {score}/5. Demonstrated {', '.join(strengths[:1])}. Could improve on {', '.join(weaknesses[:1])}."
         
-        # Generate sentiment
-        sentiment = random.choice(["positive", "neutral", "negative"])
+        # Generate sentiment (-1 to 1, as stored in ResponseAnalysis.sentiment)
+        sentiment = random.choice([1.0, 0.0, -1.0])
         if score >= 4:
-            sentiment = "positive"
+            sentiment = 1.0
         elif score <= 2:
-            sentiment = "negative"
+            sentiment = -1.0
         
         return {
             "score": score,
@@ -111,63 +147,15 @@ def analyze_response(
     
     # In production, use OpenAI API
     else:
-        # TODO: Implement OpenAI API integration
-        """
-        Example of how this would be implemented:
-        
-        messages = [
-            {"role": "system", "content": "You are an expert interviewer analyzing candidate responses."},
-            {"role": "user", "content": f"Question: {question_text}\n\nResponse: {response_text or selected_option}"}
-        ]
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            functions=[{
-                "name": "analyze_response",
-                "description": "Analyze the candidate's response",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "score": {
-                            "type": "number",
-                            "description": "Score from 1-5 where 5 is excellent"
-                        },
-                        "strengths": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of strengths in the response"
-                        },
-                        "weaknesses": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of weaknesses or areas for improvement"
-                        },
-                        "notes": {
-                            "type": "string",
-                            "description": "General notes about the response"
-                        },
-                        "keywords": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Key terms or concepts mentioned in response"
-                        },
-                        "sentiment": {
-                            "type": "string",
-                            "enum": ["positive", "neutral", "negative"],
-                            "description": "Overall sentiment of the response"
-                        }
-                    },
-                    "required": ["score", "strengths", "weaknesses", "notes"]
-                }
-            }]
-        )
-        
-        return json.loads(response.choices[0].message.function_call.arguments)
-        """
-        
-        # Fallback to mock data for now
-        return analyze_response(question_type, question_text, response_text, selected_option, options)
+        return analyze_responses([{
+            "question_type": question_type,
+            "question_text": question_text,
+            "response_text": response_text,
+            "selected_option": selected_option,
+            "options": options,
+            "reference_answer": reference_answer,
+            "rubric": rubric
+        }], mode="serial")[0]
 
 
 def analyze_full_interview(interview_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -182,7 +170,7 @@ def analyze_full_interview(interview_data: Dict[str, Any]) -> Dict[str, Any]:
         A dictionary containing the overall analysis results
     """
     # In development mode, return mock data
-    if os.getenv("APP_ENV") == "development" or not os.getenv("OPENAI_API_KEY"):
+    if use_mock_analysis():
         # Calculate average score from individual response scores
         if interview_data.get("responses"):
             scores = [r.get("score", 0) for r in interview_data["responses"]]
@@ -236,68 +224,340 @@ def analyze_full_interview(interview_data: Dict[str, Any]) -> Dict[str, Any]:
     
     # In production, use OpenAI API
     else:
-        # TODO: Implement OpenAI API integration
-        """
-        Example of how this would be implemented:
-        
-        # Format the interview data for the API
-        response_summaries = []
-        for resp in interview_data.get("responses", []):
-            summary = {
-                "question": resp.get("question_text", ""),
-                "response": resp.get("response_text", ""),
-                "score": resp.get("score", 0),
-                "strengths": resp.get("strengths", []),
-                "weaknesses": resp.get("weaknesses", [])
-            }
-            response_summaries.append(summary)
-        
-        prompt = {
-            "candidate": interview_data.get("candidate_name", "Candidate"),
-            "position": interview_data.get("position", "Not specified"),
-            "responses": response_summaries
-        }
-        
-        messages = [
-            {"role": "system", "content": "You are an expert interviewer analyzing complete candidate interviews."},
-            {"role": "user", "content": f"Please analyze this interview: {json.dumps(prompt)}"}
-        ]
+        return model_client.run(_analyze_full_interview(interview_data))
+
+
+def analyze_responses(
+    items: List[Dict[str, Any]],
+    mode: Optional[str] = None,
+    on_result: Optional[ResultCallback] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Analyze several responses of one interview, e.g. all answers still missing an analysis.
+    
+    Args:
+        items: One dictionary per response, with the keyword arguments of analyze_response
+        mode: "serial", "concurrent" or "batch" (see ANALYSIS_MODES); defaults to ANALYSIS_MODE
+        on_result: Called with (index, analysis) as each response finishes, before the
+            whole list is returned; from the model client's thread outside development
         
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            functions=[{
-                "name": "analyze_interview",
-                "description": "Analyze the complete interview",
-                "parameters": {
+    Returns:
+        The analysis results, in the order of `items`
+    """
+    mode = mode or ANALYSIS_MODE
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode {mode!r}, expected one of {', '.join(ANALYSIS_MODES)}")
+    if not items:
+        return []
+    if use_mock_analysis():
+        results = []
+        for index, item in enumerate(items):
+            results.append(analyze_response(**item))
+            if on_result:
+                on_result(index, results[-1])
+        return results
+    # Called from the analysis worker threads; the calls run on the shared client's event loop
+    return model_client.run(_analyze_responses(items, mode, on_result))
+
+
+# Model calls (production)
+RESPONSE_ANALYSIS_PROPERTIES = {
+    "score": {
+        "type": "number",
+        "description": "Score from 1-5 where 5 is excellent"
+    },
+    "strengths": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "List of strengths in the response"
+    },
+    "weaknesses": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "List of weaknesses or areas for improvement"
+    },
+    "notes": {
+        "type": "string",
+        "description": "General notes about the response"
+    },
+    "keywords": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Key terms or concepts mentioned in response"
+    },
+    "sentiment": {
+        "type": "string",
+        "enum": ["positive", "neutral", "negative"],
+        "description": "Overall sentiment of the response"
+    }
+}
+
+RESPONSE_ANALYSIS_REQUIRED = ["score", "strengths", "weaknesses", "notes"]
+
+RESPONSE_ANALYSIS_FUNCTION = {
+    "name": "analyze_response",
+    "description": "Analyze the candidate's response",
+    "parameters": {
+        "type": "object",
+        "properties": RESPONSE_ANALYSIS_PROPERTIES,
+        "required": RESPONSE_ANALYSIS_REQUIRED
+    }
+}
+
+BATCH_ANALYSIS_FUNCTION = {
+    "name": "analyze_responses",
+    "description": "Analyze each of the candidate's responses separately",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "analyses": {
+                "type": "array",
+                "items": {
                     "type": "object",
                     "properties": {
-                        "overall_score": {
-                            "type": "number",
-                            "description": "Overall score from 1-5 where 5 is excellent"
-                        },
-                        "recommendation": {
-                            "type": "string",
-                            "description": "Hiring recommendation"
+                        "index": {
+                            "type": "integer",
+                            "description": "Index of the response being analyzed"
                         },
-                        "strengths": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of candidate's key strengths"
-                        },
-                        "weaknesses": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of candidate's key weaknesses or areas for improvement"
-                        }
+                        **RESPONSE_ANALYSIS_PROPERTIES
                     },
-                    "required": ["overall_score", "recommendation", "strengths", "weaknesses"]
+                    "required": ["index"] + RESPONSE_ANALYSIS_REQUIRED
                 }
-            }]
-        )
-        
-        return json.loads(response.choices[0].message.function_call.arguments)
-        """
-        
-        # Fallback to mock data for now
-        return analyze_full_interview(interview_data) 
\ No newline at end of file
+            }
+        },
+        "required": ["analyses"]
+    }
+}
+
+INTERVIEW_ANALYSIS_FUNCTION = {
+    "name": "analyze_interview",
+    "description": "Analyze the complete interview",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "overall_score": {
+                "type": "number",
+                "description": "Overall score from 1-5 where 5 is excellent"
+            },
+            "recommendation": {
+                "type": "string",
+                "description": "Hiring recommendation"
+            },
+            "strengths": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "List of candidate's key strengths"
+            },
+            "weaknesses": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "List of candidate's key weaknesses or areas for improvement"
+            }
+        },
+        "required": ["overall_score", "recommendation", "strengths", "weaknesses"]
+    }
+}
+
+# ResponseAnalysis.sentiment is stored as a number from -1 to 1
+SENTIMENT_VALUES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+class ModelOutputError(ValueError):
+    """The model answered without valid arguments for the requested function."""
+
+# Extra attempts when the model returns malformed function arguments
+MALFORMED_OUTPUT_RETRIES = 1
+
+def _function_arguments(body: Any, function: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Arguments of the call to `function` in a chat completion, from either the
+    function_call or the tool_calls form of the message.
+    """
+    try:
+        message = body["choices"][0]["message"]
+        calls = [call["function"] for call in message.get("tool_calls") or []]
+        if message.get("function_call"):
+            calls.append(message["function_call"])
+        call = next(call for call in calls if call.get("name") in (None, function["name"]))
+        arguments = json.loads(call["arguments"])
+    except (KeyError, IndexError, TypeError, StopIteration, ValueError) as exc:
+        raise ModelOutputError(f"No valid {function['name']} call in the model response") from exc
+    if not isinstance(arguments, dict):
+        raise ModelOutputError(f"Arguments of {function['name']} are not an object")
+    missing = [name for name in function["parameters"].get("required", []) if name not in arguments]
+    if missing:
+        raise ModelOutputError(f"{function['name']} call is missing {', '.join(missing)}")
+    return arguments
+
+async def _call_function(
+    client: httpx.AsyncClient,
+    system_prompt: str,
+    user_prompt: str,
+    function: Dict[str, Any],
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """Make one chat completion that must answer through `function`, and return its arguments."""
+    payload = {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "functions": [function],
+        "function_call": {"name": function["name"]}
+    }
+    for attempt in range(MALFORMED_OUTPUT_RETRIES + 1):
+        response = await scheduler.post(client, "/chat/completions", payload, timeout=timeout)
+        try:
+            return _function_arguments(response.json(), function)
+        except ValueError:
+            # Malformed JSON or a ModelOutputError; sampling again usually fixes it
+            if attempt == MALFORMED_OUTPUT_RETRIES:
+                raise
+
+def _response_prompt(item: Dict[str, Any]) -> str:
+    prompt = f"Question: {item['question_text']}\n\nResponse: {item.get('response_text') or item.get('selected_option') or ''}"
+    if item.get("options"):
+        prompt += f"\n\nOptions: {json.dumps(item['options'])}"
+    if item.get("reference_answer"):
+        prompt += f"\n\nReference answer: {item['reference_answer']}"
+    if item.get("rubric"):
+        prompt += f"\n\nA strong answer covers: {json.dumps(item['rubric'])}"
+    return prompt
+
+def _strings(value: Any) -> List[str]:
+    return [str(entry) for entry in value if entry is not None] if isinstance(value, list) else []
+
+def _score(value: Any) -> float:
+    """A model-reported score as a float clamped to 0-5; anything unparseable counts as 0."""
+    try:
+        return min(5.0, max(0.0, float(value or 0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+def _response_result(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the fields crud stores, coerced to their column types, with sentiment in its numeric form."""
+    score = _score(arguments.get("score"))
+    sentiment = arguments.get("sentiment")
+    if isinstance(sentiment, str):
+        sentiment = SENTIMENT_VALUES.get(sentiment.lower())
+    elif not isinstance(sentiment, (int, float)):
+        sentiment = None
+    notes = arguments.get("notes")
+    return {
+        "score": score,
+        "strengths": _strings(arguments.get("strengths")),
+        "weaknesses": _strings(arguments.get("weaknesses")),
+        "notes": notes if isinstance(notes, str) else None,
+        "keywords": _strings(arguments.get("keywords")),
+        "sentiment": sentiment
+    }
+
+async def _analyze_one(client: httpx.AsyncClient, item: Dict[str, Any]) -> Dict[str, Any]:
+    arguments = await _call_function(
+        client,
+        "You are an expert interviewer analyzing candidate responses.",
+        _response_prompt(item),
+        RESPONSE_ANALYSIS_FUNCTION
+    )
+    return _response_result(arguments)
+
+async def _analyze_concurrently(
+    client: httpx.AsyncClient,
+    items: List[Dict[str, Any]],
+    on_result: Optional[ResultCallback] = None
+) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+
+    async def analyze(index, item):
+        async with semaphore:
+            result = await _analyze_one(client, item)
+        if on_result:
+            on_result(index, result)
+        return result
+
+    return list(await asyncio.gather(*(analyze(index, item) for index, item in enumerate(items))))
+
+async def _analyze_batch(
+    client: httpx.AsyncClient,
+    items: List[Dict[str, Any]],
+    on_result: Optional[ResultCallback] = None
+) -> List[Dict[str, Any]]:
+    """Score all responses in one call; any the model leaves out are scored individually."""
+    prompt = "\n\n".join(f"Response {index}\n{_response_prompt(item)}" for index, item in enumerate(items))
+    arguments = await _call_function(
+        client,
+        "You are an expert interviewer analyzing candidate responses. Analyze every response on its own.",
+        prompt,
+        BATCH_ANALYSIS_FUNCTION,
+        timeout=OPENAI_BATCH_TIMEOUT_SECONDS
+    )
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    analyses = arguments["analyses"] if isinstance(arguments["analyses"], list) else []
+    for analysis in analyses:
+        index = analysis.get("index") if isinstance(analysis, dict) else None
+        if isinstance(index, int) and 0 <= index < len(items):
+            results[index] = _response_result(analysis)
+    missing = [index for index, result in enumerate(results) if result is None]
+    if on_result:
+        for index, result in enumerate(results):
+            if result is not None:
+                on_result(index, result)
+    if missing:
+        def on_missing(position, result):
+            if on_result:
+                on_result(missing[position], result)
+
+        for index, result in zip(missing, await _analyze_concurrently(client, [items[i] for i in missing], on_missing)):
+            results[index] = result
+    return results
+
+async def _analyze_responses(
+    items: List[Dict[str, Any]],
+    mode: str,
+    on_result: Optional[ResultCallback] = None
+) -> List[Dict[str, Any]]:
+    client = model_client.client
+    if mode == "batch":
+        return await _analyze_batch(client, items, on_result)
+    if mode == "concurrent":
+        return await _analyze_concurrently(client, items, on_result)
+    results = []
+    for index, item in enumerate(items):
+        results.append(await _analyze_one(client, item))
+        if on_result:
+            on_result(index, results[-1])
+    return results
+
+def _interview_result(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the fields crud stores, coerced to their column types; the overall score feeds the rollup histogram."""
+    recommendation = arguments.get("recommendation")
+    return {
+        "overall_score": _score(arguments.get("overall_score")),
+        "recommendation": recommendation if isinstance(recommendation, str) else None,
+        "strengths": _strings(arguments.get("strengths")),
+        "weaknesses": _strings(arguments.get("weaknesses"))
+    }
+
+async def _analyze_full_interview(interview_data: Dict[str, Any]) -> Dict[str, Any]:
+    response_summaries = [
+        {
+            "question": response.get("question_text", ""),
+            "response": response.get("response_text", ""),
+            "score": response.get("score", 0),
+            "strengths": response.get("strengths", []),
+            "weaknesses": response.get("weaknesses", [])
+        }
+        for response in interview_data.get("responses", [])
+    ]
+    prompt = {
+        "candidate": interview_data.get("candidate_name", "Candidate"),
+        "position": interview_data.get("interview_title") or "Not specified",
+        "responses": response_summaries
+    }
+    arguments = await _call_function(
+        model_client.client,
+        "You are an expert interviewer analyzing complete candidate interviews.",
+        f"Please analyze this interview: {json.dumps(prompt)}",
+        INTERVIEW_ANALYSIS_FUNCTION
+    )
+    return _interview_result(arguments)
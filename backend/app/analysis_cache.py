@@ -0,0 +1,222 @@
+"""
+Content-addressed cache of response analyses (models.AnalysisCacheEntry).
+
+An analysis depends only on the question, the answer and what scores it, so
+identical answers to identical questions (copied templates, re-runs) reuse the
+stored result instead of paying for another model call. Entries are keyed by a
+hash of the analyze_response inputs and the scorer version (Scorer.version):
+bumping ai_engine.PROMPT_VERSION or changing OPENAI_MODEL makes older entries
+miss, and `prune` deletes them, keeping the current version of every scorer:
+
+    python -m app.analysis_cache prune
+
+An in-process LRU in front of the table serves repeated keys without a query.
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .ai_engine import ResultCallback
+from .database import UPSERT_DIALECTS
+from .scorers import SCORERS, Scorer
+
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+# Results kept in memory per process
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "2048"))
+
+def content_key(item: Dict[str, Any], version: str) -> str:
+    """SHA-256 of the analyze_response arguments in `item` and the scorer version."""
+    question_type = item.get("question_type")
+    payload = [
+        version,
+        getattr(question_type, "value", question_type),
+        item.get("question_text"),
+        item.get("response_text"),
+        item.get("selected_option"),
+        item.get("options"),
+        item.get("reference_answer"),
+        item.get("rubric"),
+    ]
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class AnalysisCache:
+    """LRU of analysis results in front of the analysis_cache table, with hit counters."""
+
+    def __init__(self, max_entries: int = ANALYSIS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        # Callers hold the lock
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, db: Session, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Results stored under any of `keys`, from memory or the table."""
+        found = {}
+        with self._lock:
+            for key in set(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+            self.memory_hits += len(found)
+        remaining = [key for key in set(keys) if key not in found]
+        rows = []
+        if remaining:
+            table = models.AnalysisCacheEntry
+            rows = db.execute(select(table.key, table.result).where(table.key.in_(remaining))).all()
+        with self._lock:
+            for key, result in rows:
+                found[key] = result
+                self._remember(key, result)
+            self.database_hits += len(rows)
+            self.misses += len(remaining) - len(rows)
+        return found
+
+    def put_many(self, db: Session, version: str, results: Dict[str, Dict[str, Any]]):
+        """Store new results as part of the caller's transaction; keys stored concurrently are kept."""
+        if not results:
+            return
+        table = models.AnalysisCacheEntry.__table__
+        rows = [{"key": key, "scorer_version": version, "result": result} for key, result in results.items()]
+        dialect = db.get_bind().dialect.name
+        if dialect in UPSERT_DIALECTS:
+            db.execute(UPSERT_DIALECTS[dialect](table).values(rows).on_conflict_do_nothing(index_elements=["key"]))
+        else:
+            existing = set(db.scalars(select(table.c.key).where(table.c.key.in_(list(results)))))
+            new_rows = [row for row in rows if row["key"] not in existing]
+            if new_rows:
+                db.execute(insert(table), new_rows)
+        with self._lock:
+            for key, result in results.items():
+                self._remember(key, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self):
+        with self._lock:
+            hits = self.memory_hits + self.database_hits
+            lookups = hits + self.misses
+            return {
+                "enabled": ANALYSIS_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "database_hits": self.database_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+            }
+
+analysis_cache = AnalysisCache()
+
+def score_here(scorer: Scorer, items: List[Dict[str, Any]], on_result: Optional[ResultCallback] = None):
+    """
+    scorer.analyze_responses, with `on_result` called on the calling thread as each
+    result arrives rather than on the thread the scorer finishes it on (the model
+    client's event loop), so that it may use the caller's session.
+    """
+    if on_result is None:
+        return scorer.analyze_responses(items)
+    arrived = queue.Queue()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="scorer") as executor:
+        future = executor.submit(scorer.analyze_responses, items, lambda index, result: arrived.put((index, result)))
+        future.add_done_callback(lambda _: arrived.put(None))
+        while (delivered := arrived.get()) is not None:
+            on_result(*delivered)
+        return future.result()
+
+def analyze_responses(
+    db: Session,
+    items: List[Dict[str, Any]],
+    scorer: Scorer,
+    on_result: Optional[ResultCallback] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    scorer.analyze_responses through the cache: only answers without a stored
+    result for the scorer's current version are scored, each distinct one once.
+    Cached results are passed to `on_result` right away, the others as the scorer
+    finishes them, always on the calling thread.
+    """
+    if not ANALYSIS_CACHE_ENABLED or not scorer.cacheable:
+        return score_here(scorer, items, on_result)
+    version = scorer.version()
+    keys = [content_key(item, version) for item in items]
+    results = analysis_cache.get_many(db, keys)
+
+    missing = {}
+    positions: Dict[str, List[int]] = {}
+    for index, (key, item) in enumerate(zip(keys, items)):
+        if key in results:
+            if on_result:
+                on_result(index, dict(results[key]))
+        else:
+            missing.setdefault(key, item)
+            positions.setdefault(key, []).append(index)
+    missing_keys = list(missing)
+
+    def on_fresh(position, result):
+        # Every response with the same answer gets the result
+        for index in positions[missing_keys[position]]:
+            on_result(index, dict(result) if result else None)
+
+    fresh = {
+        key: result
+        for key, result in zip(missing_keys, score_here(scorer, list(missing.values()), on_fresh if on_result else None))
+        if result
+    }
+    analysis_cache.put_many(db, version, fresh)
+    results.update(fresh)
+    # Copies, so callers cannot modify what the cache holds
+    return [dict(results[key]) if key in results else None for key in keys]
+
+def prune(db: Session, keep_versions: Iterable[str] = ()) -> int:
+    """
+    Delete the entries of old scorer versions. The current version of every
+    registered scorer is kept, since templates can pick any of them, plus
+    `keep_versions`.
+    """
+    keep = {scorer.version() for scorer in SCORERS.values()} | set(keep_versions)
+    table = models.AnalysisCacheEntry
+    deleted = db.execute(delete(table).where(table.scorer_version.notin_(keep))).rowcount
+    db.commit()
+    analysis_cache.clear()
+    return deleted
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the response analysis cache")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    prune_command = subcommands.add_parser("prune", help="Delete entries from other scorer versions")
+    prune_command.add_argument(
+        "--keep-version", action="append", default=[],
+        help="Also keep this version (repeatable); current versions of all scorers are always kept"
+    )
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        deleted = prune(db, keep_versions=args.keep_version)
+    finally:
+        db.close()
+    print(f"Deleted {deleted} cached analyses")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+In-process notifications about running interview analyses.
+
+The analysis workers (jobs.py) publish an event for every change of job status,
+for every response score as soon as it is committed, and for the overall
+analysis once the summary is committed; the analysis stream
+(GET /analytics/interview/{id}/stream) forwards them to the recruiter as
+Server-Sent Events. Workers publish from their own threads, so events are
+handed to each subscriber's event loop with call_soon_threadsafe.
+
+Only workers in the same process reach a subscriber. Streams also poll the
+analysis job, so analyses run by `python -m app.jobs` or another API worker
+still arrive, once the whole job has finished.
+"""
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+Event = Tuple[str, Dict[str, Any]]
+
+class AnalysisEvents:
+    """Subscribers per interview, each with a queue on its event loop."""
+
+    def __init__(self):
+        self._subscribers: Dict[int, List[Tuple[asyncio.AbstractEventLoop, "asyncio.Queue[Event]"]]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self, interview_id: int) -> Iterator["asyncio.Queue[Event]"]:
+        """Queue of (event, data) published for the interview until the block exits; call from async code."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(interview_id, []).append(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(interview_id, [])
+                subscribers.remove(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(interview_id, None)
+
+    def publish(self, interview_id: int, event: str, data: Dict[str, Any]):
+        """Send `event` to the interview's subscribers; a no-op when nobody is listening."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(interview_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+            except RuntimeError:
+                # The subscriber's loop has closed; its block is exiting
+                pass
+
+    def status(self):
+        with self._lock:
+            return {"streams": sum(len(subscribers) for subscribers in self._subscribers.values())}
+
+def job_event(job) -> Dict[str, Any]:
+    """Data of the `job` event for an analysis job (models.AnalysisJob)."""
+    return {"id": job.id, "status": job.status.value, "attempts": job.attempts, "error": job.error}
+
+def analysis_event(analysis) -> Dict[str, Any]:
+    """Data of the `analysis` event for an overall analysis (models.InterviewAnalysis)."""
+    return {
+        "interview_id": analysis.interview_id,
+        "overall_score": analysis.overall_score,
+        "recommendation": analysis.recommendation,
+        "strengths": analysis.strengths,
+        "weaknesses": analysis.weaknesses,
+        "created_at": analysis.created_at
+    }
+
+analysis_events = AnalysisEvents()
@@ -0,0 +1,189 @@
+"""
+Async counterparts of the crud operations, for routes using an AsyncSession.
+
+Reads await the same statements crud builds. Writes run the crud implementation
+through AsyncSession.run_sync, which drives it on the async driver without
+blocking the event loop, queued one at a time on SQLite (database.write_queue),
+and then reload whatever the route renders: lazy loading is not available once
+control is back in async code. The analytics aggregations are CPU-bound rather
+than I/O-bound, so they run on a worker thread.
+"""
+import datetime
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from . import crud, models, schemas
+from .database import SessionLocal, write_queue
+from .clerk_events import clerk_event_consumer
+from .jobs import analysis_workers
+from .mailer import email_sender
+from .passwords import password_hasher
+
+async def _reload(db: AsyncSession, stmt):
+    """Re-read a row written through run_sync together with its eager-loaded relationships."""
+    return (await db.scalars(stmt.execution_options(populate_existing=True))).first()
+
+async def _write(db: AsyncSession, fn, *args):
+    """Run a crud write through run_sync, queued behind other writers on SQLite."""
+    if write_queue.enabled:
+        # Hand the connection back to the pool while waiting; it carries no pending changes
+        await db.commit()
+    async with write_queue.slot():
+        return await db.run_sync(fn, *args)
+
+async def _in_thread(fn, *args):
+    """
+    Run a CPU-heavy crud function on a worker thread with its own synchronous session.
+    Used for the analytics aggregations, whose NumPy and serialization work would
+    otherwise hold the event loop for the whole computation.
+    """
+    def call():
+        with SessionLocal() as session:
+            return fn(session, *args)
+    return await run_in_threadpool(call)
+
+# User operations
+async def get_user_by_email(db: AsyncSession, email: str):
+    return (await db.scalars(crud.select_user_by_email(email))).first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    # Hash on the password pool first, so the write does not hold the SQLite write queue for it
+    hashed_password = await password_hasher.hash(user.password)
+    return await _write(db, crud.create_user, user, hashed_password)
+
+async def create_user_with_hash(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    """create_user with a hash computed elsewhere (or a placeholder for accounts that cannot log in)."""
+    return await _write(db, crud.create_user, user, hashed_password)
+
+async def create_oauth_user(db: AsyncSession, user: schemas.UserCreate, oauth_provider: str, oauth_provider_id: str):
+    return await _write(db, crud.create_oauth_user, user, oauth_provider, oauth_provider_id)
+
+async def set_password_hash(db: AsyncSession, user_id: int, hashed_password: str):
+    await _write(db, crud.set_password_hash, user_id, hashed_password)
+
+async def link_oauth_account(db: AsyncSession, user_id: int, oauth_provider: str, oauth_provider_id: str):
+    return await _write(db, crud.link_oauth_account, user_id, oauth_provider, oauth_provider_id)
+
+# Video upload operations
+async def get_video_upload(db: AsyncSession, upload_id: str):
+    return (await db.scalars(crud.select_video_upload(upload_id))).first()
+
+async def get_video_playback(db: AsyncSession, upload_id: str):
+    return (await db.execute(crud.select_video_playback(upload_id))).first()
+
+async def create_video_upload(
+    db: AsyncSession,
+    interview_id: int,
+    uploader_id: int,
+    content_type: str,
+    storage_key,
+    expires_at: datetime.datetime,
+    question_id: Optional[int] = None,
+    total_bytes: Optional[int] = None
+) -> models.VideoUpload:
+    upload = await _write(
+        db, crud.create_video_upload, interview_id, uploader_id, content_type, storage_key, expires_at, question_id, total_bytes
+    )
+    return await _reload(db, crud.select_video_upload(upload.id))
+
+async def set_video_upload_progress(db: AsyncSession, upload_id: str, received_bytes: int, total_bytes: Optional[int] = None):
+    await _write(db, crud.set_video_upload_progress, upload_id, received_bytes, total_bytes)
+
+async def complete_video_upload(db: AsyncSession, upload_id: str, sha256: str) -> models.VideoUpload:
+    await _write(db, crud.complete_video_upload, upload_id, sha256)
+    return await _reload(db, crud.select_video_upload(upload_id))
+
+async def abort_video_upload(db: AsyncSession, upload_id: str):
+    await _write(db, crud.abort_video_upload, upload_id)
+
+# Webhook event operations
+async def record_webhook_event(
+    db: AsyncSession, source: str, delivery_id: str, event_type: str, subject: Optional[str], payload: dict,
+    occurred_at: Optional[datetime.datetime] = None
+) -> bool:
+    recorded = await _write(db, crud.record_webhook_event, source, delivery_id, event_type, subject, payload, occurred_at)
+    if recorded:
+        clerk_event_consumer.notify()
+    return recorded
+
+# Interview Template operations
+async def get_interview_template(db: AsyncSession, template_id: int):
+    return (await db.scalars(crud.select_interview_template(template_id))).first()
+
+async def get_interview_templates(db: AsyncSession, skip: int = 0, limit: int = 100, user_id: Optional[int] = None, after_id: Optional[int] = None):
+    return (await db.scalars(crud.select_interview_templates(skip=skip, limit=limit, user_id=user_id, after_id=after_id))).all()
+
+async def create_interview_template(db: AsyncSession, template: schemas.InterviewTemplateCreate, user_id: int):
+    db_template = await _write(db, crud.create_interview_template, template, user_id)
+    return await _reload(db, crud.select_interview_template(db_template.id))
+
+async def update_interview_template(db: AsyncSession, template_id: int, template: schemas.InterviewTemplateCreate):
+    db_template = await _write(db, crud.update_interview_template, template_id, template)
+    if db_template is None:
+        return None
+    return await _reload(db, crud.select_interview_template(template_id))
+
+# Interview operations
+async def get_interview(db: AsyncSession, interview_id: int):
+    return (await db.scalars(crud.select_interview(interview_id))).first()
+
+async def get_recruiter_interviews(db: AsyncSession, recruiter_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = crud.select_interviews(models.Interview.recruiter_id == recruiter_id, skip=skip, limit=limit, after_id=after_id)
+    return (await db.scalars(stmt)).all()
+
+async def get_candidate_interviews(db: AsyncSession, candidate_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = crud.select_interviews(models.Interview.candidate_id == candidate_id, skip=skip, limit=limit, after_id=after_id)
+    return (await db.scalars(stmt)).all()
+
+async def get_interviews_by_email(db: AsyncSession, email: str, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = crud.select_interviews(models.Interview.candidate_email == email, skip=skip, limit=limit, after_id=after_id)
+    return (await db.scalars(stmt)).all()
+
+async def create_interview(db: AsyncSession, interview: schemas.InterviewCreate, recruiter_id: int):
+    db_interview, invitation = await _write(db, crud.create_interview, interview, recruiter_id)
+    email_sender.notify()
+    return await _reload(db, crud.select_interview(db_interview.id)), invitation
+
+async def create_interviews(db: AsyncSession, interviews: List[schemas.InterviewCreate], recruiter_id: int):
+    created = await _write(db, crud.create_interviews, interviews, recruiter_id)
+    email_sender.notify()
+    return created
+
+async def update_interview_status(db: AsyncSession, interview_id: int, status: models.InterviewStatus):
+    db_interview = await _write(db, crud.update_interview_status, interview_id, status)
+    if db_interview is None:
+        return None
+    return await _reload(db, crud.select_interview(interview_id))
+
+async def submit_interview_response(db: AsyncSession, interview_id: int, response: schemas.InterviewResponseCreate):
+    db_interview = await _write(db, crud.submit_interview_response, interview_id, response)
+    if db_interview is None:
+        return None
+    if db_interview.status == models.InterviewStatus.completed:
+        analysis_workers.notify()
+    return await _reload(db, crud.select_interview(interview_id))
+
+# Analysis job operations
+async def create_analysis_job(db: AsyncSession, interview_id: int, regenerate: bool = False):
+    job = await _write(db, crud.create_analysis_job, interview_id, regenerate)
+    analysis_workers.notify()
+    return job
+
+async def get_latest_analysis_job(db: AsyncSession, interview_id: int):
+    return (await db.scalars(crud.select_latest_analysis_job(interview_id))).first()
+
+# Analytics operations
+async def get_recruiter_dashboard(db: AsyncSession, recruiter_id: int):
+    return await _in_thread(crud.get_recruiter_dashboard, recruiter_id)
+
+async def get_recruiter_analytics(
+    db: AsyncSession,
+    recruiter_id: int,
+    start: datetime.date,
+    end: datetime.date,
+    granularity: schemas.AnalyticsGranularity = schemas.AnalyticsGranularity.day,
+    group_by: schemas.AnalyticsGroupBy = schemas.AnalyticsGroupBy.template
+):
+    return await _in_thread(crud.get_recruiter_analytics, recruiter_id, start, end, granularity, group_by)
@@ -1,38 +1,42 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
 from . import models, schemas
-from .database import get_db
+from .database import get_async_db
+from .passwords import password_hasher, pwd_context
+from .principal_cache import AUTH_CACHE_ENABLED, Principal, principal_cache
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days (for demo purposes)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+# Synchronous hashing for scripts; async code uses passwords.password_hasher
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def authenticate_user(email: str, password: str, db: Session = None):
+async def authenticate_user(email: str, password: str, db: AsyncSession = None):
     """
     Authenticate a user by email and password
     
     For demo purposes, allow certain email patterns to automatically authenticate
     as specific user types without checking the database
+
+    The password check runs on the password hashing pool and raises
+    passwords.PasswordHasherBusy when that is saturated. Hashes made with an
+    outdated cost are replaced on a successful login.
     """
     # Demo authentication mode
     if email.endswith("@example.com"):
@@ -58,28 +62,33 @@ def authenticate_user(email: str, password: str, db: Session = None):
     
     # Real authentication with database
     if db:
-        user = db.query(models.User).filter(models.User.email == email).first()
+        user = (await db.scalars(select(models.User).where(models.User.email == email))).first()
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
         if not user.is_active:
             return None
+        if new_hash:
+            # Imported here: async_crud pulls in the background workers, which import crud and so this module
+            from . import async_crud
+            await async_crud.set_password_hash(db, user.id, new_hash)
         return user
     
     return None
 
-def authenticate_oauth_user(email: str, oauth_provider: str, oauth_provider_id: str, db: Session):
+async def authenticate_oauth_user(email: str, oauth_provider: str, oauth_provider_id: str, db: AsyncSession):
     """Authenticate a user based on OAuth provider information"""
     # Check if user exists with this OAuth provider ID
-    user = db.query(models.User).filter(
+    user = (await db.scalars(select(models.User).where(
         models.User.oauth_provider == oauth_provider,
         models.User.oauth_provider_id == oauth_provider_id
-    ).first()
+    ))).first()
     
     # If not found, try by email as fallback
     if not user:
-        user = db.query(models.User).filter(models.User.email == email).first()
+        user = (await db.scalars(select(models.User).where(models.User.email == email))).first()
     
     # Ensure the user is active
     if user and not user.is_active:
@@ -97,13 +106,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """
+    The user the bearer token belongs to. Database users are returned as a Principal
+    snapshot, cached per token (see principal_cache.py), so repeat requests skip
+    both the token verification and the user query.
+    """
+    if AUTH_CACHE_ENABLED:
+        principal = principal_cache.get(token)
+        if principal is not None:
+            return principal
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
+        # Access tokens have no audience; without one to expect, decode rejects
+        # tokens issued for an audience, such as video playback tokens
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         user_type: str = payload.get("user_type")
@@ -137,10 +158,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     else:
         # Real authentication with database
-        user = db.query(models.User).filter(models.User.email == token_data.email).first()
-        if user is None:
+        generation = principal_cache.generation
+        db_user = (await db.scalars(select(models.User).where(models.User.email == token_data.email))).first()
+        if db_user is None:
             raise credentials_exception
-        if not user.is_active:
+        if not db_user.is_active:
             raise HTTPException(status_code=400, detail="Inactive user")
+        user = Principal.from_user(db_user)
+        if AUTH_CACHE_ENABLED:
+            principal_cache.put(token, user, token_expires_at=payload.get("exp"), generation=generation)
     
     return user 
\ No newline at end of file
@@ -1,20 +1,34 @@
+import logging
 import os
-import time
 import jwt
 from jwt.exceptions import InvalidTokenError
 from typing import Optional
 from fastapi import Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from .database import get_db
-from . import models, crud
+from .database import get_async_db
+from . import models, async_crud
+from .jwks import JWKSCache
 
-# Clerk's JWKS endpoint (for verifying JWTs)
-CLERK_JWKS_URL = "https://api.clerk.dev/v1/jwks"
+logger = logging.getLogger(__name__)
 
-# In-memory cache for JWT verification keys
-jwks_client = None
+CLERK_SECRET_KEY = os.getenv("CLERK_SECRET_KEY")
+# Clerk's JWKS endpoint (for verifying JWTs); Clerk sign-in is off without one
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL") or ("https://api.clerk.dev/v1/jwks" if CLERK_SECRET_KEY else "")
+# Expected iss claim (the Clerk frontend API URL); not checked when unset
+CLERK_ISSUER = os.getenv("CLERK_ISSUER") or None
+# Comma-separated origins accepted in the azp claim; not checked when unset
+CLERK_AUTHORIZED_PARTIES = [party.strip() for party in os.getenv("CLERK_AUTHORIZED_PARTIES", "").split(",") if party.strip()]
+# Clock skew tolerated on exp/nbf/iat, in seconds
+CLERK_LEEWAY_SECONDS = float(os.getenv("CLERK_LEEWAY_SECONDS", "5"))
+
+# In-memory cache for JWT verification keys (see app.jwks)
+clerk_jwks = JWKSCache(
+    CLERK_JWKS_URL,
+    headers={"Authorization": f"Bearer {CLERK_SECRET_KEY}"} if CLERK_SECRET_KEY else None
+)
 
 class ClerkUserData(BaseModel):
     """Basic data structure for Clerk user info"""
@@ -23,14 +37,34 @@ class ClerkUserData(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
 
-async def get_clerk_user(request: Request, db: Session = Depends(get_db)) -> Optional[models.User]:
+async def verify_clerk_token(token: str) -> dict:
+    """The claims of a Clerk session token; raises InvalidTokenError unless its RS256 signature checks out."""
+    if not CLERK_JWKS_URL:
+        raise InvalidTokenError("Clerk is not configured")
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") != "RS256":
+        raise InvalidTokenError(f"Unexpected token algorithm {header.get('alg')}")
+    key = await clerk_jwks.get_key(header.get("kid"))
+    if key is None:
+        raise InvalidTokenError(f"Unknown signing key {header.get('kid')}")
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=["RS256"],
+        issuer=CLERK_ISSUER,
+        leeway=CLERK_LEEWAY_SECONDS,
+        options={"require": ["exp", "sub"], "verify_aud": False}
+    )
+    if CLERK_AUTHORIZED_PARTIES and claims.get("azp") not in CLERK_AUTHORIZED_PARTIES:
+        raise InvalidTokenError(f"Unauthorized party {claims.get('azp')}")
+    return claims
+
+async def get_clerk_user(request: Request, db: AsyncSession = Depends(get_async_db)) -> Optional[models.User]:
     """
     Get the current user from Clerk JWT
-    
-    This is a simplified version - in a production app, you'd want to:
-    1. Use a proper JWKS client to validate and decode the JWT
-    2. Cache the JWKS keys to avoid repeated network requests
-    3. Handle key rotation properly
+
+    The token is verified against Clerk's signing keys, which are cached and
+    refreshed in the background (see verify_clerk_token and app.jwks).
     """
     try:
         # Extract the token from the Authorization header
@@ -40,14 +74,7 @@ async def get_clerk_user(request: Request, db: Session = Depends(get_db)) -> Opt
             
         token = auth_header.replace("Bearer ", "")
         
-        # Simple decode of the JWT to get user info
-        # WARNING: In production, validate signature properly with JWKS
-        # This is simplified for demo purposes
-        decoded = jwt.decode(
-            token, 
-            options={"verify_signature": False},
-            algorithms=["RS256"]
-        )
+        decoded = await verify_clerk_token(token)
         
         # Extract user data
         user_id = decoded.get("sub")
@@ -55,26 +82,23 @@ async def get_clerk_user(request: Request, db: Session = Depends(get_db)) -> Opt
             return None
             
         # Look up user in our database by Clerk ID
-        db_user = db.query(models.User).filter(
+        db_user = (await db.scalars(select(models.User).where(
             models.User.oauth_provider == "clerk", 
             models.User.oauth_provider_id == user_id
-        ).first()
+        ))).first()
         
         # If not found but we have an email, try by email
         if not db_user and decoded.get("email"):
-            db_user = crud.get_user_by_email(db, email=decoded.get("email"))
+            db_user = await async_crud.get_user_by_email(db, email=decoded.get("email"))
             
             # If found by email but not linked to Clerk, update the link
             if db_user and not db_user.oauth_provider_id:
-                db_user.oauth_provider = "clerk"
-                db_user.oauth_provider_id = user_id
-                db.commit()
+                db_user = await async_crud.link_oauth_account(db, db_user.id, "clerk", user_id)
         
         return db_user
     
-    except Exception as e:
-        # Log the error in a real app
-        print(f"Error authenticating with Clerk: {e}")
+    except InvalidTokenError as e:
+        logger.info("Rejected Clerk token: %s", e)
         return None
 
 # Dependency to require a logged-in user
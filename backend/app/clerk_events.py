@@ -0,0 +1,306 @@
+"""
+Background processing of Clerk webhook events (models.WebhookEvent).
+
+The webhook route only verifies a delivery, stores it keyed by its svix-id and
+answers 200, so Clerk's retries during a burst (bulk user imports) neither
+queue behind user writes nor apply an event twice: a redelivered id is dropped.
+The consumer threads here claim stored events in batches of WEBHOOK_BATCH_SIZE,
+group them by Clerk user and apply each user's events, oldest first, as a single
+change: the last snapshot of the user wins, so a creation followed by several
+updates is one write. Events are ordered by when the change happened in Clerk
+(event_timestamp), not by when they arrived, since svix retries deliver them out
+of order; a change no newer than the one last applied to the user
+(User.oauth_synced_at) is skipped. The whole batch and the events' new status
+are committed together; if a user's change fails, the batch is applied again one
+user at a time and only that user's events are retried, with exponential
+backoff from WEBHOOK_RETRY_SECONDS, until WEBHOOK_MAX_ATTEMPTS dead-letters them.
+Later events of a user wait while an earlier one is being retried or is
+dead-lettered, so a creation that failed is never skipped over by its updates;
+`python -m app.clerk_events requeue` releases them.
+
+The API starts WEBHOOK_CONSUMERS consumer threads on startup and drains them on
+shutdown; set WEBHOOK_CONSUMERS=0 and run `python -m app.clerk_events run` to
+apply events from a separate process. Processed events are kept to recognize
+redeliveries; `python -m app.clerk_events prune` deletes those older than
+WEBHOOK_RETENTION_DAYS.
+"""
+import argparse
+import datetime
+import logging
+import os
+import signal
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_CONSUMERS = int(os.getenv("WEBHOOK_CONSUMERS", "1"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+# Wait before the first retry, doubled for each later one
+WEBHOOK_RETRY_SECONDS = float(os.getenv("WEBHOOK_RETRY_SECONDS", "30"))
+# A batch whose consumer has been silent this long is claimed again
+WEBHOOK_LEASE_SECONDS = float(os.getenv("WEBHOOK_LEASE_SECONDS", "300"))
+# Idle consumers check for events received by other processes this often
+WEBHOOK_POLL_SECONDS = float(os.getenv("WEBHOOK_POLL_SECONDS", "5"))
+WEBHOOK_DRAIN_SECONDS = float(os.getenv("WEBHOOK_DRAIN_SECONDS", "30"))
+# Processed events are kept this long to recognize redeliveries (Clerk retries for about a day)
+WEBHOOK_RETENTION_DAYS = float(os.getenv("WEBHOOK_RETENTION_DAYS", "7"))
+
+SOURCE = "clerk"
+USER_EVENTS = ("user.created", "user.updated", "user.deleted")
+
+def event_subject(event: Dict[str, Any]) -> Optional[str]:
+    """The Clerk user id a webhook event is about, or None for events the consumer ignores."""
+    if event.get("type") not in USER_EVENTS:
+        return None
+    return (event.get("data") or {}).get("id")
+
+def event_timestamp(event: Dict[str, Any], delivered_at: Optional[str] = None) -> datetime.datetime:
+    """
+    When the change an event reports happened, as naive UTC: the user's updated_at
+    (milliseconds since the epoch) if the payload has one, else the svix timestamp
+    of the delivery (seconds), else now.
+    """
+    updated_at = (event.get("data") or {}).get("updated_at")
+    if isinstance(updated_at, (int, float)):
+        seconds = updated_at / 1000
+    else:
+        try:
+            seconds = float(delivered_at)
+        except (TypeError, ValueError):
+            seconds = time.time()
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).replace(tzinfo=None)
+
+def primary_email(user_data: Dict[str, Any]) -> Optional[str]:
+    email_addresses = user_data.get("email_addresses") or []
+    return next((email.get("email_address") for email in email_addresses if email.get("id") == user_data.get("primary_email_address_id")), None)
+
+class UserChange(NamedTuple):
+    """The net effect of a user's events."""
+    clerk_id: str
+    data: Optional[Dict[str, Any]]  # Latest snapshot of the user from created/updated events
+    created: bool  # One of the events created the user
+    deleted: bool  # The last event deleted the user
+    occurred_at: Optional[datetime.datetime] = None  # When the last event happened
+
+def coalesce(clerk_id: str, events: List[models.WebhookEvent]) -> UserChange:
+    """Fold a user's events, in the order they happened, into one change."""
+    data, created, deleted, occurred_at = None, False, False, None
+    for event in sorted(events, key=lambda event: (event.occurred_at is None, event.occurred_at, event.id)):
+        occurred_at = event.occurred_at or occurred_at
+        if event.event_type == "user.deleted":
+            deleted = True
+        else:
+            # Every created/updated event carries the whole user, so the latest one wins
+            data = event.payload.get("data") or {}
+            created = created or event.event_type == "user.created"
+            deleted = False
+    return UserChange(clerk_id, data, created, deleted, occurred_at)
+
+def apply_user_change(db: Session, change: UserChange) -> str:
+    """Apply `change` in the caller's transaction; returns what was done."""
+    db_user = crud.get_user_by_oauth_id(db, "clerk", change.clerk_id)
+    if db_user is not None and db_user.oauth_synced_at and change.occurred_at and change.occurred_at <= db_user.oauth_synced_at:
+        # A redelivery or retry of a change older than the user's current state
+        return "stale"
+    if change.deleted:
+        if db_user is None:
+            return "unknown user"
+        # For data integrity, deactivate rather than delete
+        db_user.is_active = False
+        db_user.oauth_synced_at = change.occurred_at
+        return "deactivated"
+
+    email = primary_email(change.data)
+    if db_user is None and email:
+        db_user = crud.get_user_by_email(db, email=email)
+    if db_user is None:
+        if not change.created:
+            return "unknown user"
+        if not email:
+            return "no primary email"
+        db.add(models.User(
+            email=email,
+            hashed_password="",  # OAuth users don't need a password
+            first_name=change.data.get("first_name", ""),
+            last_name=change.data.get("last_name", ""),
+            user_type=models.UserType.candidate,  # Default type, can be updated later
+            profile_image=change.data.get("image_url") or None,
+            oauth_provider="clerk",
+            oauth_provider_id=change.clerk_id,
+            oauth_synced_at=change.occurred_at
+        ))
+        return "created"
+
+    if db_user.oauth_provider_id and db_user.oauth_provider_id != change.clerk_id:
+        return "email belongs to another user"
+    if not db_user.oauth_provider_id:
+        db_user.oauth_provider = "clerk"
+        db_user.oauth_provider_id = change.clerk_id
+    db_user.first_name = change.data.get("first_name", db_user.first_name)
+    db_user.last_name = change.data.get("last_name", db_user.last_name)
+    # Check for user type in metadata
+    user_type = (change.data.get("public_metadata") or {}).get("userType")
+    if user_type in ["recruiter", "candidate"]:
+        db_user.user_type = user_type
+    if change.data.get("image_url"):
+        db_user.profile_image = change.data["image_url"]
+    db_user.oauth_synced_at = change.occurred_at
+    return "updated"
+
+class ClerkEventConsumer:
+    """Threads that claim and apply stored Clerk events until drained."""
+
+    def __init__(self, consumers: int = WEBHOOK_CONSUMERS, session_factory=SessionLocal):
+        self.consumers = consumers
+        self.session_factory = session_factory
+        self.applied = 0  # Events processed
+        self.writes = 0  # User changes they were coalesced into
+        self.retried = 0
+        self.dead = 0
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._threads or self.consumers <= 0:
+            return
+        self._stopping.clear()
+        for index in range(self.consumers):
+            thread = threading.Thread(target=self._run, name=f"clerk-events-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        """Wake idle consumers after storing an event instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def drain(self, timeout: float = WEBHOOK_DRAIN_SECONDS) -> bool:
+        """
+        Stop claiming events and wait up to `timeout` seconds for batches in flight.
+        Returns False if a batch was still being applied; its lease expires and
+        another process applies it.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            logger.warning("%d webhook event batches still being applied after %.0fs", len(self._threads), timeout)
+        return not self._threads
+
+    def run_next(self, batch_size: int = WEBHOOK_BATCH_SIZE) -> int:
+        """Claim and apply one batch. Returns the number of events claimed."""
+        with self.session_factory() as db:
+            claimed = crud.claim_webhook_events(db, SOURCE, limit=batch_size, lease_seconds=WEBHOOK_LEASE_SECONDS)
+            if not claimed:
+                return 0
+            groups: "OrderedDict[Optional[str], List[models.WebhookEvent]]" = OrderedDict()
+            subjects = {}  # Event id -> subject, readable after the session is closed
+            for event in claimed:
+                groups.setdefault(event.subject, []).append(event)
+                subjects[event.id] = event.subject
+            changes = [coalesce(subject, events) for subject, events in groups.items() if subject is not None]
+            failures: Dict[int, str] = {}
+            try:
+                for change in changes:
+                    apply_user_change(db, change)
+                db.flush()
+                batch_failed = False
+            except Exception:
+                db.rollback()
+                batch_failed = True
+            if not batch_failed:
+                dead = crud.finish_webhook_events(db, claimed, failures, WEBHOOK_MAX_ATTEMPTS, WEBHOOK_RETRY_SECONDS)
+            else:
+                # Find the failing users: apply and commit each user's events on their own
+                dead = 0
+                for subject, events in groups.items():
+                    group_failures = {}
+                    try:
+                        if subject is not None:
+                            apply_user_change(db, coalesce(subject, events))
+                            db.flush()
+                    except Exception as exc:
+                        db.rollback()
+                        logger.exception("Could not apply Clerk events for user %s", subject)
+                        group_failures = {event.id: f"{type(exc).__name__}: {exc}" for event in events}
+                        failures.update(group_failures)
+                    dead += crud.finish_webhook_events(db, events, group_failures, WEBHOOK_MAX_ATTEMPTS, WEBHOOK_RETRY_SECONDS)
+        failed_subjects = {subjects[event_id] for event_id in failures}
+        with self._lock:
+            self.applied += len(claimed) - len(failures)
+            self.writes += len([change for change in changes if change.clerk_id not in failed_subjects])
+            self.retried += len(failures) - dead
+            self.dead += dead
+        return len(claimed)
+
+    def status(self):
+        with self._lock:
+            return {
+                "consumers": len([thread for thread in self._threads if thread.is_alive()]),
+                "applied": self.applied,
+                "user_writes": self.writes,
+                "retried": self.retried,
+                "dead": self.dead,
+            }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self.run_next():
+                    continue
+            except Exception:
+                # Database unavailable or similar; back off until the next poll
+                logger.exception("Clerk event consumer could not apply a batch")
+            self._wakeup.wait(WEBHOOK_POLL_SECONDS)
+            self._wakeup.clear()
+
+clerk_event_consumer = ClerkEventConsumer()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply stored Clerk webhook events")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    run_command = subcommands.add_parser("run", help="Run the event consumers")
+    run_command.add_argument("--consumers", type=int, default=max(WEBHOOK_CONSUMERS, 1), help="Number of consumer threads")
+    subcommands.add_parser("requeue", help="Retry dead-lettered events")
+    subcommands.add_parser("status", help="Count events by status")
+    prune_command = subcommands.add_parser("prune", help="Delete processed events")
+    prune_command.add_argument("--days", type=float, default=WEBHOOK_RETENTION_DAYS, help="Keep events received more recently")
+    args = parser.parse_args(argv)
+
+    if args.command in ("requeue", "status", "prune"):
+        with SessionLocal() as db:
+            if args.command == "requeue":
+                print(f"Requeued {crud.requeue_dead_webhook_events(db)} events")
+            elif args.command == "prune":
+                older_than = datetime.datetime.now() - datetime.timedelta(days=args.days)
+                print(f"Deleted {crud.prune_webhook_events(db, older_than)} events")
+            else:
+                print(", ".join(f"{count} {status}" for status, count in crud.count_webhook_events(db).items()))
+    else:
+        logging.basicConfig(level=logging.INFO)
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        consumer = ClerkEventConsumer(consumers=args.consumers)
+        consumer.start()
+        print(f"Running {args.consumers} Clerk event consumers")
+        try:
+            stop.wait()
+        except KeyboardInterrupt:
+            pass
+        consumer.drain()
+
+if __name__ == "__main__":
+    main()
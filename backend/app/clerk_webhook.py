@@ -3,9 +3,9 @@ import os
 import hmac
 import hashlib
 from fastapi import APIRouter, Request, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import models, crud, schemas, database
+from . import async_crud, clerk_events, database
 
 # Create a router for Clerk webhooks
 router = APIRouter(
@@ -67,108 +67,34 @@ async def verify_clerk_webhook(request: Request):
             detail="Invalid signature"
         )
     
+    # Keep the signed delivery time; events without their own timestamp are ordered by it
+    request.state.svix_timestamp = timestamp
+
     # Return the body so it can be used downstream
     return json.loads(body)
 
 @router.post("")
 async def clerk_webhook(
+    request: Request,
     data: dict = Depends(verify_clerk_webhook),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
-    Process Clerk webhook events to synchronize user data
+    Store a Clerk webhook event and acknowledge it; user data is synchronized in
+    the background (see app.clerk_events). Redeliveries are recognized by their
+    svix-id and acknowledged without being stored again.
     """
-    event_type = data.get("type")
-    
-    # Handle user creation
-    if event_type == "user.created":
-        user_data = data.get("data", {})
-        
-        email_addresses = user_data.get("email_addresses", [])
-        primary_email = next((email.get("email_address") for email in email_addresses if email.get("id") == user_data.get("primary_email_address_id")), None)
-        
-        if not primary_email:
-            return {"status": "error", "message": "No primary email found"}
-        
-        # Check if user already exists
-        db_user = crud.get_user_by_email(db, email=primary_email)
-        if db_user:
-            return {"status": "success", "message": "User already exists"}
-        
-        # Get first and last name
-        first_name = user_data.get("first_name", "")
-        last_name = user_data.get("last_name", "")
-        
-        # Create new user
-        user_create = schemas.UserCreate(
-            email=primary_email,
-            password="",  # OAuth users don't need a password
-            first_name=first_name,
-            last_name=last_name,
-            user_type="candidate",  # Default type, can be updated later
-            oauth_provider="clerk",
-            oauth_provider_id=user_data.get("id")
-        )
-        
-        # Create user in our database
-        crud.create_oauth_user(
-            db=db,
-            user=user_create,
-            oauth_provider="clerk",
-            oauth_provider_id=user_data.get("id")
-        )
-        
-        return {"status": "success", "message": "User created successfully"}
-    
-    # Handle user update
-    elif event_type == "user.updated":
-        user_data = data.get("data", {})
-        
-        email_addresses = user_data.get("email_addresses", [])
-        primary_email = next((email.get("email_address") for email in email_addresses if email.get("id") == user_data.get("primary_email_address_id")), None)
-        
-        if not primary_email:
-            return {"status": "error", "message": "No primary email found"}
-            
-        # Get user by email
-        db_user = crud.get_user_by_email(db, email=primary_email)
-        if not db_user:
-            return {"status": "error", "message": "User not found"}
-        
-        # Update user data
-        db_user.first_name = user_data.get("first_name", db_user.first_name)
-        db_user.last_name = user_data.get("last_name", db_user.last_name)
-        
-        # Check for user type in metadata
-        metadata = user_data.get("public_metadata", {})
-        user_type = metadata.get("userType")
-        if user_type in ["recruiter", "candidate"]:
-            db_user.user_type = user_type
-        
-        # Update image if available
-        image_url = user_data.get("image_url")
-        if image_url:
-            db_user.profile_image = image_url
-            
-        # Save changes
-        db.commit()
-        
-        return {"status": "success", "message": "User updated successfully"}
-    
-    # Handle user deletion
-    elif event_type == "user.deleted":
-        user_data = data.get("data", {})
-        
-        # Try to find by Clerk ID
-        clerk_id = user_data.get("id")
-        db_user = db.query(models.User).filter(models.User.oauth_provider == "clerk", models.User.oauth_provider_id == clerk_id).first()
-        
-        if db_user:
-            # For data integrity, we might want to just deactivate rather than delete
-            db_user.is_active = False
-            db.commit()
-            
-            return {"status": "success", "message": "User deactivated successfully"}
-    
-    # Default response for unhandled events
-    return {"status": "success", "message": f"Event {event_type} received but not processed"} 
\ No newline at end of file
+    delivery_id = request.headers.get("svix-id") or hashlib.sha256(await request.body()).hexdigest()
+    event_type = data.get("type") or ""
+    recorded = await async_crud.record_webhook_event(
+        db,
+        source=clerk_events.SOURCE,
+        delivery_id=delivery_id,
+        event_type=event_type,
+        subject=clerk_events.event_subject(data),
+        payload=data,
+        occurred_at=clerk_events.event_timestamp(data, request.state.svix_timestamp)
+    )
+    if not recorded:
+        return {"status": "success", "message": f"Event {event_type} already received"}
+    return {"status": "success", "message": f"Event {event_type} queued"}
@@ -1,19 +1,34 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
-from typing import List, Optional, Dict, Any
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, desc, and_, or_, select, insert, update, delete
+from typing import Callable, List, Optional, Dict, Any
 import datetime
-from . import models, schemas, auth
-from .ai_engine import analyze_response, analyze_full_interview
+import hashlib
+import json
+import uuid
+import numpy as np
+from . import models, schemas, auth, database, rollups, grading, emails
+from .analysis_cache import analyze_responses
+from .scorers import get_scorer
 
 # User operations
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
+def select_user_by_email(email: str):
+    return select(models.User).where(models.User.email == email)
+
 def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+    return db.scalars(select_user_by_email(email)).first()
+
+def get_user_by_oauth_id(db: Session, oauth_provider: str, oauth_provider_id: str) -> Optional[models.User]:
+    return db.scalars(select(models.User).where(
+        models.User.oauth_provider == oauth_provider,
+        models.User.oauth_provider_id == oauth_provider_id
+    )).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = auth.get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = auth.get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password,
@@ -49,21 +64,67 @@ def create_oauth_user(db: Session, user: schemas.UserCreate, oauth_provider: str
     db.refresh(db_user)
     return db_user
 
+def set_password_hash(db: Session, user_id: int, hashed_password: str):
+    """Replace a user's password hash, e.g. with one made at the current bcrypt cost."""
+    db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password))
+    db.commit()
+
+def link_oauth_account(db: Session, user_id: int, oauth_provider: str, oauth_provider_id: str) -> Optional[models.User]:
+    """Attach an OAuth identity to an existing user, who can then sign in with either."""
+    db_user = db.get(models.User, user_id)
+    if db_user is None:
+        return None
+    db_user.oauth_provider = oauth_provider
+    db_user.oauth_provider_id = oauth_provider_id
+    db.commit()
+    return db_user
+
+# Pagination
+def paginate(stmt, model, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """
+    Restrict the `stmt` select to one page, ordered newest first by (created_at, id).
+
+    With `after_id` the page starts right after that row (keyset pagination), which
+    costs the same on every page; otherwise falls back to OFFSET `skip`. The anchor
+    row's created_at is read in SQL rather than round-tripped through the cursor so
+    the comparison always sees the stored value.
+    """
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    if after_id is not None:
+        anchor = select(model.created_at).where(model.id == after_id).scalar_subquery()
+        stmt = stmt.where(or_(
+            model.created_at < anchor,
+            and_(model.created_at == anchor, model.id < after_id)
+        ))
+    elif skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
 # Interview Template operations
+def select_interview_template(template_id: int):
+    return select(models.InterviewTemplate).options(
+        selectinload(models.InterviewTemplate.questions)
+    ).where(models.InterviewTemplate.id == template_id)
+
 def get_interview_template(db: Session, template_id: int):
-    return db.query(models.InterviewTemplate).filter(models.InterviewTemplate.id == template_id).first()
+    return db.scalars(select_interview_template(template_id)).first()
 
-def get_interview_templates(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[int] = None):
-    query = db.query(models.InterviewTemplate)
+def select_interview_templates(skip: int = 0, limit: int = 100, user_id: Optional[int] = None, after_id: Optional[int] = None):
+    stmt = select(models.InterviewTemplate).options(selectinload(models.InterviewTemplate.questions))
     if user_id:
-        query = query.filter(models.InterviewTemplate.creator_id == user_id)
-    return query.filter(models.InterviewTemplate.is_active == True).offset(skip).limit(limit).all()
+        stmt = stmt.where(models.InterviewTemplate.creator_id == user_id)
+    stmt = stmt.where(models.InterviewTemplate.is_active == True)
+    return paginate(stmt, models.InterviewTemplate, skip=skip, limit=limit, after_id=after_id)
+
+def get_interview_templates(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[int] = None, after_id: Optional[int] = None):
+    return db.scalars(select_interview_templates(skip=skip, limit=limit, user_id=user_id, after_id=after_id)).all()
 
 def create_interview_template(db: Session, template: schemas.InterviewTemplateCreate, user_id: int):
     # Create template
     db_template = models.InterviewTemplate(
         title=template.title,
         description=template.description,
+        scorer=template.scorer,
         creator_id=user_id
     )
     db.add(db_template)
@@ -76,6 +137,10 @@ def create_interview_template(db: Session, template: schemas.InterviewTemplateCr
             text=question.text,
             type=question.type,
             options=question.options,
+            multiple_select=question.multiple_select,
+            correct_options=question.correct_options,
+            reference_answer=question.reference_answer,
+            rubric=question.rubric,
             time_limit=question.time_limit,
             required=question.required,
             order=question.order or i
@@ -94,6 +159,7 @@ def update_interview_template(db: Session, template_id: int, template: schemas.I
     # Update template fields
     db_template.title = template.title
     db_template.description = template.description
+    db_template.scorer = template.scorer
     
     # Delete existing questions
     db.query(models.Question).filter(models.Question.template_id == template_id).delete()
@@ -105,6 +171,10 @@ def update_interview_template(db: Session, template_id: int, template: schemas.I
             text=question.text,
             type=question.type,
             options=question.options,
+            multiple_select=question.multiple_select,
+            correct_options=question.correct_options,
+            reference_answer=question.reference_answer,
+            rubric=question.rubric,
             time_limit=question.time_limit,
             required=question.required,
             order=question.order or i
@@ -116,19 +186,48 @@ def update_interview_template(db: Session, template_id: int, template: schemas.I
     return db_template
 
 # Interview operations
+def interview_graph_options():
+    """
+    Loader options for everything the interview formatters in utils touch.
+
+    Many-to-one and one-to-one links are joined into the parent query, collections
+    are fetched with one SELECT ... IN per relationship, so rendering a page of
+    interviews costs three queries no matter how many rows it holds.
+    """
+    return (
+        joinedload(models.Interview.template).selectinload(models.InterviewTemplate.questions),
+        joinedload(models.Interview.analysis),
+        selectinload(models.Interview.responses).joinedload(models.Response.analysis),
+    )
+
+def select_interview(interview_id: int):
+    return select(models.Interview).options(*interview_graph_options()).where(models.Interview.id == interview_id)
+
 def get_interview(db: Session, interview_id: int):
-    return db.query(models.Interview).filter(models.Interview.id == interview_id).first()
+    return db.scalars(select_interview(interview_id)).first()
+
+def select_interviews(*criteria, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """One page of the interviews matching `criteria`, with the graph the formatters render."""
+    stmt = select(models.Interview).options(*interview_graph_options()).where(*criteria)
+    return paginate(stmt, models.Interview, skip=skip, limit=limit, after_id=after_id)
 
-def get_recruiter_interviews(db: Session, recruiter_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Interview).filter(models.Interview.recruiter_id == recruiter_id).offset(skip).limit(limit).all()
+def get_recruiter_interviews(db: Session, recruiter_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = select_interviews(models.Interview.recruiter_id == recruiter_id, skip=skip, limit=limit, after_id=after_id)
+    return db.scalars(stmt).all()
 
-def get_candidate_interviews(db: Session, candidate_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Interview).filter(models.Interview.candidate_id == candidate_id).offset(skip).limit(limit).all()
+def get_candidate_interviews(db: Session, candidate_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = select_interviews(models.Interview.candidate_id == candidate_id, skip=skip, limit=limit, after_id=after_id)
+    return db.scalars(stmt).all()
 
-def get_interviews_by_email(db: Session, email: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Interview).filter(models.Interview.candidate_email == email).offset(skip).limit(limit).all()
+def get_interviews_by_email(db: Session, email: str, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = select_interviews(models.Interview.candidate_email == email, skip=skip, limit=limit, after_id=after_id)
+    return db.scalars(stmt).all()
 
 def create_interview(db: Session, interview: schemas.InterviewCreate, recruiter_id: int):
+    """
+    Create the interview and queue its invitation in the email outbox. Returns the
+    interview and the id, status and recipient of the queued invitation.
+    """
     # Lookup if the candidate exists
     candidate = db.query(models.User).filter(
         models.User.email == interview.candidate_email,
@@ -145,15 +244,103 @@ def create_interview(db: Session, interview: schemas.InterviewCreate, recruiter_
         due_date=interview.due_date
     )
     db.add(db_interview)
+    db.flush()
+    rollups.record_created(db, db_interview)
+    # The invitation is committed with the interview and delivered by the email sender
+    template_title = db.scalar(select(models.InterviewTemplate.title).where(models.InterviewTemplate.id == interview.template_id))
+    db_email = models.OutboxEmail(**emails.invitation(
+        db_interview.id, interview.candidate_email, interview.candidate_name, template_title, interview.due_date
+    ), status=models.EmailStatus.pending, attempts=0)
+    db.add(db_email)
+    db.flush()
+    invitation = {"id": db_email.id, "status": db_email.status.value, "recipient": db_email.recipient}
     db.commit()
     db.refresh(db_interview)
-    return db_interview
+    return db_interview, invitation
+
+# Emails per candidate lookup and rows per INSERT statement when creating interviews in bulk
+BULK_LOOKUP_SIZE = 10000
+BULK_INSERT_SIZE = 1000
+
+def create_interviews(db: Session, interviews: List[schemas.InterviewCreate], recruiter_id: int) -> List[Dict[str, Any]]:
+    """
+    Bulk create_interview in one transaction: existing candidates are resolved with
+    one IN query per BULK_LOOKUP_SIZE distinct emails and the interviews written with
+    multi-row INSERTs, together with their invitations in the email outbox. Returns
+    the id, candidate_id, candidate_email, candidate_name and due_date of each
+    interview, matched back to `interviews` and in their order.
+    """
+    user = models.User
+    candidate_emails = sorted({interview.candidate_email for interview in interviews})
+    candidates = {}
+    for start in range(0, len(candidate_emails), BULK_LOOKUP_SIZE):
+        candidates.update(db.execute(
+            select(user.email, user.id).where(
+                user.email.in_(candidate_emails[start:start + BULK_LOOKUP_SIZE]),
+                user.user_type == models.UserType.candidate
+            )
+        ).all())
+
+    template = models.InterviewTemplate
+    template_ids = sorted({interview.template_id for interview in interviews})
+    titles = dict(db.execute(select(template.id, template.title).where(template.id.in_(template_ids))).all())
+
+    table = models.Interview.__table__
+    outbox = models.OutboxEmail.__table__
+    created = []
+    for start in range(0, len(interviews), BULK_INSERT_SIZE):
+        batch = interviews[start:start + BULK_INSERT_SIZE]
+        # RETURNING gives no guarantee of VALUES order, so everything used below comes from the returned rows
+        returned = db.execute(insert(table).returning(
+            table.c.id, table.c.candidate_id, table.c.candidate_email, table.c.candidate_name,
+            table.c.due_date, table.c.template_id, table.c.created_at
+        ), [
+            {
+                "template_id": interview.template_id,
+                "recruiter_id": recruiter_id,
+                "candidate_id": candidates.get(interview.candidate_email),
+                "candidate_email": interview.candidate_email,
+                "candidate_name": interview.candidate_name,
+                "due_date": interview.due_date,
+                "status": models.InterviewStatus.pending
+            }
+            for interview in batch
+        ]).mappings().all()
+        db.execute(insert(outbox), [
+            dict(emails.invitation(
+                row["id"], row["candidate_email"], row["candidate_name"], titles.get(row["template_id"]), row["due_date"]
+            ), status=models.EmailStatus.pending, attempts=0)
+            for row in returned
+        ])
+        created.extend(_match_created(batch, returned))
+
+    for template_id in {interview["template_id"] for interview in created}:
+        rollups.record_created_many(db, recruiter_id, template_id, [
+            interview["created_at"] for interview in created if interview["template_id"] == template_id
+        ])
+    db.commit()
+    return created
+
+def _match_created(interviews: List[schemas.InterviewCreate], returned) -> List[Dict[str, Any]]:
+    """The returned row of each of `interviews`, by candidate and due date; identical requests are interchangeable."""
+    by_candidate: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in returned:
+        by_candidate.setdefault((row["candidate_email"], row["candidate_name"]), []).append(dict(row))
+    matched = []
+    for interview in interviews:
+        rows = by_candidate[(interview.candidate_email, interview.candidate_name)]
+        # Stored due dates are naive, and may come back in another zone on PostgreSQL; fall back to any row
+        due_date = interview.due_date.replace(tzinfo=None) if interview.due_date else None
+        index = next((index for index, row in enumerate(rows) if row["due_date"] == due_date), 0)
+        matched.append(rows.pop(index))
+    return matched
 
 def update_interview_status(db: Session, interview_id: int, status: models.InterviewStatus):
     db_interview = db.query(models.Interview).filter(models.Interview.id == interview_id).first()
     if not db_interview:
         return None
     
+    previous_status = db_interview.status
     db_interview.status = status
     
     # Set timestamps based on status
@@ -162,6 +349,7 @@ def update_interview_status(db: Session, interview_id: int, status: models.Inter
     elif status == models.InterviewStatus.completed and not db_interview.completed_at:
         db_interview.completed_at = datetime.datetime.now()
     
+    rollups.record_status_change(db, db_interview, previous_status)
     db.commit()
     db.refresh(db_interview)
     return db_interview
@@ -173,35 +361,13 @@ def create_response(db: Session, response: schemas.ResponseCreate, interview_id:
         question_id=response.question_id,
         text_response=response.text_response,
         selected_option=response.selected_option,
+        selected_options=response.selected_options,
         video_url=response.video_url,
         video_transcript=response.video_transcript
     )
     db.add(db_response)
-    db.flush()
-    
-    # If AI analysis is enabled, analyze the response
-    question = db.query(models.Question).filter(models.Question.id == response.question_id).first()
-    if question:
-        analysis_result = analyze_response(
-            question_type=question.type,
-            question_text=question.text,
-            response_text=response.text_response or response.video_transcript,
-            selected_option=response.selected_option,
-            options=question.options
-        )
-        
-        if analysis_result:
-            db_analysis = models.ResponseAnalysis(
-                response_id=db_response.id,
-                score=analysis_result.get("score", 0),
-                strengths=analysis_result.get("strengths"),
-                weaknesses=analysis_result.get("weaknesses"),
-                notes=analysis_result.get("notes"),
-                keywords=analysis_result.get("keywords"),
-                sentiment=analysis_result.get("sentiment")
-            )
-            db.add(db_analysis)
     
+    # Responses are scored by the background analysis job queued on completion
     db.commit()
     db.refresh(db_response)
     return db_response
@@ -220,15 +386,18 @@ def submit_interview_response(db: Session, interview_id: int, response: schemas.
     if interview.status == models.InterviewStatus.pending:
         interview.status = models.InterviewStatus.in_progress
         interview.started_at = datetime.datetime.now()
+        rollups.record_status_change(db, interview, models.InterviewStatus.pending)
     
     # Save responses
-    for resp in response.responses:
-        create_response(db, resp, interview_id)
+    db_responses = [create_response(db, resp, interview_id) for resp in response.responses]
     
     # Check if all required questions are answered
     template = db.query(models.InterviewTemplate).filter(models.InterviewTemplate.id == interview.template_id).first()
     
     if template:
+        # Multiple choice answers with an answer key are scored right away
+        grading.grade_responses(db_responses, {q.id: q for q in template.questions})
+        
         required_questions = {q.id for q in template.questions if q.required}
         answered_questions = {
             r.question_id for r in db.query(models.Response).filter(models.Response.interview_id == interview_id).all()
@@ -236,134 +405,660 @@ def submit_interview_response(db: Session, interview_id: int, response: schemas.
         
         # If all required questions are answered, mark as completed
         if required_questions.issubset(answered_questions):
+            previous_status = interview.status
             interview.status = models.InterviewStatus.completed
             interview.completed_at = datetime.datetime.now()
+            rollups.record_status_change(db, interview, previous_status)
             
-            # Analyze the full interview
-            analyze_interview(db, interview_id)
+            # Score the responses and the full interview in the background
+            queue_analysis(db, interview_id)
     
     db.commit()
     db.refresh(interview)
     return interview
 
 # Analysis operations
-def analyze_interview(db: Session, interview_id: int):
+def analyze_interview(
+    db: Session,
+    interview_id: int,
+    on_response: Optional[Callable[[int, Dict[str, Any]], None]] = None
+):
+    """
+    Score the interview's unscored responses and (re)generate its overall analysis.
+    Each response score is committed on its own as soon as it is ready, then passed
+    to `on_response` with the response id, so a stream shows it long before the
+    summary; the summary is committed last.
+    """
     interview = db.query(models.Interview).filter(models.Interview.id == interview_id).first()
     if not interview or interview.status != models.InterviewStatus.completed:
         return None
     
     # Get all responses and their analyses
-    responses = db.query(models.Response).filter(models.Response.interview_id == interview_id).all()
-    
-    # Check if we have all the analyses
-    for response in responses:
-        if not hasattr(response, 'analysis') or not response.analysis:
-            question = db.query(models.Question).filter(models.Question.id == response.question_id).first()
-            if question:
-                analysis_result = analyze_response(
-                    question_type=question.type,
-                    question_text=question.text,
-                    response_text=response.text_response or response.video_transcript,
-                    selected_option=response.selected_option,
-                    options=question.options
-                )
-                
-                if analysis_result:
-                    db_analysis = models.ResponseAnalysis(
-                        response_id=response.id,
-                        score=analysis_result.get("score", 0),
-                        strengths=analysis_result.get("strengths"),
-                        weaknesses=analysis_result.get("weaknesses"),
-                        notes=analysis_result.get("notes"),
-                        keywords=analysis_result.get("keywords"),
-                        sentiment=analysis_result.get("sentiment")
-                    )
-                    db.add(db_analysis)
-                    db.flush()
-    
-    # Generate a full interview analysis
+    responses = db.query(models.Response).options(selectinload(models.Response.analysis)).filter(
+        models.Response.interview_id == interview_id
+    ).all()
+    questions = {
+        question.id: question
+        for question in db.query(models.Question).filter(
+            models.Question.id.in_({response.question_id for response in responses})
+        )
+    }
+    
     template = db.query(models.InterviewTemplate).filter(models.InterviewTemplate.id == interview.template_id).first()
+    scorer = get_scorer(template.scorer if template else None)
+    existing_analysis = db.query(models.InterviewAnalysis).filter(
+        models.InterviewAnalysis.interview_id == interview_id
+    ).first()
+    # An analysis with aggregates takes in each score in the transaction that stores it, so scores
+    # committed by a run that failed later are counted; a new one (or one stored before aggregates
+    # existed) is summed from all the scores at the end
+    running = existing_analysis if existing_analysis is not None and existing_analysis.score_count is not None else None
+
+    def commit_scored(scored: List[models.Response]):
+        if running is not None:
+            add_to_aggregates(running, [response.analysis for response in scored])
+        results = [(response.id, response_analysis_result(response.analysis)) for response in scored]
+        db.commit()
+        if on_response:
+            for response_id, result in results:
+                on_response(response_id, result)
     
-    # Prepare data for the analysis
+    # Grade answers against answer keys, then score the remaining responses without an
+    # analysis all together with the template's scorer; answers scored before by the
+    # same scorer come from the analysis cache
+    candidates = [
+        response for response in responses
+        if response.analysis is None and response.question_id in questions
+    ]
+    unscored = grading.grade_responses(candidates, questions)
+    graded = [response for response in candidates if response.analysis is not None]
+    if graded:
+        commit_scored(graded)
+
+    def on_result(index, result):
+        if result:
+            unscored[index].analysis = response_analysis(result)
+            commit_scored([unscored[index]])
+
+    analysis_results = analyze_responses(db, [
+        {
+            "question_type": questions[response.question_id].type,
+            "question_text": questions[response.question_id].text,
+            "response_text": response.text_response or response.video_transcript,
+            "selected_option": grading.selection_text(response),
+            "options": questions[response.question_id].options,
+            "reference_answer": questions[response.question_id].reference_answer,
+            "rubric": questions[response.question_id].rubric
+        }
+        for response in unscored
+    ], scorer, on_result)
+    for response, analysis_result in zip(unscored, analysis_results):
+        if analysis_result and response.analysis is None:
+            response.analysis = response_analysis(analysis_result)
+            if running is not None:
+                add_to_aggregates(running, [response.analysis])
+    db.flush()
+    
+    summarized = [response for response in responses if response.analysis and response.question_id in questions]
+    db_analysis = existing_analysis or models.InterviewAnalysis(interview_id=interview_id)
+    if running is None:
+        db_analysis.score_sum, db_analysis.score_count = 0.0, 0
+        db_analysis.strength_counts, db_analysis.weakness_counts = {}, {}
+        add_to_aggregates(db_analysis, [response.analysis for response in summarized])
+    
+    # Skip the summarizer when nothing it would see has changed since the last summary
+    summary_key = hashlib.sha256(json.dumps([
+        scorer.version(),
+        template.title if template else None,
+        interview.candidate_name,
+        sorted(response.analysis.id for response in summarized)
+    ]).encode("utf-8")).hexdigest()
+    if existing_analysis and existing_analysis.summary_key == summary_key:
+        db.commit()
+        return existing_analysis
+    
+    # Prepare data for the full interview analysis
     analysis_data = {
         "interview_title": template.title if template else None,
         "candidate_name": interview.candidate_name,
-        "responses": []
-    }
-    
-    for response in responses:
-        question = db.query(models.Question).filter(models.Question.id == response.question_id).first()
-        if question and hasattr(response, 'analysis') and response.analysis:
-            analysis_data["responses"].append({
-                "question_text": question.text,
-                "question_type": question.type,
-                "response_text": response.text_response or response.video_transcript or response.selected_option,
+        "responses": [
+            {
+                "question_text": questions[response.question_id].text,
+                "question_type": questions[response.question_id].type,
+                "response_text": response.text_response or response.video_transcript or grading.selection_text(response),
                 "score": response.analysis.score,
                 "strengths": response.analysis.strengths,
                 "weaknesses": response.analysis.weaknesses
-            })
+            }
+            for response in summarized
+        ],
+        "aggregates": {
+            "score_sum": db_analysis.score_sum,
+            "score_count": db_analysis.score_count,
+            "strength_counts": db_analysis.strength_counts,
+            "weakness_counts": db_analysis.weakness_counts
+        }
+    }
     
     # Generate the overall analysis
-    overall_analysis = analyze_full_interview(analysis_data)
-    
-    # Check if an analysis already exists
-    existing_analysis = db.query(models.InterviewAnalysis).filter(
-        models.InterviewAnalysis.interview_id == interview_id
-    ).first()
+    overall_analysis = scorer.analyze_interview(analysis_data)
     
     if existing_analysis:
-        # Update existing analysis
-        existing_analysis.overall_score = overall_analysis.get("overall_score", 0)
-        existing_analysis.recommendation = overall_analysis.get("recommendation")
-        existing_analysis.strengths = overall_analysis.get("strengths")
-        existing_analysis.weaknesses = overall_analysis.get("weaknesses")
-        db_analysis = existing_analysis
+        # Moving the existing analysis to its new histogram bucket
+        rollups.record_score(db, interview, existing_analysis.overall_score, sign=-1)
     else:
-        # Create new analysis
-        db_analysis = models.InterviewAnalysis(
-            interview_id=interview_id,
-            overall_score=overall_analysis.get("overall_score", 0),
-            recommendation=overall_analysis.get("recommendation"),
-            strengths=overall_analysis.get("strengths"),
-            weaknesses=overall_analysis.get("weaknesses")
-        )
         db.add(db_analysis)
+    db_analysis.overall_score = overall_analysis.get("overall_score", 0)
+    db_analysis.recommendation = overall_analysis.get("recommendation")
+    db_analysis.strengths = overall_analysis.get("strengths")
+    db_analysis.weaknesses = overall_analysis.get("weaknesses")
+    db_analysis.summary_key = summary_key
+    rollups.record_score(db, interview, db_analysis.overall_score)
     
     db.commit()
     db.refresh(db_analysis)
     return db_analysis
 
+def response_analysis(result: Dict[str, Any]) -> models.ResponseAnalysis:
+    return models.ResponseAnalysis(
+        score=result.get("score", 0),
+        strengths=result.get("strengths"),
+        weaknesses=result.get("weaknesses"),
+        notes=result.get("notes"),
+        keywords=result.get("keywords"),
+        sentiment=result.get("sentiment")
+    )
+
+def response_analysis_result(analysis: models.ResponseAnalysis) -> Dict[str, Any]:
+    """A stored response analysis in the form the scorers return it."""
+    return {
+        "score": analysis.score,
+        "strengths": analysis.strengths,
+        "weaknesses": analysis.weaknesses,
+        "notes": analysis.notes,
+        "keywords": analysis.keywords,
+        "sentiment": analysis.sentiment
+    }
+
+def add_to_aggregates(analysis: models.InterviewAnalysis, response_analyses: List[models.ResponseAnalysis]):
+    """Add response analyses to the running score sum and count and the strength and weakness tallies."""
+    if not response_analyses:
+        return
+    strength_counts = dict(analysis.strength_counts or {})
+    weakness_counts = dict(analysis.weakness_counts or {})
+    for response_analysis in response_analyses:
+        analysis.score_sum += response_analysis.score or 0
+        analysis.score_count += 1
+        for strength in response_analysis.strengths or []:
+            strength_counts[strength] = strength_counts.get(strength, 0) + 1
+        for weakness in response_analysis.weaknesses or []:
+            weakness_counts[weakness] = weakness_counts.get(weakness, 0) + 1
+    # Assigned rather than changed in place: JSON columns do not track mutations
+    analysis.strength_counts = strength_counts
+    analysis.weakness_counts = weakness_counts
+
+# Analysis job operations
+def queue_analysis(db: Session, interview_id: int) -> models.AnalysisJob:
+    """
+    Queue a background analysis of the interview as part of the caller's transaction,
+    reusing a queued job that has not started yet.
+    """
+    job = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.interview_id == interview_id,
+        models.AnalysisJob.status == models.JobStatus.pending
+    ).first()
+    if job is None:
+        job = models.AnalysisJob(interview_id=interview_id, status=models.JobStatus.pending)
+        db.add(job)
+        db.flush()
+    return job
+
+def create_analysis_job(db: Session, interview_id: int, regenerate: bool = False):
+    """Queue an analysis; `regenerate` also summarizes the interview again when its scores are unchanged."""
+    if regenerate:
+        db.execute(
+            update(models.InterviewAnalysis)
+            .where(models.InterviewAnalysis.interview_id == interview_id)
+            .values(summary_key=None)
+        )
+    job = queue_analysis(db, interview_id)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def select_latest_analysis_job(interview_id: int):
+    return select(models.AnalysisJob).where(
+        models.AnalysisJob.interview_id == interview_id
+    ).order_by(models.AnalysisJob.id.desc()).limit(1)
+
+def get_latest_analysis_job(db: Session, interview_id: int):
+    return db.scalars(select_latest_analysis_job(interview_id)).first()
+
+def claim_analysis_job(db: Session, lease_seconds: float) -> Optional[models.AnalysisJob]:
+    """
+    Mark the oldest runnable job as running and return it, or None if there is none.
+    Runnable means pending, or running with an expired lease: no heartbeat for
+    `lease_seconds` (its worker went away). Safe to call from several workers and
+    processes: the claim is a conditional UPDATE.
+    """
+    job = models.AnalysisJob
+    now = datetime.datetime.now()
+    last_seen = func.coalesce(job.heartbeat_at, job.started_at)
+    runnable = or_(
+        job.status == models.JobStatus.pending,
+        and_(job.status == models.JobStatus.running, last_seen < now - datetime.timedelta(seconds=lease_seconds))
+    )
+    for job_id in db.scalars(select(job.id).where(runnable).order_by(job.id).limit(5)).all():
+        claimed = db.execute(
+            update(job).where(job.id == job_id, runnable).values(
+                status=models.JobStatus.running,
+                attempts=job.attempts + 1,
+                started_at=now,
+                heartbeat_at=now,
+                finished_at=None
+            )
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(job, job_id)
+    return None
+
+def renew_analysis_job_lease(db: Session, job_id: int, attempt: int) -> bool:
+    """
+    Record a heartbeat of run number `attempt` of a job. Returns False if that run
+    no longer holds the job (its lease expired and another worker claimed it).
+    """
+    job = models.AnalysisJob
+    renewed = db.execute(
+        update(job).where(
+            job.id == job_id, job.status == models.JobStatus.running, job.attempts == attempt
+        ).values(heartbeat_at=datetime.datetime.now()),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    db.commit()
+    return bool(renewed)
+
+def park_analysis_job(db: Session, job_id: int, reason: str):
+    """Put a claimed job back in the queue without counting the run against its attempts."""
+    job = db.get(models.AnalysisJob, job_id)
+    if job is None:
+        return None
+    job.status = models.JobStatus.pending
+    job.attempts = max(job.attempts - 1, 0)
+    job.error = reason
+    db.commit()
+    return job
+
+def finish_analysis_job(db: Session, job_id: int, error: Optional[str] = None, max_attempts: int = 1):
+    """Record the outcome of a job run; failed runs go back to pending until max_attempts is reached."""
+    job = db.get(models.AnalysisJob, job_id)
+    if job is None:
+        return None
+    if error is None:
+        job.status = models.JobStatus.done
+        job.error = None
+    else:
+        job.status = models.JobStatus.pending if job.attempts < max_attempts else models.JobStatus.failed
+        job.error = error
+    job.finished_at = datetime.datetime.now()
+    db.commit()
+    return job
+
+# Email outbox operations
+def claim_emails(db: Session, limit: int, lease_seconds: float) -> List[models.OutboxEmail]:
+    """
+    Mark up to `limit` of the oldest deliverable emails as sending and return them.
+    Deliverable means pending and due, or sending with an expired lease (its sender
+    went away). Like claim_analysis_job, the claim is a conditional UPDATE; the
+    batch's claim_token identifies the rows this caller won.
+    """
+    email = models.OutboxEmail
+    now = datetime.datetime.now()
+    deliverable = or_(
+        and_(email.status == models.EmailStatus.pending, or_(email.next_attempt_at.is_(None), email.next_attempt_at <= now)),
+        and_(email.status == models.EmailStatus.sending, email.claimed_at < now - datetime.timedelta(seconds=lease_seconds))
+    )
+    email_ids = db.scalars(select(email.id).where(deliverable).order_by(email.id).limit(limit)).all()
+    if not email_ids:
+        return []
+    token = uuid.uuid4().hex
+    db.execute(
+        update(email).where(email.id.in_(email_ids), deliverable).values(
+            status=models.EmailStatus.sending,
+            attempts=email.attempts + 1,
+            claimed_at=now,
+            claim_token=token
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return db.scalars(select(email).where(email.claim_token == token).order_by(email.id)).all()
+
+def finish_emails(
+    db: Session,
+    claimed: List[models.OutboxEmail],
+    failures: Dict[int, Any],
+    max_attempts: int,
+    retry_seconds: float
+) -> int:
+    """
+    Record the delivery of a claimed batch. `failures` maps the ids of undelivered
+    emails to (error, permanent); the rest were sent. Temporary failures are retried
+    with exponential backoff from `retry_seconds` until max_attempts; permanent ones
+    and the last attempt are dead-lettered. Rows whose claim has since passed to
+    another sender are left alone. Returns the number of emails dead-lettered.
+    """
+    email = models.OutboxEmail
+    now = datetime.datetime.now()
+    sent_ids = [row.id for row in claimed if row.id not in failures]
+    tokens = {row.claim_token for row in claimed}
+    if sent_ids:
+        db.execute(
+            update(email).where(email.id.in_(sent_ids), email.claim_token.in_(tokens)).values(
+                status=models.EmailStatus.sent, sent_at=now, error=None, claim_token=None
+            ),
+            execution_options={"synchronize_session": False}
+        )
+    dead = 0
+    for row in claimed:
+        if row.id not in failures:
+            continue
+        error, permanent = failures[row.id]
+        if permanent or row.attempts >= max_attempts:
+            values = {"status": models.EmailStatus.dead}
+            dead += 1
+        else:
+            delay = retry_seconds * 2 ** (row.attempts - 1)
+            values = {"status": models.EmailStatus.pending, "next_attempt_at": now + datetime.timedelta(seconds=delay)}
+        db.execute(
+            update(email).where(email.id == row.id, email.claim_token == row.claim_token).values(
+                error=error, claim_token=None, **values
+            ),
+            execution_options={"synchronize_session": False}
+        )
+    db.commit()
+    return dead
+
+def requeue_dead_emails(db: Session) -> int:
+    """Give every dead-lettered email a fresh set of attempts; returns how many were requeued."""
+    email = models.OutboxEmail
+    requeued = db.execute(
+        update(email).where(email.status == models.EmailStatus.dead).values(
+            status=models.EmailStatus.pending, attempts=0, next_attempt_at=None
+        ),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    db.commit()
+    return requeued
+
+def count_emails(db: Session) -> Dict[str, int]:
+    """Outbox emails per status."""
+    email = models.OutboxEmail
+    counts = dict(db.execute(select(email.status, func.count()).group_by(email.status)).all())
+    return {status.value: counts.get(status, 0) for status in models.EmailStatus}
+
+# Webhook event operations
+def record_webhook_event(
+    db: Session,
+    source: str,
+    delivery_id: str,
+    event_type: str,
+    subject: Optional[str],
+    payload: Dict[str, Any],
+    occurred_at: Optional[datetime.datetime] = None
+) -> bool:
+    """
+    Queue a received webhook event that happened at `occurred_at` (naive UTC, now
+    if not given); returns False if the delivery was already recorded.
+    """
+    event = models.WebhookEvent
+    row = {
+        "source": source,
+        "delivery_id": delivery_id,
+        "event_type": event_type,
+        "subject": subject,
+        "payload": payload,
+        "occurred_at": occurred_at or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
+        "status": models.WebhookEventStatus.pending,
+        "attempts": 0,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect in database.UPSERT_DIALECTS:
+        recorded = db.execute(
+            database.UPSERT_DIALECTS[dialect](event.__table__).values(row).on_conflict_do_nothing(
+                index_elements=["source", "delivery_id"]
+            )
+        ).rowcount
+    else:
+        exists = db.scalars(select(event.id).where(event.source == source, event.delivery_id == delivery_id)).first()
+        recorded = 0 if exists else db.execute(insert(event.__table__).values(row)).rowcount
+    db.commit()
+    return bool(recorded)
+
+def claim_webhook_events(db: Session, source: str, limit: int, lease_seconds: float) -> List[models.WebhookEvent]:
+    """
+    Mark up to `limit` of the due events of `source` that happened first as
+    processing and return them in that order, like claim_emails. Events of a
+    subject that has an event held by another consumer, waiting for a retry or
+    dead-lettered are not claimed, so no event is applied before an older one of
+    the same subject.
+    """
+    event = models.WebhookEvent
+    now = datetime.datetime.now()
+    lease_start = now - datetime.timedelta(seconds=lease_seconds)
+    due = or_(
+        and_(event.status == models.WebhookEventStatus.pending, or_(event.next_attempt_at.is_(None), event.next_attempt_at <= now)),
+        and_(event.status == models.WebhookEventStatus.processing, event.claimed_at < lease_start)
+    )
+    busy_subjects = select(event.subject).where(
+        event.source == source,
+        event.subject.is_not(None),
+        or_(
+            and_(event.status == models.WebhookEventStatus.processing, event.claimed_at >= lease_start),
+            and_(event.status == models.WebhookEventStatus.pending, event.next_attempt_at > now),
+            event.status == models.WebhookEventStatus.dead
+        )
+    )
+    claimable = and_(event.source == source, due, or_(event.subject.is_(None), event.subject.not_in(busy_subjects)))
+    event_ids = db.scalars(select(event.id).where(claimable).order_by(event.occurred_at, event.id).limit(limit)).all()
+    if not event_ids:
+        return []
+    token = uuid.uuid4().hex
+    # The subject check is repeated in the UPDATE, against claims made since the SELECT
+    db.execute(
+        update(event).where(event.id.in_(event_ids), claimable).values(
+            status=models.WebhookEventStatus.processing,
+            attempts=event.attempts + 1,
+            claimed_at=now,
+            claim_token=token
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return db.scalars(select(event).where(event.claim_token == token).order_by(event.occurred_at, event.id)).all()
+
+def finish_webhook_events(
+    db: Session,
+    claimed: List[models.WebhookEvent],
+    failures: Dict[int, str],
+    max_attempts: int,
+    retry_seconds: float
+) -> int:
+    """
+    Record the outcome of claimed events together with the changes the caller made
+    in `db`, in one commit. `failures` maps the ids of events that could not be
+    applied to their error; like finish_emails, they are retried with exponential
+    backoff until max_attempts and then dead-lettered. Returns the number dead-lettered.
+    """
+    event = models.WebhookEvent
+    now = datetime.datetime.now()
+    processed_ids = [row.id for row in claimed if row.id not in failures]
+    tokens = {row.claim_token for row in claimed}
+    if processed_ids:
+        db.execute(
+            update(event).where(event.id.in_(processed_ids), event.claim_token.in_(tokens)).values(
+                status=models.WebhookEventStatus.processed, processed_at=now, error=None, claim_token=None
+            ),
+            execution_options={"synchronize_session": False}
+        )
+    dead = 0
+    for row in claimed:
+        if row.id not in failures:
+            continue
+        if row.attempts >= max_attempts:
+            values = {"status": models.WebhookEventStatus.dead}
+            dead += 1
+        else:
+            delay = retry_seconds * 2 ** (row.attempts - 1)
+            values = {"status": models.WebhookEventStatus.pending, "next_attempt_at": now + datetime.timedelta(seconds=delay)}
+        db.execute(
+            update(event).where(event.id == row.id, event.claim_token == row.claim_token).values(
+                error=failures[row.id], claim_token=None, **values
+            ),
+            execution_options={"synchronize_session": False}
+        )
+    db.commit()
+    return dead
+
+def requeue_dead_webhook_events(db: Session) -> int:
+    """Give every dead-lettered event a fresh set of attempts; returns how many were requeued."""
+    event = models.WebhookEvent
+    requeued = db.execute(
+        update(event).where(event.status == models.WebhookEventStatus.dead).values(
+            status=models.WebhookEventStatus.pending, attempts=0, next_attempt_at=None
+        ),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    db.commit()
+    return requeued
+
+def prune_webhook_events(db: Session, older_than: datetime.datetime) -> int:
+    """Delete processed events received before `older_than`; their redeliveries are no longer recognized."""
+    event = models.WebhookEvent
+    pruned = db.execute(
+        delete(event).where(event.status == models.WebhookEventStatus.processed, event.received_at < older_than),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    db.commit()
+    return pruned
+
+def count_webhook_events(db: Session) -> Dict[str, int]:
+    """Webhook events per status."""
+    event = models.WebhookEvent
+    counts = dict(db.execute(select(event.status, func.count()).group_by(event.status)).all())
+    return {status.value: counts.get(status, 0) for status in models.WebhookEventStatus}
+
+# Video upload operations
+def select_video_upload(upload_id: str):
+    return select(models.VideoUpload).where(models.VideoUpload.id == upload_id)
+
+def select_video_playback(upload_id: str):
+    """A completed upload with the recruiter of its interview, who may watch it."""
+    return select(models.VideoUpload, models.Interview.recruiter_id).join(
+        models.Interview, models.Interview.id == models.VideoUpload.interview_id
+    ).where(
+        models.VideoUpload.id == upload_id,
+        models.VideoUpload.status == models.VideoUploadStatus.complete
+    )
+
+def create_video_upload(
+    db: Session,
+    interview_id: int,
+    uploader_id: int,
+    content_type: str,
+    storage_key: Callable[[str], str],
+    expires_at: datetime.datetime,
+    question_id: Optional[int] = None,
+    total_bytes: Optional[int] = None
+) -> models.VideoUpload:
+    """Start an upload; `storage_key` names the published video after the upload's id."""
+    upload_id = uuid.uuid4().hex
+    upload = models.VideoUpload(
+        id=upload_id,
+        interview_id=interview_id,
+        question_id=question_id,
+        uploader_id=uploader_id,
+        content_type=content_type,
+        total_bytes=total_bytes,
+        received_bytes=0,
+        storage_key=storage_key(upload_id),
+        status=models.VideoUploadStatus.uploading,
+        expires_at=expires_at
+    )
+    db.add(upload)
+    db.commit()
+    return upload
+
+def set_video_upload_progress(db: Session, upload_id: str, received_bytes: int, total_bytes: Optional[int] = None):
+    """Commit the offset of an upload after a chunk (and its declared length, once known)."""
+    values = {"received_bytes": received_bytes}
+    if total_bytes is not None:
+        values["total_bytes"] = total_bytes
+    db.execute(
+        update(models.VideoUpload).where(models.VideoUpload.id == upload_id).values(**values),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+
+def complete_video_upload(db: Session, upload_id: str, sha256: str):
+    db.execute(
+        update(models.VideoUpload).where(models.VideoUpload.id == upload_id).values(
+            status=models.VideoUploadStatus.complete,
+            sha256=sha256,
+            total_bytes=models.VideoUpload.received_bytes,
+            completed_at=datetime.datetime.now()
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+
+def abort_video_upload(db: Session, upload_id: str):
+    db.execute(
+        update(models.VideoUpload).where(
+            models.VideoUpload.id == upload_id,
+            models.VideoUpload.status == models.VideoUploadStatus.uploading
+        ).values(status=models.VideoUploadStatus.aborted),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+
+def abort_expired_video_uploads(db: Session, now: datetime.datetime) -> List[str]:
+    """Mark unfinished uploads past their expiry as aborted; returns their ids."""
+    upload = models.VideoUpload
+    expired = and_(upload.status == models.VideoUploadStatus.uploading, upload.expires_at < now)
+    upload_ids = db.scalars(select(upload.id).where(expired)).all()
+    if upload_ids:
+        db.execute(
+            update(upload).where(upload.id.in_(upload_ids), expired).values(status=models.VideoUploadStatus.aborted),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+    return upload_ids
+
 # Analytics operations
 def get_recruiter_dashboard(db: Session, recruiter_id: int):
-    # Calculate analytics data
-    total_candidates = db.query(func.count(models.Interview.candidate_email.distinct())).filter(
-        models.Interview.recruiter_id == recruiter_id
-    ).scalar()
-    
-    pending_interviews = db.query(func.count(models.Interview.id)).filter(
-        models.Interview.recruiter_id == recruiter_id,
-        models.Interview.status == models.InterviewStatus.pending
-    ).scalar()
-    
-    completed_interviews = db.query(func.count(models.Interview.id)).filter(
-        models.Interview.recruiter_id == recruiter_id,
-        models.Interview.status == models.InterviewStatus.completed
-    ).scalar()
+    stats = models.RecruiterDailyStats
     
-    # Calculate average completion time
-    completed_with_times = db.query(models.Interview).filter(
-        models.Interview.recruiter_id == recruiter_id,
-        models.Interview.status == models.InterviewStatus.completed,
-        models.Interview.started_at.isnot(None),
-        models.Interview.completed_at.isnot(None)
-    ).all()
+    # Headline numbers and score histogram from the daily rollup
+    totals = db.query(
+        func.coalesce(func.sum(stats.created_count), 0),
+        func.coalesce(func.sum(stats.started_count), 0),
+        func.coalesce(func.sum(stats.completed_count), 0),
+        func.coalesce(func.sum(stats.timed_completed_count), 0),
+        func.coalesce(func.sum(stats.completion_minutes), 0),
+        *[func.coalesce(func.sum(getattr(stats, f"score_bucket_{i}")), 0) for i in range(rollups.SCORE_BUCKETS)]
+    ).filter(
+        stats.recruiter_id == recruiter_id
+    ).one()
     
-    total_time = 0
-    for interview in completed_with_times:
-        duration = (interview.completed_at - interview.started_at).total_seconds() / 60  # Convert to minutes
-        total_time += duration
+    created, started, completed_interviews, timed_completed, completion_minutes, *score_counts = totals
+    pending_interviews = created - started
+    avg_completion_time = float(completion_minutes) / timed_completed if timed_completed else 0
     
-    avg_completion_time = total_time / len(completed_with_times) if completed_with_times else 0
+    # Distinct candidates are not additive across days, so count them from the (recruiter_id, candidate_email) index
+    total_candidates = db.query(func.count(models.Interview.candidate_email.distinct())).filter(
+        models.Interview.recruiter_id == recruiter_id
+    ).scalar()
     
     # Calculate completion rate
     total_interviews = pending_interviews + completed_interviews
@@ -381,20 +1076,21 @@ def get_recruiter_dashboard(db: Session, recruiter_id: int):
     completed_counts = [0] * 7
     scheduled_counts = [0] * 7
     
-    # Query interviews from the last 7 days
-    recent_interviews = db.query(models.Interview).filter(
-        models.Interview.recruiter_id == recruiter_id,
-        func.date(models.Interview.created_at) >= seven_days_ago
-    ).all()
+    # Interviews created in the last 7 days, split by whether they have been completed
+    daily_counts = db.query(
+        stats.day,
+        func.sum(stats.created_completed_count),
+        func.sum(stats.created_count)
+    ).filter(
+        stats.recruiter_id == recruiter_id,
+        stats.day >= seven_days_ago
+    ).group_by(stats.day).all()
     
-    # Count interviews by day
-    for interview in recent_interviews:
-        day_index = (interview.created_at.date() - seven_days_ago).days
+    for day, completed, total in daily_counts:
+        day_index = (rollups.as_date(day) - seven_days_ago).days
         if 0 <= day_index < 7:
-            if interview.status == models.InterviewStatus.completed:
-                completed_counts[day_index] += 1
-            else:
-                scheduled_counts[day_index] += 1
+            completed_counts[day_index] += completed
+            scheduled_counts[day_index] += total - completed
     
     interviews_by_day = {
         "labels": date_labels,
@@ -413,20 +1109,8 @@ def get_recruiter_dashboard(db: Session, recruiter_id: int):
     }
     
     # 2. Scores distribution
-    # Get all completed interviews with analysis
-    scored_interviews = db.query(models.InterviewAnalysis).join(
-        models.Interview, models.Interview.id == models.InterviewAnalysis.interview_id
-    ).filter(
-        models.Interview.recruiter_id == recruiter_id
-    ).all()
-    
-    # Group scores into ranges
     score_ranges = ["0-1", "1-2", "2-3", "3-4", "4-5"]
-    score_counts = [0] * 5
-    
-    for analysis in scored_interviews:
-        score_index = min(int(analysis.overall_score), 4)
-        score_counts[score_index] += 1
+    score_counts = [int(count) for count in score_counts]
     
     scores_distribution = {
         "labels": score_ranges,
@@ -464,4 +1148,156 @@ def get_recruiter_dashboard(db: Session, recruiter_id: int):
         interviews_by_day=interviews_by_day,
         scores_distribution=scores_distribution,
         candidate_sources=candidate_sources
-    ) 
\ No newline at end of file
+    ) 
+
+PERCENTILES = (25, 50, 90)
+
+# Lifecycle counters reported when grouping by status
+STATUS_SERIES = [
+    ("created", "Created", "created_count"),
+    ("started", "Started", "started_count"),
+    ("completed", "Completed", "completed_count"),
+]
+
+def get_score_percentiles(db: Session, recruiter_id: int, start: datetime.date, end: datetime.date, by_template: bool = False):
+    """
+    p25/p50/p90 of the overall scores of interviews completed in [start, end].
+    Returns {None: percentiles} for the whole range, plus one entry per template id when `by_template` is set.
+    PostgreSQL computes them with percentile_cont; elsewhere the score column is fetched once and
+    reduced with NumPy, which uses the same linear interpolation.
+    """
+    score = models.InterviewAnalysis.overall_score
+    template_id = models.Interview.template_id
+    filters = (
+        models.Interview.recruiter_id == recruiter_id,
+        models.Interview.completed_at >= datetime.datetime.combine(start, datetime.time.min),
+        models.Interview.completed_at < datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min),
+        score.isnot(None),
+    )
+    
+    def scored(*columns):
+        return db.query(*columns).join(
+            models.Interview, models.Interview.id == models.InterviewAnalysis.interview_id
+        ).filter(*filters)
+    
+    if db.get_bind().dialect.name == "postgresql":
+        aggregates = [func.count(score)] + [func.percentile_cont(p / 100).within_group(score) for p in PERCENTILES]
+        results = {None: scored(*aggregates).one()}
+        if by_template:
+            for row in scored(template_id, *aggregates).group_by(template_id):
+                results[row[0]] = tuple(row[1:])
+        return {
+            key: schemas.ScorePercentiles(count=count, **dict(zip(("p25", "p50", "p90"), values)))
+            for key, (count, *values) in results.items()
+        }
+    
+    rows = scored(template_id, score).all()
+    templates = np.fromiter((row[0] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    scores = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    
+    def summarize(values):
+        if not len(values):
+            return schemas.ScorePercentiles(count=0)
+        p25, p50, p90 = np.percentile(values, PERCENTILES)
+        return schemas.ScorePercentiles(count=len(values), p25=float(p25), p50=float(p50), p90=float(p90))
+    
+    results = {None: summarize(scores)}
+    if by_template and len(scores):
+        order = np.argsort(templates, kind="stable")
+        templates, scores = templates[order], scores[order]
+        keys, first = np.unique(templates, return_index=True)
+        for key, values in zip(keys, np.split(scores, first[1:])):
+            results[int(key)] = summarize(values)
+    return results
+
+def get_recruiter_analytics(
+    db: Session,
+    recruiter_id: int,
+    start: datetime.date,
+    end: datetime.date,
+    granularity: schemas.AnalyticsGranularity = schemas.AnalyticsGranularity.day,
+    group_by: schemas.AnalyticsGroupBy = schemas.AnalyticsGroupBy.template
+):
+    """
+    Time series of interview activity between `start` and `end` (inclusive), bucketed by
+    day, week or month and split per template or per lifecycle status. Reads the daily
+    rollup, so the cost depends on the number of buckets and templates, not interviews.
+    """
+    stats = models.RecruiterDailyStats
+    bucket = rollups.bucket_start(db, stats.day, granularity.value)
+    starts = rollups.bucket_starts(start, end, granularity.value)
+    index = {day: i for i, day in enumerate(starts)}
+    
+    in_range = (
+        stats.recruiter_id == recruiter_id,
+        stats.day >= start,
+        stats.day <= end,
+    )
+    
+    series = []
+    if group_by == schemas.AnalyticsGroupBy.status:
+        sums = [func.sum(getattr(stats, column)) for _, _, column in STATUS_SERIES]
+        counts = {key: [0] * len(starts) for key, _, _ in STATUS_SERIES}
+        for day, *values in db.query(bucket, *sums).filter(*in_range).group_by(bucket):
+            i = index.get(rollups.as_date(day))
+            if i is None:
+                continue
+            for (key, _, _), value in zip(STATUS_SERIES, values):
+                counts[key][i] = int(value or 0)
+        
+        for key, label, _ in STATUS_SERIES:
+            series.append(schemas.AnalyticsSeries(key=key, label=label, counts=counts[key], total=sum(counts[key])))
+        percentiles = get_score_percentiles(db, recruiter_id, start, end)
+    else:
+        rows = db.query(
+            stats.template_id, bucket,
+            func.sum(stats.created_count), func.sum(stats.score_sum), func.sum(stats.scored_count)
+        ).filter(*in_range).group_by(stats.template_id, bucket).all()
+        
+        # Scatter the (template, bucket) rows into template x bucket matrices
+        template_ids = sorted({row[0] for row in rows})
+        template_index = {template_id: i for i, template_id in enumerate(template_ids)}
+        positions = [
+            (template_index[row[0]], index.get(rollups.as_date(row[1])), row[2:])
+            for row in rows
+        ]
+        positions = [position for position in positions if position[1] is not None]
+        shape = (len(template_ids), len(starts))
+        counts = np.zeros(shape, dtype=np.int64)
+        score_sums = np.zeros(shape, dtype=np.float64)
+        scored = np.zeros(shape, dtype=np.int64)
+        if positions:
+            t, b = np.array([p[0] for p in positions]), np.array([p[1] for p in positions])
+            values = np.array([p[2] for p in positions], dtype=np.float64)
+            values = np.nan_to_num(values)
+            counts[t, b] = values[:, 0]
+            score_sums[t, b] = values[:, 1]
+            scored[t, b] = values[:, 2]
+        avg_scores = np.round(np.divide(score_sums, scored, out=np.zeros(shape), where=scored > 0), 2)
+        totals = counts.sum(axis=1)
+        
+        titles = dict(db.query(models.InterviewTemplate.id, models.InterviewTemplate.title).filter(
+            models.InterviewTemplate.id.in_(template_ids)
+        )) if template_ids else {}
+        percentiles = get_score_percentiles(db, recruiter_id, start, end, by_template=True)
+        
+        for i in np.argsort(-totals, kind="stable"):
+            template_id = template_ids[i]
+            series.append(schemas.AnalyticsSeries.construct(
+                key=str(template_id),
+                label=titles.get(template_id) or f"Template {template_id}",
+                counts=counts[i].tolist(),
+                avg_scores=[score if n else None for score, n in zip(avg_scores[i].tolist(), scored[i].tolist())],
+                total=int(totals[i]),
+                score_percentiles=percentiles.get(template_id, schemas.ScorePercentiles(count=0))
+            ))
+    
+    return schemas.RecruiterAnalyticsSeries(
+        start_date=start,
+        end_date=end,
+        granularity=granularity,
+        group_by=group_by,
+        labels=[day.isoformat() for day in starts],
+        series=series,
+        score_percentiles=percentiles[None]
+    )
@@ -1,28 +1,319 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+import asyncio
 import os
+import time
 
 # Database URL from environment variable or default to SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_interview_assistant.db")
 
-# For SQLite
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-# For PostgreSQL, MySQL, etc.
-else:
-    engine = create_engine(DATABASE_URL)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Dialects with INSERT ... ON CONFLICT, by name
+UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Connection pool configuration. Each worker process (WEB_CONCURRENCY) opens a
+# sync and an async engine, so by default they split DB_MAX_CONNECTIONS evenly;
+# set DB_POOL_SIZE / DB_MAX_OVERFLOW to size the pools explicitly.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+_connections_per_engine = max(2, DB_MAX_CONNECTIONS // (WEB_CONCURRENCY * 2))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(max(1, _connections_per_engine // 2))))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(max(0, _connections_per_engine - DB_POOL_SIZE))))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() not in ("0", "false", "no")
+
+# How long a SQLite connection waits for another writer's lock before failing
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Pool metrics
+class PoolMetrics:
+    """Checkout counters and wait times (including opening new connections) of one connection pool."""
+    __slots__ = ("checkouts", "timeouts", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+def _instrumented(pool_class):
+    """Subclass `pool_class` to time how long each checkout waits for a free connection."""
+    class InstrumentedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.metrics = PoolMetrics()
+
+        def recreate(self):
+            pool = super().recreate()
+            pool.metrics = self.metrics
+            return pool
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                self.metrics.record(time.perf_counter() - start, timed_out=True)
+                raise
+            self.metrics.record(time.perf_counter() - start)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+InstrumentedQueuePool = _instrumented(QueuePool)
+InstrumentedAsyncAdaptedQueuePool = _instrumented(AsyncAdaptedQueuePool)
+
+def engine_options(url: str, pool_class) -> dict:
+    """create_engine keyword arguments for `url`, with a sized and instrumented pool."""
+    if url.startswith("sqlite") and (":memory:" in url or url.split("://", 1)[-1] in ("", "/")):
+        # In-memory databases live and die with their single connection
+        return {}
+    options = {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+def configure_sqlite(engine: Engine):
+    """
+    Put every new SQLite connection in WAL mode, so readers never block the writer,
+    with synchronous=NORMAL (safe under WAL) and a busy timeout, so a connection
+    waits for another writer's lock instead of failing with "database is locked".
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, InstrumentedQueuePool))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the request path, on the asyncio driver of the same database
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str) -> str:
+    """Rewrite a database URL to use the asyncio driver for its dialect."""
+    scheme, separator, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database URL scheme '{scheme}'")
+    return f"{ASYNC_DRIVERS[dialect]}{separator}{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, InstrumentedAsyncAdaptedQueuePool))
+
+# Objects stay loaded after commit: there is no lazy loading once a route is back in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if IS_SQLITE:
+    configure_sqlite(engine)
+    configure_sqlite(async_engine.sync_engine)
+
+def pool_status() -> Dict[str, Dict[str, Any]]:
+    """Current size, usage and checkout wait statistics of both connection pools."""
+    status = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.pool)):
+        metrics = getattr(pool, "metrics", None)
+        if metrics is None:
+            status[name] = {"pool": type(pool).__name__}
+            continue
+        status[name] = {
+            "pool": type(pool).__name__,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "checkouts": metrics.checkouts,
+            "timeouts": metrics.timeouts,
+            "wait_avg_ms": round(metrics.wait_total / metrics.checkouts * 1000, 3) if metrics.checkouts else 0.0,
+            "wait_max_ms": round(metrics.wait_max * 1000, 3),
+        }
+    return status
+
+# SQLite write serialization
+class WriteQueue:
+    """
+    Lets one async write transaction at a time into SQLite, in arrival order.
+
+    SQLite has a single writer; without this, concurrent submissions race for the
+    lock and the losers spin on busy_timeout or fail. Waiting here instead keeps
+    the event loop free and turns a burst of writes into a queue. Other processes
+    are still arbitrated by busy_timeout. A no-op on databases with row-level locking.
+    """
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.waiting = 0
+        self.writes = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @asynccontextmanager
+    async def slot(self):
+        if not self.enabled:
+            yield
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._lock.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            waited = time.perf_counter() - start
+            self.writes += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            yield
+        finally:
+            self._lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "waiting": self.waiting,
+            "writes": self.writes,
+            "wait_avg_ms": round(self.wait_total / self.writes * 1000, 3) if self.writes else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+write_queue = WriteQueue(enabled=IS_SQLITE)
+
 Base = declarative_base()
 
+# Schema migrations
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Revision matching the schema that create_all used to build, before migrations existed
+BASELINE_REVISION = "0001"
+
+# Advisory lock key held on PostgreSQL while migrating
+MIGRATION_LOCK_KEY = 0x41494941
+
+def _lock_for_migrations(connection):
+    """
+    Make workers that start together migrate one at a time; the others wait, then
+    find the schema already at head. Held until the migration transaction ends.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    elif connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def run_migrations():
+    """
+    Upgrade the database to the latest migration in migrations/versions.
+    Databases created by the old create_all call are stamped at the baseline revision first.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.attributes["configure_logger"] = False
+
+    with engine.begin() as connection:
+        _lock_for_migrations(connection)
+        config.attributes["connection"] = connection
+        inspector = inspect(connection)
+        if inspector.has_table("users") and not inspector.has_table("alembic_version"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+
 # Dependency to get the database session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Query budgets
+class QueryTracker:
+    """Counts the SQL statements executed while it is active."""
+    __slots__ = ("count", "budget")
+
+    def __init__(self):
+        self.count = 0
+        self.budget: Optional[int] = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+_query_tracker: ContextVar[Optional[QueryTracker]] = ContextVar("query_tracker", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    tracker = _query_tracker.get()
+    if tracker is not None:
+        tracker.count += 1
+
+@contextmanager
+def track_queries():
+    """
+    Count the queries issued inside the block.
+    The tracker object is shared, so work done in tasks spawned from the block is counted too.
+    """
+    tracker = QueryTracker()
+    token = _query_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _query_tracker.reset(token)
+
+def query_budget(max_queries: int):
+    """
+    Route dependency declaring how many queries the endpoint may issue.
+    Checked by tests/test_query_budgets.py, and reported by the diagnostic
+    middleware in main.py when QUERY_BUDGET_DIAGNOSTICS is on.
+    """
+    def set_budget():
+        tracker = _query_tracker.get()
+        if tracker is not None:
+            tracker.budget = max_queries
+    set_budget.max_queries = max_queries
+    return set_budget
@@ -0,0 +1,105 @@
+"""
+Email templates.
+
+Outgoing mail is queued in the email outbox (models.OutboxEmail) as a template
+name, a recipient and the values to render, and rendered by the sender in
+mailer.py. Templates use {name} placeholders; each is parsed once into literal
+text and field names (compile_template) and kept for the life of the process,
+so rendering a batch only joins strings. Values are HTML-escaped in the HTML part.
+
+Add a template to EMAIL_TEMPLATES and a function that builds its outbox fields,
+like invitation below.
+"""
+import datetime
+import html
+import os
+import string
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Base URL of the web app, for links in emails
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
+EMAIL_TEMPLATES = {
+    "interview_invitation": {
+        "subject": "Interview Invitation: {template_title}",
+        "text": (
+            "Hello {candidate_name},\n"
+            "\n"
+            "You have been invited to complete an interview for {template_title}.\n"
+            "{due_text}"
+            "\n"
+            "Start the interview: {interview_link}\n"
+            "\n"
+            "Thank you,\n"
+            "The AI Interview Assistant Team\n"
+        ),
+        "html": (
+            "<p>Hello {candidate_name},</p>\n"
+            "<p>You have been invited to complete an interview for {template_title}.</p>\n"
+            "<p>{due_text}</p>\n"
+            "<p><a href=\"{interview_link}\">Click here to start the interview</a></p>\n"
+            "<p>Thank you,<br>\n"
+            "The AI Interview Assistant Team</p>\n"
+        ),
+    },
+}
+
+# Literal text followed by the field rendered after it (None at the end)
+CompiledTemplate = List[Tuple[str, Optional[str]]]
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    text: str
+    html: str
+
+def compile_template(source: str) -> CompiledTemplate:
+    """Split `source` into literal text and field names, rejecting anything but plain {name} fields."""
+    parts = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(source):
+        if field is not None and (not field.isidentifier() or format_spec or conversion):
+            raise ValueError(f"Unsupported template field {{{field}}}; use {{name}}")
+        parts.append((literal, field))
+    return parts
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Dict[str, CompiledTemplate]:
+    """The compiled subject, text and HTML of template `name`; raises KeyError for unknown names."""
+    return {part: compile_template(source) for part, source in EMAIL_TEMPLATES[name].items()}
+
+def render_template(parts: CompiledTemplate, context: Dict[str, Any], escape: bool = False) -> str:
+    pieces = []
+    for literal, field in parts:
+        pieces.append(literal)
+        if field is not None:
+            value = "" if context.get(field) is None else str(context[field])
+            pieces.append(html.escape(value) if escape else value)
+    return "".join(pieces)
+
+def render(name: str, context: Dict[str, Any]) -> RenderedEmail:
+    """Render template `name` with `context`; missing values render empty."""
+    template = get_template(name)
+    return RenderedEmail(
+        subject=render_template(template["subject"], context),
+        text=render_template(template["text"], context),
+        html=render_template(template["html"], context, escape=True)
+    )
+
+def invitation(
+    interview_id: int,
+    candidate_email: str,
+    candidate_name: Optional[str],
+    template_title: Optional[str],
+    due_date: Optional[datetime.datetime] = None
+) -> Dict[str, Any]:
+    """Outbox fields (template, recipient, context) of an interview invitation."""
+    return {
+        "template": "interview_invitation",
+        "recipient": candidate_email,
+        "context": {
+            "candidate_name": candidate_name or "there",
+            "template_title": template_title or "your interview",
+            "due_text": f"Please complete the interview by {due_date.strftime('%B %d, %Y')}.\n" if due_date else "",
+            "interview_link": f"{FRONTEND_URL}/interview/{interview_id}",
+        },
+    }
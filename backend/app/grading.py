@@ -0,0 +1,99 @@
+"""
+Answer-key grading for multiple choice questions.
+
+Questions with correct_options are scored here instead of by the AI engine. Each
+correct option picked earns credit and each incorrect one takes it back, scaled
+to the 0-5 score of ResponseAnalysis:
+
+    score = 5 * max(0, (correct picked - incorrect picked) / correct options)
+
+A single selection question is the one-option case: 5 for the right answer and 0
+otherwise. A batch of responses is graded with a few NumPy operations over
+boolean selection and answer key matrices.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import models
+
+MAX_SCORE = 5.0
+
+def is_gradable(question: models.Question) -> bool:
+    return question.type == models.QuestionType.multiple_choice and bool(question.correct_options)
+
+def selections(response: models.Response) -> List[str]:
+    """Options picked in a response, whether single or multiple selection."""
+    if response.selected_options:
+        return list(response.selected_options)
+    return [response.selected_option] if response.selected_option else []
+
+def selection_text(response: models.Response) -> Optional[str]:
+    """The picked options as one string, for prompts and summaries."""
+    return ", ".join(selections(response)) or None
+
+def grade_selections(
+    keys: Sequence[Sequence[str]],
+    picked: Sequence[Sequence[str]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Grade each selection in `picked` against the answer key at the same position.
+    Returns the scores and the number of correct and incorrect options picked.
+    """
+    # One column per distinct option label in the batch
+    columns: Dict[str, int] = {}
+    for options in (*keys, *picked):
+        for option in options:
+            columns.setdefault(option, len(columns))
+
+    def matrix(rows: Sequence[Sequence[str]]) -> np.ndarray:
+        cells = [(row, columns[option]) for row, options in enumerate(rows) for option in set(options)]
+        result = np.zeros((len(rows), len(columns)), dtype=bool)
+        if cells:
+            result[tuple(np.array(cells).T)] = True
+        return result
+
+    key_matrix = matrix(keys)
+    picked_matrix = matrix(picked)
+    correct = (picked_matrix & key_matrix).sum(axis=1)
+    incorrect = (picked_matrix & ~key_matrix).sum(axis=1)
+    total = np.maximum(key_matrix.sum(axis=1), 1)
+    scores = MAX_SCORE * np.clip((correct - incorrect) / total, 0.0, 1.0)
+    return scores, correct, incorrect
+
+def grade_responses(
+    responses: Sequence[models.Response],
+    questions: Dict[int, models.Question]
+) -> List[models.Response]:
+    """
+    Attach an answer-key analysis to every response whose question has an answer key.
+    Returns the other responses, which still need the AI engine.
+    """
+    gradable = [
+        response for response in responses
+        if response.question_id in questions and is_gradable(questions[response.question_id])
+    ]
+    if not gradable:
+        return list(responses)
+
+    keys = [questions[response.question_id].correct_options for response in gradable]
+    scores, correct, incorrect = grade_selections(keys, [selections(response) for response in gradable])
+    for response, key, score, right, wrong in zip(gradable, keys, scores, correct, incorrect):
+        missed = len(set(key)) - int(right)
+        strengths = ["Selected the correct answer"] if score == MAX_SCORE else []
+        if 0 < right and score < MAX_SCORE:
+            strengths.append(f"Selected {right} of {len(set(key))} correct options")
+        weaknesses = []
+        if wrong:
+            weaknesses.append(f"Selected {wrong} incorrect option{'s' if wrong > 1 else ''}")
+        if missed:
+            weaknesses.append(f"Missed {missed} correct option{'s' if missed > 1 else ''}")
+        response.analysis = models.ResponseAnalysis(
+            score=round(float(score), 2),
+            strengths=strengths,
+            weaknesses=weaknesses,
+            notes="Graded against the answer key"
+        )
+
+    graded = {id(response) for response in gradable}
+    return [response for response in responses if id(response) not in graded]
@@ -0,0 +1,201 @@
+"""
+Background interview analysis (models.AnalysisJob).
+
+Completing an interview queues an analysis job in the same transaction as the
+last responses (crud.queue_analysis), so the submission returns as soon as the
+answers are stored. The workers here claim queued jobs, run crud.analyze_interview
+and record the outcome. The queue is the table itself: jobs survive restarts.
+While a job runs, its worker renews the lease every ANALYSIS_JOB_HEARTBEAT_SECONDS,
+so a job left running by a process that went away is claimed again once its
+heartbeats stop for ANALYSIS_JOB_LEASE_SECONDS, however long a live run takes.
+Failed runs are retried up to ANALYSIS_JOB_MAX_ATTEMPTS times.
+
+The API starts a pool on startup and drains it on shutdown. Set ANALYSIS_WORKERS=0
+to keep the API from analyzing and run the workers as their own process instead:
+
+    python -m app.jobs [--workers N]
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from . import crud
+from .analysis_events import analysis_event, analysis_events, job_event
+from .database import SessionLocal
+from .model_client import model_client
+from .model_scheduler import ModelUnavailableError, scheduler
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per process; analysis waits on the AI provider, not the CPU
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+# A running job whose worker has been silent this long is handed to another worker
+JOB_LEASE_SECONDS = float(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "120"))
+# How often the worker running a job renews its lease
+JOB_HEARTBEAT_SECONDS = float(os.getenv("ANALYSIS_JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 4)))
+# Idle workers check the table this often for jobs queued by other processes
+JOB_POLL_SECONDS = float(os.getenv("ANALYSIS_JOB_POLL_SECONDS", "2"))
+JOB_DRAIN_SECONDS = float(os.getenv("ANALYSIS_JOB_DRAIN_SECONDS", "30"))
+
+class AnalysisWorkerPool:
+    """Threads that claim and run analysis jobs until drained."""
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, session_factory=SessionLocal):
+        self.workers = workers
+        self.session_factory = session_factory
+        self.completed = 0
+        self.failed = 0
+        self.parked = 0
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"analysis-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        """Wake idle workers after queueing a job instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def drain(self, timeout: float = JOB_DRAIN_SECONDS) -> bool:
+        """
+        Stop claiming jobs and wait up to `timeout` seconds for the running ones.
+        Returns False if some were still running; their leases expire and another
+        process picks them up.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            logger.warning("%d analysis jobs still running after %.0fs", len(self._threads), timeout)
+        return not self._threads
+
+    def run_next(self) -> Optional[int]:
+        """Claim and run one job. Returns its id, or None if nothing was queued or the model is unavailable."""
+        if scheduler.breaker.retry_after() > 0:
+            # Leave the queue alone while the model API circuit is open
+            return None
+        with self.session_factory() as db:
+            job = crud.claim_analysis_job(db, lease_seconds=JOB_LEASE_SECONDS)
+            if job is None:
+                return None
+            job_id, interview_id = job.id, job.interview_id
+            publish_job_status(job)
+
+            # analyze_interview commits each score before reporting it, so a stream never shows one that is rolled back
+            def on_response(response_id, result):
+                analysis_events.publish(interview_id, "response", {"response_id": response_id, **result})
+
+            error = None
+            with self._lease(job_id, job.attempts):
+                try:
+                    analysis = crud.analyze_interview(db, interview_id, on_response=on_response)
+                    if analysis is None:
+                        error = "Interview not found or not completed"
+                except ModelUnavailableError as exc:
+                    db.rollback()
+                    publish_job_status(crud.park_analysis_job(db, job_id, reason=str(exc)))
+                    with self._lock:
+                        self.parked += 1
+                    logger.warning("Parked analysis job %d: %s", job_id, exc)
+                    return None
+                except Exception as exc:
+                    db.rollback()
+                    logger.exception("Analysis job %d for interview %d failed", job_id, interview_id)
+                    error = f"{type(exc).__name__}: {exc}"
+                else:
+                    if analysis is not None:
+                        analysis_events.publish(interview_id, "analysis", analysis_event(analysis))
+            publish_job_status(crud.finish_analysis_job(db, job_id, error=error, max_attempts=JOB_MAX_ATTEMPTS))
+        with self._lock:
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        return job_id
+
+    @contextmanager
+    def _lease(self, job_id: int, attempt: int):
+        """Renew the lease of run `attempt` of a job from a side thread, on its own session, until the block exits."""
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(JOB_HEARTBEAT_SECONDS):
+                try:
+                    with self.session_factory() as db:
+                        if not crud.renew_analysis_job_lease(db, job_id, attempt):
+                            logger.warning("Analysis job %d was claimed by another worker after its lease expired", job_id)
+                            return
+                except Exception:
+                    logger.exception("Could not renew the lease of analysis job %d", job_id)
+
+        thread = threading.Thread(target=heartbeat, name=f"analysis-heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def status(self):
+        return {
+            "workers": len([thread for thread in self._threads if thread.is_alive()]),
+            "completed": self.completed,
+            "failed": self.failed,
+            "parked": self.parked,
+        }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self.run_next() is not None:
+                    continue
+            except Exception:
+                # Database unavailable or similar; back off until the next poll
+                logger.exception("Analysis worker could not claim a job")
+            self._wakeup.wait(max(JOB_POLL_SECONDS, scheduler.breaker.retry_after()))
+            self._wakeup.clear()
+
+def publish_job_status(job):
+    """Tell streams following the interview that its analysis job changed status."""
+    if job is not None:
+        analysis_events.publish(job.interview_id, "job", job_event(job))
+
+analysis_workers = AnalysisWorkerPool()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the interview analysis workers")
+    parser.add_argument("--workers", type=int, default=max(ANALYSIS_WORKERS, 1), help="Number of worker threads")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    pool = AnalysisWorkerPool(workers=args.workers)
+    pool.start()
+    print(f"Running {args.workers} analysis workers")
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    pool.drain()
+    model_client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+In-memory JSON Web Key Set for verifying RS256 tokens (used by clerk_auth.py).
+
+Keys are fetched from the JWKS URL, parsed once and kept by `kid`, so verifying
+a token is a dictionary lookup and a signature check. A background task on the
+API's event loop fetches the set again before it expires (at
+JWKS_REFRESH_FRACTION of the Cache-Control max-age, or of JWKS_REFRESH_SECONDS
+without one), so requests do not wait on the network in steady state. A token
+signed with a kid the set does not have yet (the provider rotated its keys)
+triggers one fetch shared by every request that needs it, at most once per
+JWKS_MIN_REFETCH_SECONDS so that tokens with made-up kids cannot flood the
+provider. Background fetches are at least JWKS_MIN_REFRESH_SECONDS apart, however
+short the max-age. A failed fetch, including a response that is not a key set,
+keeps the previous keys. scripts/stub_jwks.py serves a rotating key set locally.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from jwt.algorithms import RSAAlgorithm
+from jwt.exceptions import InvalidKeyError
+
+logger = logging.getLogger(__name__)
+
+JWKS_TIMEOUT_SECONDS = float(os.getenv("JWKS_TIMEOUT_SECONDS", "5"))
+# Lifetime of a fetched key set when the response has no max-age
+JWKS_REFRESH_SECONDS = float(os.getenv("JWKS_REFRESH_SECONDS", "3600"))
+# Share of the lifetime after which the set is fetched again in the background
+JWKS_REFRESH_FRACTION = float(os.getenv("JWKS_REFRESH_FRACTION", "0.8"))
+# Least time between fetches caused by unknown kids
+JWKS_MIN_REFETCH_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_SECONDS", "30"))
+# Least time between background refreshes, e.g. when the provider sends max-age=0
+JWKS_MIN_REFRESH_SECONDS = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", "60"))
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+class JWKSCache:
+    """Signing keys by kid, fetched on demand and refreshed in the background."""
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.headers = headers or {}
+        self.fetches = 0
+        self.failures = 0
+        self.unknown_kid_fetches = 0
+        self._keys: Dict[str, Any] = {}
+        self._lifetime = JWKS_REFRESH_SECONDS
+        self._fetched_at = 0.0  # Monotonic time of the last successful fetch
+        self._attempted_at = float("-inf")
+        self._fetch: Optional["asyncio.Future[None]"] = None
+        self._refresher: Optional["asyncio.Task[None]"] = None
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Any]:
+        """The public key for `kid`, or None if the provider does not have it."""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        if self._keys and time.monotonic() - self._attempted_at < JWKS_MIN_REFETCH_SECONDS:
+            return None
+        if self._keys:
+            self.unknown_kid_fetches += 1
+        await self.refresh()
+        return self._keys.get(kid)
+
+    async def refresh(self):
+        """Fetch the key set, joining the fetch already in flight if there is one."""
+        loop = asyncio.get_running_loop()
+        if self._fetch is None or self._fetch.done() or self._fetch.get_loop() is not loop:
+            self._fetch = loop.create_task(self._fetch_keys())
+        # Shielded: a request that gives up waiting does not cancel the fetch for the others
+        await asyncio.shield(self._fetch)
+
+    async def _fetch_keys(self):
+        self._attempted_at = time.monotonic()
+        self.fetches += 1
+        try:
+            async with httpx.AsyncClient(timeout=JWKS_TIMEOUT_SECONDS) as client:
+                response = await client.get(self.url, headers=self.headers)
+                response.raise_for_status()
+            body = response.json()
+            if not isinstance(body, dict) or not isinstance(body.get("keys"), list):
+                raise ValueError("the response is not a JSON Web Key Set")
+            keys = {}
+            for jwk in body["keys"]:
+                if not isinstance(jwk, dict) or jwk.get("kty") != "RSA" or jwk.get("use", "sig") != "sig" or not jwk.get("kid"):
+                    continue
+                try:
+                    keys[str(jwk["kid"])] = RSAAlgorithm.from_jwk(json.dumps(jwk))
+                except (InvalidKeyError, ValueError, KeyError, TypeError) as exc:
+                    logger.warning("Skipping unusable key %r from %s: %s", jwk["kid"], self.url, exc)
+            if not keys:
+                raise ValueError("the key set has no usable RS256 signing keys")
+        except (httpx.HTTPError, ValueError) as exc:
+            self.failures += 1
+            logger.warning("Could not fetch the JWKS from %s: %s", self.url, exc)
+            return
+        max_age = MAX_AGE.search(response.headers.get("cache-control", ""))
+        self._lifetime = float(max_age.group(1)) if max_age else JWKS_REFRESH_SECONDS
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def start(self):
+        """Start refreshing in the background on the running event loop."""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def _refresh_loop(self):
+        retry_delay = 1.0
+        while True:
+            if self._keys:
+                due = self._fetched_at + max(self._lifetime * JWKS_REFRESH_FRACTION, JWKS_MIN_REFRESH_SECONDS)
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+            fetched_at = self._fetched_at
+            try:
+                await self.refresh()
+            except Exception:
+                # Whatever went wrong, the refresher must outlive it; the request path still fetches on demand
+                self.failures += 1
+                logger.exception("JWKS refresh from %s failed", self.url)
+            if self._fetched_at == fetched_at:
+                # Failed; keep the old keys and try again soon
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60.0)
+            else:
+                retry_delay = 1.0
+
+    def status(self):
+        return {
+            "url": self.url,
+            "keys": len(self._keys),
+            "age_seconds": round(time.monotonic() - self._fetched_at, 1) if self._fetched_at else None,
+            "fetches": self.fetches,
+            "failures": self.failures,
+            "unknown_kid_fetches": self.unknown_kid_fetches,
+            "refreshing": self._refresher is not None and not self._refresher.done(),
+        }
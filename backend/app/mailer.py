@@ -0,0 +1,433 @@
+"""
+Background delivery of the email outbox (models.OutboxEmail).
+
+Routes never send mail themselves: they write an outbox row in the same
+transaction as the interview it is about (see emails.py for the templates). The
+sender threads here claim due emails in batches of EMAIL_BATCH_SIZE, render them
+and hand each batch to the transport over one pooled connection, then record the
+outcome. Temporary failures (connection errors, 4xx replies) are retried with
+exponential backoff from EMAIL_RETRY_SECONDS; rejected recipients (5xx) and
+emails that fail EMAIL_MAX_ATTEMPTS times are dead-lettered, i.e. kept with
+status "dead" and their last error until requeued:
+
+    python -m app.mailer requeue
+
+Transports (EMAIL_BACKEND):
+
+    log   log each message instead of sending it; the default without SMTP_HOST
+    smtp  deliver to SMTP_HOST, keeping up to SMTP_CONNECTIONS connections open
+          between batches and pipelining each message's MAIL, RCPT and DATA
+          commands (RFC 2920) when the server offers PIPELINING
+
+The API starts EMAIL_SENDERS sender threads on startup and drains them on
+shutdown; set EMAIL_SENDERS=0 and run `python -m app.mailer run` to send from a
+separate process. To try delivery locally, run the SMTP sink in
+scripts/smtp_sink.py, which accepts and counts messages and rejects recipients
+whose address starts with "bounce":
+
+    python -m scripts.smtp_sink --port 1025 &
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_SECURITY=none uvicorn app.main:app
+"""
+import argparse
+import base64
+import logging
+import os
+import queue
+import re
+import signal
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.header import Header
+from email.utils import formataddr, formatdate, parseaddr
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import crud, emails
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+FROM_EMAIL = os.getenv("FROM_EMAIL", "AI Interview Assistant <interviews@example.com>")
+SMTP_HOST = os.getenv("SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+# "starttls" (default), "ssl" for implicit TLS (usually port 465), or "none" for local relays and the sink
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "starttls").lower()
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+# Connections kept open to the server per process, and how long an idle one is kept
+SMTP_CONNECTIONS = int(os.getenv("SMTP_CONNECTIONS", "4"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "30"))
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "smtp" if SMTP_HOST else "log")
+
+# Sender threads per process; each delivers one batch at a time over its own connection
+EMAIL_SENDERS = int(os.getenv("EMAIL_SENDERS", "1"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+# Wait before the first retry, doubled for each later one
+EMAIL_RETRY_SECONDS = float(os.getenv("EMAIL_RETRY_SECONDS", "60"))
+# A batch whose sender has been silent this long is claimed again
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+# Idle senders check the outbox this often for emails queued by other processes
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+EMAIL_DRAIN_SECONDS = float(os.getenv("EMAIL_DRAIN_SECONDS", "30"))
+
+class OutgoingEmail(NamedTuple):
+    id: int
+    sender: str  # Envelope sender
+    recipient: str
+    data: bytes  # The whole message, headers included
+
+class DeliveryError(Exception):
+    """A message was not delivered; permanent errors are not retried."""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+# Delivery outcome per message id: None when sent
+DeliveryResults = Dict[int, Optional[DeliveryError]]
+
+# The envelope sender and From header, parsed once
+ENVELOPE_FROM = parseaddr(FROM_EMAIL)[1]
+FROM_HEADER = formataddr(parseaddr(FROM_EMAIL))
+MESSAGE_ID_DOMAIN = ENVELOPE_FROM.rpartition("@")[2] or "localhost"
+
+def encode_header(value: str) -> str:
+    """A header value on one line (user input cannot add headers), RFC 2047-encoded when not plain ASCII."""
+    value = " ".join(value.split())
+    if value.isascii() and len(value) <= 900:
+        return value
+    return Header(value, "utf-8").encode(linesep="\r\n")
+
+def encode_part(content_type: str, content: str) -> str:
+    body = base64.encodebytes(content.encode("utf-8")).decode("ascii").replace("\n", "\r\n")
+    return f"Content-Type: {content_type}; charset=\"utf-8\"\r\nContent-Transfer-Encoding: base64\r\n\r\n{body}"
+
+def build_message(email_id: int, template: str, recipient: str, context: Dict) -> OutgoingEmail:
+    """
+    Render an outbox email into a multipart/alternative message with plain text and
+    HTML parts. The MIME structure is written directly rather than through
+    email.message.EmailMessage, whose serialization costs milliseconds per message.
+    """
+    rendered = emails.render(template, context)
+    # The boundary cannot occur in base64 content
+    boundary = f"=_outbox_{email_id}"
+    data = (
+        f"From: {FROM_HEADER}\r\n"
+        f"To: {encode_header(recipient)}\r\n"
+        f"Subject: {encode_header(rendered.subject)}\r\n"
+        f"Date: {formatdate(localtime=True)}\r\n"
+        # Stable across retries, so receivers can drop duplicates of a delivery that timed out
+        f"Message-ID: <outbox-{email_id}@{MESSAGE_ID_DOMAIN}>\r\n"
+        "MIME-Version: 1.0\r\n"
+        f"Content-Type: multipart/alternative; boundary=\"{boundary}\"\r\n"
+        "\r\n"
+        f"--{boundary}\r\n{encode_part('text/plain', rendered.text)}"
+        f"--{boundary}\r\n{encode_part('text/html', rendered.html)}"
+        f"--{boundary}--\r\n"
+    )
+    return OutgoingEmail(email_id, ENVELOPE_FROM, recipient, data.encode("utf-8"))
+
+class LogTransport:
+    """Logs messages instead of sending them, for development without an SMTP server."""
+
+    name = "log"
+
+    def deliver(self, messages: List[OutgoingEmail]) -> DeliveryResults:
+        for message in messages:
+            logger.info("Email %d to %s (%d bytes) would be sent in production", message.id, message.recipient, len(message.data))
+        return {message.id: None for message in messages}
+
+    def close(self):
+        pass
+
+    def status(self):
+        return {"backend": self.name}
+
+LINE_ENDINGS = re.compile(rb"\r\n|\r|\n")
+LEADING_DOT = re.compile(rb"^\.", re.MULTILINE)
+
+def dot_stuff(data: bytes) -> bytes:
+    """Message data as sent after DATA: CRLF line endings, leading dots doubled, ending in CRLF.CRLF."""
+    data = LEADING_DOT.sub(b"..", LINE_ENDINGS.sub(b"\r\n", data))
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+class SMTPTransport:
+    """Delivers over a pool of authenticated SMTP connections that stay open between batches."""
+
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        security: str = SMTP_SECURITY,
+        max_connections: int = SMTP_CONNECTIONS,
+        idle_seconds: float = SMTP_IDLE_SECONDS
+    ):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.max_connections = max_connections
+        self.idle_seconds = idle_seconds
+        self.connections_opened = 0
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.security == "ssl":
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS, context=ssl.create_default_context())
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            connection.ehlo()
+            if self.security == "starttls":
+                connection.starttls(context=ssl.create_default_context())
+                connection.ehlo()
+            if SMTP_USERNAME:
+                connection.login(SMTP_USERNAME, SMTP_PASSWORD)
+        except Exception:
+            connection.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """A pooled connection, checked with NOOP before reuse; closed instead of returned if an error escapes."""
+        with self._slots:
+            connection = None
+            while connection is None:
+                try:
+                    connection, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    connection = self._connect()
+                    break
+                if time.monotonic() - idle_since > self.idle_seconds or not self._alive(connection):
+                    self._quit(connection)
+                    connection = None
+            try:
+                yield connection
+            except BaseException:
+                self._quit(connection)
+                raise
+            self._idle.put((connection, time.monotonic()))
+
+    def deliver(self, messages: List[OutgoingEmail]) -> DeliveryResults:
+        results: DeliveryResults = {}
+        try:
+            with self.connection() as connection:
+                pipelining = connection.has_extn("pipelining")
+                for message in messages:
+                    try:
+                        self._send(connection, message, pipelining)
+                        results[message.id] = None
+                    except smtplib.SMTPResponseException as exc:
+                        results[message.id] = DeliveryError(f"{exc.smtp_code} {exc.smtp_error!r}", permanent=exc.smtp_code >= 500)
+                        connection.rset()
+                    except smtplib.SMTPRecipientsRefused as exc:
+                        code, reply = next(iter(exc.recipients.values()))
+                        results[message.id] = DeliveryError(f"{code} {reply!r}", permanent=code >= 500)
+                        connection.rset()
+                    except UnicodeEncodeError as exc:
+                        results[message.id] = DeliveryError(f"Address cannot be sent over SMTP: {exc}", permanent=True)
+        except (smtplib.SMTPException, OSError) as exc:
+            # The connection failed; whatever was not delivered yet is retried later
+            logger.warning("SMTP delivery to %s:%d failed: %s", self.host, self.port, exc)
+            for message in messages:
+                results.setdefault(message.id, DeliveryError(f"{type(exc).__name__}: {exc}"))
+        return results
+
+    def _send(self, connection: smtplib.SMTP, message: OutgoingEmail, pipelining: bool):
+        if not pipelining:
+            connection.sendmail(message.sender, [message.recipient], message.data)
+            return
+        # One round trip for the envelope instead of three, then one for the data
+        connection.send(f"MAIL FROM:<{message.sender}>\r\nRCPT TO:<{message.recipient}>\r\nDATA\r\n".encode("ascii"))
+        (mail_code, mail_reply), (rcpt_code, rcpt_reply), (data_code, data_reply) = (connection.getreply() for _ in range(3))
+        if data_code == 354 and (mail_code != 250 or rcpt_code not in (250, 251)):
+            # Servers should refuse DATA without an accepted recipient; end the empty message if one did not
+            connection.send(b".\r\n")
+            connection.getreply()
+        if mail_code != 250:
+            raise smtplib.SMTPSenderRefused(mail_code, mail_reply, message.sender)
+        if rcpt_code not in (250, 251):
+            raise smtplib.SMTPRecipientsRefused({message.recipient: (rcpt_code, rcpt_reply)})
+        if data_code != 354:
+            raise smtplib.SMTPDataError(data_code, data_reply)
+        connection.send(dot_stuff(message.data))
+        code, reply = connection.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, reply)
+
+    def _alive(self, connection: smtplib.SMTP) -> bool:
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _quit(self, connection: smtplib.SMTP):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def close(self):
+        """Close the idle connections; connections in use are returned and reused as usual."""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(connection)
+
+    def status(self):
+        return {
+            "backend": self.name,
+            "host": f"{self.host}:{self.port}",
+            "idle_connections": self._idle.qsize(),
+            "connections_opened": self.connections_opened,
+        }
+
+TRANSPORTS = {"log": LogTransport, "smtp": SMTPTransport}
+
+def get_transport(name: str = EMAIL_BACKEND):
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown email backend {name!r}, expected one of {', '.join(TRANSPORTS)}")
+    return TRANSPORTS[name]()
+
+class EmailSender:
+    """Threads that claim and deliver outbox emails until drained."""
+
+    def __init__(self, senders: int = EMAIL_SENDERS, transport=None, session_factory=SessionLocal):
+        self.senders = senders
+        self.session_factory = session_factory
+        self._transport = transport
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def transport(self):
+        with self._lock:
+            if self._transport is None:
+                self._transport = get_transport()
+            return self._transport
+
+    def start(self):
+        if self._threads or self.senders <= 0:
+            return
+        self._stopping.clear()
+        for index in range(self.senders):
+            thread = threading.Thread(target=self._run, name=f"email-sender-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        """Wake idle senders after queueing email instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def drain(self, timeout: float = EMAIL_DRAIN_SECONDS) -> bool:
+        """
+        Stop claiming email, wait up to `timeout` seconds for batches in flight and
+        close the transport's connections. Returns False if a batch was still being
+        delivered; its lease expires and another process sends it.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            logger.warning("%d email batches still being delivered after %.0fs", len(self._threads), timeout)
+        if self._transport is not None:
+            self._transport.close()
+        return not self._threads
+
+    def run_next(self, batch_size: int = EMAIL_BATCH_SIZE) -> int:
+        """Claim and deliver one batch. Returns the number of emails claimed."""
+        with self.session_factory() as db:
+            claimed = crud.claim_emails(db, limit=batch_size, lease_seconds=EMAIL_LEASE_SECONDS)
+            if not claimed:
+                return 0
+            messages, failures = [], {}
+            for row in claimed:
+                try:
+                    messages.append(build_message(row.id, row.template, row.recipient, row.context))
+                except (KeyError, ValueError) as exc:
+                    # Unknown template or a malformed address; retrying cannot help
+                    failures[row.id] = (f"Could not build the message: {type(exc).__name__}: {exc}", True)
+            for email_id, error in self.transport.deliver(messages).items():
+                if error is not None:
+                    failures[email_id] = (str(error), error.permanent)
+            dead = crud.finish_emails(db, claimed, failures, max_attempts=EMAIL_MAX_ATTEMPTS, retry_seconds=EMAIL_RETRY_SECONDS)
+        with self._lock:
+            self.sent += len(claimed) - len(failures)
+            self.retried += len(failures) - dead
+            self.dead += dead
+        return len(claimed)
+
+    def status(self):
+        return {
+            "senders": len([thread for thread in self._threads if thread.is_alive()]),
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "transport": self.transport.status(),
+        }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self.run_next():
+                    continue
+            except Exception:
+                # Database unavailable or similar; back off until the next poll
+                logger.exception("Email sender could not deliver a batch")
+            self._wakeup.wait(EMAIL_POLL_SECONDS)
+            self._wakeup.clear()
+
+email_sender = EmailSender()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deliver the email outbox")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    run_command = subcommands.add_parser("run", help="Run the email senders")
+    run_command.add_argument("--senders", type=int, default=max(EMAIL_SENDERS, 1), help="Number of sender threads")
+    subcommands.add_parser("requeue", help="Retry dead-lettered emails")
+    subcommands.add_parser("status", help="Count outbox emails by status")
+    args = parser.parse_args(argv)
+
+    if args.command in ("requeue", "status"):
+        with SessionLocal() as db:
+            if args.command == "requeue":
+                print(f"Requeued {crud.requeue_dead_emails(db)} emails")
+            else:
+                print(", ".join(f"{count} {status}" for status, count in crud.count_emails(db).items()))
+    else:
+        logging.basicConfig(level=logging.INFO)
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        sender = EmailSender(senders=args.senders)
+        sender.start()
+        print(f"Running {args.senders} email senders ({sender.transport.name})")
+        try:
+            stop.wait()
+        except KeyboardInterrupt:
+            pass
+        sender.drain()
+
+if __name__ == "__main__":
+    main()
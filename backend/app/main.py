@@ -1,18 +1,37 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import hmac
+import logging
 import os
 from datetime import datetime, timedelta
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
 
-from .database import engine, get_db
+from .database import engine, async_engine, get_db, pool_status, run_migrations, track_queries, write_queue
 from . import models, schemas, crud, auth
-from .routers import auth as auth_router, templates, interviews, analytics
+from .routers import auth as auth_router, templates, interviews, analytics, videos
 from . import clerk_webhook
+from .clerk_auth import CLERK_JWKS_URL, clerk_jwks
+from .clerk_events import clerk_event_consumer
+from .jobs import analysis_workers
+from .scorers import close_scorers
+from .mailer import email_sender
+from .analysis_cache import analysis_cache
+from .principal_cache import principal_cache
+from .passwords import password_hasher
+from .uploads import upload_manager
+from .playback import video_player
+from .analysis_events import analysis_events
+from .model_client import model_client
+from .model_scheduler import scheduler as model_scheduler
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Bring the database schema up to date on startup (set AUTO_MIGRATE=false to run
+# `python -m scripts.migrate` separately, e.g. as a release step)
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() not in ("0", "false", "no")
+# Bearer token that GET /metrics requires; without one, metrics are only served with APP_ENV=development
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 app = FastAPI(
     title="AI Interview Assistant API",
@@ -43,11 +62,102 @@ app.add_middleware(
     secret_key=os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
 )
 
+logger = logging.getLogger(__name__)
+
+# Report each request's query count (and log budget overruns); the budgets themselves
+# are enforced by tests/test_query_budgets.py
+QUERY_BUDGET_DIAGNOSTICS = os.getenv("QUERY_BUDGET_DIAGNOSTICS", "").lower() in ("1", "true", "yes")
+
+if QUERY_BUDGET_DIAGNOSTICS:
+    @app.middleware("http")
+    async def report_query_budget(request: Request, call_next):
+        """
+        Count the SQL statements each request issues and report them, with the
+        budget declared by the route (see database.query_budget), in the
+        X-Query-Count and X-Query-Budget headers.
+        """
+        with track_queries() as tracker:
+            response = await call_next(request)
+
+        response.headers["X-Query-Count"] = str(tracker.count)
+        if tracker.budget is not None:
+            response.headers["X-Query-Budget"] = str(tracker.budget)
+        if tracker.over_budget:
+            logger.warning(f"{request.method} {request.url.path} issued {tracker.count} queries (budget {tracker.budget})")
+        return response
+
+@app.on_event("startup")
+async def apply_migrations():
+    """Upgrade the schema before anything touches the database; registered first, so it runs first."""
+    if AUTO_MIGRATE:
+        await run_in_threadpool(run_migrations)
+
+@app.on_event("startup")
+async def start_analysis_workers():
+    """Start the background interview analysis workers (see app.jobs)."""
+    analysis_workers.start()
+
+@app.on_event("startup")
+async def start_email_sender():
+    """Start delivering the email outbox (see app.mailer)."""
+    email_sender.start()
+
+@app.on_event("startup")
+async def start_clerk_event_consumer():
+    """Start applying stored Clerk webhook events (see app.clerk_events)."""
+    clerk_event_consumer.start()
+
+@app.on_event("startup")
+async def start_clerk_jwks():
+    """Fetch Clerk's signing keys and keep them fresh in the background (see app.jwks)."""
+    if CLERK_JWKS_URL:
+        clerk_jwks.start()
+
+@app.on_event("shutdown")
+async def stop_clerk_jwks():
+    await clerk_jwks.stop()
+
+@app.on_event("shutdown")
+async def drain_clerk_event_consumer():
+    """Finish the event batches in flight; unapplied events stay in the table."""
+    await run_in_threadpool(clerk_event_consumer.drain)
+
+@app.on_event("shutdown")
+async def drain_email_sender():
+    """Finish the email batches in flight; undelivered email stays in the outbox."""
+    await run_in_threadpool(email_sender.drain)
+
+@app.on_event("shutdown")
+async def drain_analysis_workers():
+    """Let running analyses finish before the worker stops; queued ones stay in the table."""
+    await run_in_threadpool(analysis_workers.drain)
+
+@app.on_event("shutdown")
+async def close_scorer_processes():
+    """Stop the local scorer's worker processes once no analysis can use them."""
+    await run_in_threadpool(close_scorers)
+
+@app.on_event("shutdown")
+async def close_model_client():
+    """Close the pooled model API connections once the analysis workers are done with them."""
+    await run_in_threadpool(model_client.close)
+
+@app.on_event("shutdown")
+async def close_password_hasher():
+    """Let hashes in progress finish and stop the password hashing threads."""
+    await run_in_threadpool(password_hasher.close)
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    """Close the async engine's pooled connections when the worker stops."""
+    await async_engine.dispose()
+
 # Include routers
 app.include_router(auth_router.router)
 app.include_router(templates.router)
 app.include_router(interviews.router)
 app.include_router(analytics.router)
+app.include_router(videos.router)
 app.include_router(clerk_webhook.router)
 
 @app.get("/")
@@ -69,17 +179,45 @@ async def health_check():
     """
     return {"status": "ok"}
 
-# Mock upload endpoint for development
-@app.post("/mock-upload")
-async def mock_upload(path: str):
+async def require_metrics_token(authorization: Optional[str] = Header(None)):
+    if not METRICS_TOKEN:
+        if os.getenv("APP_ENV") == "development":
+            return
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Set METRICS_TOKEN to read metrics"
+        )
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def metrics():
     """
-    Mock endpoint for file uploads during development.
-    In production, this would be handled by S3 or similar.
+    Connection pool usage and checkout wait times, the SQLite write queue, the
+    analysis workers, the response analysis cache, model API calls, email delivery,
+    the authenticated principal cache, password hashing, the Clerk signing keys,
+    Clerk webhook processing, video uploads and video playback.
     """
     return {
-        "success": True,
-        "message": "File uploaded successfully (mock)",
-        "path": path
+        "database": {
+            "pools": pool_status(),
+            "write_queue": write_queue.status()
+        },
+        "analysis_workers": {**analysis_workers.status(), **analysis_events.status()},
+        "analysis_cache": analysis_cache.status(),
+        "model_api": {**model_scheduler.status(), "client": model_client.status()},
+        "email": email_sender.status(),
+        "auth_cache": principal_cache.status(),
+        "password_hashing": password_hasher.status(),
+        "clerk_jwks": clerk_jwks.status() if CLERK_JWKS_URL else None,
+        "clerk_events": clerk_event_consumer.status(),
+        "video_uploads": upload_manager.status(),
+        "video_playback": video_player.status()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""
+Shared HTTP client for the model API.
+
+Model calls run on one long-lived event loop in a background thread, through a
+single httpx.AsyncClient. Its connection pool keeps connections to the API open
+between calls, so an analysis does not pay for a new TCP and TLS handshake, and
+it speaks HTTP/2 when the h2 package is installed (`pip install h2`). Analysis
+worker threads hand coroutines to the loop with `model_client.run`; async code
+awaits `model_client.arun` instead of blocking its own event loop.
+`python -m scripts.bench_model_client` measures it against a local stub.
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+import httpx
+
+# OpenAI-compatible chat completions API, called with OPENAI_API_KEY.
+# Point OPENAI_BASE_URL at a local stub server (scripts/stub_model.py) to exercise the model path without the API.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+# Longest wait for a response; batch calls (ai_engine) allow for the extra output
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+# Connections kept to the API per process; analysis workers x ANALYSIS_CONCURRENCY calls can be in flight
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "60"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() not in ("0", "false", "no")
+
+T = TypeVar("T")
+
+def http2_available() -> bool:
+    return OPENAI_HTTP2 and importlib.util.find_spec("h2") is not None
+
+class ModelClient:
+    """An AsyncClient and the event loop thread that all of its requests run on."""
+
+    def __init__(
+        self,
+        base_url: str = OPENAI_BASE_URL,
+        timeout: float = OPENAI_TIMEOUT_SECONDS,
+        max_connections: int = OPENAI_MAX_CONNECTIONS
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="model-client", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client; only use it in coroutines passed to run or arun."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=OPENAI_KEEPALIVE_SECONDS
+                ),
+                http2=http2_available(),
+                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+            )
+        return self._client
+
+    def run(self, coroutine: Awaitable[T]) -> T:
+        """Run `coroutine` on the client's loop and wait for its result (from any other thread)."""
+        loop = self._start()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("ModelClient.run would block its own event loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    async def arun(self, coroutine: Awaitable[T]) -> T:
+        """Await `coroutine` on the client's loop without blocking the caller's loop."""
+        loop = self._start()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+    def close(self):
+        """Close pooled connections and stop the loop; the next call starts them again."""
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def status(self):
+        return {
+            "base_url": self.base_url,
+            "http2": http2_available(),
+            "max_connections": self.max_connections,
+            "running": self._loop is not None,
+        }
+
+model_client = ModelClient()
+
@@ -0,0 +1,257 @@
+"""
+Admission control for model API calls.
+
+Every chat completion made by ai_engine goes through `scheduler.post`, which is
+shared by all analysis worker threads (each runs its own event loop, so the
+state here is guarded by thread locks rather than asyncio primitives):
+
+- Requests-per-minute and tokens-per-minute budgets are token buckets; a call
+  reserves its share up front and sleeps until the reservation is covered.
+- 429, 5xx and transport errors (including timeouts) are retried with full
+  jitter exponential backoff, honouring Retry-After.
+- Consecutive upstream failures trip a circuit breaker. While it is open, calls
+  fail fast with ModelUnavailableError and the analysis workers park their jobs
+  (see jobs.py) instead of sending more traffic to a failing upstream. After the
+  cooldown one probe call is let through and other calls wait for its outcome,
+  which closes or reopens the circuit.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+MODEL_REQUESTS_PER_MINUTE = float(os.getenv("MODEL_REQUESTS_PER_MINUTE", "500"))
+MODEL_TOKENS_PER_MINUTE = float(os.getenv("MODEL_TOKENS_PER_MINUTE", "90000"))
+# Completion tokens reserved per call until the response reports actual usage
+MODEL_COMPLETION_TOKENS = int(os.getenv("MODEL_COMPLETION_TOKENS", "500"))
+MODEL_MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "4"))
+MODEL_BACKOFF_BASE_SECONDS = float(os.getenv("MODEL_BACKOFF_BASE_SECONDS", "0.5"))
+MODEL_BACKOFF_MAX_SECONDS = float(os.getenv("MODEL_BACKOFF_MAX_SECONDS", "20"))
+MODEL_BREAKER_THRESHOLD = int(os.getenv("MODEL_BREAKER_THRESHOLD", "5"))
+MODEL_BREAKER_COOLDOWN_SECONDS = float(os.getenv("MODEL_BREAKER_COOLDOWN_SECONDS", "30"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# How often calls waiting on a circuit breaker probe check its outcome
+PROBE_POLL_SECONDS = 0.05
+
+class ModelUnavailableError(Exception):
+    """The circuit breaker is open; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model API unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Budget of `per_minute` units refilled continuously; 0 disables it."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` units, going into debt if needed; returns how long to wait before using them."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float):
+        """Give back units reserved but not used (or take more when `amount` is negative)."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and lets one probe through after `cooldown` seconds."""
+
+    def __init__(self, threshold: int = MODEL_BREAKER_THRESHOLD, cooldown: float = MODEL_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def _remaining(self) -> float:
+        # Callers hold the lock
+        if self.state == "closed":
+            return 0.0
+        since = self.opened_at if self.state == "open" else self.probe_started
+        return since + self.cooldown - time.monotonic()
+
+    def retry_after(self) -> float:
+        """Seconds until calls are let through again (0 when closed)."""
+        with self._lock:
+            return max(0.0, self._remaining())
+
+    def before_call(self):
+        """Raise ModelUnavailableError unless a call may go out now."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self._remaining()
+            if remaining <= 0:
+                # Let this call through as the probe; others keep failing fast until it reports
+                # back, or until another cooldown passes if it never does (e.g. it was cancelled)
+                self.state = "half_open"
+                self.probe_started = time.monotonic()
+                return
+            raise ModelUnavailableError(max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.trips += 1
+
+class ModelScheduler:
+    """Rate limits, retries and circuit breaking around model API requests."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = MODEL_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = MODEL_TOKENS_PER_MINUTE,
+        max_retries: int = MODEL_MAX_RETRIES,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_tokens(payload: Dict[str, Any]) -> int:
+        """Rough prompt size (about four characters per token) plus the completion allowance."""
+        prompt = json.dumps(payload.get("messages", [])) + json.dumps(payload.get("functions", []))
+        return len(prompt) // 4 + MODEL_COMPLETION_TOKENS
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(MODEL_BACKOFF_MAX_SECONDS, MODEL_BACKOFF_BASE_SECONDS * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    async def _wait_for_breaker(self):
+        """Raise ModelUnavailableError while the circuit is open; wait while a probe call decides it."""
+        while True:
+            try:
+                return self.breaker.before_call()
+            except ModelUnavailableError:
+                if self.breaker.state != "half_open":
+                    raise
+            await asyncio.sleep(PROBE_POLL_SECONDS)
+
+    async def _admit(self, estimated_tokens: int):
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            self._count(throttled_seconds=wait)
+            await asyncio.sleep(wait)
+
+    async def post(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        payload: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        POST `payload` as JSON once admitted; returns the successful response or raises.
+        `timeout` overrides the client's read timeout for this call.
+        """
+        estimated = self.estimate_tokens(payload)
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_breaker()
+            await self._admit(estimated)
+            self._count(calls=1)
+            retry_after = None
+            try:
+                if timeout is None:
+                    response = await client.post(url, json=payload)
+                else:
+                    response = await client.post(url, json=payload, timeout=httpx.Timeout(timeout, connect=client.timeout.connect))
+            except httpx.TransportError as exc:
+                error: Exception = exc
+                self.breaker.record_failure()
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    # Success, or a client error retrying will not fix; either way the upstream is healthy
+                    self.breaker.record_success()
+                    response.raise_for_status()
+                    self._settle(response, estimated)
+                    return response
+                error = httpx.HTTPStatusError(
+                    f"Model API returned {response.status_code}", request=response.request, response=response
+                )
+                retry_after = _retry_after_seconds(response)
+                if response.status_code != 429:
+                    self.breaker.record_failure()
+            self._count(failures=1)
+            if attempt == self.max_retries:
+                raise error
+            self._count(retries=1)
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+        raise AssertionError("unreachable")
+
+    def _settle(self, response: httpx.Response, estimated: int):
+        """Correct the token reservation with the usage the API reported."""
+        try:
+            used = response.json().get("usage", {}).get("total_tokens")
+        except ValueError:
+            used = None
+        if used is not None:
+            self.tokens.refund(estimated - used)
+
+    def status(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "breaker": {
+                "state": self.breaker.state,
+                "trips": self.breaker.trips,
+                "retry_after": round(self.breaker.retry_after(), 1),
+            },
+        }
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+scheduler = ModelScheduler()
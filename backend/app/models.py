@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Text, DateTime, JSON, Enum
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Integer, String, Float, Text, Date, DateTime, JSON, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -16,6 +16,29 @@ class InterviewStatus(str, enum.Enum):
     completed = "completed"
     expired = "expired"
 
+class JobStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class EmailStatus(str, enum.Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    dead = "dead"
+
+class WebhookEventStatus(str, enum.Enum):
+    pending = "pending"
+    processing = "processing"
+    processed = "processed"
+    dead = "dead"
+
+class VideoUploadStatus(str, enum.Enum):
+    uploading = "uploading"
+    complete = "complete"
+    aborted = "aborted"
+
 class QuestionType(str, enum.Enum):
     text = "text"
     multiple_choice = "multiple_choice"
@@ -40,6 +63,11 @@ class User(Base):
     # OAuth fields
     oauth_provider = Column(String, nullable=True)  # 'google', 'twitter', 'linkedin'
     oauth_provider_id = Column(String, nullable=True)  # Provider's user ID
+    oauth_synced_at = Column(DateTime, nullable=True)  # When the provider change last applied to the user happened (UTC)
+
+    __table_args__ = (
+        Index("ix_users_oauth_provider_id", "oauth_provider", "oauth_provider_id"),
+    )
 
     # Relationships
     created_templates = relationship("InterviewTemplate", back_populates="creator")
@@ -54,9 +82,14 @@ class InterviewTemplate(Base):
     description = Column(Text, nullable=True)
     creator_id = Column(Integer, ForeignKey("users.id"))
     is_active = Column(Boolean, default=True)
+    scorer = Column(String(50), nullable=True)  # Scorer backend for this template's interviews (see scorers.py)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        Index("ix_interview_templates_creator_active_created", "creator_id", "is_active", "created_at", "id"),
+    )
+
     # Relationships
     creator = relationship("User", back_populates="created_templates")
     questions = relationship("Question", back_populates="template", cascade="all, delete-orphan")
@@ -66,10 +99,14 @@ class Question(Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    template_id = Column(Integer, ForeignKey("interview_templates.id"))
+    template_id = Column(Integer, ForeignKey("interview_templates.id"), index=True)
     text = Column(Text)
     type = Column(Enum(QuestionType))
     options = Column(JSON, nullable=True)  # For multiple choice questions
+    multiple_select = Column(Boolean, default=False)  # Multiple choice questions accepting several options
+    correct_options = Column(JSON, nullable=True)  # Answer key, graded without the AI engine (see grading.py)
+    reference_answer = Column(Text, nullable=True)  # Example of a strong answer
+    rubric = Column(JSON, nullable=True)  # Points a strong answer covers
     time_limit = Column(Integer, nullable=True)  # For video questions (in seconds)
     required = Column(Boolean, default=True)
     order = Column(Integer)  # For ordering questions within a template
@@ -82,7 +119,7 @@ class Interview(Base):
     __tablename__ = "interviews"
 
     id = Column(Integer, primary_key=True, index=True)
-    template_id = Column(Integer, ForeignKey("interview_templates.id"))
+    template_id = Column(Integer, ForeignKey("interview_templates.id"), index=True)
     recruiter_id = Column(Integer, ForeignKey("users.id"))
     candidate_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     candidate_email = Column(String)  # In case the candidate doesn't have an account yet
@@ -94,25 +131,40 @@ class Interview(Base):
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
+    __table_args__ = (
+        Index("ix_interviews_recruiter_created", "recruiter_id", "created_at", "id"),
+        Index("ix_interviews_recruiter_status_created", "recruiter_id", "status", "created_at"),
+        Index("ix_interviews_candidate_email_created", "candidate_email", "created_at", "id"),
+        Index("ix_interviews_candidate_created", "candidate_id", "created_at", "id"),
+        Index("ix_interviews_recruiter_candidate_email", "recruiter_id", "candidate_email"),
+        Index("ix_interviews_recruiter_completed", "recruiter_id", "completed_at"),
+    )
+
     # Relationships
     template = relationship("InterviewTemplate", back_populates="interviews")
     recruiter = relationship("User", foreign_keys=[recruiter_id], back_populates="recruiter_interviews")
     candidate = relationship("User", foreign_keys=[candidate_id], back_populates="candidate_interviews")
     responses = relationship("Response", back_populates="interview", cascade="all, delete-orphan")
     analysis = relationship("InterviewAnalysis", back_populates="interview", uselist=False, cascade="all, delete-orphan")
+    analysis_jobs = relationship("AnalysisJob", back_populates="interview", cascade="all, delete-orphan")
 
 class Response(Base):
     __tablename__ = "responses"
 
     id = Column(Integer, primary_key=True, index=True)
     interview_id = Column(Integer, ForeignKey("interviews.id"))
-    question_id = Column(Integer, ForeignKey("questions.id"))
+    question_id = Column(Integer, ForeignKey("questions.id"), index=True)
     text_response = Column(Text, nullable=True)
     selected_option = Column(String, nullable=True)  # For multiple choice
+    selected_options = Column(JSON, nullable=True)  # For multiple choice questions with multiple_select
     video_url = Column(String, nullable=True)  # For video responses
     video_transcript = Column(Text, nullable=True)  # For video responses
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_responses_interview_question", "interview_id", "question_id"),
+    )
+
     # Relationships
     interview = relationship("Interview", back_populates="responses")
     question = relationship("Question", back_populates="responses")
@@ -122,7 +174,7 @@ class ResponseAnalysis(Base):
     __tablename__ = "response_analyses"
 
     id = Column(Integer, primary_key=True, index=True)
-    response_id = Column(Integer, ForeignKey("responses.id"))
+    response_id = Column(Integer, ForeignKey("responses.id"), index=True)
     score = Column(Float)  # 0-5 scale
     strengths = Column(JSON, nullable=True)  # List of strengths
     weaknesses = Column(JSON, nullable=True)  # List of areas for improvement
@@ -138,12 +190,174 @@ class InterviewAnalysis(Base):
     __tablename__ = "interview_analyses"
 
     id = Column(Integer, primary_key=True, index=True)
-    interview_id = Column(Integer, ForeignKey("interviews.id"))
+    interview_id = Column(Integer, ForeignKey("interviews.id"), index=True)
     overall_score = Column(Float)  # 0-5 scale
     recommendation = Column(Text, nullable=True)  # AI-generated recommendation
     strengths = Column(JSON, nullable=True)  # List of strengths
     weaknesses = Column(JSON, nullable=True)  # List of areas for improvement
+    # Running aggregates of the response analyses, updated as each one lands
+    score_sum = Column(Float, nullable=True)
+    score_count = Column(Integer, nullable=True)  # Null until the aggregates have been computed
+    strength_counts = Column(JSON, nullable=True)  # Strength -> number of responses citing it
+    weakness_counts = Column(JSON, nullable=True)
+    # Hash of what the overall analysis was generated from; unchanged inputs skip the summarizer
+    summary_key = Column(String(64), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    interview = relationship("Interview", back_populates="analysis") 
+
+class RecruiterDailyStats(Base):
+    """
+    Per recruiter, template and day counters maintained alongside interview status
+    changes (see rollups.py), so analytics reads scale with days rather than interviews.
+    """
+    __tablename__ = "recruiter_daily_stats"
+
+    recruiter_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    template_id = Column(Integer, ForeignKey("interview_templates.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    created_count = Column(Integer, default=0, nullable=False)  # Interviews created on this day
+    created_completed_count = Column(Integer, default=0, nullable=False)  # Of those, how many are completed by now
+    started_count = Column(Integer, default=0, nullable=False)  # Interviews that left pending on this day
+    completed_count = Column(Integer, default=0, nullable=False)  # Interviews completed on this day
+    timed_completed_count = Column(Integer, default=0, nullable=False)  # Completed interviews with both start and end times
+    completion_minutes = Column(Float, default=0, nullable=False)  # Summed duration of the timed completions
+    scored_count = Column(Integer, default=0, nullable=False)  # Interview analyses, by completion day
+    score_sum = Column(Float, default=0, nullable=False)
+    score_bucket_0 = Column(Integer, default=0, nullable=False)  # Overall score 0-1
+    score_bucket_1 = Column(Integer, default=0, nullable=False)  # 1-2
+    score_bucket_2 = Column(Integer, default=0, nullable=False)  # 2-3
+    score_bucket_3 = Column(Integer, default=0, nullable=False)  # 3-4
+    score_bucket_4 = Column(Integer, default=0, nullable=False)  # 4-5
+
+    __table_args__ = (
+        Index("ix_recruiter_daily_stats_recruiter_day", "recruiter_id", "day"),
+    )
+
+class AnalysisJob(Base):
+    """
+    Durable queue entry for scoring a submitted interview, worked off by the
+    background workers in jobs.py. The worker running a job renews its lease
+    with heartbeats; running jobs whose lease has expired were abandoned by a
+    stopped process and are picked up again.
+    """
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    interview_id = Column(Integer, ForeignKey("interviews.id"), nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)  # Runs started so far, including the current one
+    error = Column(Text, nullable=True)  # Last failure, if any
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)  # Start of the current or last run
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Last lease renewal of the current run
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_analysis_jobs_status_id", "status", "id"),
+        Index("ix_analysis_jobs_interview_id", "interview_id", "id"),
+    )
 
     # Relationships
-    interview = relationship("Interview", back_populates="analysis") 
\ No newline at end of file
+    interview = relationship("Interview", back_populates="analysis_jobs")
+
+class AnalysisCacheEntry(Base):
+    """
+    Stored analyze_response result, keyed by a hash of its inputs and the scorer
+    version (see analysis_cache.py), so identical answers are only scored once.
+    """
+    __tablename__ = "analysis_cache"
+
+    key = Column(String(64), primary_key=True)  # SHA-256 of the inputs and scorer version
+    scorer_version = Column(String(100), nullable=False, index=True)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class OutboxEmail(Base):
+    """
+    Email waiting for delivery, written in the same transaction as the change it
+    reports (e.g. a new interview) and sent by the background sender in mailer.py.
+    Mail is neither sent for a rolled back change nor lost when a process stops;
+    messages that keep failing end up dead (dead letters) for inspection.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    template = Column(String(50), nullable=False)  # Email template name (see emails.py)
+    recipient = Column(String, nullable=False)
+    context = Column(JSON, nullable=False)  # Values rendered into the template
+    status = Column(Enum(EmailStatus), default=EmailStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)  # Deliveries started so far, including the current one
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # Earliest retry; null means right away
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # Start of the current or last delivery
+    claim_token = Column(String(32), nullable=True)  # Identifies the sender batch holding the claim
+    error = Column(Text, nullable=True)  # Last failure, if any
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_id", "status", "id"),
+        Index("ix_email_outbox_claim_token", "claim_token"),
+    )
+
+class WebhookEvent(Base):
+    """
+    Webhook delivery received from a provider (e.g. Clerk), stored as soon as its
+    signature checks out and applied later by a background consumer
+    (clerk_events.py). The delivery id is unique per source, so redeliveries of
+    an event are recognized and dropped.
+    """
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(20), nullable=False)  # Provider, e.g. "clerk"
+    delivery_id = Column(String, nullable=False)  # Provider's id of the delivery (svix-id)
+    event_type = Column(String(100), nullable=False)
+    subject = Column(String, nullable=True)  # Provider id of the record the event is about; its events apply in order
+    payload = Column(JSON, nullable=False)  # Event body as received
+    occurred_at = Column(DateTime, nullable=True)  # When the reported change happened (UTC); events apply in this order
+    status = Column(Enum(WebhookEventStatus), default=WebhookEventStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # Earliest retry; null means right away
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    claim_token = Column(String(32), nullable=True)  # Identifies the consumer batch holding the claim
+    error = Column(Text, nullable=True)  # Last failure, if any
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("source", "delivery_id", name="uq_webhook_events_delivery"),
+        Index("ix_webhook_events_status_occurred_at", "status", "occurred_at", "id"),
+        Index("ix_webhook_events_subject", "source", "subject"),
+        Index("ix_webhook_events_claim_token", "claim_token"),
+    )
+
+class VideoUpload(Base):
+    """
+    Resumable upload of a video answer (see uploads.py). Bytes are appended to a
+    staging file by offset-addressed PATCH requests; received_bytes only advances
+    once a chunk is on disk, so a client resumes from it after losing a
+    connection. Completing the upload publishes the file to video storage
+    (storage.py) under storage_key.
+    """
+    __tablename__ = "video_uploads"
+
+    id = Column(String(32), primary_key=True)  # Random hex id, part of the upload URL
+    interview_id = Column(Integer, ForeignKey("interviews.id"), nullable=False, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=True)
+    uploader_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    total_bytes = Column(BigInteger, nullable=True)  # Declared size (Upload-Length); unknown while recording
+    received_bytes = Column(BigInteger, default=0, nullable=False)
+    sha256 = Column(String(64), nullable=True)  # Hex digest of the content, set on completion
+    storage_key = Column(String, nullable=True)
+    status = Column(Enum(VideoUploadStatus), default=VideoUploadStatus.uploading, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)  # Unfinished uploads are pruned after this
+
+    __table_args__ = (
+        Index("ix_video_uploads_status_expires_at", "status", "expires_at"),
+    )
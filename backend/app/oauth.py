@@ -5,9 +5,8 @@ import os
 import json
 from typing import Dict, Any, Optional
 
-from .database import get_db
-from . import models, crud, schemas, auth
-from sqlalchemy.orm import Session
+from . import models, async_crud, schemas, auth
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Load configuration
 config = Config(".env")
@@ -103,20 +102,17 @@ async def get_oauth_user_info(provider: str, request: Request) -> Dict[str, Any]
 
 async def get_or_create_oauth_user(
     user_info: Dict[str, Any], 
-    db: Session,
+    db: AsyncSession,
     user_type: str = "candidate"
 ) -> models.User:
     """Get existing user or create a new one from OAuth user info"""
     # Check if user exists by email
-    db_user = crud.get_user_by_email(db, email=user_info["email"])
+    db_user = await async_crud.get_user_by_email(db, email=user_info["email"])
     
     if db_user:
         # Update OAuth provider info if not already set
         if not db_user.oauth_provider:
-            db_user.oauth_provider = user_info["provider"]
-            db_user.oauth_provider_id = user_info["provider_id"]
-            db.commit()
-            db.refresh(db_user)
+            db_user = await async_crud.link_oauth_account(db, db_user.id, user_info["provider"], user_info["provider_id"])
         return db_user
     
     # Create new user from OAuth info
@@ -130,7 +126,7 @@ async def get_or_create_oauth_user(
     )
     
     # Create user with OAuth provider info
-    db_user = crud.create_oauth_user(
+    db_user = await async_crud.create_oauth_user(
         db=db, 
         user=user_create, 
         oauth_provider=user_info["provider"],
@@ -0,0 +1,146 @@
+"""
+Password hashing off the event loop.
+
+bcrypt costs a few hundred milliseconds of CPU per hash or check by design. Run
+inside an async route, that time is taken from every other request on the
+worker, and a burst of logins (everyone signing in when a hiring event opens)
+stalls the whole API. Hashes and checks therefore run on a small dedicated
+thread pool (bcrypt releases the GIL while it works) with admission control:
+once PASSWORD_HASH_WORKERS hashes are running and PASSWORD_HASH_QUEUE_LIMIT more
+are waiting, new ones are refused with PasswordHasherBusy, which the auth routes
+answer with 503 and a Retry-After estimated from recent hash times.
+
+BCRYPT_ROUNDS sets the cost of new hashes. Hashes made with another cost are
+replaced with one at the current cost the next time their user logs in.
+`python -m scripts.bench_passwords` measures login throughput and the latency
+other requests see meanwhile.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashes computed at once; the rest of the cores keep serving requests
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Hashes allowed to wait for a worker before new ones are refused
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+# Hashes at any other cost count as outdated (see verify_and_update)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes are queued; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password hashing is saturated, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+def verify_and_update(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Check `password` against `hashed_password`. Returns whether it matches and, if
+    it does but the hash was made with another cost, a new hash to store.
+    """
+    if not hashed_password:
+        # OAuth accounts have no password
+        return False, None
+    try:
+        return pwd_context.verify_and_update(password, hashed_password)
+    except ValueError:
+        # Not a hash this context knows (e.g. placeholder values)
+        return False, None
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt with a limit on queued work."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.completed = 0
+        self.rejected = 0
+        self.pending = 0  # Running and waiting
+        # Moving average of the time a hash takes on a worker
+        self.average_seconds = 0.25
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            if self.pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise PasswordHasherBusy(self.retry_after())
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.average_seconds = 0.8 * self.average_seconds + 0.2 * elapsed
+                self.completed += 1
+
+    def _release(self, future=None):
+        with self._lock:
+            self.pending -= 1
+
+    async def _run(self, fn, *args):
+        executor = self._admit()
+        try:
+            future = executor.submit(self._timed, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the hash ends rather than when the caller stops waiting: a request
+        # cancelled mid-hash (client gone) leaves its hash running on the worker
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        """A new hash of `password`; raises PasswordHasherBusy when saturated."""
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """verify_and_update on the pool; raises PasswordHasherBusy when saturated."""
+        if not hashed_password:
+            return False, None
+        return await self._run(verify_and_update, password, hashed_password)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have cleared."""
+        return max(1, math.ceil(self.pending / max(self.workers, 1) * self.average_seconds))
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def status(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "queue_limit": self.queue_limit,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "average_ms": round(self.average_seconds * 1000, 1),
+                "rounds": BCRYPT_ROUNDS,
+            }
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,321 @@
+"""
+Playback of uploaded videos (GET /videos/{upload_id}).
+
+The candidate who recorded a video and the recruiter of its interview may watch
+it once the upload is complete, with their bearer token or with the `token`
+query parameter of the video_url handed out with interview responses (a
+<video> element cannot send an Authorization header). Playback tokens are
+issued per VIDEO_URL_TTL_SECONDS window, so a video keeps the same URL, and
+its place in the browser cache, for at least that long.
+
+Responses carry a strong ETag (the video's SHA-256), Last-Modified and
+Accept-Ranges. A single Range is answered with 206 and only those bytes, unless
+an If-Range validator no longer matches, so a player seeking in a long answer
+fetches just what it needs. Completed uploads never change, so what serving
+them needs is cached in memory (VIDEO_CACHE_SIZE entries), and a request with a
+playback token for a cached video does not touch the database.
+
+The bytes of a video in local storage are sent without passing through Python
+where the server allows it:
+
+    nginx      with VIDEO_ACCEL_MAPPING set to "<directory>=<internal URI
+               prefix>" (see frontend/nginx.conf), the response only names the
+               file with X-Accel-Redirect, and nginx sends it with sendfile and
+               answers the Range itself
+    ASGI       servers offering the http.response.zerocopysend extension send
+               the range straight from the open file
+    otherwise  the range is read in PLAYBACK_BLOCK_BYTES blocks on a worker
+               thread, so each stream holds about one block in memory
+
+Videos in S3 storage are redirected to a presigned URL, and the bucket serves
+the ranges. scripts/bench_playback.py measures seeks and concurrent streams.
+"""
+import datetime
+import email.utils
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import IO, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urlsplit, urlunsplit
+
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import RedirectResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from . import auth, models
+from .uploads import upload_manager
+
+# Least time a playback URL stays valid (and unchanged); also the browser cache lifetime
+VIDEO_URL_TTL_SECONDS = int(os.getenv("VIDEO_URL_TTL_SECONDS", str(6 * 3600)))
+# Completed uploads whose storage key, checksum and owners are kept in memory
+VIDEO_CACHE_SIZE = int(os.getenv("VIDEO_CACHE_SIZE", "4096"))
+# Bytes read from disk at a time when a video is streamed through Python
+PLAYBACK_BLOCK_BYTES = int(os.getenv("PLAYBACK_BLOCK_BYTES", str(256 * 1024)))
+# "<directory>=<URI prefix>" pairs, comma separated: videos under a directory are handed
+# to nginx with X-Accel-Redirect to the prefix, an internal location serving that directory
+VIDEO_ACCEL_MAPPING = os.getenv("VIDEO_ACCEL_MAPPING", "")
+
+ZERO_COPY_SEND = "http.response.zerocopysend"
+# Audience of playback tokens, which auth.get_current_user does not accept as access tokens
+PLAYBACK_AUDIENCE = "video-playback"
+# Path of the video URLs handed out by /interviews/{id}/video-upload-url
+VIDEO_PATH = re.compile(r"/videos/([0-9a-f]{32})$")
+RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+class Playback(NamedTuple):
+    """What serving a completed upload needs."""
+    upload_id: str
+    storage_key: str
+    sha256: str
+    content_type: str
+    size: int
+    modified: datetime.datetime  # Completion time in UTC, to the second (HTTP dates have no fractions)
+    uploader_id: int
+    recruiter_id: Optional[int]
+
+    @classmethod
+    def from_upload(cls, upload: models.VideoUpload, recruiter_id: Optional[int]) -> "Playback":
+        # Naive timestamps are local time, which astimezone() assumes
+        completed_at = upload.completed_at or upload.created_at
+        modified = completed_at.astimezone(datetime.timezone.utc).replace(microsecond=0)
+        return cls(
+            upload.id, upload.storage_key, upload.sha256, upload.content_type,
+            upload.total_bytes, modified, upload.uploader_id, recruiter_id
+        )
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256}"'
+
+    @property
+    def last_modified(self) -> str:
+        return email.utils.format_datetime(self.modified, usegmt=True)
+
+# Playback tokens
+def playback_token(upload_id: str, now: Optional[float] = None) -> str:
+    """Permission to watch `upload_id`, the same for a whole VIDEO_URL_TTL_SECONDS window."""
+    window = int((time.time() if now is None else now) // VIDEO_URL_TTL_SECONDS)
+    claims = {"sub": upload_id, "aud": PLAYBACK_AUDIENCE, "exp": (window + 2) * VIDEO_URL_TTL_SECONDS}
+    return jwt.encode(claims, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+def check_playback_token(token: str, upload_id: str) -> bool:
+    try:
+        claims = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM], audience=PLAYBACK_AUDIENCE)
+    except JWTError:
+        return False
+    # decode only checks the audience of tokens that name one
+    return claims.get("aud") == PLAYBACK_AUDIENCE and claims.get("sub") == upload_id
+
+def playback_url(video_url: Optional[str]) -> Optional[str]:
+    """`video_url` with a playback token, if it is a video uploaded to this API."""
+    if not video_url:
+        return video_url
+    parts = urlsplit(video_url)
+    match = VIDEO_PATH.search(parts.path)
+    if match is None:
+        return video_url
+    return urlunsplit(parts._replace(query=f"token={playback_token(match.group(1))}"))
+
+# Conditional and range requests (RFC 9110)
+class RangeNotSatisfiable(Exception):
+    """The Range starts past the end of the video."""
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single `bytes=` range, or None to send the whole
+    video. Malformed headers and multiple ranges are ignored, as RFC 9110 allows.
+    """
+    match = RANGE.match(header)
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if start >= size:
+            raise RangeNotSatisfiable()
+        if end < start:
+            return None
+    elif last:
+        # The last `last` bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable()
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        return None
+    return start, min(end, size - 1)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match uses."""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def if_range_matches(if_range: str, playback: Playback) -> bool:
+    """Whether the representation the client holds part of is still this one."""
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        # Strong comparison; a weak tag never matches
+        return if_range == playback.etag
+    try:
+        return email.utils.parsedate_to_datetime(if_range) == playback.modified
+    except (TypeError, ValueError):
+        return False
+
+def accel_redirect_uri(path: str, accel_mapping: str = VIDEO_ACCEL_MAPPING) -> Optional[str]:
+    """
+    The internal URI nginx serves `path` under, if `accel_mapping` maps a
+    directory containing it. Only server configuration decides this; request
+    headers are never trusted to name files.
+    """
+    for mapping in accel_mapping.split(","):
+        directory, separator, prefix = mapping.strip().partition("=")
+        directory = directory.rstrip("/")
+        if separator and directory and path.startswith(directory + "/"):
+            return prefix.rstrip("/") + "/" + quote(path[len(directory) + 1:])
+    return None
+
+def _read_at(file: IO[bytes], offset: int, size: int) -> bytes:
+    file.seek(offset)
+    return file.read(size)
+
+class VideoFileResponse(StreamingResponse):
+    """Bytes `start` to `end` (inclusive) of an open file, which the response closes."""
+
+    def __init__(self, file: IO[bytes], start: int, end: int, status_code: int, headers: dict, media_type: str, player: "VideoPlayer"):
+        self.file = file
+        self.start = start
+        self.end = end
+        self.player = player
+        super().__init__(self._blocks(), status_code=status_code, headers=headers, media_type=media_type)
+
+    async def _blocks(self):
+        position = self.start
+        while position <= self.end:
+            block = await run_in_threadpool(_read_at, self.file, position, min(PLAYBACK_BLOCK_BYTES, self.end + 1 - position))
+            if not block:
+                return
+            position += len(block)
+            self.player.streamed_bytes += len(block)
+            yield block
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            if scope["method"] == "HEAD":
+                await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+                await send({"type": "http.response.body", "body": b""})
+            elif ZERO_COPY_SEND in scope.get("extensions", {}):
+                self.player.zero_copy += 1
+                await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+                await send({
+                    "type": ZERO_COPY_SEND,
+                    "file": self.file,
+                    "offset": self.start,
+                    "count": self.end + 1 - self.start,
+                    "more_body": False,
+                })
+            else:
+                # Stops reading when the client goes away, e.g. when the player seeks elsewhere
+                await super().__call__(scope, receive, send)
+        finally:
+            self.file.close()
+
+class VideoPlayer:
+    """Answers playback requests for completed uploads."""
+
+    def __init__(self, cache_size: int = VIDEO_CACHE_SIZE, accel_mapping: str = VIDEO_ACCEL_MAPPING):
+        self.cache_size = cache_size
+        self.accel_mapping = accel_mapping
+        self.hits = 0
+        self.misses = 0
+        self.served = 0
+        self.partial = 0
+        self.not_modified = 0
+        self.zero_copy = 0
+        self.accel_redirects = 0
+        self.storage_redirects = 0
+        self.streamed_bytes = 0  # Copied through Python rather than sent by the server or proxy
+        self._cache: "OrderedDict[str, Playback]" = OrderedDict()
+
+    def cached(self, upload_id: str) -> Optional[Playback]:
+        playback = self._cache.get(upload_id)
+        if playback is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cache.move_to_end(upload_id)
+        return playback
+
+    def remember(self, playback: Playback) -> Playback:
+        self._cache[playback.upload_id] = playback
+        self._cache.move_to_end(playback.upload_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return playback
+
+    async def respond(self, headers: Headers, playback: Playback, video_storage=None) -> Response:
+        """
+        The response to a GET or HEAD of the video with request `headers`. Raises
+        FileNotFoundError if a local video's file is gone.
+        """
+        video_storage = video_storage or upload_manager.storage
+        self.served += 1
+        response_headers = {
+            "ETag": playback.etag,
+            "Last-Modified": playback.last_modified,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": f"private, max-age={VIDEO_URL_TTL_SECONDS}, immutable",
+        }
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, playback.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=response_headers)
+
+        path = video_storage.local_path(playback.storage_key)
+        if path is None:
+            self.storage_redirects += 1
+            return RedirectResponse(
+                video_storage.presigned_url(playback.storage_key, VIDEO_URL_TTL_SECONDS),
+                status_code=307,
+                headers={"Cache-Control": "no-store"}
+            )
+        accel_uri = accel_redirect_uri(path, self.accel_mapping)
+        if accel_uri is not None:
+            self.accel_redirects += 1
+            return Response(status_code=200, headers={**response_headers, "X-Accel-Redirect": accel_uri}, media_type=playback.content_type)
+
+        byte_range = None
+        if "range" in headers and ("if-range" not in headers or if_range_matches(headers["if-range"], playback)):
+            try:
+                byte_range = parse_range(headers["range"], playback.size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**response_headers, "Content-Range": f"bytes */{playback.size}"})
+        start, end = byte_range or (0, playback.size - 1)
+        response_headers["Content-Length"] = str(end + 1 - start)
+        if byte_range is not None:
+            self.partial += 1
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{playback.size}"
+        file = await run_in_threadpool(open, path, "rb")
+        return VideoFileResponse(
+            file, start, end,
+            status_code=206 if byte_range is not None else 200,
+            headers=response_headers,
+            media_type=playback.content_type,
+            player=self
+        )
+
+    def status(self):
+        return {
+            "served": self.served,
+            "partial": self.partial,
+            "not_modified": self.not_modified,
+            "zero_copy": self.zero_copy,
+            "accel_redirects": self.accel_redirects,
+            "storage_redirects": self.storage_redirects,
+            "streamed_bytes": self.streamed_bytes,
+            "cache": {"entries": len(self._cache), "hits": self.hits, "misses": self.misses},
+        }
+
+video_player = VideoPlayer()
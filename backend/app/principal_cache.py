@@ -0,0 +1,153 @@
+"""
+Cache of authenticated principals for auth.get_current_user.
+
+Every authenticated request used to decode its token and load the user by email,
+the most frequent query in the API. Verified tokens now map to an immutable
+snapshot of the user (Principal) in a bounded in-process LRU, so repeat requests
+with the same token need neither the signature check nor a query. Entries live
+for AUTH_CACHE_TTL_SECONDS at most and never past the token's own expiry.
+
+Committing any change to a user, through any session in this process (the Clerk
+webhook, OAuth account linking, deactivation), drops the entries of that user.
+Other processes see the change once their entries expire, so the TTL bounds how
+long a deactivated user stays signed in elsewhere.
+"""
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import models
+
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+class Principal(NamedTuple):
+    """Snapshot of the authenticated user; routes read it like models.User."""
+    id: int
+    email: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    company: Optional[str]
+    position: Optional[str]
+    user_type: models.UserType
+    profile_image: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime.datetime]
+    oauth_provider: Optional[str]
+    oauth_provider_id: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(*(getattr(user, field) for field in cls._fields))
+
+class PrincipalCache:
+    """LRU of token -> (Principal, expiry), indexed by user id for invalidation."""
+
+    def __init__(self, max_entries: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by every invalidation; see put
+        self.generation = 0
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(token)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float] = None, generation: Optional[int] = None):
+        """
+        Remember `principal` for `token`; `token_expires_at` is the token's exp claim
+        (Unix time). Pass the `generation` read before loading the user: if a user was
+        invalidated since, the snapshot may predate that change and is not stored.
+        """
+        ttl = self.ttl
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (principal, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """Forget every token of the user."""
+        with self._lock:
+            self.generation += 1
+            tokens = self._tokens_by_user.pop(user_id, ())
+            for token in tokens:
+                self._entries.pop(token, None)
+            self.invalidations += len(tokens)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str):
+        # Callers hold the lock
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+    def status(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": AUTH_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+principal_cache = PrincipalCache()
+
+# Invalidation: note the users a flush changes, drop their entries once the change is committed
+@event.listens_for(Session, "after_flush")
+def _note_changed_users(session: Session, flush_context):
+    changed = [user.id for user in (*session.dirty, *session.deleted) if isinstance(user, models.User)]
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        principal_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session):
+    session.info.pop("changed_user_ids", None)
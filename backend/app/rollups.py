@@ -0,0 +1,259 @@
+"""
+Incrementally maintained analytics rollup (models.RecruiterDailyStats).
+
+crud calls the record_* helpers in the same transaction as the interview change
+they count, so the rollup commits or rolls back together with it. `rebuild`
+recomputes the table from the interviews and analyses, for the initial backfill
+or after a manual data fix:
+
+    python -m app.rollups backfill [--recruiter-id ID]
+"""
+import argparse
+import datetime
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, Integer, String, and_, case, cast, delete, func, insert, literal, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import UPSERT_DIALECTS
+
+SCORE_BUCKETS = 5
+
+# SQL helpers
+def minutes_between(db: Session, start, end):
+    """SQL expression for the number of minutes from `start` to `end` on the session's database."""
+    if db.get_bind().dialect.name == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 1440.0
+    return func.extract("epoch", end - start) / 60.0
+
+def score_bucket(score):
+    """SQL expression mapping a 0-5 score to its histogram bucket (0-1, 1-2, ..., 4-5)."""
+    return case(
+        (score < 1, 0),
+        (score < 2, 1),
+        (score < 3, 2),
+        (score < 4, 3),
+        else_=4
+    )
+
+def score_bucket_index(score: float) -> int:
+    """Python counterpart of score_bucket."""
+    return max(0, min(int(score), SCORE_BUCKETS - 1))
+
+def as_date(value) -> Optional[datetime.date]:
+    """Normalize a timestamp, or a DATE() result which SQLite returns as text, to a date."""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+def bucket_start(db: Session, day, granularity: str):
+    """SQL expression for the first day of the day/week/month bucket containing `day` (weeks start on Monday)."""
+    if granularity == "day":
+        return day
+    if db.get_bind().dialect.name == "sqlite":
+        if granularity == "month":
+            return func.date(day, "start of month")
+        days_since_monday = (cast(func.strftime("%w", day), Integer) + 6) % 7
+        return func.date(day, literal("-").concat(cast(days_since_monday, String)).concat(" days"))
+    return cast(func.date_trunc(granularity, day), Date)
+
+def bucket_starts(start: datetime.date, end: datetime.date, granularity: str) -> List[datetime.date]:
+    """First day of every bucket overlapping [start, end], matching bucket_start."""
+    if granularity == "week":
+        current = start - datetime.timedelta(days=start.weekday())
+    elif granularity == "month":
+        current = start.replace(day=1)
+    else:
+        current = start
+
+    starts = []
+    while current <= end:
+        starts.append(current)
+        if granularity == "month":
+            current = (current.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        else:
+            current += datetime.timedelta(days=7 if granularity == "week" else 1)
+    return starts
+
+def _day(value) -> datetime.date:
+    return as_date(value) or datetime.date.today()
+
+# Counter updates
+def bump(db: Session, recruiter_id: int, template_id: int, day: datetime.date, **deltas):
+    """Add `deltas` to the counters of one rollup row, creating the row if needed."""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas or recruiter_id is None or template_id is None:
+        return
+
+    table = models.RecruiterDailyStats.__table__
+    key = {"recruiter_id": recruiter_id, "template_id": template_id, "day": day}
+    dialect = db.get_bind().dialect.name
+
+    if dialect in UPSERT_DIALECTS:
+        stmt = UPSERT_DIALECTS[dialect](table).values(**key, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+        )
+        db.execute(stmt)
+        return
+
+    result = db.execute(
+        update(table)
+        .where(*(table.c[name] == value for name, value in key.items()))
+        .values({name: table.c[name] + value for name, value in deltas.items()})
+    )
+    if result.rowcount == 0:
+        db.execute(insert(table).values(**key, **deltas))
+
+def record_created(db: Session, interview: models.Interview):
+    """Count a newly created interview. Call after flushing so created_at is populated."""
+    bump(db, interview.recruiter_id, interview.template_id, _day(interview.created_at), created_count=1)
+
+def record_created_many(db: Session, recruiter_id: int, template_id: int, created_at: Iterable[datetime.datetime]):
+    """Count interviews created in bulk with one counter update per day instead of per interview."""
+    for day, count in Counter(_day(value) for value in created_at).items():
+        bump(db, recruiter_id, template_id, day, created_count=count)
+
+def record_status_change(db: Session, interview: models.Interview, previous_status: models.InterviewStatus):
+    """Count the move of `interview` from `previous_status` to its current status and timestamps."""
+    status = interview.status
+    if status == previous_status:
+        return
+
+    if previous_status == models.InterviewStatus.pending:
+        bump(db, interview.recruiter_id, interview.template_id, _day(interview.started_at), started_count=1)
+
+    if status == models.InterviewStatus.completed:
+        timed = interview.started_at is not None and interview.completed_at is not None
+        minutes = (interview.completed_at - interview.started_at).total_seconds() / 60 if timed else 0
+        bump(
+            db, interview.recruiter_id, interview.template_id, _day(interview.completed_at),
+            completed_count=1,
+            timed_completed_count=int(timed),
+            completion_minutes=minutes
+        )
+        bump(db, interview.recruiter_id, interview.template_id, _day(interview.created_at), created_completed_count=1)
+
+def record_score(db: Session, interview: models.Interview, score: Optional[float], sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) an overall interview score from the histogram."""
+    if score is None:
+        return
+    bump(
+        db, interview.recruiter_id, interview.template_id, _day(interview.completed_at or interview.created_at),
+        scored_count=sign,
+        score_sum=sign * score,
+        **{f"score_bucket_{score_bucket_index(score)}": sign}
+    )
+
+# Backfill
+def rebuild(db: Session, recruiter_id: Optional[int] = None) -> int:
+    """
+    Recompute the rollup from the interviews and analyses tables, for one
+    recruiter or all of them. Returns the number of rollup rows written.
+    """
+    interview = models.Interview
+    stats = models.RecruiterDailyStats
+    is_completed = interview.status == models.InterviewStatus.completed
+    scope = [interview.recruiter_id == recruiter_id] if recruiter_id is not None else []
+    rows: Dict[Tuple[int, int, datetime.date], Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+
+    def add(groups, *names):
+        for recruiter, template, day, *values in groups:
+            if recruiter is None or template is None:
+                continue
+            counters = rows[(recruiter, template, as_date(day))]
+            for name, value in zip(names, values):
+                counters[name] += value or 0
+
+    created_day = func.date(interview.created_at)
+    add(
+        db.query(
+            interview.recruiter_id, interview.template_id, created_day,
+            func.count(interview.id), func.sum(case((is_completed, 1), else_=0))
+        ).filter(*scope).group_by(interview.recruiter_id, interview.template_id, created_day),
+        "created_count", "created_completed_count"
+    )
+
+    started_day = func.date(func.coalesce(interview.started_at, interview.completed_at, interview.created_at))
+    add(
+        db.query(
+            interview.recruiter_id, interview.template_id, started_day, func.count(interview.id)
+        ).filter(
+            *scope, interview.status != models.InterviewStatus.pending
+        ).group_by(interview.recruiter_id, interview.template_id, started_day),
+        "started_count"
+    )
+
+    completed_day = func.date(func.coalesce(interview.completed_at, interview.created_at))
+    timed = and_(interview.started_at.isnot(None), interview.completed_at.isnot(None))
+    add(
+        db.query(
+            interview.recruiter_id, interview.template_id, completed_day,
+            func.count(interview.id),
+            func.sum(case((timed, 1), else_=0)),
+            func.sum(case((timed, minutes_between(db, interview.started_at, interview.completed_at)), else_=0))
+        ).filter(
+            *scope, is_completed
+        ).group_by(interview.recruiter_id, interview.template_id, completed_day),
+        "completed_count", "timed_completed_count", "completion_minutes"
+    )
+
+    score = models.InterviewAnalysis.overall_score
+    bucket = score_bucket(score)
+    for recruiter, template, day, bucket_index, count, total in db.query(
+        interview.recruiter_id, interview.template_id, completed_day, bucket,
+        func.count(models.InterviewAnalysis.id), func.sum(score)
+    ).join(
+        models.InterviewAnalysis, models.InterviewAnalysis.interview_id == interview.id
+    ).filter(
+        *scope, score.isnot(None)
+    ).group_by(interview.recruiter_id, interview.template_id, completed_day, bucket):
+        if recruiter is None or template is None:
+            continue
+        counters = rows[(recruiter, template, as_date(day))]
+        counters["scored_count"] += count
+        counters["score_sum"] += total or 0
+        counters[f"score_bucket_{bucket_index}"] += count
+
+    delete_stmt = delete(stats)
+    if recruiter_id is not None:
+        delete_stmt = delete_stmt.where(stats.recruiter_id == recruiter_id)
+    db.execute(delete_stmt)
+
+    if rows:
+        key_columns = ("recruiter_id", "template_id", "day")
+        counter_names = [column.name for column in stats.__table__.columns if column.name not in key_columns]
+        db.execute(insert(stats.__table__), [
+            {
+                "recruiter_id": recruiter, "template_id": template, "day": day,
+                **{name: counters.get(name, 0) for name in counter_names}
+            }
+            for (recruiter, template, day), counters in rows.items()
+        ])
+    db.commit()
+    return len(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the recruiter analytics rollup")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill = subcommands.add_parser("backfill", help="Rebuild the rollup from interviews and analyses")
+    backfill.add_argument("--recruiter-id", type=int, default=None, help="Only rebuild this recruiter's rows")
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        written = rebuild(db, recruiter_id=args.recruiter_id)
+    finally:
+        db.close()
+    print(f"Rebuilt {written} rollup rows")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import os
+import time
+from datetime import date, timedelta
+from typing import AsyncIterator, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, models, schemas, auth, database
+from .. import async_crud, models, schemas, auth, database
+from ..analysis_events import analysis_event, analysis_events, job_event
 
 router = APIRouter(
     prefix="/analytics",
@@ -13,7 +21,7 @@ router = APIRouter(
 @router.get("/recruiter/dashboard", response_model=schemas.RecruiterAnalytics)
 async def get_recruiter_dashboard(
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Get analytics data for the recruiter dashboard.
@@ -27,20 +35,91 @@ async def get_recruiter_dashboard(
         )
     
     # Get analytics data
-    return crud.get_recruiter_dashboard(db, recruiter_id=current_user.id)
+    return await async_crud.get_recruiter_dashboard(db, recruiter_id=current_user.id)
 
-@router.get("/interview/{interview_id}", response_model=Dict[str, Any])
+# Longest range the time series endpoint accepts
+MAX_ANALYTICS_RANGE_DAYS = 3 * 366
+
+@router.get("/recruiter/series", response_model=schemas.RecruiterAnalyticsSeries)
+async def get_recruiter_analytics_series(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    granularity: schemas.AnalyticsGranularity = schemas.AnalyticsGranularity.day,
+    group_by: schemas.AnalyticsGroupBy = schemas.AnalyticsGroupBy.template,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Get interview activity over a date range, bucketed by day, week or month and grouped
+    by template or by status, with score percentiles.
+    Defaults to the last 30 days. Only recruiters can access this endpoint.
+    """
+    # Check if user is a recruiter
+    if current_user.user_type != models.UserType.recruiter:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only recruiters can access this endpoint"
+        )
+    
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    if (end_date - start_date).days > MAX_ANALYTICS_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range cannot exceed {MAX_ANALYTICS_RANGE_DAYS} days"
+        )
+    
+    return await async_crud.get_recruiter_analytics(
+        db,
+        recruiter_id=current_user.id,
+        start=start_date,
+        end=end_date,
+        granularity=granularity,
+        group_by=group_by
+    )
+
+ACTIVE_JOB_STATUSES = (models.JobStatus.pending, models.JobStatus.running)
+
+def format_analysis_job(interview: models.Interview, job: models.AnalysisJob) -> Dict[str, Any]:
+    """Body returned while an interview's analysis is queued or running."""
+    return {
+        "interview_id": interview.id,
+        "candidate_name": interview.candidate_name,
+        "template_title": interview.template.title if interview.template else None,
+        "completed_at": interview.completed_at,
+        "status": job.status,
+        "job": schemas.AnalysisJob.from_orm(job)
+    }
+
+@router.get(
+    "/interview/{interview_id}",
+    response_model=Dict[str, Any],
+    responses={
+        202: {"description": "Analysis queued or running; poll the job endpoint"},
+        404: {"description": "Interview not found, or no analysis produced or queued"}
+    }
+)
 async def get_interview_analysis(
     interview_id: int,
+    response: Response,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Get analysis results for a specific interview.
     Recruiters can only see analysis for their own interviews.
+    Analysis is queued when the interview is completed and runs in the background;
+    until it has finished this returns 202 with the analysis job instead. Reading
+    never queues work: an interview whose analysis failed or was never queued
+    answers 404 until POST /analytics/interview/{id}/regenerate queues one.
     """
     # Get interview
-    interview = crud.get_interview(db, interview_id=interview_id)
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
     if interview is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -68,13 +147,16 @@ async def get_interview_analysis(
             detail="Analysis is only available for completed interviews"
         )
     
-    # Get or create analysis
-    analysis = crud.analyze_interview(db, interview_id=interview_id)
+    analysis = interview.analysis
     if analysis is None:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to generate analysis"
-        )
+        job = await async_crud.get_latest_analysis_job(db, interview_id=interview_id)
+        if job is None or job.status not in ACTIVE_JOB_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No analysis is available or queued for this interview; regenerate it to queue one"
+            )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return format_analysis_job(interview, job)
     
     return {
         "interview_id": interview_id,
@@ -88,18 +170,198 @@ async def get_interview_analysis(
         "created_at": analysis.created_at
     }
 
-@router.post("/interview/{interview_id}/regenerate", response_model=Dict[str, Any])
+@router.get("/interview/{interview_id}/job", response_model=schemas.AnalysisJob)
+async def get_interview_analysis_job(
+    interview_id: int,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Get the latest analysis job for an interview, to follow a queued analysis or
+    regeneration. Recruiters can only see jobs for their own interviews.
+    """
+    # Get interview
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
+    if interview is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Interview not found"
+        )
+    
+    # Check permissions
+    if current_user.user_type != models.UserType.recruiter:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only recruiters can access interview analysis"
+        )
+    
+    # Check if interview belongs to the recruiter
+    if interview.recruiter_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access analysis for your own interviews"
+        )
+    
+    job = await async_crud.get_latest_analysis_job(db, interview_id=interview_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No analysis has been queued for this interview"
+        )
+    return job
+
+# Streams check the analysis job this often, for jobs run by other processes, and send a keep-alive comment
+ANALYSIS_STREAM_POLL_SECONDS = float(os.getenv("ANALYSIS_STREAM_POLL_SECONDS", "2"))
+# Longest a stream stays open; clients reconnect to keep following a job that takes longer
+ANALYSIS_STREAM_MAX_SECONDS = float(os.getenv("ANALYSIS_STREAM_MAX_SECONDS", "600"))
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+async def stream_interview_analysis(interview_id: int) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for an interview's analysis: the analysis job, each response
+    score (stored ones first, then the rest as the worker commits them), and the
+    overall analysis once its summary is committed, followed by an end event.
+    """
+    sent = set()
+    analysis_sent = False
+    deadline = time.monotonic() + ANALYSIS_STREAM_MAX_SECONDS
+    # Subscribe before reading what is stored, so that no score falls in between
+    with analysis_events.subscribe(interview_id) as events:
+        # Short sessions: a stream can stay open for minutes and should not hold a connection
+        async with database.AsyncSessionLocal() as db:
+            interview = await async_crud.get_interview(db, interview_id=interview_id)
+            job = await async_crud.get_latest_analysis_job(db, interview_id=interview_id)
+        status_value = job.status.value if job else None
+        if job:
+            yield format_sse("job", job_event(job))
+        for response in interview.responses:
+            if response.analysis:
+                sent.add(response.id)
+                yield format_sse("response", format_response_analysis(response.id, response.analysis))
+
+        # JobStatus is a str enum, so the status values of events compare equal to its members
+        while status_value in ACTIVE_JOB_STATUSES:
+            if time.monotonic() > deadline:
+                yield format_sse("end", {"status": status_value, "reason": "timeout"})
+                return
+            try:
+                event, data = await asyncio.wait_for(events.get(), timeout=ANALYSIS_STREAM_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                # Nothing from a worker in this process; the job may be running elsewhere
+                async with database.AsyncSessionLocal() as db:
+                    job = await async_crud.get_latest_analysis_job(db, interview_id=interview_id)
+                if job.status.value == status_value:
+                    yield ": keep-alive\n\n"
+                    continue
+                event, data = "job", job_event(job)
+            if event == "response":
+                if data["response_id"] not in sent:
+                    sent.add(data["response_id"])
+                    yield format_sse("response", data)
+            elif event == "analysis":
+                analysis_sent = True
+                yield format_sse("analysis", data)
+            elif event == "job":
+                status_value = data["status"]
+                yield format_sse("job", data)
+
+        async with database.AsyncSessionLocal() as db:
+            interview = await async_crud.get_interview(db, interview_id=interview_id)
+        for response in interview.responses:
+            if response.analysis and response.id not in sent:
+                yield format_sse("response", format_response_analysis(response.id, response.analysis))
+        if interview.analysis and not analysis_sent:
+            yield format_sse("analysis", analysis_event(interview.analysis))
+        yield format_sse("end", {"status": status_value})
+
+def format_response_analysis(response_id: int, analysis: models.ResponseAnalysis) -> Dict[str, Any]:
+    return {
+        "response_id": response_id,
+        "score": analysis.score,
+        "strengths": analysis.strengths,
+        "weaknesses": analysis.weaknesses,
+        "notes": analysis.notes,
+        "keywords": analysis.keywords,
+        "sentiment": analysis.sentiment
+    }
+
+@router.get(
+    "/interview/{interview_id}/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}, "description": "Server-Sent Events"}}
+)
+async def stream_interview_analysis_events(
+    interview_id: int,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Follow an interview's analysis as Server-Sent Events instead of polling:
+
+    - `job`: the analysis job's status (pending, running, done or failed)
+    - `response`: the analysis of one response, sent as soon as it is scored
+    - `analysis`: the overall analysis, once the job is done
+    - `end`: nothing more will be sent
+
+    The stream does not queue anything: open it after completing or regenerating
+    an interview to follow that analysis. Recruiters can only follow their own
+    interviews.
+    """
+    # Get interview
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
+    if interview is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Interview not found"
+        )
+    
+    # Check permissions
+    if current_user.user_type != models.UserType.recruiter:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only recruiters can access interview analysis"
+        )
+    
+    # Check if interview belongs to the recruiter
+    if interview.recruiter_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access analysis for your own interviews"
+        )
+    
+    # Check if interview is completed
+    if interview.status != models.InterviewStatus.completed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Analysis is only available for completed interviews"
+        )
+    
+    # The stream opens its own short sessions; do not hold this one's connection while it runs
+    await db.close()
+    
+    return StreamingResponse(
+        stream_interview_analysis(interview_id),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/interview/{interview_id}/regenerate", response_model=Dict[str, Any], status_code=status.HTTP_202_ACCEPTED)
 async def regenerate_interview_analysis(
     interview_id: int,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Regenerate analysis for a specific interview.
     This can be useful if the AI model has been updated or if the analysis was incorrect.
+    The new analysis is produced in the background and replaces the current one when
+    it is ready; follow it through the returned job.
     """
     # Get interview
-    interview = crud.get_interview(db, interview_id=interview_id)
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
     if interview is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -127,27 +389,5 @@ async def regenerate_interview_analysis(
             detail="Analysis is only available for completed interviews"
         )
     
-    # Delete existing analysis if it exists
-    if hasattr(interview, 'analysis') and interview.analysis:
-        db.delete(interview.analysis)
-        db.commit()
-    
-    # Regenerate analysis
-    analysis = crud.analyze_interview(db, interview_id=interview_id)
-    if analysis is None:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to regenerate analysis"
-        )
-    
-    return {
-        "interview_id": interview_id,
-        "candidate_name": interview.candidate_name,
-        "template_title": interview.template.title if interview.template else None,
-        "completed_at": interview.completed_at,
-        "overall_score": analysis.overall_score,
-        "recommendation": analysis.recommendation,
-        "strengths": analysis.strengths,
-        "weaknesses": analysis.weaknesses,
-        "created_at": analysis.created_at
-    } 
\ No newline at end of file
+    job = await async_crud.create_analysis_job(db, interview_id=interview_id, regenerate=True)
+    return format_analysis_job(interview, job)
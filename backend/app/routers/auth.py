@@ -2,11 +2,12 @@ from datetime import timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import RedirectResponse
 import os
 
-from .. import crud, models, schemas, auth, database, utils, oauth
+from .. import async_crud, models, schemas, auth, database, utils, oauth
+from ..passwords import PasswordHasherBusy
 
 router = APIRouter(
     prefix="/auth",
@@ -17,7 +18,7 @@ router = APIRouter(
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
@@ -25,7 +26,7 @@ async def login_for_access_token(
     # First, check if this is a demo user
     if form_data.username.endswith("@example.com"):
         # Demo login logic
-        demo_user = utils.get_demo_user(form_data.username, db)
+        demo_user = await utils.get_demo_user(form_data.username, db)
         if demo_user:
             access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
             access_token = auth.create_access_token(
@@ -41,7 +42,14 @@ async def login_for_access_token(
             }
     
     # Standard authentication logic
-    user = auth.authenticate_user(form_data.username, form_data.password, db)
+    try:
+        user = await auth.authenticate_user(form_data.username, form_data.password, db)
+    except PasswordHasherBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins at the moment, please try again shortly",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,13 +74,13 @@ async def login_for_access_token(
 @router.post("/register", response_model=schemas.User)
 async def register_user(
     user: schemas.UserCreate,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Register a new user, hashing their password.
     """
     # Check if user already exists
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -80,7 +88,14 @@ async def register_user(
         )
     
     # Create new user
-    return crud.create_user(db=db, user=user)
+    try:
+        return await async_crud.create_user(db=db, user=user)
+    except PasswordHasherBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many registrations at the moment, please try again shortly",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
 
 @router.get("/me", response_model=schemas.User)
 async def read_users_me(
@@ -117,7 +132,7 @@ async def oauth_login(
 async def oauth_callback(
     provider: str, 
     request: Request,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Handle OAuth callback from provider"""
     try:
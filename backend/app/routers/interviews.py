@@ -1,8 +1,12 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import os
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, Response, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from .. import crud, models, schemas, auth, database, utils
+from .. import async_crud, models, schemas, auth, database, utils
+from ..uploads import UPLOAD_EXPIRY_HOURS, UPLOAD_MAX_BYTES, storage_key
 
 router = APIRouter(
     prefix="/interviews",
@@ -14,10 +18,11 @@ router = APIRouter(
 async def create_interview(
     interview: schemas.InterviewCreate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
-    Create a new interview and send invitation to candidate.
+    Create a new interview and queue the invitation to the candidate.
+    `invitation` reports the queued email (its outbox id and status, `pending` until sent).
     Only recruiters can create interviews.
     """
     # Check if user is a recruiter
@@ -28,7 +33,7 @@ async def create_interview(
         )
     
     # Verify that the template exists
-    template = crud.get_interview_template(db, template_id=interview.template_id)
+    template = await async_crud.get_interview_template(db, template_id=interview.template_id)
     if template is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -42,27 +47,111 @@ async def create_interview(
             detail="You can only use your own templates"
         )
     
-    # Create the interview
-    db_interview = crud.create_interview(db, interview=interview, recruiter_id=current_user.id)
+    # Create the interview; its invitation is written to the email outbox in the same transaction
+    db_interview, invitation = await async_crud.create_interview(db, interview=interview, recruiter_id=current_user.id)
     
-    # Send invitation email
-    email_result = utils.send_interview_invitation(db_interview)
-    
-    # Format response
+    # Format response; the invitation is only queued here, the email sender delivers it later
     interview_data = utils.format_interview_for_recruiter(db_interview)
-    interview_data["email_sent"] = email_result
+    interview_data["invitation"] = invitation
     
     return interview_data
 
-@router.get("/recruiter", response_model=List[Dict[str, Any]])
+# Most rows accepted in one bulk upload
+MAX_BULK_INTERVIEWS = int(os.getenv("MAX_BULK_INTERVIEWS", "20000"))
+
+@router.post("/bulk", response_model=schemas.BulkInterviewResult)
+async def create_interviews_bulk(
+    template_id: int = Form(...),
+    due_date: Optional[datetime] = Form(None),
+    file: UploadFile = File(...),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Create interviews for many candidates at once from an uploaded file, e.g. a campus batch.
+    The file is CSV with a header row, a JSON array or JSON lines, with candidate_email,
+    candidate_name and optionally due_date per row (`due_date` applies to rows without one).
+    Valid rows are created in one transaction together with their invitations (see app.mailer);
+    the result reports each row as created or invalid.
+    Only recruiters can create interviews.
+    """
+    # Check if user is a recruiter
+    if current_user.user_type != models.UserType.recruiter:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only recruiters can create interviews"
+        )
+    
+    # Verify that the template exists
+    template = await async_crud.get_interview_template(db, template_id=template_id)
+    if template is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Template not found"
+        )
+    
+    # Verify that the template belongs to the recruiter
+    if template.creator_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only use your own templates"
+        )
+    
+    kind = utils.bulk_interview_format(file.filename, file.content_type)
+    if kind is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload a .csv, .json or .ndjson file"
+        )
+    
+    # The upload has been spooled to a temporary file; parse and validate it off the event loop
+    try:
+        interviews, invalid = await run_in_threadpool(
+            utils.parse_bulk_interviews, file.file, kind, template_id, due_date, MAX_BULK_INTERVIEWS
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read the upload: {exc}"
+        )
+    
+    created = await async_crud.create_interviews(
+        db, interviews=[interview for _, interview in interviews], recruiter_id=current_user.id
+    )
+    
+    results = invalid + [
+        schemas.BulkInterviewRowResult(
+            row=row_number,
+            candidate_email=db_interview["candidate_email"],
+            status=schemas.BulkInterviewRowStatus.created,
+            interview_id=db_interview["id"],
+            candidate_id=db_interview["candidate_id"]
+        )
+        # create_interviews matched its returned rows back to the requests, in order
+        for (row_number, _), db_interview in zip(interviews, created)
+    ]
+    results.sort(key=lambda result: result.row)
+    bulk_result = schemas.BulkInterviewResult(
+        template_id=template_id, created=len(created), invalid=len(invalid), results=results
+    )
+    # The results are built as validated models already; skip response_model revalidation of every row
+    return Response(content=await run_in_threadpool(bulk_result.json), media_type="application/json")
+
+# One query for the current user plus the three eager-loading queries of the listing
+LISTING_QUERY_BUDGET = 4
+
+@router.get("/recruiter", response_model=schemas.InterviewPage, dependencies=[Depends(database.query_budget(LISTING_QUERY_BUDGET))])
 async def get_recruiter_interviews(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
-    Get all interviews created by the current recruiter.
+    Get the interviews created by the current recruiter, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page;
+    `skip` is only used when no cursor is given.
     """
     # Check if user is a recruiter
     if current_user.user_type != models.UserType.recruiter:
@@ -72,20 +161,28 @@ async def get_recruiter_interviews(
         )
     
     # Get interviews
-    interviews = crud.get_recruiter_interviews(db, recruiter_id=current_user.id, skip=skip, limit=limit)
+    after_id = utils.decode_cursor(cursor)
+    interviews = await async_crud.get_recruiter_interviews(db, recruiter_id=current_user.id, skip=skip, limit=limit + 1, after_id=after_id)
+    interviews, next_cursor = utils.split_page(interviews, limit)
     
     # Format response
-    return [utils.format_interview_for_recruiter(interview) for interview in interviews]
+    return {
+        "items": [utils.format_interview_for_recruiter(interview) for interview in interviews],
+        "next_cursor": next_cursor
+    }
 
-@router.get("/candidate", response_model=List[Dict[str, Any]])
+@router.get("/candidate", response_model=schemas.InterviewPage, dependencies=[Depends(database.query_budget(LISTING_QUERY_BUDGET))])
 async def get_candidate_interviews(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
-    Get all interviews for the current candidate.
+    Get the interviews for the current candidate, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page;
+    `skip` is only used when no cursor is given.
     """
     # Check if user is a candidate
     if current_user.user_type != models.UserType.candidate:
@@ -95,16 +192,21 @@ async def get_candidate_interviews(
         )
     
     # Get interviews by email
-    interviews = crud.get_interviews_by_email(db, email=current_user.email, skip=skip, limit=limit)
+    after_id = utils.decode_cursor(cursor)
+    interviews = await async_crud.get_interviews_by_email(db, email=current_user.email, skip=skip, limit=limit + 1, after_id=after_id)
+    interviews, next_cursor = utils.split_page(interviews, limit)
     
     # Format response
-    return [utils.format_interview_for_candidate(interview) for interview in interviews]
+    return {
+        "items": [utils.format_interview_for_candidate(interview) for interview in interviews],
+        "next_cursor": next_cursor
+    }
 
 @router.get("/{interview_id}", response_model=Dict[str, Any])
 async def get_interview(
     interview_id: int,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Get a specific interview.
@@ -112,7 +214,7 @@ async def get_interview(
     Candidates can only see interviews assigned to them.
     """
     # Get interview
-    interview = crud.get_interview(db, interview_id=interview_id)
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
     if interview is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -150,14 +252,14 @@ async def get_interview(
 async def start_interview(
     interview_id: int,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Start an interview (change status from pending to in_progress).
     Only the assigned candidate can start the interview.
     """
     # Get interview
-    interview = crud.get_interview(db, interview_id=interview_id)
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
     if interview is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -179,7 +281,7 @@ async def start_interview(
         )
     
     # Update status
-    updated_interview = crud.update_interview_status(db, interview_id=interview_id, status=models.InterviewStatus.in_progress)
+    updated_interview = await async_crud.update_interview_status(db, interview_id=interview_id, status=models.InterviewStatus.in_progress)
     
     return utils.format_interview_for_candidate(updated_interview)
 
@@ -188,14 +290,14 @@ async def submit_interview_response(
     interview_id: int,
     response: schemas.InterviewResponseCreate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Submit responses for an interview.
     Only the assigned candidate can submit responses.
     """
     # Get interview
-    interview = crud.get_interview(db, interview_id=interview_id)
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
     if interview is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -217,7 +319,7 @@ async def submit_interview_response(
         )
     
     # Submit responses
-    updated_interview = crud.submit_interview_response(db, interview_id=interview_id, response=response)
+    updated_interview = await async_crud.submit_interview_response(db, interview_id=interview_id, response=response)
     if updated_interview is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -229,15 +331,20 @@ async def submit_interview_response(
 @router.post("/{interview_id}/video-upload-url", response_model=Dict[str, Any])
 async def get_video_upload_url(
     interview_id: int,
+    request: Request,
+    question_id: Optional[int] = None,
+    content_type: str = "video/webm",
+    size: Optional[int] = None,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
-    Get a pre-signed URL for uploading a video response.
-    Only the assigned candidate can get an upload URL.
+    Start a resumable upload of a video response (see app.uploads) and return its URL.
+    `size` declares the length of the video when it is known in advance.
+    Only the assigned candidate can upload videos.
     """
     # Get interview
-    interview = crud.get_interview(db, interview_id=interview_id)
+    interview = await async_crud.get_interview(db, interview_id=interview_id)
     if interview is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -258,7 +365,40 @@ async def get_video_upload_url(
             detail="This interview has already been completed"
         )
     
-    # Generate upload URL
-    upload_info = utils.generate_upload_url(file_type="video")
+    if question_id is not None and question_id not in {question.id for question in interview.template.questions}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The question is not part of this interview"
+        )
+    if not content_type.startswith("video/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only video uploads are accepted"
+        )
+    if size is not None and not 0 < size <= UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Videos may not exceed {UPLOAD_MAX_BYTES} bytes"
+        )
+    
+    expires_at = datetime.now() + timedelta(hours=UPLOAD_EXPIRY_HOURS)
+    upload = await async_crud.create_video_upload(
+        db,
+        interview_id=interview.id,
+        uploader_id=current_user.id,
+        content_type=content_type,
+        storage_key=lambda upload_id: storage_key(interview.id, upload_id, content_type),
+        expires_at=expires_at,
+        question_id=question_id,
+        total_bytes=size
+    )
     
-    return upload_info 
\ No newline at end of file
+    return {
+        "upload_id": upload.id,
+        "upload_url": str(request.url_for("upload_chunk", upload_id=upload.id)),
+        "file_path": upload.storage_key,
+        "public_url": f"{str(request.base_url).rstrip('/')}/videos/{upload.id}",
+        "offset": upload.received_bytes,
+        "max_bytes": UPLOAD_MAX_BYTES,
+        "expires_in": int(UPLOAD_EXPIRY_HOURS * 3600)
+    } 
\ No newline at end of file
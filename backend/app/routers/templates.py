@@ -1,8 +1,8 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import crud, models, schemas, auth, database, utils
+from .. import async_crud, models, schemas, auth, database, utils
 
 router = APIRouter(
     prefix="/templates",
@@ -10,17 +10,20 @@ router = APIRouter(
     responses={401: {"description": "Not authorized"}},
 )
 
-@router.get("/", response_model=List[schemas.InterviewTemplate])
+@router.get("/", response_model=schemas.InterviewTemplatePage)
 async def get_interview_templates(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     user_id: Optional[int] = None,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
-    Get all interview templates, optionally filtered by creator.
+    Get all interview templates, optionally filtered by creator, newest first.
     Only recruiters can see templates.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page;
+    `skip` is only used when no cursor is given.
     """
     # Check if user is a recruiter
     if current_user.user_type != models.UserType.recruiter:
@@ -38,14 +41,16 @@ async def get_interview_templates(
         )
     
     # Get templates
-    templates = crud.get_interview_templates(db, skip=skip, limit=limit, user_id=current_user.id)
-    return templates
+    after_id = utils.decode_cursor(cursor)
+    templates = await async_crud.get_interview_templates(db, skip=skip, limit=limit + 1, user_id=current_user.id, after_id=after_id)
+    templates, next_cursor = utils.split_page(templates, limit)
+    return {"items": templates, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.InterviewTemplate)
 async def create_interview_template(
     template: schemas.InterviewTemplateCreate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Create a new interview template.
@@ -62,19 +67,19 @@ async def create_interview_template(
     utils.validate_template(template)
     
     # Create template
-    return crud.create_interview_template(db=db, template=template, user_id=current_user.id)
+    return await async_crud.create_interview_template(db=db, template=template, user_id=current_user.id)
 
 @router.get("/{template_id}", response_model=schemas.InterviewTemplate)
 async def get_interview_template(
     template_id: int,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Get a specific interview template.
     """
     # Get template
-    template = crud.get_interview_template(db, template_id=template_id)
+    template = await async_crud.get_interview_template(db, template_id=template_id)
     if template is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -102,13 +107,13 @@ async def update_interview_template(
     template_id: int,
     template: schemas.InterviewTemplateCreate,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """
     Update an existing interview template.
     """
     # Get existing template
-    db_template = crud.get_interview_template(db, template_id=template_id)
+    db_template = await async_crud.get_interview_template(db, template_id=template_id)
     if db_template is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -133,7 +138,7 @@ async def update_interview_template(
     utils.validate_template(template)
     
     # Update template
-    updated_template = crud.update_interview_template(db, template_id=template_id, template=template)
+    updated_template = await async_crud.update_interview_template(db, template_id=template_id, template=template)
     if updated_template is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,269 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import async_crud, models, schemas, auth, database
+from ..playback import Playback, check_playback_token, video_player
+from ..storage import StorageError
+from ..uploads import (
+    UPLOAD_MAX_BYTES,
+    UploadChecksumMismatch,
+    UploadConflict,
+    UploadTooLarge,
+    parse_checksum,
+    upload_manager,
+)
+
+router = APIRouter(
+    prefix="/videos",
+    tags=["videos"],
+    responses={401: {"description": "Not authorized"}},
+)
+
+async def get_own_upload(upload_id: str, current_user: models.User, db: AsyncSession) -> models.VideoUpload:
+    """The upload, if the current user started it and it is still open."""
+    upload = await async_crud.get_video_upload(db, upload_id=upload_id)
+    if upload is None or upload.uploader_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    if upload.status == models.VideoUploadStatus.aborted:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="This upload was abandoned; start a new one"
+        )
+    # Past its expiry an unfinished upload is only waiting to be pruned
+    if upload.status == models.VideoUploadStatus.uploading and upload.expires_at <= datetime.now(upload.expires_at.tzinfo):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="This upload has expired; start a new one"
+        )
+    return upload
+
+def offset_headers(received_bytes: int, total_bytes: Optional[int]):
+    headers = {"Upload-Offset": str(received_bytes), "Cache-Control": "no-store"}
+    if total_bytes is not None:
+        headers["Upload-Length"] = str(total_bytes)
+    return headers
+
+@router.head("/uploads/{upload_id}")
+async def get_upload_offset(
+    upload_id: str,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Report how many bytes of the upload have been received (Upload-Offset), so that
+    a client resumes from there after losing its connection.
+    """
+    upload = await get_own_upload(upload_id, current_user, db)
+    return Response(status_code=status.HTTP_200_OK, headers=offset_headers(upload.received_bytes, upload.total_bytes))
+
+@router.patch("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0),
+    upload_length: Optional[int] = Header(None, ge=0),
+    upload_checksum: Optional[str] = Header(None),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Append the request body to the upload at Upload-Offset, which must be the
+    number of bytes received so far. The body is streamed to disk as it arrives.
+    An optional Upload-Checksum ("sha256 <base64>") of the chunk is verified
+    before it counts; Upload-Length declares the size of the whole video.
+    Answers 204 with the new Upload-Offset, or 409 with the current one.
+    """
+    if upload_checksum is not None:
+        try:
+            parse_checksum(upload_checksum)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(exc)
+            )
+    try:
+        async with upload_manager.writing(upload_id, upload_offset):
+            upload = await get_own_upload(upload_id, current_user, db)
+            if upload.status == models.VideoUploadStatus.complete:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This upload is already complete",
+                    headers=offset_headers(upload.received_bytes, upload.total_bytes)
+                )
+            if upload_length is not None and upload.total_bytes is not None and upload_length != upload.total_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"The upload's length was declared as {upload.total_bytes} bytes"
+                )
+            total_bytes = upload.total_bytes if upload.total_bytes is not None else upload_length
+            if total_bytes is not None and total_bytes > UPLOAD_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Videos may not exceed {UPLOAD_MAX_BYTES} bytes"
+                )
+            # Hand the connection back to the pool while the body streams in
+            await db.commit()
+            result = await upload_manager.append(
+                upload_id,
+                offset=upload_offset,
+                committed=upload.received_bytes,
+                limit=total_bytes if total_bytes is not None else UPLOAD_MAX_BYTES,
+                chunks=request.stream(),
+                checksum=upload_checksum
+            )
+            await async_crud.set_video_upload_progress(db, upload_id, result.received_bytes, total_bytes)
+    except UploadConflict as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc),
+            headers={"Upload-Offset": str(exc.offset)}
+        )
+    except UploadChecksumMismatch as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+            headers={"Upload-Offset": str(upload_offset)}
+        )
+    except UploadTooLarge as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(exc),
+            headers={"Upload-Offset": str(upload_offset)}
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=offset_headers(result.received_bytes, total_bytes))
+
+@router.post("/uploads/{upload_id}/complete", response_model=schemas.VideoUpload)
+async def complete_upload(
+    upload_id: str,
+    body: schemas.VideoUploadComplete = schemas.VideoUploadComplete(),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Finish the upload: verify the optional SHA-256 of the whole video and publish
+    it to video storage. Completing an upload again returns it unchanged.
+    """
+    try:
+        async with upload_manager.writing(upload_id):
+            upload = await get_own_upload(upload_id, current_user, db)
+            if upload.status == models.VideoUploadStatus.complete:
+                return upload
+            if upload.total_bytes is not None and upload.received_bytes != upload.total_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Received {upload.received_bytes} of {upload.total_bytes} bytes",
+                    headers=offset_headers(upload.received_bytes, upload.total_bytes)
+                )
+            if upload.received_bytes == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Nothing has been uploaded"
+                )
+            sha256 = await upload_manager.complete(
+                upload_id,
+                received=upload.received_bytes,
+                key=upload.storage_key,
+                content_type=upload.content_type,
+                expected_sha256=body.sha256
+            )
+            return await async_crud.complete_video_upload(db, upload_id, sha256)
+    except UploadConflict as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc)
+        )
+    except UploadChecksumMismatch as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    except StorageError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Could not store the video: {exc}"
+        )
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Abandon an unfinished upload and delete what was received."""
+    try:
+        async with upload_manager.writing(upload_id):
+            upload = await get_own_upload(upload_id, current_user, db)
+            if upload.status == models.VideoUploadStatus.complete:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This upload is already complete"
+                )
+            await async_crud.abort_video_upload(db, upload_id)
+            upload_manager.discard(upload_id)
+    except UploadConflict as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc)
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/{upload_id}", response_class=Response)
+@router.head("/{upload_id}", response_class=Response)
+async def play_video(
+    upload_id: str,
+    request: Request,
+    token: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Serve a completed video to the candidate who recorded it or the interview's
+    recruiter (see app.playback). Authorized by the `token` of a playback URL or
+    a bearer token. Honors Range, If-Range and If-None-Match.
+    """
+    current_user = None
+    if token is not None:
+        if not check_playback_token(token, upload_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="This video link is invalid or has expired"
+            )
+    else:
+        scheme, _, credentials = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not credentials:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        current_user = await auth.get_current_user(credentials, db)
+    
+    playback = video_player.cached(upload_id)
+    if playback is None:
+        row = await async_crud.get_video_playback(db, upload_id)
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Video not found"
+            )
+        playback = video_player.remember(Playback.from_upload(*row))
+    if current_user is not None and current_user.id not in (playback.uploader_id, playback.recruiter_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to watch this video"
+        )
+    # Hand the connection back to the pool before the video streams
+    await db.commit()
+    
+    try:
+        return await video_player.respond(request.headers, playback)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video not found"
+        )
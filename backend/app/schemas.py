@@ -1,6 +1,6 @@
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, EmailStr, Field, validator
-from datetime import datetime
+from datetime import datetime, date
 import enum
 
 # Enums
@@ -15,11 +15,35 @@ class InterviewStatus(str, enum.Enum):
     completed = "completed"
     expired = "expired"
 
+class JobStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class VideoUploadStatus(str, enum.Enum):
+    uploading = "uploading"
+    complete = "complete"
+    aborted = "aborted"
+
 class QuestionType(str, enum.Enum):
     text = "text"
     multiple_choice = "multiple_choice"
     video = "video"
 
+class AnalysisScorer(str, enum.Enum):
+    ai = "ai"
+    local = "local"
+
+class AnalyticsGranularity(str, enum.Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+class AnalyticsGroupBy(str, enum.Enum):
+    template = "template"
+    status = "status"
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
@@ -68,6 +92,10 @@ class QuestionBase(BaseModel):
     text: str
     type: QuestionType
     options: Optional[List[str]] = None  # For multiple choice
+    multiple_select: bool = False  # For multiple choice questions accepting several options
+    correct_options: Optional[List[str]] = None  # Answer key for multiple choice
+    reference_answer: Optional[str] = None  # Example of a strong answer
+    rubric: Optional[List[str]] = None  # Points a strong answer covers
     time_limit: Optional[int] = None  # For video questions (in seconds)
     required: bool = True
     order: int
@@ -80,6 +108,24 @@ class QuestionBase(BaseModel):
             raise ValueError('Options should only be provided for multiple choice questions')
         return v
 
+    @validator('multiple_select')
+    def validate_multiple_select(cls, v, values):
+        if v and values.get('type') != QuestionType.multiple_choice:
+            raise ValueError('Multiple selection is only available for multiple choice questions')
+        return v
+
+    @validator('correct_options')
+    def validate_correct_options(cls, v, values):
+        if v is None:
+            return v
+        if values.get('type') != QuestionType.multiple_choice:
+            raise ValueError('Correct options should only be provided for multiple choice questions')
+        if not v or len(set(v)) != len(v) or any(option not in (values.get('options') or []) for option in v):
+            raise ValueError('Correct options must be distinct options of the question')
+        if not values.get('multiple_select') and len(v) != 1:
+            raise ValueError('Single selection questions must have exactly one correct option')
+        return v
+
     @validator('time_limit')
     def validate_time_limit(cls, v, values):
         if values.get('type') == QuestionType.video and not v:
@@ -104,6 +150,7 @@ class Question(QuestionBase):
 class InterviewTemplateBase(BaseModel):
     title: str
     description: Optional[str] = None
+    scorer: Optional[AnalysisScorer] = None  # Defaults to the deployment's ANALYSIS_SCORER
 
 class InterviewTemplateCreate(InterviewTemplateBase):
     questions: List[QuestionCreate]
@@ -119,6 +166,10 @@ class InterviewTemplate(InterviewTemplateBase):
     class Config:
         orm_mode = True
 
+class InterviewTemplatePage(BaseModel):
+    items: List[InterviewTemplate]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
+
 # Interview schemas
 class InterviewBase(BaseModel):
     template_id: int
@@ -143,11 +194,34 @@ class Interview(InterviewBase):
     class Config:
         orm_mode = True
 
+class InterviewPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
+
+class BulkInterviewRowStatus(str, enum.Enum):
+    created = "created"
+    invalid = "invalid"
+
+class BulkInterviewRowResult(BaseModel):
+    row: int  # 1-based position among the uploaded rows, not counting a CSV header
+    candidate_email: Optional[str] = None
+    status: BulkInterviewRowStatus
+    interview_id: Optional[int] = None
+    candidate_id: Optional[int] = None  # Set when the email belongs to a registered candidate
+    error: Optional[str] = None
+
+class BulkInterviewResult(BaseModel):
+    template_id: int
+    created: int
+    invalid: int
+    results: List[BulkInterviewRowResult]
+
 # Response schemas
 class ResponseBase(BaseModel):
     question_id: int
     text_response: Optional[str] = None
     selected_option: Optional[str] = None
+    selected_options: Optional[List[str]] = None  # For multiple choice questions with multiple_select
     video_url: Optional[str] = None
     video_transcript: Optional[str] = None
 
@@ -217,6 +291,39 @@ class InterviewAnalysis(InterviewAnalysisBase):
     class Config:
         orm_mode = True
 
+class AnalysisJob(BaseModel):
+    id: int
+    interview_id: int
+    status: JobStatus
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+# Video upload schemas
+class VideoUpload(BaseModel):
+    id: str
+    interview_id: int
+    question_id: Optional[int] = None
+    content_type: str
+    total_bytes: Optional[int] = None
+    received_bytes: int
+    sha256: Optional[str] = None
+    status: VideoUploadStatus
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    expires_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class VideoUploadComplete(BaseModel):
+    sha256: Optional[str] = Field(None, regex="^[0-9a-fA-F]{64}$")  # Of the whole video, checked before publishing
+
 # For submitting a complete interview
 class InterviewResponseCreate(BaseModel):
     responses: List[ResponseCreate]
@@ -234,4 +341,27 @@ class RecruiterAnalytics(BaseModel):
     completion_rate: float  # percentage
     interviews_by_day: ChartData
     scores_distribution: ChartData
-    candidate_sources: ChartData 
\ No newline at end of file
+    candidate_sources: ChartData 
+
+class ScorePercentiles(BaseModel):
+    count: int  # Number of scored interviews
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+
+class AnalyticsSeries(BaseModel):
+    key: str  # Template id, or created/started/completed when grouping by status
+    label: str
+    counts: List[int]  # One value per bucket
+    avg_scores: Optional[List[Optional[float]]] = None  # One value per bucket, for template series
+    total: int
+    score_percentiles: Optional[ScorePercentiles] = None
+
+class RecruiterAnalyticsSeries(BaseModel):
+    start_date: date
+    end_date: date
+    granularity: AnalyticsGranularity
+    group_by: AnalyticsGroupBy
+    labels: List[str]  # ISO date of the first day of each bucket
+    series: List[AnalyticsSeries]
+    score_percentiles: ScorePercentiles  # Across everything completed in the range
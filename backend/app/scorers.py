@@ -0,0 +1,279 @@
+"""
+Scorer backends for interview analysis.
+
+A scorer turns responses into ResponseAnalysis fields and summarizes a scored
+interview. Deployments pick one with ANALYSIS_SCORER and templates can override
+it (InterviewTemplate.scorer):
+
+    ai     ai_engine: the OpenAI model, or mock results in development
+    local  LocalScorer: deterministic, CPU-only scoring against each question's
+           reference answer and rubric, for pre-screening high-volume roles
+           without model latency or cost
+
+Add a backend by subclassing Scorer and registering it in SCORERS.
+"""
+import abc
+import math
+import multiprocessing
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from . import ai_engine
+
+ANALYSIS_SCORER = os.getenv("ANALYSIS_SCORER", "ai")
+# Batches at least this large are split across LOCAL_SCORER_PROCESSES worker processes
+LOCAL_SCORER_PROCESSES = int(os.getenv("LOCAL_SCORER_PROCESSES", str(os.cpu_count() or 1)))
+LOCAL_SCORER_PARALLEL_MIN = int(os.getenv("LOCAL_SCORER_PARALLEL_MIN", "2000"))
+
+class Scorer(abc.ABC):
+    """Interface of a scoring backend."""
+
+    name = ""
+    # Whether results are worth storing in the analysis cache (see analysis_cache.py)
+    cacheable = True
+
+    @abc.abstractmethod
+    def version(self) -> str:
+        """Identifies the scoring logic; results from another version are not reused."""
+
+    @abc.abstractmethod
+    def analyze_responses(
+        self,
+        items: List[Dict[str, Any]],
+        on_result: Optional[ai_engine.ResultCallback] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyses for `items` (the keyword arguments of ai_engine.analyze_response), in
+        order, also passing each one to `on_result` as soon as it is ready.
+        """
+
+    @abc.abstractmethod
+    def analyze_interview(self, interview_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Overall analysis from the scored responses, as ai_engine.analyze_full_interview.
+        `interview_data["aggregates"]` holds the running score sum and count and the
+        strength and weakness tallies (models.InterviewAnalysis).
+        """
+
+    def close(self):
+        """Release processes or connections the scorer started; it starts them again when next used."""
+
+class AIScorer(Scorer):
+    name = "ai"
+
+    @property
+    def cacheable(self) -> bool:
+        # Mock results are random and cheap; caching them would pin one draw per answer
+        return not ai_engine.use_mock_analysis()
+
+    def version(self) -> str:
+        return ai_engine.scorer_version()
+
+    def analyze_responses(self, items, on_result=None):
+        return ai_engine.analyze_responses(items, on_result=on_result)
+
+    def analyze_interview(self, interview_data):
+        return ai_engine.analyze_full_interview(interview_data)
+
+# Local scoring
+LOCAL_SCORER_VERSION = 1
+
+# Words that carry no content for matching answers to references
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+# Weight of each feature in the local score, renormalized over the features a question supports
+FEATURE_WEIGHTS = {"similarity": 0.5, "coverage": 0.35, "length": 0.15}
+# Answers this long (in content words) get full marks for length
+TARGET_CONTENT_WORDS = 40
+
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SUFFIXES = ("ing", "ed", "es", "s")
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Strip common inflections so that e.g. "caching", "cached" and "cache" match."""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    return word[:-1] if word.endswith("e") and len(word) > 3 else word
+
+def unstemmed_words(text: Optional[str]) -> List[str]:
+    return [word for word in WORD.findall((text or "").lower()) if word not in STOP_WORDS]
+
+def content_words(text: Optional[str]) -> List[str]:
+    return [stem(word) for word in unstemmed_words(text)]
+
+def term_weights(words: List[str], discounted: frozenset) -> Dict[str, float]:
+    """Sublinear term frequencies of unigrams and bigrams; terms in `discounted` count half."""
+    terms = Counter(words)
+    terms.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return {
+        term: (1.0 + math.log(count)) * (0.5 if term in discounted else 1.0)
+        for term, count in terms.items()
+    }
+
+def cosine(left: Dict[str, float], right: Dict[str, float]) -> float:
+    if not left or not right:
+        return 0.0
+    if len(left) > len(right):
+        left, right = right, left
+    dot = sum(weight * right.get(term, 0.0) for term, weight in left.items())
+    norm = math.sqrt(sum(w * w for w in left.values())) * math.sqrt(sum(w * w for w in right.values()))
+    return dot / norm if norm else 0.0
+
+@lru_cache(maxsize=1024)
+def reference_terms(question_text: Optional[str], reference: str) -> Tuple[FrozenSet[str], Dict[str, float]]:
+    """Terms of the question and the weighted reference vector, shared by all answers to a question."""
+    question_terms = frozenset(term_weights(content_words(question_text), frozenset()))
+    return question_terms, term_weights(content_words(reference), question_terms)
+
+@lru_cache(maxsize=1024)
+def rubric_words(point: str) -> FrozenSet[str]:
+    return frozenset(content_words(point))
+
+def score_locally(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Score one response from features of its text:
+
+    - similarity: cosine similarity of weighted term vectors of the answer and the
+      reference answer; terms the question itself uses count half, so restating
+      the question earns little
+    - coverage: share of rubric points whose content words all appear in the answer
+    - length: content words relative to TARGET_CONTENT_WORDS
+
+    Features without input (no reference answer or rubric) are left out.
+    """
+    answer = item.get("response_text") or item.get("selected_option") or ""
+    raw_words = unstemmed_words(answer)
+    words = [stem(word) for word in raw_words]
+    present = set(words)
+    features = {"length": min(1.0, len(words) / TARGET_CONTENT_WORDS)}
+    strengths, weaknesses = [], []
+
+    reference = item.get("reference_answer")
+    if reference:
+        question_terms, reference_weights = reference_terms(item.get("question_text"), reference)
+        features["similarity"] = cosine(term_weights(words, question_terms), reference_weights)
+        if features["similarity"] >= 0.5:
+            strengths.append("Close to the reference answer")
+        elif features["similarity"] < 0.2:
+            weaknesses.append("Differs substantially from the reference answer")
+
+    rubric = item.get("rubric") or []
+    if rubric:
+        covered = [point for point in rubric if rubric_words(point) and rubric_words(point) <= present]
+        missed = [point for point in rubric if point not in covered]
+        features["coverage"] = len(covered) / len(rubric)
+        if covered:
+            strengths.append(f"Covers: {', '.join(covered)}")
+        if missed:
+            weaknesses.append(f"Does not cover: {', '.join(missed)}")
+
+    if features["length"] < 0.25:
+        weaknesses.append("Answer is very short")
+
+    total_weight = sum(FEATURE_WEIGHTS[name] for name in features)
+    score = 5.0 * sum(FEATURE_WEIGHTS[name] * value for name, value in features.items()) / total_weight
+    keywords = [term for term, _ in sorted(Counter(raw_words).items(), key=lambda entry: (-entry[1], entry[0]))[:5]]
+    return {
+        "score": round(score, 2),
+        "strengths": strengths,
+        "weaknesses": weaknesses,
+        "notes": "Scored locally: " + ", ".join(f"{name} {value:.2f}" for name, value in sorted(features.items())),
+        "keywords": keywords,
+        "sentiment": None
+    }
+
+def score_batch(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [score_locally(item) for item in items]
+
+class LocalScorer(Scorer):
+    name = "local"
+    # Scoring is cheaper than a cache round trip
+    cacheable = False
+
+    def __init__(self, processes: int = LOCAL_SCORER_PROCESSES, parallel_min: int = LOCAL_SCORER_PARALLEL_MIN):
+        self.processes = processes
+        self.parallel_min = parallel_min
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def version(self) -> str:
+        return f"local:{LOCAL_SCORER_VERSION}"
+
+    def analyze_responses(self, items, on_result=None):
+        if self.processes <= 1 or len(items) < self.parallel_min:
+            results = score_batch(items)
+        else:
+            with self._lock:
+                if self._pool is None:
+                    # Spawned rather than forked: the API process runs threads and holds database connections
+                    self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+                pool = self._pool
+            size = math.ceil(len(items) / self.processes)
+            chunks = [items[start:start + size] for start in range(0, len(items), size)]
+            results = [result for chunk in pool.map(score_batch, chunks) for result in chunk]
+        if on_result:
+            # Scoring takes microseconds per response, so results are reported together
+            for index, result in enumerate(results):
+                on_result(index, result)
+        return results
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def analyze_interview(self, interview_data):
+        responses = interview_data.get("responses", [])
+        aggregates = interview_data.get("aggregates") or {
+            "score_sum": sum(response.get("score") or 0 for response in responses),
+            "score_count": len(responses),
+            "strength_counts": Counter(entry for response in responses for entry in response.get("strengths") or []),
+            "weakness_counts": Counter(entry for response in responses for entry in response.get("weaknesses") or [])
+        }
+        count = aggregates["score_count"]
+        overall_score = round(aggregates["score_sum"] / count, 1) if count else 0.0
+        if overall_score >= 4:
+            recommendation = "Strong match with the reference answers; advance to the next stage"
+        elif overall_score >= 2.5:
+            recommendation = "Partial match with the reference answers; review before advancing"
+        else:
+            recommendation = "Weak match with the reference answers"
+        return {
+            "overall_score": overall_score,
+            "recommendation": recommendation,
+            "strengths": most_common(aggregates["strength_counts"]),
+            "weaknesses": most_common(aggregates["weakness_counts"])
+        }
+
+def most_common(counts: Dict[str, int], limit: int = 3) -> List[str]:
+    return [entry for entry, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]]
+
+SCORERS: Dict[str, Scorer] = {scorer.name: scorer for scorer in (AIScorer(), LocalScorer())}
+
+def get_scorer(name: Optional[str] = None) -> Scorer:
+    """The scorer called `name`, or the deployment default (ANALYSIS_SCORER)."""
+    name = name or ANALYSIS_SCORER
+    if name not in SCORERS:
+        raise ValueError(f"Unknown scorer {name!r}, expected one of {', '.join(SCORERS)}")
+    return SCORERS[name]
+
+def close_scorers():
+    """Stop the worker processes of every registered scorer."""
+    for scorer in SCORERS.values():
+        scorer.close()
@@ -0,0 +1,265 @@
+"""
+Storage for uploaded videos.
+
+Uploads are received into a staging file (see uploads.py) and handed to the
+storage backend once complete. Backends (VIDEO_STORAGE):
+
+    local  files under VIDEO_STORAGE_DIR; publishing is a rename from the
+           staging directory (on the same filesystem), so a video is either
+           absent or complete
+    s3     objects in S3_BUCKET_NAME at S3_ENDPOINT_URL (AWS S3, MinIO or any
+           S3-compatible service); publishing is one signed PUT whose
+           x-amz-content-sha256 the service checks against the bytes it received
+
+To try the s3 backend locally, run the stub server, which keeps objects in a
+directory and rejects PUTs whose content does not match their SHA-256:
+
+    python -m scripts.stub_s3 --port 9000 --dir /tmp/s3-stub &
+    VIDEO_STORAGE=s3 S3_ENDPOINT_URL=http://127.0.0.1:9000 S3_BUCKET_NAME=videos uvicorn app.main:app
+"""
+import datetime
+import hashlib
+import hmac
+import os
+from typing import Dict, Iterator, Optional
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+VIDEO_STORAGE = os.getenv("VIDEO_STORAGE", "local").lower()
+VIDEO_STORAGE_DIR = os.getenv(
+    "VIDEO_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "media")
+)
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "https://s3.amazonaws.com")
+S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "")
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
+AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
+S3_TIMEOUT_SECONDS = float(os.getenv("S3_TIMEOUT_SECONDS", "60"))
+
+# Bytes read from disk at a time when sending a file
+READ_BLOCK_BYTES = 1024 * 1024
+
+class StorageError(Exception):
+    """The storage backend refused or failed an operation."""
+
+def read_blocks(path: str, block_size: int = READ_BLOCK_BYTES) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                return
+            yield block
+
+def _fsync_directory(path: str):
+    if os.name == "posix":
+        descriptor = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+class LocalStorage:
+    """Videos as files in a directory."""
+
+    name = "local"
+
+    def __init__(self, root: str = VIDEO_STORAGE_DIR):
+        self.root = os.path.abspath(root)
+        self.published = 0
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise StorageError(f"Invalid storage key {key!r}")
+        return path
+
+    def publish(self, staged_path: str, key: str, sha256: str, content_type: str):
+        """Move the complete file at `staged_path` to `key`, durably and atomically."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(staged_path, "rb") as file:
+            os.fsync(file.fileno())
+        os.replace(staged_path, path)
+        _fsync_directory(os.path.dirname(path))
+        self.published += 1
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        """The file holding `key`, for serving it straight from disk."""
+        return self.path(key)
+
+    def status(self):
+        return {"backend": self.name, "root": self.root, "published": self.published}
+
+# AWS Signature Version 4 (https://docs.aws.amazon.com/IAM/latest/UserGuide/reference_aws-signing.html)
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+def _signature(secret_key: str, now: datetime.datetime, region: str, service: str, string_to_sign: str) -> str:
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), now.strftime("%Y%m%d"))
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    return hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+def sign_v4(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    payload_sha256: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    service: str = "s3",
+    now: Optional[datetime.datetime] = None
+) -> Dict[str, str]:
+    """`headers` plus the Host, date, payload hash and Authorization headers of a signed request."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{now.strftime('%Y%m%d')}/{region}/{service}/aws4_request"
+    parts = urlsplit(url)
+    signed = {
+        **{name.lower(): str(value).strip() for name, value in headers.items()},
+        "host": parts.netloc,
+        "x-amz-date": amz_date,
+        "x-amz-content-sha256": payload_sha256,
+    }
+    names = sorted(signed)
+    query = "&".join(sorted(
+        f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+        for name, _, value in (pair.partition("=") for pair in parts.query.split("&") if pair)
+    ))
+    canonical_request = "\n".join([
+        method,
+        parts.path or "/",  # Already URI-encoded
+        query,
+        "".join(f"{name}:{signed[name]}\n" for name in names),
+        ";".join(names),
+        payload_sha256,
+    ])
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    signature = _signature(secret_key, now, region, service, string_to_sign)
+    signed["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, SignedHeaders={';'.join(names)}, Signature={signature}"
+    )
+    return signed
+
+def presign_v4(
+    method: str,
+    url: str,
+    expires_seconds: int,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    service: str = "s3",
+    now: Optional[datetime.datetime] = None
+) -> str:
+    """`url` with the query string authentication of a request valid for `expires_seconds`."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{now.strftime('%Y%m%d')}/{region}/{service}/aws4_request"
+    parts = urlsplit(url)
+    query = "&".join(sorted(
+        f"{name}={quote(value, safe='-_.~')}"
+        for name, value in {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{access_key}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_seconds),
+            "X-Amz-SignedHeaders": "host",
+        }.items()
+    ))
+    canonical_request = "\n".join([method, parts.path or "/", query, f"host:{parts.netloc}\n", "host", "UNSIGNED-PAYLOAD"])
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    signature = _signature(secret_key, now, region, service, string_to_sign)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}?{query}&X-Amz-Signature={signature}"
+
+class S3Storage:
+    """Videos as objects in an S3-compatible bucket (path-style URLs)."""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        endpoint_url: str = S3_ENDPOINT_URL,
+        bucket: str = S3_BUCKET_NAME,
+        region: str = AWS_REGION,
+        access_key: str = AWS_ACCESS_KEY_ID,
+        secret_key: str = AWS_SECRET_ACCESS_KEY
+    ):
+        if not bucket:
+            raise StorageError("S3_BUCKET_NAME is required for VIDEO_STORAGE=s3")
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.published = 0
+        self._client = httpx.Client(timeout=S3_TIMEOUT_SECONDS)
+
+    def url(self, key: str) -> str:
+        return f"{self.endpoint_url}/{self.bucket}/{quote(key, safe='/-_.~')}"
+
+    def _request(self, method: str, key: str, headers: Optional[Dict[str, str]] = None, payload_sha256: Optional[str] = None, content=None):
+        url = self.url(key)
+        signed = sign_v4(
+            method, url, headers or {}, payload_sha256 or hashlib.sha256(b"").hexdigest(),
+            self.access_key, self.secret_key, self.region
+        )
+        try:
+            return self._client.request(method, url, headers=signed, content=content)
+        except httpx.HTTPError as exc:
+            raise StorageError(f"{method} {url} failed: {exc}") from exc
+
+    def publish(self, staged_path: str, key: str, sha256: str, content_type: str):
+        """PUT the complete file at `staged_path` as `key`, streamed from disk, then delete it."""
+        headers = {"content-type": content_type, "content-length": str(os.path.getsize(staged_path))}
+        response = self._request("PUT", key, headers, payload_sha256=sha256, content=read_blocks(staged_path))
+        if response.status_code >= 300:
+            raise StorageError(f"PUT {key} was refused with {response.status_code}: {response.text[:200]}")
+        os.remove(staged_path)
+        self.published += 1
+
+    def exists(self, key: str) -> bool:
+        return self._request("HEAD", key).status_code == 200
+
+    def delete(self, key: str):
+        response = self._request("DELETE", key)
+        if response.status_code >= 300 and response.status_code != 404:
+            raise StorageError(f"DELETE {key} was refused with {response.status_code}")
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    def presigned_url(self, key: str, expires_seconds: int) -> str:
+        """A URL that lets its holder GET `key` (with Range) straight from the bucket."""
+        return presign_v4("GET", self.url(key), expires_seconds, self.access_key, self.secret_key, self.region)
+
+    def status(self):
+        return {"backend": self.name, "bucket": self.bucket, "endpoint": self.endpoint_url, "published": self.published}
+
+def get_storage():
+    if VIDEO_STORAGE == "s3":
+        return S3Storage()
+    if VIDEO_STORAGE != "local":
+        raise StorageError(f"Unknown VIDEO_STORAGE {VIDEO_STORAGE!r}; use local or s3")
+    return LocalStorage()
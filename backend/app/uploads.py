@@ -0,0 +1,314 @@
+"""
+Resumable uploads of video answers.
+
+A candidate starts an upload with POST /interviews/{id}/video-upload-url and
+sends the recording in any number of chunks as it is produced:
+
+    PATCH /videos/uploads/{upload_id}     Upload-Offset: <bytes already sent>
+                                          Upload-Checksum: sha256 <base64> (optional, of this chunk)
+    HEAD  /videos/uploads/{upload_id}     -> Upload-Offset, to resume after a lost connection
+    POST  /videos/uploads/{upload_id}/complete   {"sha256": "<hex of the whole file>"} (optional)
+
+Each PATCH body is streamed into a staging file under UPLOAD_STAGING_DIR in
+writes of UPLOAD_WRITE_BUFFER_BYTES, so memory stays flat whatever the size of
+the video. The file is written and hashed on a worker thread, and a SHA-256 of
+everything received so far is carried from chunk to chunk (rebuilt from the
+staging file when another process took the previous chunk). A chunk with an
+Upload-Checksum that does not match, or that would exceed the upload's
+declared length or UPLOAD_MAX_BYTES, is cut off again and not counted. When the
+client disconnects mid-chunk, what arrived is kept and the client resumes from
+the offset HEAD reports. Completing checks the whole-file hash and publishes
+the file to video storage (storage.py) in one atomic step.
+
+Uploads not completed within UPLOAD_EXPIRY_HOURS are removed by:
+
+    python -m app.uploads prune
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import datetime
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from . import crud, storage
+from .database import SessionLocal
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; uploads are then only locked within the process
+    fcntl = None
+
+UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", os.path.join(storage.VIDEO_STORAGE_DIR, ".staging"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(2 * 1024 ** 3)))
+UPLOAD_EXPIRY_HOURS = float(os.getenv("UPLOAD_EXPIRY_HOURS", "24"))
+# Bytes collected from a request body before each write to the staging file
+UPLOAD_WRITE_BUFFER_BYTES = int(os.getenv("UPLOAD_WRITE_BUFFER_BYTES", str(1024 * 1024)))
+
+CHECKSUM_ALGORITHMS = ("sha256", "sha1", "md5")
+
+class UploadConflict(Exception):
+    """The chunk does not start at the upload's offset, or another request is writing to it."""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+class UploadChecksumMismatch(Exception):
+    """The received bytes do not match the checksum the client sent."""
+
+class UploadTooLarge(Exception):
+    """The chunk would take the upload past its declared length or UPLOAD_MAX_BYTES."""
+
+class ChunkResult(NamedTuple):
+    received_bytes: int  # Offset after the chunk
+    disconnected: bool  # The client went away mid-chunk; the bytes that arrived are kept
+
+def parse_checksum(header: str) -> Tuple[str, bytes]:
+    """Algorithm and digest of an Upload-Checksum header ("sha256 <base64 digest>")."""
+    algorithm, _, encoded = header.strip().partition(" ")
+    if algorithm.lower() not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"Unsupported checksum algorithm {algorithm!r}; use one of {', '.join(CHECKSUM_ALGORITHMS)}")
+    try:
+        return algorithm.lower(), base64.b64decode(encoded.strip(), validate=True)
+    except binascii.Error:
+        raise ValueError("The checksum must be base64 encoded")
+
+class UploadManager:
+    """Staging files of uploads in progress and the running hash of each."""
+
+    def __init__(self, staging_dir: str = UPLOAD_STAGING_DIR, video_storage=None, hash_cache_size: int = 1024):
+        self.staging_dir = staging_dir
+        self._storage = video_storage
+        self.hash_cache_size = hash_cache_size
+        self.bytes_received = 0
+        self.chunks = 0
+        self.disconnects = 0
+        self.checksum_failures = 0
+        self.rehashes = 0
+        self.completed = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Upload id -> (offset, SHA-256 of the bytes before it)
+        self._hashes: "OrderedDict[str, Tuple[int, hashlib._Hash]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self):
+        with self._lock:
+            if self._storage is None:
+                self._storage = storage.get_storage()
+            return self._storage
+
+    def staged_path(self, upload_id: str) -> str:
+        return os.path.join(self.staging_dir, f"{upload_id}.part")
+
+    @asynccontextmanager
+    async def writing(self, upload_id: str, offset: int = 0):
+        """Hold the upload for one request; raises UploadConflict if another request has it."""
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        if lock.locked():
+            raise UploadConflict("Another request is writing to this upload", offset)
+        async with lock:
+            try:
+                yield
+            finally:
+                if self._locks.get(upload_id) is lock:
+                    del self._locks[upload_id]
+
+    # Staging file operations; these block and run on worker threads
+    def _open(self, upload_id: str, committed: int, offset: int):
+        os.makedirs(self.staging_dir, exist_ok=True)
+        path = self.staged_path(upload_id)
+        file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                file.close()
+                raise UploadConflict("Another process is writing to this upload", offset)
+        # Bytes past the committed offset were never acknowledged; drop them
+        file.truncate(committed)
+        file.seek(committed)
+        return file
+
+    @staticmethod
+    def _write(file, data: bytearray, *hashes):
+        file.write(data)
+        for digest in hashes:
+            if digest is not None:
+                digest.update(data)
+
+    @staticmethod
+    def _rewind(file, offset: int):
+        file.truncate(offset)
+        file.seek(offset)
+
+    @staticmethod
+    def _sync(file):
+        file.flush()
+        os.fsync(file.fileno())
+
+    @staticmethod
+    def _hash_prefix(file, length: int):
+        digest = hashlib.sha256()
+        file.seek(0)
+        remaining = length
+        while remaining:
+            block = file.read(min(storage.READ_BLOCK_BYTES, remaining))
+            if not block:
+                raise ValueError("The staging file is shorter than the upload's offset")
+            digest.update(block)
+            remaining -= len(block)
+        return digest
+
+    async def _running_hash(self, upload_id: str, file, offset: int):
+        """A copy of the SHA-256 of the first `offset` bytes, rebuilt from the file if not at hand."""
+        with self._lock:
+            state = self._hashes.get(upload_id)
+        if state is not None and state[0] == offset:
+            return state[1].copy()
+        if offset == 0:
+            return hashlib.sha256()
+        self.rehashes += 1
+        digest = await run_in_threadpool(self._hash_prefix, file, offset)
+        file.seek(offset)
+        return digest
+
+    def _remember_hash(self, upload_id: str, offset: int, digest):
+        with self._lock:
+            self._hashes[upload_id] = (offset, digest)
+            self._hashes.move_to_end(upload_id)
+            while len(self._hashes) > self.hash_cache_size:
+                self._hashes.popitem(last=False)
+
+    def _forget(self, upload_id: str):
+        with self._lock:
+            self._hashes.pop(upload_id, None)
+
+    async def append(
+        self,
+        upload_id: str,
+        offset: int,
+        committed: int,
+        limit: int,
+        chunks: AsyncIterator[bytes],
+        checksum: Optional[str] = None
+    ) -> ChunkResult:
+        """
+        Write the chunk arriving in `chunks` at `offset`, which must equal the
+        `committed` offset. `limit` is the most bytes the upload may hold.
+        Returns the new offset, for the caller to commit.
+        """
+        if offset != committed:
+            raise UploadConflict(f"Expected the chunk at offset {committed}, not {offset}", committed)
+        expected = parse_checksum(checksum) if checksum else None
+        file = await run_in_threadpool(self._open, upload_id, committed, offset)
+        try:
+            running = await self._running_hash(upload_id, file, offset)
+            chunk_digest = hashlib.new(expected[0]) if expected else None
+            position, buffer, disconnected = offset, bytearray(), False
+            try:
+                async for piece in chunks:
+                    if position + len(buffer) + len(piece) > limit:
+                        raise UploadTooLarge(f"The upload may not exceed {limit} bytes")
+                    buffer += piece
+                    if len(buffer) >= UPLOAD_WRITE_BUFFER_BYTES:
+                        data, buffer = buffer, bytearray()
+                        await run_in_threadpool(self._write, file, data, running, chunk_digest)
+                        position += len(data)
+            except ClientDisconnect:
+                disconnected = True
+                self.disconnects += 1
+            except UploadTooLarge:
+                await run_in_threadpool(self._rewind, file, offset)
+                raise
+            if buffer:
+                await run_in_threadpool(self._write, file, buffer, running, chunk_digest)
+                position += len(buffer)
+            if expected is not None and (disconnected or chunk_digest.digest() != expected[1]):
+                # A chunk with a checksum counts only when all of it arrived intact
+                await run_in_threadpool(self._rewind, file, offset)
+                if disconnected:
+                    return ChunkResult(offset, True)
+                self.checksum_failures += 1
+                raise UploadChecksumMismatch(f"The chunk does not match its {expected[0]} checksum")
+            await run_in_threadpool(self._sync, file)
+        finally:
+            await run_in_threadpool(file.close)
+        self._remember_hash(upload_id, position, running)
+        self.chunks += 1
+        self.bytes_received += position - offset
+        return ChunkResult(position, disconnected)
+
+    async def complete(self, upload_id: str, received: int, key: str, content_type: str, expected_sha256: Optional[str] = None) -> str:
+        """
+        Publish the first `received` bytes of the upload to video storage as `key`.
+        Returns the hex SHA-256 of the video; raises UploadChecksumMismatch if it
+        differs from `expected_sha256`.
+        """
+        file = await run_in_threadpool(self._open, upload_id, received, received)
+        try:
+            sha256 = (await self._running_hash(upload_id, file, received)).hexdigest()
+            await run_in_threadpool(self._sync, file)
+        finally:
+            await run_in_threadpool(file.close)
+        if expected_sha256 is not None and expected_sha256.lower() != sha256:
+            self.checksum_failures += 1
+            raise UploadChecksumMismatch(f"The video's SHA-256 is {sha256}, not {expected_sha256}")
+        await run_in_threadpool(self.storage.publish, self.staged_path(upload_id), key, sha256, content_type)
+        self._forget(upload_id)
+        self.completed += 1
+        return sha256
+
+    def discard(self, upload_id: str):
+        """Delete the staging file of an abandoned upload."""
+        self._forget(upload_id)
+        try:
+            os.remove(self.staged_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def status(self):
+        return {
+            "in_progress": len(self._locks),
+            "chunks": self.chunks,
+            "bytes_received": self.bytes_received,
+            "disconnects": self.disconnects,
+            "checksum_failures": self.checksum_failures,
+            "rehashes": self.rehashes,
+            "completed": self.completed,
+            "storage": self.storage.status(),
+        }
+
+upload_manager = UploadManager()
+
+def storage_key(interview_id: int, upload_id: str, content_type: str) -> str:
+    extension = {"video/webm": "webm", "video/mp4": "mp4", "video/quicktime": "mov"}.get(content_type.split(";")[0].strip(), "bin")
+    return f"videos/{interview_id}/{upload_id}.{extension}"
+
+def prune(db, now: Optional[datetime.datetime] = None) -> int:
+    """Abort uploads past their expiry and delete their staging files; returns how many."""
+    expired = crud.abort_expired_video_uploads(db, now or datetime.datetime.now())
+    for upload_id in expired:
+        upload_manager.discard(upload_id)
+    return len(expired)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumable video uploads")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("prune", help="Remove uploads not completed in time")
+    parser.parse_args(argv)
+
+    with SessionLocal() as db:
+        print(f"Removed {prune(db)} expired uploads")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 import os
-import uuid
+import csv
+import codecs
+import json
+import re
+import base64
 import datetime
 import secrets
-from typing import Dict, Any, List, Optional
+from typing import BinaryIO, Dict, Any, Iterator, List, Optional, Sequence, TextIO, Tuple
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from . import models, schemas
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import async_crud, models, schemas
+from .playback import playback_url
 
 def validate_template(template: schemas.InterviewTemplateCreate) -> None:
     """Validate interview template data"""
@@ -18,7 +25,7 @@ def validate_template(template: schemas.InterviewTemplateCreate) -> None:
     
     # Check that MCQ questions have options
     for i, question in enumerate(template.questions):
-        if question.type == models.QuestionType.mcq and (not question.options or len(question.options) < 2):
+        if question.type == models.QuestionType.multiple_choice and (not question.options or len(question.options) < 2):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Multiple choice question at position {i+1} must have at least 2 options"
@@ -38,7 +45,36 @@ def validate_template(template: schemas.InterviewTemplateCreate) -> None:
                 detail=f"Video question at position {i+1} must have a time limit of at least 30 seconds"
             )
 
-def get_demo_user(email: str, db: Session) -> Optional[models.User]:
+def encode_cursor(row_id: int) -> str:
+    """Encode the id of the last row on a page as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(f"id:{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Decode a cursor produced by encode_cursor, rejecting anything else with a 400."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded.encode()).decode().partition(":")
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Split rows fetched with limit + 1 into the page itself and the cursor for the next one.
+    The next cursor is None on the last page.
+    """
+    page = list(rows[:limit])
+    next_cursor = encode_cursor(page[-1].id) if len(rows) > limit and page else None
+    return page, next_cursor
+
+async def get_demo_user(email: str, db: AsyncSession) -> Optional[models.User]:
     """
     Get a demo user without querying the database.
     For demonstration accounts (example.com emails), return a mock user object.
@@ -49,7 +85,7 @@ def get_demo_user(email: str, db: Session) -> Optional[models.User]:
     user_type = models.UserType.recruiter if "recruiter" in email else models.UserType.candidate
     
     # Check if user already exists in db
-    db_user = db.query(models.User).filter(models.User.email == email).first()
+    db_user = (await db.scalars(select(models.User).where(models.User.email == email))).first()
     if db_user:
         return db_user
     
@@ -58,70 +94,15 @@ def get_demo_user(email: str, db: Session) -> Optional[models.User]:
     last_name = "Recruiter" if user_type == models.UserType.recruiter else "Candidate"
     
     # For demo purposes, create this user in the database
-    db_user = models.User(
+    return await async_crud.create_user_with_hash(db, schemas.UserCreate(
         email=email,
-        hashed_password="$2b$12$demo_password_hash_for_development_only",  # Not a real hash
+        password="",
         first_name=first_name,
         last_name=last_name,
         user_type=user_type,
-        is_demo=True,
         company="Demo Company" if user_type == models.UserType.recruiter else None,
         position="HR Manager" if user_type == models.UserType.recruiter else "Software Engineer",
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return db_user
-
-def generate_upload_url(file_type: str = "video") -> Dict[str, Any]:
-    """
-    Generate a pre-signed URL for uploading a file.
-    In a production environment, this would integrate with S3 or similar.
-    For now, we just return a mock URL and file path.
-    """
-    # In a production environment, we would use AWS S3 or similar:
-    # Example implementation (commented out):
-    # import boto3
-    # from botocore.config import Config
-    # 
-    # s3_client = boto3.client(
-    #     's3',
-    #     config=Config(signature_version='s3v4'),
-    #     region_name=os.environ.get('AWS_REGION', 'us-east-1')
-    # )
-    # 
-    # bucket_name = os.environ.get('S3_BUCKET_NAME')
-    # file_key = f"{file_type}/{uuid.uuid4()}.{file_type}"
-    # 
-    # presigned_url = s3_client.generate_presigned_url(
-    #     'put_object',
-    #     Params={
-    #         'Bucket': bucket_name,
-    #         'Key': file_key,
-    #         'ContentType': f"{file_type}/{file_type}"
-    #     },
-    #     ExpiresIn=3600  # URL expires in 1 hour
-    # )
-    # 
-    # return {
-    #     "upload_url": presigned_url,
-    #     "file_path": f"s3://{bucket_name}/{file_key}",
-    #     "public_url": f"https://{bucket_name}.s3.amazonaws.com/{file_key}",
-    #     "expires_in": 3600
-    # }
-    
-    # For development, return a mock URL
-    mock_file_id = str(uuid.uuid4())
-    mock_file_path = f"/uploads/{file_type}/{mock_file_id}.{file_type}"
-    mock_upload_url = f"http://localhost:8000/mock-upload?path={mock_file_path}"
-    
-    return {
-        "upload_url": mock_upload_url,
-        "file_path": mock_file_path,
-        "public_url": f"http://localhost:8000/static{mock_file_path}",
-        "expires_in": 3600
-    }
+    ), "$2b$12$demo_password_hash_for_development_only")  # Not a real hash
 
 def format_interview_for_candidate(interview: models.Interview) -> Dict[str, Any]:
     """
@@ -141,8 +122,9 @@ def format_interview_for_candidate(interview: models.Interview) -> Dict[str, Any
         }
         
         # Only include options for MCQ questions
-        if q.type == models.QuestionType.mcq:
+        if q.type == models.QuestionType.multiple_choice:
             question_data["options"] = q.options
+            question_data["multiple_select"] = bool(q.multiple_select)
         
         questions.append(question_data)
     
@@ -155,7 +137,8 @@ def format_interview_for_candidate(interview: models.Interview) -> Dict[str, Any
                 "question_id": response.question_id,
                 "text_response": response.text_response,
                 "selected_option": response.selected_option,
-                "video_url": response.video_url if interview.status == models.InterviewStatus.completed else None
+                "selected_options": response.selected_options,
+                "video_url": playback_url(response.video_url) if interview.status == models.InterviewStatus.completed else None
             }
             responses[response.question_id] = response_data
     
@@ -182,6 +165,12 @@ def format_interview_for_recruiter(interview: models.Interview) -> Dict[str, Any
     data["candidate_name"] = interview.candidate_name
     data["candidate_email"] = interview.candidate_email
     
+    # Add answer keys, which the candidate view leaves out
+    answer_keys = {q.id: q.correct_options for q in interview.template.questions if q.correct_options}
+    for question in data["questions"]:
+        if question["id"] in answer_keys:
+            question["correct_options"] = answer_keys[question["id"]]
+    
     # Add analysis information if available and interview is completed
     if interview.status == models.InterviewStatus.completed and hasattr(interview, 'analysis') and interview.analysis:
         data["analysis"] = {
@@ -193,8 +182,9 @@ def format_interview_for_recruiter(interview: models.Interview) -> Dict[str, Any
         }
         
         # Add individual response analyses
+        db_responses = {r.question_id: r for r in interview.responses}
         for question_id, response in data["responses"].items():
-            db_response = next((r for r in interview.responses if r.question_id == question_id), None)
+            db_response = db_responses.get(question_id)
             if db_response and hasattr(db_response, 'analysis') and db_response.analysis:
                 response["analysis"] = {
                     "score": db_response.analysis.score,
@@ -207,53 +197,138 @@ def format_interview_for_recruiter(interview: models.Interview) -> Dict[str, Any
     
     return data
 
-def send_interview_invitation(interview: models.Interview) -> Dict[str, Any]:
+# Bulk interview uploads
+BULK_INTERVIEW_FORMATS = {
+    ".csv": "csv", "text/csv": "csv",
+    ".json": "json", "application/json": "json",
+    ".ndjson": "ndjson", ".jsonl": "ndjson", "application/x-ndjson": "ndjson",
+}
+
+def bulk_interview_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """csv, json or ndjson, from the upload's file extension or else its content type."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return BULK_INTERVIEW_FORMATS.get(extension) or BULK_INTERVIEW_FORMATS.get((content_type or "").split(";")[0].strip())
+
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+JSON_DELIMITERS = {",", "]", " ", "\t", "\n", "\r"}
+
+def iter_json_array(text: TextIO, chunk_size: int = 65536) -> Iterator[Any]:
     """
-    Send an interview invitation email to the candidate.
-    In a production environment, this would integrate with an email service.
-    For now, we just return mock data.
+    Items of the JSON array in `text`, decoded one at a time as the file is read, so
+    memory holds one chunk and one item rather than the whole document.
+    Raises ValueError for anything but a well-formed array.
     """
-    # In a production environment, we would use an email service like SendGrid:
-    # Example implementation (commented out):
-    # import sendgrid
-    # from sendgrid.helpers.mail import Mail, Email, To, Content
-    # 
-    # sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
-    # 
-    # from_email = Email(os.environ.get('FROM_EMAIL', 'interviews@example.com'))
-    # to_email = To(interview.candidate_email)
-    # subject = f"Interview Invitation: {interview.template.title}"
-    # 
-    # interview_link = f"{os.environ.get('FRONTEND_URL')}/interview/{interview.id}"
-    # 
-    # html_content = f'''
-    # <p>Hello {interview.candidate_name},</p>
-    # <p>You have been invited to complete an interview for {interview.template.title}.</p>
-    # <p>Please complete the interview by {interview.due_date.strftime('%B %d, %Y')}.</p>
-    # <p><a href="{interview_link}">Click here to start the interview</a></p>
-    # <p>Thank you,<br>
-    # The AI Interview Assistant Team</p>
-    # '''
-    # 
-    # mail = Mail(from_email, to_email, subject, html_content=html_content)
-    # 
-    # response = sg.client.mail.send.post(request_body=mail.get())
-    # 
-    # return {
-    #     "success": response.status_code == 202,
-    #     "message": "Email sent successfully" if response.status_code == 202 else "Failed to send email"
-    # }
-    
-    # For development, return a mock response
-    interview_link = f"http://localhost:3000/interview/{interview.id}"
-    
-    return {
-        "success": True,
-        "message": "Email would be sent in production",
-        "details": {
-            "to": interview.candidate_email,
-            "subject": f"Interview Invitation: {interview.template.title}",
-            "interview_link": interview_link,
-            "due_date": interview.due_date
-        }
-    } 
\ No newline at end of file
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def read_more():
+        nonlocal buffer, position, eof
+        chunk = text.read(chunk_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+    def peek() -> str:
+        # The next character after whitespace, or "" at the end of the file
+        nonlocal position
+        while True:
+            position = JSON_WHITESPACE.match(buffer, position).end()
+            if position < len(buffer) or eof:
+                return buffer[position:position + 1]
+            read_more()
+
+    if peek() != "[":
+        raise ValueError("The JSON upload must be an array of objects")
+    position += 1
+    if peek() == "]":
+        position += 1
+    else:
+        while True:
+            if not peek():
+                raise ValueError("The JSON upload ends inside the array")
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    # A value cut off by the end of the chunk (e.g. "12" of "12.5e3") may decode
+                    # early, so it only counts once followed by a delimiter
+                    if eof or buffer[end:end + 1] in JSON_DELIMITERS:
+                        break
+                except json.JSONDecodeError as exc:
+                    if eof:
+                        raise ValueError(f"Invalid JSON: {exc}") from exc
+                read_more()
+            position = end
+            yield item
+            separator = peek()
+            position += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError("Invalid JSON: expected ',' or ']' after an array item")
+    if peek():
+        raise ValueError("Invalid JSON: data after the array")
+
+def iter_bulk_interview_rows(file: BinaryIO, kind: str) -> Iterator[Any]:
+    """
+    Rows of an uploaded file: CSV with a header row, a JSON array of objects, or one
+    JSON object per line, read incrementally. Raises ValueError if the file as a
+    whole cannot be read.
+    """
+    # A codecs reader rather than TextIOWrapper, which needs more of the io interface
+    # than the SpooledTemporaryFile behind an UploadFile offers before Python 3.11
+    text = codecs.getreader("utf-8-sig")(file)
+    if kind == "csv":
+        reader = csv.DictReader(text)
+        if not reader.fieldnames or "candidate_email" not in reader.fieldnames:
+            raise ValueError("The CSV header must include candidate_email and candidate_name")
+        try:
+            yield from reader
+        except csv.Error as exc:
+            raise ValueError(f"Line {reader.line_num}: {exc}") from exc
+    elif kind == "ndjson":
+        for line in text:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+    else:
+        yield from iter_json_array(text)
+
+def parse_bulk_interviews(
+    file: BinaryIO,
+    kind: str,
+    template_id: int,
+    due_date: Optional[datetime.datetime] = None,
+    max_rows: Optional[int] = None
+) -> Tuple[List[Tuple[int, schemas.InterviewCreate]], List[schemas.BulkInterviewRowResult]]:
+    """
+    Validate the rows of a bulk upload as interviews from `template_id`, with
+    `due_date` for rows that have none. Returns the valid interviews with their row
+    numbers and a result for each invalid row. Raises ValueError for unreadable
+    files and uploads of more than `max_rows` rows.
+    """
+    interviews, invalid = [], []
+    for row_number, row in enumerate(iter_bulk_interview_rows(file, kind), start=1):
+        if max_rows is not None and row_number > max_rows:
+            raise ValueError(f"Uploads are limited to {max_rows} rows")
+        if not isinstance(row, dict):
+            invalid.append(schemas.BulkInterviewRowResult(row=row_number, status="invalid", error="Row is not an object"))
+            continue
+        # Empty CSV cells count as missing
+        fields = {key: value for key, value in row.items() if value not in ("", None)}
+        fields.setdefault("due_date", due_date)
+        try:
+            interviews.append((row_number, schemas.InterviewCreate(**{
+                "candidate_email": fields.get("candidate_email"),
+                "candidate_name": fields.get("candidate_name"),
+                "due_date": fields.get("due_date"),
+                "template_id": template_id
+            })))
+        except ValidationError as exc:
+            invalid.append(schemas.BulkInterviewRowResult(
+                row=row_number,
+                candidate_email=str(fields.get("candidate_email") or "") or None,
+                status="invalid",
+                error="; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+            ))
+    return interviews, invalid
@@ -0,0 +1,135 @@
+"""Initial schema, as previously created by Base.metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+user_type = sa.Enum("recruiter", "candidate", "admin", name="usertype")
+interview_status = sa.Enum("pending", "in_progress", "completed", "expired", name="interviewstatus")
+question_type = sa.Enum("text", "multiple_choice", "video", name="questiontype")
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("first_name", sa.String()),
+        sa.Column("last_name", sa.String()),
+        sa.Column("company", sa.String(), nullable=True),
+        sa.Column("position", sa.String(), nullable=True),
+        sa.Column("user_type", user_type),
+        sa.Column("profile_image", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("oauth_provider", sa.String(), nullable=True),
+        sa.Column("oauth_provider_id", sa.String(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "interview_templates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String()),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("creator_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_interview_templates_id", "interview_templates", ["id"])
+    op.create_index("ix_interview_templates_title", "interview_templates", ["title"])
+
+    op.create_table(
+        "questions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("template_id", sa.Integer(), sa.ForeignKey("interview_templates.id")),
+        sa.Column("text", sa.Text()),
+        sa.Column("type", question_type),
+        sa.Column("options", sa.JSON(), nullable=True),
+        sa.Column("time_limit", sa.Integer(), nullable=True),
+        sa.Column("required", sa.Boolean()),
+        sa.Column("order", sa.Integer()),
+    )
+    op.create_index("ix_questions_id", "questions", ["id"])
+
+    op.create_table(
+        "interviews",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("template_id", sa.Integer(), sa.ForeignKey("interview_templates.id")),
+        sa.Column("recruiter_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("candidate_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("candidate_email", sa.String()),
+        sa.Column("candidate_name", sa.String()),
+        sa.Column("status", interview_status),
+        sa.Column("due_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_interviews_id", "interviews", ["id"])
+
+    op.create_table(
+        "responses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("interview_id", sa.Integer(), sa.ForeignKey("interviews.id")),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id")),
+        sa.Column("text_response", sa.Text(), nullable=True),
+        sa.Column("selected_option", sa.String(), nullable=True),
+        sa.Column("video_url", sa.String(), nullable=True),
+        sa.Column("video_transcript", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_responses_id", "responses", ["id"])
+
+    op.create_table(
+        "response_analyses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("response_id", sa.Integer(), sa.ForeignKey("responses.id")),
+        sa.Column("score", sa.Float()),
+        sa.Column("strengths", sa.JSON(), nullable=True),
+        sa.Column("weaknesses", sa.JSON(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("keywords", sa.JSON(), nullable=True),
+        sa.Column("sentiment", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_response_analyses_id", "response_analyses", ["id"])
+
+    op.create_table(
+        "interview_analyses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("interview_id", sa.Integer(), sa.ForeignKey("interviews.id")),
+        sa.Column("overall_score", sa.Float()),
+        sa.Column("recommendation", sa.Text(), nullable=True),
+        sa.Column("strengths", sa.JSON(), nullable=True),
+        sa.Column("weaknesses", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_interview_analyses_id", "interview_analyses", ["id"])
+
+
+def downgrade():
+    op.drop_table("interview_analyses")
+    op.drop_table("response_analyses")
+    op.drop_table("responses")
+    op.drop_table("interviews")
+    op.drop_table("questions")
+    op.drop_table("interview_templates")
+    op.drop_table("users")
+    bind = op.get_bind()
+    for enum_type in (question_type, interview_status, user_type):
+        enum_type.drop(bind, checkfirst=True)
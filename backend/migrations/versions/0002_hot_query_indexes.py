@@ -0,0 +1,43 @@
+"""Indexes for the hot listing, dashboard and analysis lookups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Recruiter listing (keyset on created_at, id) and dashboard counts by status
+    ("ix_interviews_recruiter_created", "interviews", ["recruiter_id", "created_at", "id"]),
+    ("ix_interviews_recruiter_status_created", "interviews", ["recruiter_id", "status", "created_at"]),
+    # Candidate listings by email and by account
+    ("ix_interviews_candidate_email_created", "interviews", ["candidate_email", "created_at", "id"]),
+    ("ix_interviews_candidate_created", "interviews", ["candidate_id", "created_at", "id"]),
+    ("ix_interviews_template_id", "interviews", ["template_id"]),
+    # Template listing per creator
+    ("ix_interview_templates_creator_active_created", "interview_templates", ["creator_id", "is_active", "created_at", "id"]),
+    ("ix_questions_template_id", "questions", ["template_id"]),
+    # Responses of an interview, and answered-question checks on submit
+    ("ix_responses_interview_question", "responses", ["interview_id", "question_id"]),
+    ("ix_responses_question_id", "responses", ["question_id"]),
+    ("ix_response_analyses_response_id", "response_analyses", ["response_id"]),
+    ("ix_interview_analyses_interview_id", "interview_analyses", ["interview_id"]),
+    # OAuth and Clerk account lookups
+    ("ix_users_oauth_provider_id", "users", ["oauth_provider", "oauth_provider_id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,49 @@
+"""Per-recruiter daily analytics rollup
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COUNTERS = [
+    ("created_count", sa.Integer()),
+    ("created_completed_count", sa.Integer()),
+    ("started_count", sa.Integer()),
+    ("completed_count", sa.Integer()),
+    ("timed_completed_count", sa.Integer()),
+    ("completion_minutes", sa.Float()),
+    ("scored_count", sa.Integer()),
+    ("score_sum", sa.Float()),
+    ("score_bucket_0", sa.Integer()),
+    ("score_bucket_1", sa.Integer()),
+    ("score_bucket_2", sa.Integer()),
+    ("score_bucket_3", sa.Integer()),
+    ("score_bucket_4", sa.Integer()),
+]
+
+
+def upgrade():
+    op.create_table(
+        "recruiter_daily_stats",
+        sa.Column("recruiter_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("template_id", sa.Integer(), sa.ForeignKey("interview_templates.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        *[sa.Column(name, type_, nullable=False, server_default="0") for name, type_ in COUNTERS],
+    )
+    op.create_index("ix_recruiter_daily_stats_recruiter_day", "recruiter_daily_stats", ["recruiter_id", "day"])
+    # Distinct-candidate counts for the dashboard can then be answered from the index alone
+    op.create_index("ix_interviews_recruiter_candidate_email", "interviews", ["recruiter_id", "candidate_email"])
+
+
+def downgrade():
+    op.drop_index("ix_interviews_recruiter_candidate_email", table_name="interviews")
+    op.drop_index("ix_recruiter_daily_stats_recruiter_day", table_name="recruiter_daily_stats")
+    op.drop_table("recruiter_daily_stats")
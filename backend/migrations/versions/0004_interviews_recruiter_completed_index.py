@@ -0,0 +1,21 @@
+"""Index for score lookups by completion date
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_interviews_recruiter_completed", "interviews", ["recruiter_id", "completed_at"])
+
+
+def downgrade():
+    op.drop_index("ix_interviews_recruiter_completed", table_name="interviews")
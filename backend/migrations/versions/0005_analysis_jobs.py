@@ -0,0 +1,41 @@
+"""Queue for background interview analysis
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+job_status = sa.Enum("pending", "running", "done", "failed", name="jobstatus")
+
+
+def upgrade():
+    op.create_table(
+        "analysis_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("interview_id", sa.Integer(), sa.ForeignKey("interviews.id"), nullable=False),
+        sa.Column("status", job_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_analysis_jobs_id", "analysis_jobs", ["id"])
+    op.create_index("ix_analysis_jobs_status_id", "analysis_jobs", ["status", "id"])
+    op.create_index("ix_analysis_jobs_interview_id", "analysis_jobs", ["interview_id", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_analysis_jobs_interview_id", table_name="analysis_jobs")
+    op.drop_index("ix_analysis_jobs_status_id", table_name="analysis_jobs")
+    op.drop_index("ix_analysis_jobs_id", table_name="analysis_jobs")
+    op.drop_table("analysis_jobs")
+    job_status.drop(op.get_bind(), checkfirst=True)
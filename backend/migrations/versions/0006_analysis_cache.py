@@ -0,0 +1,30 @@
+"""Content-addressed cache of response analyses
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "analysis_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("scorer_version", sa.String(100), nullable=False),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_analysis_cache_scorer_version", "analysis_cache", ["scorer_version"])
+
+
+def downgrade():
+    op.drop_index("ix_analysis_cache_scorer_version", table_name="analysis_cache")
+    op.drop_table("analysis_cache")
@@ -0,0 +1,28 @@
+"""Answer keys and multiple selection for multiple choice questions
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("questions", sa.Column("multiple_select", sa.Boolean(), nullable=True, server_default=sa.false()))
+    op.add_column("questions", sa.Column("correct_options", sa.JSON(), nullable=True))
+    op.add_column("responses", sa.Column("selected_options", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("responses") as batch_op:
+        batch_op.drop_column("selected_options")
+    with op.batch_alter_table("questions") as batch_op:
+        batch_op.drop_column("correct_options")
+        batch_op.drop_column("multiple_select")
@@ -0,0 +1,28 @@
+"""Scorer selection per template, reference answers and rubrics per question
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("interview_templates", sa.Column("scorer", sa.String(50), nullable=True))
+    op.add_column("questions", sa.Column("reference_answer", sa.Text(), nullable=True))
+    op.add_column("questions", sa.Column("rubric", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("questions") as batch_op:
+        batch_op.drop_column("rubric")
+        batch_op.drop_column("reference_answer")
+    with op.batch_alter_table("interview_templates") as batch_op:
+        batch_op.drop_column("scorer")
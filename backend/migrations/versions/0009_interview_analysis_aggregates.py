@@ -0,0 +1,32 @@
+"""Running response score aggregates and summary input key on interview analyses
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left empty on existing rows; crud.analyze_interview fills them the next time it runs
+    op.add_column("interview_analyses", sa.Column("score_sum", sa.Float(), nullable=True))
+    op.add_column("interview_analyses", sa.Column("score_count", sa.Integer(), nullable=True))
+    op.add_column("interview_analyses", sa.Column("strength_counts", sa.JSON(), nullable=True))
+    op.add_column("interview_analyses", sa.Column("weakness_counts", sa.JSON(), nullable=True))
+    op.add_column("interview_analyses", sa.Column("summary_key", sa.String(64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("interview_analyses") as batch_op:
+        batch_op.drop_column("summary_key")
+        batch_op.drop_column("weakness_counts")
+        batch_op.drop_column("strength_counts")
+        batch_op.drop_column("score_count")
+        batch_op.drop_column("score_sum")
@@ -0,0 +1,50 @@
+"""Queue of received webhook events
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+webhook_event_status = sa.Enum("pending", "processing", "processed", "dead", name="webhookeventstatus")
+
+
+def upgrade():
+    op.create_table(
+        "webhook_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("source", sa.String(20), nullable=False),
+        sa.Column("delivery_id", sa.String(), nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("subject", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", webhook_event_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("claim_token", sa.String(32), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("source", "delivery_id", name="uq_webhook_events_delivery"),
+    )
+    op.create_index("ix_webhook_events_id", "webhook_events", ["id"])
+    op.create_index("ix_webhook_events_status_id", "webhook_events", ["status", "id"])
+    op.create_index("ix_webhook_events_subject", "webhook_events", ["source", "subject"])
+    op.create_index("ix_webhook_events_claim_token", "webhook_events", ["claim_token"])
+
+
+def downgrade():
+    op.drop_index("ix_webhook_events_claim_token", table_name="webhook_events")
+    op.drop_index("ix_webhook_events_subject", table_name="webhook_events")
+    op.drop_index("ix_webhook_events_status_id", table_name="webhook_events")
+    op.drop_index("ix_webhook_events_id", table_name="webhook_events")
+    op.drop_table("webhook_events")
+    webhook_event_status.drop(op.get_bind(), checkfirst=True)
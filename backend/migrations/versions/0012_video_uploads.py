@@ -0,0 +1,45 @@
+"""Resumable video uploads
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+video_upload_status = sa.Enum("uploading", "complete", "aborted", name="videouploadstatus")
+
+
+def upgrade():
+    op.create_table(
+        "video_uploads",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("interview_id", sa.Integer(), sa.ForeignKey("interviews.id"), nullable=False),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id"), nullable=True),
+        sa.Column("uploader_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content_type", sa.String(100), nullable=False),
+        sa.Column("total_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("received_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("sha256", sa.String(64), nullable=True),
+        sa.Column("storage_key", sa.String(), nullable=True),
+        sa.Column("status", video_upload_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_video_uploads_interview_id", "video_uploads", ["interview_id"])
+    op.create_index("ix_video_uploads_status_expires_at", "video_uploads", ["status", "expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_video_uploads_status_expires_at", table_name="video_uploads")
+    op.drop_index("ix_video_uploads_interview_id", table_name="video_uploads")
+    op.drop_table("video_uploads")
+    video_upload_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,24 @@
+"""Heartbeat on running analysis jobs
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Empty on existing rows; their lease runs from started_at as before
+    op.add_column("analysis_jobs", sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("analysis_jobs") as batch_op:
+        batch_op.drop_column("heartbeat_at")
@@ -0,0 +1,33 @@
+"""Apply webhook events in the order they happened
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("webhook_events", sa.Column("occurred_at", sa.DateTime(), nullable=True))
+    # Events already queued keep their arrival order
+    op.execute("UPDATE webhook_events SET occurred_at = received_at")
+    op.drop_index("ix_webhook_events_status_id", table_name="webhook_events")
+    op.create_index("ix_webhook_events_status_occurred_at", "webhook_events", ["status", "occurred_at", "id"])
+    # Empty for existing users: the next event for them applies
+    op.add_column("users", sa.Column("oauth_synced_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("oauth_synced_at")
+    op.drop_index("ix_webhook_events_status_occurred_at", table_name="webhook_events")
+    op.create_index("ix_webhook_events_status_id", "webhook_events", ["status", "id"])
+    with op.batch_alter_table("webhook_events") as batch_op:
+        batch_op.drop_column("occurred_at")
@@ -0,0 +1,62 @@
+"""
+Wall time of analyzing one interview (every answer, then the overall analysis)
+in each ANALYSIS_MODE, against the local model stub (scripts/stub_model.py),
+which is started here. Run from backend/:
+
+    python -m scripts.bench_analysis --answers 15 --latency 0.4 --per-answer 0.05
+"""
+import argparse
+import os
+import time
+
+from scripts import stub_model
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the analysis modes against a local model stub")
+    parser.add_argument("--answers", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.4, help="Seconds per stub completion")
+    parser.add_argument("--per-answer", type=float, default=0.05, help="Extra stub seconds per answer of a batch call")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    stub, base_url = stub_model.spawn("--latency", str(args.latency), "--per-answer", str(args.per_answer))
+    # The model path is only taken outside development and with a key; the stub ignores it
+    os.environ.update({
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_KEY": "stub",
+        "APP_ENV": "production",
+        "MODEL_REQUESTS_PER_MINUTE": "0",
+        "MODEL_TOKENS_PER_MINUTE": "0",
+    })
+    from app import ai_engine
+    from app.model_client import model_client
+
+    items = [
+        {
+            "question_type": "text",
+            "question_text": f"Question {index}: describe a system you designed and its trade-offs.",
+            "response_text": "I designed an event pipeline and traded latency for throughput by batching writes.",
+        }
+        for index in range(args.answers)
+    ]
+    try:
+        print(f"{args.answers} answers, stub latency {args.latency}s (+{args.per_answer}s per batched answer), "
+              f"concurrency {ai_engine.ANALYSIS_CONCURRENCY}")
+        for mode in ai_engine.ANALYSIS_MODES:
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                results = ai_engine.analyze_responses(items, mode=mode)
+                ai_engine.analyze_full_interview({
+                    "candidate_name": "Candidate",
+                    "responses": [dict(item, **result) for item, result in zip(items, results)],
+                })
+                timings.append(time.perf_counter() - started)
+            print(f"{mode:>10}: {min(timings):6.2f} s (best of {args.runs})")
+    finally:
+        model_client.close()
+        stub.terminate()
+        stub.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Applying a burst of Clerk webhook events (app/clerk_events.py) like a bulk
+import: each user created, then updated --updates times right away, with every
+delivery sent twice. The burst is stored in a scratch SQLite database and
+applied one event at a time and in batches of --batch-size. Run from backend/:
+
+    python -m scripts.bench_clerk_events --users 500 --updates 3
+"""
+import argparse
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.clerk_events import SOURCE, WEBHOOK_BATCH_SIZE, ClerkEventConsumer, event_subject, event_timestamp
+
+def bench(users: int, updates: int, batch_size: int):
+    started_at = int(time.time() * 1000)
+    for size in (1, batch_size):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{directory}/bench.db", connect_args={"check_same_thread": False})
+            models.Base.metadata.create_all(engine)
+            factory = sessionmaker(bind=engine)
+            duplicates = 0
+            with factory() as db:
+                for user in range(users):
+                    for round_ in range(updates + 1):
+                        event = {
+                            "type": "user.created" if round_ == 0 else "user.updated",
+                            "data": {
+                                "id": f"user_{user}",
+                                "first_name": f"First {round_}",
+                                "last_name": "Last",
+                                "primary_email_address_id": "email_1",
+                                "email_addresses": [{"id": "email_1", "email_address": f"user{user}@example.com"}],
+                                "updated_at": started_at + round_,
+                            },
+                        }
+                        for _ in range(2):
+                            if not crud.record_webhook_event(
+                                db, SOURCE, f"msg_{round_}_{user}", event["type"], event_subject(event), event, event_timestamp(event)
+                            ):
+                                duplicates += 1
+            consumer = ClerkEventConsumer(consumers=0, session_factory=factory)
+            started = time.perf_counter()
+            while consumer.run_next(batch_size=size):
+                pass
+            elapsed = time.perf_counter() - started
+            status = consumer.status()
+            print(
+                f"batch size {size:4d}: {status['applied']} events in {elapsed:6.2f}s "
+                f"({status['applied'] / elapsed:7.1f}/s), {status['user_writes']} user writes, "
+                f"{duplicates} redeliveries dropped"
+            )
+            engine.dispose()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure applying a burst of Clerk events in a scratch database")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--updates", type=int, default=3, help="Updates per user after its creation")
+    parser.add_argument("--batch-size", type=int, default=WEBHOOK_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    bench(args.users, args.updates, args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+SMTP delivery throughput of the email sender's transport (app/mailer.py) against
+SMTP_HOST: pooled and pipelined, pooled without pipelining, and a connection per
+email. Point it at the local sink (scripts/smtp_sink.py) with some latency to
+see the round trips saved. Run from backend/:
+
+    python -m scripts.smtp_sink --port 1025 --latency 0.02 &
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_SECURITY=none python -m scripts.bench_mailer --emails 1000
+"""
+import argparse
+import statistics
+import time
+
+from app import emails
+from app.mailer import EMAIL_BATCH_SIZE, SMTP_HOST, SMTP_PORT, SMTPTransport, build_message
+
+def bench(emails_count: int, batch_size: int):
+    """Deliver rendered invitations to SMTP_HOST with and without pipelining and pooled connections."""
+    context = emails.invitation(1, "candidate@example.com", "Candidate", "Backend Engineer")
+    message = build_message(1, context["template"], context["recipient"], context["context"])
+    batches = [
+        [message._replace(id=index) for index in range(start, min(start + batch_size, emails_count))]
+        for start in range(0, emails_count, batch_size)
+    ]
+
+    def run(label: str, transport: SMTPTransport, per_message: bool):
+        latencies = []
+        started = time.perf_counter()
+        for batch in batches:
+            for chunk in ([[message] for message in batch] if per_message else [batch]):
+                chunk_started = time.perf_counter()
+                results = transport.deliver(chunk)
+                if per_message:
+                    transport.close()
+                latencies.append(time.perf_counter() - chunk_started)
+                assert all(error is None for error in results.values()), results
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:>30}: {emails_count / elapsed:7.1f} emails/s, "
+            f"{statistics.median(latencies) * 1000:6.1f} ms per {'email' if per_message else 'batch'}, "
+            f"{transport.connections_opened} connections"
+        )
+        transport.close()
+
+    class UnpipelinedTransport(SMTPTransport):
+        def _send(self, connection, message, pipelining):
+            super()._send(connection, message, False)
+
+    print(f"{emails_count} emails to {SMTP_HOST}:{SMTP_PORT} in batches of {batch_size}")
+    run("pooled, pipelined", SMTPTransport(), per_message=False)
+    run("pooled, not pipelined", UnpipelinedTransport(), per_message=False)
+    run("connection per email", UnpipelinedTransport(), per_message=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure SMTP delivery to SMTP_HOST")
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=EMAIL_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    bench(args.emails, args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput and latency of model calls over the shared pooled client
+(app/model_client.py) versus a new client per call, against the local model
+stub (scripts/stub_model.py), which is started here. Run from backend/:
+
+    python -m scripts.bench_model_client --analyses 500 --concurrency 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from scripts import stub_model
+
+ITEM = {
+    "question_type": "text",
+    "question_text": "Describe a system you designed and the trade-offs you made.",
+    "response_text": "I designed an event pipeline and traded latency for throughput by batching writes.",
+}
+
+async def bench(analyses: int, concurrency: int, shared: bool):
+    from app import ai_engine
+    from app.model_client import model_client
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def analyze():
+        async with semaphore:
+            started = time.perf_counter()
+            if shared:
+                await ai_engine._analyze_one(model_client.client, ITEM)
+            else:
+                async with httpx.AsyncClient(base_url=model_client.base_url, timeout=model_client.timeout) as client:
+                    await ai_engine._analyze_one(client, ITEM)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(analyze() for _ in range(analyses)))
+    elapsed = time.perf_counter() - started
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{'shared' if shared else 'client per call':>16}: {analyses / elapsed:7.1f} analyses/s, "
+        f"p50 {percentiles[49] * 1000:6.1f} ms, p99 {percentiles[98] * 1000:6.1f} ms"
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the model API client against a local model stub")
+    parser.add_argument("--analyses", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per stub completion")
+    args = parser.parse_args(argv)
+
+    stub, base_url = stub_model.spawn("--latency", str(args.latency))
+    os.environ.update({
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_KEY": "stub",
+        "APP_ENV": "production",
+        "MODEL_REQUESTS_PER_MINUTE": "0",
+        "MODEL_TOKENS_PER_MINUTE": "0",
+    })
+    from app.model_client import http2_available, model_client
+
+    print(f"{args.analyses} analyses against {base_url}, {args.concurrency} in flight, http2={http2_available()}")
+    try:
+        for shared in (True, False):
+            model_client.run(bench(args.analyses, args.concurrency, shared))
+    finally:
+        model_client.close()
+        stub.terminate()
+        stub.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Latency of the API under concurrent mixed load: p50/p99 of light requests
+(GET /auth/me and the recruiter's interview listing) on their own, then with
+heavy ones (a year of daily analytics series) mixed in. A route that blocks the
+event loop shows up as light requests waiting behind the heavy ones.
+
+Starts uvicorn on a temporary SQLite database seeded with --interviews
+completed interviews. Run from backend/:
+
+    python -m scripts.bench_p99 --interviews 20000 --clients 10 --seconds 20
+
+Set DATABASE_URL to a scratch PostgreSQL database to measure there instead; it
+is migrated and seeded, not cleaned up.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def seed(recruiter_email: str, interviews: int):
+    """Completed, analyzed interviews spread over the last year, and the rollup built from them."""
+    from app import database, models, rollups
+
+    with database.SessionLocal() as db:
+        recruiter = db.query(models.User).filter(models.User.email == recruiter_email).one()
+        templates = []
+        for index in range(10):
+            template = models.InterviewTemplate(title=f"Template {index}", creator_id=recruiter.id)
+            db.add(template)
+            templates.append(template)
+        db.flush()
+        now = datetime.datetime.now()
+        for start in range(0, interviews, 1000):
+            batch = []
+            for _ in range(start, min(start + 1000, interviews)):
+                completed_at = now - datetime.timedelta(minutes=random.randrange(365 * 24 * 60))
+                batch.append(models.Interview(
+                    template_id=random.choice(templates).id,
+                    recruiter_id=recruiter.id,
+                    candidate_email=f"candidate-{random.randrange(interviews)}@corp.io",
+                    candidate_name="Candidate",
+                    status=models.InterviewStatus.completed,
+                    created_at=completed_at - datetime.timedelta(days=1),
+                    started_at=completed_at - datetime.timedelta(minutes=30),
+                    completed_at=completed_at,
+                    analysis=models.InterviewAnalysis(overall_score=random.uniform(0, 5), strengths=[], weaknesses=[])
+                ))
+            db.add_all(batch)
+            db.commit()
+        rollups.rebuild(db, recruiter_id=recruiter.id)
+
+async def load(base_url: str, headers, clients: int, seconds: float, heavy_share: float):
+    """Run `clients` closed-loop clients for `seconds`; returns latencies per request kind."""
+    today = datetime.date.today()
+    heavy_params = {"start_date": (today - datetime.timedelta(days=364)).isoformat(), "end_date": today.isoformat()}
+    light = [("/auth/me", None), ("/interviews/recruiter", {"limit": 20})]
+    latencies = {"light": [], "heavy": []}
+    deadline = time.monotonic() + seconds
+
+    async def client(http):
+        while time.monotonic() < deadline:
+            if random.random() < heavy_share:
+                kind, (path, params) = "heavy", ("/analytics/recruiter/series", heavy_params)
+            else:
+                kind, (path, params) = "light", random.choice(light)
+            started = time.perf_counter()
+            response = await http.get(path, params=params, headers=headers)
+            response.raise_for_status()
+            latencies[kind].append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as http:
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+    return latencies
+
+def report(label: str, latencies, seconds: float):
+    for kind, values in latencies.items():
+        if len(values) < 2:
+            continue
+        percentiles = statistics.quantiles(values, n=100, method="inclusive")
+        print(
+            f"{label:>12} {kind:>5}: {len(values) / seconds:7.1f} req/s, "
+            f"p50 {percentiles[49] * 1000:7.1f} ms, p99 {percentiles[98] * 1000:7.1f} ms, max {max(values) * 1000:7.1f} ms"
+        )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure p99 latency under concurrent mixed load")
+    parser.add_argument("--interviews", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--heavy-share", type=float, default=0.05, help="Fraction of requests that ask for the series")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="bench-p99-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=os.getenv("DATABASE_URL", f"sqlite:///{directory}/bench.db"),
+        APP_ENV="development",
+        ANALYSIS_WORKERS="0",
+        EMAIL_SENDERS="0",
+        WEBHOOK_CONSUMERS="0",
+        BCRYPT_ROUNDS="4",
+    )
+    os.environ.update(env)
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIRECTORY, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base_url}/health").raise_for_status()
+                break
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        email = f"bench-{uuid.uuid4().hex[:8]}@corp.io"
+        httpx.post(f"{base_url}/auth/register", json={
+            "email": email, "password": "password", "first_name": "Bench", "last_name": "Recruiter", "user_type": "recruiter"
+        }).raise_for_status()
+        token = httpx.post(f"{base_url}/auth/token", data={"username": email, "password": "password"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        seed(email, args.interviews)
+
+        print(f"{args.interviews} interviews, {args.clients} clients, {args.seconds:.0f}s per run, {env['DATABASE_URL']}")
+        report("light only", asyncio.run(load(base_url, headers, args.clients, args.seconds, 0.0)), args.seconds)
+        report("mixed", asyncio.run(load(base_url, headers, args.clients, args.seconds, args.heavy_share)), args.seconds)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Login throughput with bcrypt on the event loop and on the password hashing pool
+(app/passwords.py), next to a stream of cheap requests whose delay shows how
+long the loop was blocked. Run from backend/:
+
+    python -m scripts.bench_passwords --logins 40 --concurrency 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.passwords import (
+    BCRYPT_ROUNDS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_WORKERS, PasswordHasher, PasswordHasherBusy,
+    pwd_context, verify_and_update
+)
+
+async def bench(logins: int, concurrency: int, offload: bool):
+    hashed = pwd_context.hash("correct horse battery staple")
+    hasher = PasswordHasher()
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    login_times, tick_delays = [], []
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if offload:
+                    await hasher.verify_and_update("correct horse battery staple", hashed)
+                else:
+                    # What the routes did before: bcrypt on the event loop thread
+                    verify_and_update("correct horse battery staple", hashed)
+                login_times.append(time.perf_counter() - started)
+            except PasswordHasherBusy:
+                rejected += 1
+
+    async def other_requests():
+        # A cheap request every 10 ms; its delay past the 10 ms is time the loop was blocked
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            tick_delays.append(time.perf_counter() - started - 0.01)
+
+    ticker = asyncio.create_task(other_requests())
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+    hasher.close()
+    percentiles = statistics.quantiles(tick_delays, n=100, method="inclusive") if len(tick_delays) > 1 else [tick_delays[0]] * 99
+    print(
+        f"{'worker pool' if offload else 'on the event loop':>18}: {len(login_times) / elapsed:5.1f} logins/s, "
+        f"login p50 {statistics.median(login_times) * 1000:6.0f} ms, {rejected} rejected; "
+        f"other requests delayed p50 {percentiles[49] * 1000:5.1f} ms, p99 {percentiles[98] * 1000:6.1f} ms, "
+        f"max {max(tick_delays) * 1000:6.1f} ms"
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark password hashing on and off the event loop")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    print(
+        f"{args.logins} logins, {args.concurrency} at a time, bcrypt rounds {BCRYPT_ROUNDS}, "
+        f"{PASSWORD_HASH_WORKERS} hash workers, queue limit {PASSWORD_HASH_QUEUE_LIMIT}"
+    )
+    for offload in (False, True):
+        asyncio.run(bench(args.logins, args.concurrency, offload))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Seeks and concurrent full streams of a local video served by the playback code
+(app/playback.py) under uvicorn, reporting how many bytes were copied through
+Python. Run from backend/:
+
+    python -m scripts.bench_playback --size-mb 256 --streams 32
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.routing import Route
+
+from app.playback import Playback, VideoPlayer
+from app.storage import LocalStorage
+
+async def bench(size_mb: int, streams: int, seeks: int, seek_kb: int, port: int):
+    directory = tempfile.mkdtemp()
+    size = size_mb * 1024 * 1024
+    with open(os.path.join(directory, "bench.webm"), "wb") as file:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            file.write(block)
+    player = VideoPlayer()
+    playback = Playback(
+        "0" * 32, "bench.webm", "0" * 64, "video/webm", size,
+        datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0), 1, 2
+    )
+    video_storage = LocalStorage(directory)
+
+    async def video(request: Request):
+        return await player.respond(request.headers, playback, video_storage)
+
+    app = Starlette(routes=[Route("/video", video, methods=["GET", "HEAD"])])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    url = f"http://127.0.0.1:{port}/video"
+    try:
+        async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=streams)) as client:
+            async def seek():
+                start = random.randrange(0, size - seek_kb * 1024)
+                started = time.perf_counter()
+                response = await client.get(url, headers={"Range": f"bytes={start}-{start + seek_kb * 1024 - 1}", "If-Range": playback.etag})
+                assert response.status_code == 206, response.status_code
+                return time.perf_counter() - started, len(response.content)
+
+            results = [await seek() for _ in range(seeks)]
+            latencies = sorted(latency for latency, _ in results)
+            print(
+                f"{seeks} seeks of {seek_kb} KiB in a {size_mb} MiB video: "
+                f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, "
+                f"{sum(length for _, length in results) / 1024 ** 2:.1f} MiB transferred"
+            )
+
+            async def stream():
+                received = 0
+                async with client.stream("GET", url) as response:
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+                return received
+
+            copied = player.streamed_bytes
+            started = time.perf_counter()
+            received = sum(await asyncio.gather(*(stream() for _ in range(streams))))
+            elapsed = time.perf_counter() - started
+            print(
+                f"{streams} concurrent full streams: {received / 1024 ** 2:.0f} MiB in {elapsed:.1f}s "
+                f"({received / 1024 ** 2 / elapsed:.0f} MiB/s); {(player.streamed_bytes - copied) / 1024 ** 2:.0f} MiB copied through Python "
+                f"(this server offers no zero-copy send; behind nginx with X-Accel-Redirect it is 0)"
+            )
+    finally:
+        server.should_exit = True
+        await serving
+        shutil.rmtree(directory)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time range requests and concurrent streams of a local video")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--streams", type=int, default=32)
+    parser.add_argument("--seeks", type=int, default=200)
+    parser.add_argument("--seek-kb", type=int, default=512, help="Bytes fetched per seek")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args(argv)
+    asyncio.run(bench(args.size_mb, args.streams, args.seeks, args.seek_kb, args.port))
+
+if __name__ == "__main__":
+    main()
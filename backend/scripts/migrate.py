@@ -0,0 +1,10 @@
+"""
+Apply pending schema migrations, then exit. Run from backend/ before starting
+the API with AUTO_MIGRATE=false:
+
+    python -m scripts.migrate
+"""
+from app.database import run_migrations
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,100 @@
+"""
+Local SMTP server for trying email delivery (app/mailer.py) without a real
+relay. It accepts mail without delivering it and prints how many messages it
+received; recipients whose address starts with "bounce" are refused with 550, to
+exercise dead-lettering. Run from backend/:
+
+    python -m scripts.smtp_sink --port 1025 --latency 0.02 &
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_SECURITY=none uvicorn app.main:app
+"""
+import argparse
+import asyncio
+
+def run_sink(port: int, latency: float):
+    """
+    Accept mail on 127.0.0.1:`port` without delivering it and print a count of the
+    messages received every few seconds. Replies to each packet of commands are
+    held back `latency` seconds, like the round trip to a remote server, so
+    pipelined commands share one wait. Recipients starting with "bounce" are
+    refused with 550, to exercise dead-lettering.
+    """
+    received = 0
+
+    async def session(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        nonlocal received
+        recipients, in_data, pending = [], False, b""
+        writer.write(b"220 localhost sink ready\r\n")
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    return
+                lines = (pending + chunk).split(b"\r\n")
+                pending = lines.pop()
+                replies = []
+                for line in lines:
+                    if in_data:
+                        if line == b".":
+                            in_data = False
+                            received += 1
+                            replies.append("250 OK queued")
+                        continue
+                    command = line.decode("ascii", "replace").strip()
+                    verb = command[:4].upper()
+                    if verb in ("EHLO", "HELO"):
+                        replies.append("250-localhost\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 SIZE 10485760")
+                    elif verb == "MAIL":
+                        recipients = []
+                        replies.append("250 OK")
+                    elif verb == "RCPT":
+                        address = command.partition(":")[2].strip(" <>")
+                        if address.lower().startswith("bounce"):
+                            replies.append("550 No such user")
+                        else:
+                            recipients.append(address)
+                            replies.append("250 OK")
+                    elif verb == "DATA":
+                        in_data = bool(recipients)
+                        replies.append("354 End data with <CR><LF>.<CR><LF>" if recipients else "554 No valid recipients")
+                    elif verb == "RSET":
+                        recipients = []
+                        replies.append("250 OK")
+                    elif verb == "NOOP":
+                        replies.append("250 OK")
+                    elif verb == "QUIT":
+                        writer.write(b"221 Bye\r\n")
+                        return
+                    else:
+                        replies.append("502 Command not implemented")
+                if replies:
+                    if latency:
+                        await asyncio.sleep(latency)
+                    writer.write("".join(reply + "\r\n" for reply in replies).encode("ascii"))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(session, "127.0.0.1", port)
+        print(f"SMTP sink listening on 127.0.0.1:{port}")
+        reported = 0
+        async with server:
+            while True:
+                await asyncio.sleep(5)
+                if received != reported:
+                    reported = received
+                    print(f"{received} messages received")
+
+    asyncio.run(serve())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local SMTP server that accepts and discards mail")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each reply")
+    args = parser.parse_args(argv)
+    run_sink(args.port, args.latency)
+
+if __name__ == "__main__":
+    main()
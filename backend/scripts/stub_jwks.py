@@ -0,0 +1,78 @@
+"""
+Local JWKS server for trying Clerk token verification (app/jwks.py) with key
+rotation. It rotates its signing key every --rotate-seconds and issues test
+tokens signed with the current key. Run from backend/:
+
+    python -m scripts.stub_jwks --port 8766 --rotate-seconds 30 &
+    CLERK_JWKS_URL=http://127.0.0.1:8766/.well-known/jwks.json uvicorn app.main:app
+    curl "http://127.0.0.1:8766/token?sub=user_123&email=candidate@corp.io"
+"""
+import argparse
+import json
+import time
+
+import jwt
+import uvicorn
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+def run_stub(port: int, rotate_seconds: float):
+    """
+    Serve a JWKS with the previous, current and next signing keys, moving to the
+    next key every `rotate_seconds`, and /token?sub=...&email=... to issue RS256
+    tokens with the current key.
+    """
+    keys = {}  # Generation -> private key
+    served = {"jwks": 0}
+
+    def current_keys():
+        # Like real providers, publish the next key ahead of its use and keep the previous one
+        generation = int(time.time() // rotate_seconds)
+        for stale in [g for g in keys if g < generation - 1]:
+            del keys[stale]
+        for g in (generation - 1, generation, generation + 1):
+            if g not in keys:
+                keys[g] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return generation
+
+    async def jwks(request: Request):
+        served["jwks"] += 1
+        current_keys()
+        public = []
+        for kid, private_key in ((f"stub-{g}", key) for g, key in keys.items()):
+            jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+            public.append(dict(jwk, kid=kid, use="sig", alg="RS256"))
+        return JSONResponse({"keys": public}, headers={"Cache-Control": f"public, max-age={int(rotate_seconds)}"})
+
+    async def token(request: Request):
+        generation = current_keys()
+        kid, private_key = f"stub-{generation}", keys[generation]
+        now = int(time.time())
+        claims = {"sub": request.query_params.get("sub", "user_stub"), "iat": now, "exp": now + 600}
+        if request.query_params.get("email"):
+            claims["email"] = request.query_params["email"]
+        return PlainTextResponse(jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid}))
+
+    async def stats(request: Request):
+        return JSONResponse({"jwks_requests": served["jwks"], "kids": [f"stub-{g}" for g in keys]})
+
+    app = Starlette(routes=[
+        Route("/.well-known/jwks.json", jwks),
+        Route("/token", token),
+        Route("/stats", stats),
+    ])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a rotating JWKS and issue test tokens")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rotate-seconds", type=float, default=30)
+    args = parser.parse_args(argv)
+    run_stub(args.port, args.rotate_seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Local OpenAI-compatible model server for exercising the model path without the
+API. It answers the analysis function calls (ai_engine) with canned arguments
+after --latency seconds, plus --per-answer seconds for each answer of a batch
+call, which is roughly how generation time grows with output length.
+
+It can also misbehave, to exercise model_scheduler's retries, backoff and
+circuit breaker: --error-rate answers that share of calls with one of
+--error-statuses (429s carry Retry-After: --retry-after), and --timeout-rate
+holds that share of calls for --hang seconds before answering. Tests script
+exact outcomes instead with POST /stub/faults {"script": [429, 503, "timeout",
+"ok"]}, consumed one per call; GET /stub/stats counts the calls received.
+
+    python -m scripts.stub_model --port 8765 --latency 0.4 --per-answer 0.05
+    python -m scripts.stub_model --port 8765 --error-rate 0.2 --timeout-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub APP_ENV=production ...
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Sequence, Tuple, Union
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+ANALYSIS = {"score": 3, "strengths": ["Clear"], "weaknesses": ["Brief"], "notes": "Stub", "sentiment": "neutral"}
+
+Outcome = Union[int, str]
+
+class Faults:
+    """Which outcome each call gets: the next scripted one, else a random draw from the configured rates."""
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = (429, 500, 503),
+        timeout_rate: float = 0.0,
+        hang: float = 60.0,
+        retry_after: float = 1.0
+    ):
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.retry_after = retry_after
+        self.script: Deque[Outcome] = deque()
+        self.outcomes: Counter = Counter()
+
+    def next(self) -> Outcome:
+        if self.script:
+            outcome = self.script.popleft()
+        else:
+            draw = random.random()
+            if draw < self.timeout_rate:
+                outcome = "timeout"
+            elif draw < self.timeout_rate + self.error_rate:
+                outcome = random.choice(self.error_statuses)
+            else:
+                outcome = "ok"
+        self.outcomes[str(outcome)] += 1
+        return outcome
+
+def completion(body) -> tuple:
+    """(extra seconds to take, JSON reply) for a chat completion request."""
+    function = body["functions"][0]["name"]
+    count = 0
+    if function == "analyze_responses":
+        count = body["messages"][-1]["content"].count("\nQuestion: ")
+        arguments: Any = {"analyses": [dict(ANALYSIS, index=index) for index in range(count)]}
+    elif function == "analyze_interview":
+        arguments = {"overall_score": 3, "recommendation": "Stub", "strengths": [], "weaknesses": []}
+    else:
+        arguments = ANALYSIS
+    return count, {
+        "choices": [{"message": {"function_call": {"name": function, "arguments": json.dumps(arguments)}}}],
+        "usage": {"total_tokens": 300},
+    }
+
+def create_app(latency: float = 0.02, per_answer: float = 0.0, faults: Faults = None) -> Starlette:
+    faults = faults or Faults()
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        outcome = faults.next()
+        if outcome == "timeout":
+            await asyncio.sleep(faults.hang)
+        elif outcome != "ok":
+            await asyncio.sleep(latency)
+            headers = {"Retry-After": str(faults.retry_after)} if outcome == 429 else None
+            return JSONResponse({"error": {"message": f"Injected {outcome}"}}, status_code=int(outcome), headers=headers)
+        answers, reply = completion(body)
+        await asyncio.sleep(latency + per_answer * answers)
+        return JSONResponse(reply)
+
+    async def set_faults(request: Request):
+        faults.script.extend((await request.json()).get("script", []))
+        return JSONResponse({"pending": list(faults.script)})
+
+    async def stats(request: Request):
+        return JSONResponse({"calls": sum(faults.outcomes.values()), "outcomes": dict(faults.outcomes)})
+
+    app = Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/stub/faults", set_faults, methods=["POST"]),
+        Route("/stub/stats", stats),
+    ])
+    app.state.faults = faults
+    return app
+
+def spawn(*args: str) -> Tuple[subprocess.Popen, str]:
+    """Start the stub in a subprocess with command line `args`; returns it and its OPENAI_BASE_URL once it answers."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "scripts.stub_model", "--port", str(port), *args],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stub/stats").raise_for_status()
+            break
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    return process, f"http://127.0.0.1:{port}/v1"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local OpenAI-compatible model stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per completion")
+    parser.add_argument("--per-answer", type=float, default=0.0, help="Extra seconds per answer of a batch call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with an error status")
+    parser.add_argument("--error-statuses", default="429,500,503", help="Comma separated statuses to inject")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Share of calls held for --hang seconds")
+    parser.add_argument("--hang", type=float, default=60.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429s")
+    args = parser.parse_args(argv)
+
+    faults = Faults(
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(",") if status],
+        timeout_rate=args.timeout_rate,
+        hang=args.hang,
+        retry_after=args.retry_after,
+    )
+    import uvicorn
+    uvicorn.run(create_app(args.latency, args.per_answer, faults), host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
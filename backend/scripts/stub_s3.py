@@ -0,0 +1,69 @@
+"""
+An S3-compatible stand-in for trying VIDEO_STORAGE=s3 (app/storage.py) locally.
+Objects are kept under a directory; a PUT whose content does not match its
+x-amz-content-sha256 is refused like S3 does. Run from backend/:
+
+    python -m scripts.stub_s3 --port 9000 --dir /tmp/s3-stub &
+    VIDEO_STORAGE=s3 S3_ENDPOINT_URL=http://127.0.0.1:9000 S3_BUCKET_NAME=videos uvicorn app.main:app
+"""
+import argparse
+import hashlib
+import os
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.routing import Route
+
+def create_app(directory: str) -> Starlette:
+    """
+    An app serving PUT, GET, HEAD and DELETE of objects stored under `directory`. Requests
+    must be signed (GETs may be presigned), but signatures are not checked; a PUT whose body does not
+    match its x-amz-content-sha256 is refused with 400 BadDigest, like S3 does.
+    """
+    root = os.path.abspath(directory)
+
+    def object_path(request: Request) -> str:
+        path = os.path.abspath(os.path.join(root, request.path_params["bucket"], request.path_params["key"]))
+        if not path.startswith(root + os.sep):
+            raise ValueError("Invalid key")
+        return path
+
+    async def handle(request: Request):
+        presigned = request.method == "GET" and "X-Amz-Signature" in request.query_params
+        if not presigned and not request.headers.get("authorization", "").startswith("AWS4-HMAC-SHA256 "):
+            return Response("AccessDenied", status_code=403)
+        path = object_path(request)
+        if request.method == "PUT":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            digest = hashlib.sha256()
+            temporary = f"{path}.{os.getpid()}.part"
+            with open(temporary, "wb") as file:
+                async for chunk in request.stream():
+                    digest.update(chunk)
+                    file.write(chunk)
+            expected = request.headers.get("x-amz-content-sha256", "")
+            if len(expected) == 64 and expected != digest.hexdigest():
+                os.remove(temporary)
+                return Response("BadDigest", status_code=400)
+            os.replace(temporary, path)
+            return Response(status_code=200, headers={"ETag": f'"{digest.hexdigest()[:32]}"'})
+        if not os.path.exists(path):
+            return Response("NoSuchKey", status_code=404)
+        if request.method == "DELETE":
+            os.remove(path)
+            return Response(status_code=204)
+        return FileResponse(path)
+
+    return Starlette(routes=[Route("/{bucket}/{key:path}", handle, methods=["GET", "HEAD", "PUT", "DELETE"])])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve an S3-compatible stand-in from a local directory")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--dir", default="s3-stub")
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(args.dir), host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Shared fixtures. The API runs in-process against a temporary SQLite database
+(or TEST_DATABASE_URL), migrated once per session, with its background workers
+off; tests that need a worker drive it directly.
+"""
+import os
+import shutil
+import tempfile
+
+_directory = tempfile.mkdtemp(prefix="interview-tests-")
+os.environ.update({
+    "DATABASE_URL": os.getenv("TEST_DATABASE_URL", f"sqlite:///{_directory}/test.db"),
+    "APP_ENV": "development",
+    "ANALYSIS_WORKERS": "0",
+    "EMAIL_SENDERS": "0",
+    "WEBHOOK_CONSUMERS": "0",
+    "BCRYPT_ROUNDS": "4",
+    "VIDEO_STORAGE_DIR": os.path.join(_directory, "media"),
+    "QUERY_BUDGET_DIAGNOSTICS": "true",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.main import app
+
+from .helpers import register
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+    shutil.rmtree(_directory, ignore_errors=True)
+
+@pytest.fixture
+def db(client):
+    with database.SessionLocal() as session:
+        yield session
+
+@pytest.fixture
+def recruiter(client):
+    return register(client, "recruiter")
+
+@pytest.fixture
+def candidate(client):
+    return register(client, "candidate")
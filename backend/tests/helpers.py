@@ -0,0 +1,34 @@
+"""Helpers for setting up users, templates and interviews through the API."""
+import uuid
+
+from app import models
+
+def register(client, user_type: str = "recruiter", password: str = "password"):
+    """Register a user with a fresh email; returns (email, authorization headers)."""
+    email = f"{user_type}-{uuid.uuid4().hex[:12]}@corp.io"
+    response = client.post("/auth/register", json={
+        "email": email, "password": password, "first_name": "Test", "last_name": user_type.title(), "user_type": user_type
+    })
+    assert response.status_code == 200, response.text
+    response = client.post("/auth/token", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return email, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def create_template(client, headers, questions=None, **fields):
+    questions = questions or [
+        {"text": "Describe a project you are proud of", "type": "text", "required": True, "order": 0},
+        {"text": "Pick one", "type": "multiple_choice", "options": ["a", "b"], "required": True, "order": 1},
+    ]
+    response = client.post("/templates/", headers=headers, json={"title": "Template", "questions": questions, **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def create_interview(client, headers, template_id: int, candidate_email: str):
+    response = client.post("/interviews/", headers=headers, json={
+        "template_id": template_id, "candidate_email": candidate_email, "candidate_name": "Candidate"
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def user_id(db, email: str) -> int:
+    return db.query(models.User.id).filter(models.User.email == email).scalar()
@@ -0,0 +1,58 @@
+"""
+Scored answers are cached by content, except the random mock analyses used in
+development, and pruning only drops versions no registered scorer uses.
+"""
+import uuid
+
+from app import analysis_cache, models, scorers
+
+def item(answer: str):
+    return {"question_type": "text", "question_text": "Describe a project", "response_text": answer}
+
+class CountingScorer(scorers.Scorer):
+    name = "counting"
+
+    def __init__(self):
+        self.scored = 0
+
+    def version(self):
+        return "counting:1"
+
+    def analyze_responses(self, items, on_result=None):
+        self.scored += len(items)
+        return [{"score": 3, "strengths": [], "weaknesses": []} for _ in items]
+
+    def analyze_interview(self, interview_data):
+        return {}
+
+def stored(db) -> int:
+    return db.query(models.AnalysisCacheEntry).count()
+
+def test_identical_answers_are_scored_once(db):
+    scorer = CountingScorer()
+    answer = f"answer {uuid.uuid4().hex}"
+    results = analysis_cache.analyze_responses(db, [item(answer), item(answer)], scorer)
+    db.commit()
+    assert scorer.scored == 1 and len(results) == 2
+
+    analysis_cache.analysis_cache.clear()
+    assert analysis_cache.analyze_responses(db, [item(answer)], scorer) == results[:1]
+    assert scorer.scored == 1
+
+def test_mock_analyses_are_not_cached(db):
+    scorer = scorers.AIScorer()
+    assert scorer.cacheable is False
+    before = stored(db)
+    results = analysis_cache.analyze_responses(db, [item(f"answer {uuid.uuid4().hex}")], scorer)
+    db.commit()
+    assert results[0]["score"] is not None
+    assert stored(db) == before
+
+def test_prune_keeps_the_current_version_of_every_scorer(db):
+    current = {scorer.version() for scorer in scorers.SCORERS.values()}
+    for version in [*current, "old:0", "pinned:0"]:
+        analysis_cache.analysis_cache.put_many(db, version, {uuid.uuid4().hex: {"score": 3}})
+    db.commit()
+    analysis_cache.prune(db, keep_versions=["pinned:0"])
+    versions = {version for version, in db.query(models.AnalysisCacheEntry.scorer_version)}
+    assert versions == current | {"pinned:0"}
@@ -0,0 +1,162 @@
+"""
+Analysis jobs are queued by completing an interview or asking to regenerate it,
+never by reading the analysis, a running job keeps its lease for as long as its
+worker is alive, and scores are only streamed once they are committed.
+"""
+import datetime
+import threading
+import time
+
+import pytest
+
+from app import crud, jobs, models, scorers
+
+from .helpers import create_interview, create_template
+
+@pytest.fixture
+def completed(client, recruiter, candidate):
+    """A completed interview of `recruiter` with its analysis job queued; returns (id, recruiter headers)."""
+    _, recruiter_headers = recruiter
+    candidate_email, candidate_headers = candidate
+    template = create_template(client, recruiter_headers, questions=[
+        {"text": "Describe a project", "type": "text", "required": True, "order": 0}
+    ])
+    interview = create_interview(client, recruiter_headers, template["id"], candidate_email)
+    response = client.post(f"/interviews/{interview['id']}/submit", headers=candidate_headers, json={"responses": [
+        {"question_id": template["questions"][0]["id"], "text_response": "I rebuilt our billing pipeline"}
+    ]})
+    assert response.json()["status"] == "completed", response.text
+    return interview["id"], recruiter_headers
+
+def job_count(db, interview_id: int) -> int:
+    return db.query(models.AnalysisJob).filter(models.AnalysisJob.interview_id == interview_id).count()
+
+def test_reading_the_analysis_never_queues_a_job(client, db, completed):
+    interview_id, headers = completed
+    assert job_count(db, interview_id) == 1
+    assert client.get(f"/analytics/interview/{interview_id}", headers=headers).status_code == 202
+
+    job = crud.get_latest_analysis_job(db, interview_id)
+    job.status = models.JobStatus.failed
+    db.commit()
+    for _ in range(2):
+        response = client.get(f"/analytics/interview/{interview_id}", headers=headers)
+        assert response.status_code == 404, response.text
+    assert job_count(db, interview_id) == 1
+
+    response = client.post(f"/analytics/interview/{interview_id}/regenerate", headers=headers)
+    assert response.status_code == 202, response.text
+    assert job_count(db, interview_id) == 2
+    assert client.get(f"/analytics/interview/{interview_id}", headers=headers).status_code == 202
+
+def test_running_job_keeps_its_lease(client, db, completed, monkeypatch):
+    interview_id, _ = completed
+    lease = 0.6
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", lease)
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", lease / 6)
+    # Only this interview's job is runnable
+    monkeypatch.setattr(crud, "claim_analysis_job", lambda session, lease_seconds: claim_own(session, interview_id))
+    running = threading.Event()
+    analyze = crud.analyze_interview
+
+    def slow_analysis(session, job_interview_id, **kwargs):
+        running.set()
+        time.sleep(lease * 3)
+        return analyze(session, job_interview_id, **kwargs)
+
+    monkeypatch.setattr(crud, "analyze_interview", slow_analysis)
+    worker = threading.Thread(target=jobs.AnalysisWorkerPool(workers=0).run_next)
+    worker.start()
+    assert running.wait(5)
+    for _ in range(4):
+        time.sleep(lease * 0.6)
+        db.expire_all()
+        job = crud.get_latest_analysis_job(db, interview_id)
+        assert job.status == models.JobStatus.running
+        assert job.heartbeat_at > datetime.datetime.now() - datetime.timedelta(seconds=lease)
+    worker.join()
+    db.expire_all()
+    job = crud.get_latest_analysis_job(db, interview_id)
+    assert (job.status, job.attempts) == (models.JobStatus.done, 1)
+
+def claim_own(db, interview_id: int):
+    job = crud.get_latest_analysis_job(db, interview_id)
+    job.status, job.attempts = models.JobStatus.running, job.attempts + 1
+    job.started_at = job.heartbeat_at = datetime.datetime.now()
+    db.commit()
+    return job
+
+def test_lease_renewal_fails_once_another_run_claimed_the_job(db, completed):
+    interview_id, _ = completed
+    job = claim_own(db, interview_id)
+    attempt = job.attempts
+    assert crud.renew_analysis_job_lease(db, job.id, attempt)
+    claim_own(db, interview_id)
+    assert not crud.renew_analysis_job_lease(db, job.id, attempt)
+
+def run_own_job(monkeypatch, interview_id: int, on_publish=None):
+    """Run the interview's queued job, recording the events published meanwhile with how many scores were stored."""
+    monkeypatch.setattr(crud, "claim_analysis_job", lambda session, lease_seconds: claim_own(session, interview_id))
+    published = []
+
+    def publish(event_interview_id, event, data):
+        if event == "response":
+            with jobs.SessionLocal() as session:
+                stored = session.query(models.ResponseAnalysis).join(models.Response).filter(
+                    models.Response.interview_id == interview_id
+                ).count()
+            published.append((event, stored))
+        elif event == "analysis":
+            published.append((event, data["overall_score"] is not None))
+        else:
+            published.append((event, data["status"]))
+        if on_publish:
+            on_publish(event)
+
+    monkeypatch.setattr(jobs.analysis_events, "publish", publish)
+    jobs.AnalysisWorkerPool(workers=0).run_next()
+    return published
+
+def test_each_score_is_committed_and_published_before_the_next_is_scored(client, recruiter, candidate, monkeypatch):
+    _, recruiter_headers = recruiter
+    candidate_email, candidate_headers = candidate
+    template = create_template(client, recruiter_headers, questions=[
+        {"text": f"Question {order}", "type": "text", "required": True, "order": order} for order in range(2)
+    ])
+    interview = create_interview(client, recruiter_headers, template["id"], candidate_email)
+    client.post(f"/interviews/{interview['id']}/submit", headers=candidate_headers, json={"responses": [
+        {"question_id": question["id"], "text_response": "An answer"} for question in template["questions"]
+    ]})
+    first_published = threading.Event()
+    released = []
+
+    def analyze_responses(self, items, on_result=None):
+        results = [{"score": 3.0, "strengths": [], "weaknesses": []} for _ in items]
+        on_result(0, results[0])
+        # The second answer is only scored once the first has reached the stream
+        released.append(first_published.wait(5))
+        for index in range(1, len(items)):
+            on_result(index, results[index])
+        return results
+
+    monkeypatch.setattr(scorers.AIScorer, "analyze_responses", analyze_responses)
+    published = run_own_job(monkeypatch, interview["id"], lambda event: event == "response" and first_published.set())
+    assert released == [True]
+    assert published == [("job", "running"), ("response", 1), ("response", 2), ("analysis", True), ("job", "done")]
+
+def test_scores_committed_before_a_failed_summary_are_kept(db, completed, monkeypatch):
+    interview_id, _ = completed
+
+    def fail(self, interview_data):
+        raise RuntimeError("summary failed")
+
+    monkeypatch.setattr(scorers.AIScorer, "analyze_interview", fail)
+    published = run_own_job(monkeypatch, interview_id)
+    assert [event for event, _ in published] == ["job", "response", "job"]
+    assert published[-1][1] != "done"
+
+    # The retry only summarizes, counting the score kept from the failed run
+    monkeypatch.undo()
+    assert [event for event, _ in run_own_job(monkeypatch, interview_id)] == ["job", "analysis", "job"]
+    analysis = db.query(models.InterviewAnalysis).filter(models.InterviewAnalysis.interview_id == interview_id).one()
+    assert analysis.score_count == 1
@@ -0,0 +1,36 @@
+"""Recruiter analytics routes answer with their declared response models."""
+import datetime
+
+import pytest
+
+from app import schemas
+
+from .helpers import create_interview, create_template
+
+@pytest.mark.parametrize("group_by", [group.value for group in schemas.AnalyticsGroupBy])
+def test_series_matches_its_schema(client, recruiter, candidate, group_by):
+    _, headers = recruiter
+    template = create_template(client, headers, title="Series")
+    for _ in range(2):
+        create_interview(client, headers, template["id"], candidate[0])
+
+    response = client.get("/analytics/recruiter/series", headers=headers, params={"granularity": "week", "group_by": group_by})
+    assert response.status_code == 200, response.text
+    series = schemas.RecruiterAnalyticsSeries.parse_obj(response.json())
+    assert series.end_date == datetime.date.today()
+    created = {entry.key: entry.total for entry in series.series}
+    if group_by == "status":
+        assert created["created"] == 2
+    else:
+        assert created == {str(template["id"]): 2}
+    assert all(len(entry.counts) == len(series.labels) for entry in series.series)
+
+def test_series_is_documented_with_its_schema(client):
+    operation = client.get("/openapi.json").json()["paths"]["/analytics/recruiter/series"]["get"]
+    schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/RecruiterAnalyticsSeries"}
+
+def test_series_rejects_inverted_range(client, recruiter):
+    _, headers = recruiter
+    response = client.get("/analytics/recruiter/series", headers=headers, params={"start_date": "2024-02-01", "end_date": "2024-01-01"})
+    assert response.status_code == 400
@@ -0,0 +1,75 @@
+"""
+Bulk interview uploads: every created row, and its invitation, belongs to the
+candidate of that row whatever order the database returns inserted rows in, and
+JSON uploads are decoded incrementally.
+"""
+import datetime
+import io
+import json
+import uuid
+
+import pytest
+
+from app import crud, models, schemas, utils
+
+from .helpers import create_template
+
+def upload(client, headers, template_id: int, rows, filename: str = "batch.json"):
+    body = rows if isinstance(rows, bytes) else json.dumps(rows).encode()
+    return client.post("/interviews/bulk", headers=headers, data={"template_id": str(template_id)},
+                       files={"file": (filename, body, "application/json")})
+
+def test_created_rows_match_their_interviews_and_invitations(client, db, recruiter):
+    _, headers = recruiter
+    template = create_template(client, headers)
+    email = f"bulk-{uuid.uuid4().hex[:8]}@corp.io"
+    rows = [
+        {"candidate_email": email, "candidate_name": "Same", "due_date": "2031-01-01T00:00:00"},
+        {"candidate_email": f"other-{uuid.uuid4().hex[:8]}@corp.io", "candidate_name": "Other"},
+        {"candidate_email": "not an email", "candidate_name": "Invalid"},
+        {"candidate_email": email, "candidate_name": "Same", "due_date": "2032-06-30T00:00:00"},
+    ]
+    response = upload(client, headers, template["id"], rows)
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["created", "created", "invalid", "created"]
+
+    for row, result in zip(rows, results):
+        if result["status"] != "created":
+            continue
+        interview = db.get(models.Interview, result["interview_id"])
+        assert (interview.candidate_email, interview.candidate_name) == (row["candidate_email"], row["candidate_name"])
+        assert interview.due_date == (datetime.datetime.fromisoformat(row["due_date"]) if "due_date" in row else None)
+        invitation = db.query(models.OutboxEmail).filter(
+            models.OutboxEmail.context["interview_link"].as_string().like(f"%/interview/{interview.id}")
+        ).one()
+        assert invitation.recipient == row["candidate_email"]
+
+def test_rows_are_matched_whatever_order_they_are_returned_in():
+    due = datetime.datetime(2031, 1, 1, tzinfo=datetime.timezone.utc)
+    interviews = [
+        schemas.InterviewCreate(template_id=1, candidate_email="a@corp.io", candidate_name="A", due_date=due),
+        schemas.InterviewCreate(template_id=1, candidate_email="b@corp.io", candidate_name="B"),
+        schemas.InterviewCreate(template_id=1, candidate_email="a@corp.io", candidate_name="A"),
+    ]
+    returned = [
+        {"id": 3, "candidate_email": "a@corp.io", "candidate_name": "A", "due_date": None},
+        {"id": 2, "candidate_email": "b@corp.io", "candidate_name": "B", "due_date": None},
+        {"id": 1, "candidate_email": "a@corp.io", "candidate_name": "A", "due_date": due.replace(tzinfo=None)},
+    ]
+    assert [row["id"] for row in crud._match_created(interviews, returned)] == [1, 2, 3]
+
+def test_json_uploads_are_read_incrementally():
+    rows = [{"candidate_email": f"c{index}@corp.io", "candidate_name": "C"} for index in range(20000)]
+    file = io.BytesIO(json.dumps(rows).encode())
+    iterator = utils.iter_bulk_interview_rows(file, "json")
+    assert next(iterator) == rows[0]
+    assert file.tell() < len(file.getvalue()) / 10
+    assert list(iterator) == rows[1:]
+
+@pytest.mark.parametrize("body", [b'{"candidate_email": "a@corp.io"}', b'[{"candidate_email": "a@corp.io"},', b"[1 2]"])
+def test_malformed_json_is_rejected(client, recruiter, body):
+    _, headers = recruiter
+    template = create_template(client, headers)
+    response = upload(client, headers, template["id"], body)
+    assert response.status_code == 400, response.text
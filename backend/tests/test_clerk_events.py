@@ -0,0 +1,109 @@
+"""
+Clerk webhook events are applied in the order they happened in Clerk, not in the
+order they arrived; changes older than the user's current state are skipped, and
+a dead-lettered event holds back the user's later events until it is requeued.
+"""
+import datetime
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+from app import clerk_events, crud, models
+from app.clerk_events import ClerkEventConsumer
+
+def user_event(clerk_id: str, event_type: str, first_name: str, updated_at: int) -> dict:
+    return {
+        "type": event_type,
+        "data": {
+            "id": clerk_id,
+            "first_name": first_name,
+            "last_name": "Clerk",
+            "primary_email_address_id": "email_1",
+            "email_addresses": [{"id": "email_1", "email_address": f"{clerk_id}@corp.io"}],
+            "updated_at": updated_at,
+        },
+    }
+
+def record(db, event: dict) -> bool:
+    return crud.record_webhook_event(
+        db, clerk_events.SOURCE, uuid.uuid4().hex, event["type"], clerk_events.event_subject(event), event,
+        clerk_events.event_timestamp(event)
+    )
+
+def drain():
+    consumer = ClerkEventConsumer(consumers=0)
+    while consumer.run_next():
+        pass
+    return consumer
+
+def synced_user(db, clerk_id: str):
+    db.expire_all()
+    return crud.get_user_by_oauth_id(db, "clerk", clerk_id)
+
+def events_of(db, clerk_id: str):
+    db.expire_all()
+    return db.query(models.WebhookEvent).filter(models.WebhookEvent.subject == clerk_id).all()
+
+def test_events_apply_in_the_order_they_happened(client, db):
+    clerk_id = f"user_{uuid.uuid4().hex}"
+    # Arrival order is the reverse of the order in Clerk
+    record(db, user_event(clerk_id, "user.updated", "Newest", 3000))
+    record(db, user_event(clerk_id, "user.updated", "Older", 2000))
+    record(db, user_event(clerk_id, "user.created", "Created", 1000))
+    drain()
+    user = synced_user(db, clerk_id)
+    assert user is not None and user.first_name == "Newest"
+    assert user.oauth_synced_at == clerk_events.event_timestamp({"data": {"updated_at": 3000}})
+
+def test_changes_older_than_the_user_are_skipped(client, db):
+    clerk_id = f"user_{uuid.uuid4().hex}"
+    record(db, user_event(clerk_id, "user.created", "Created", 1000))
+    record(db, user_event(clerk_id, "user.updated", "Current", 2000))
+    drain()
+    # A late retry of an update made before the current state
+    record(db, user_event(clerk_id, "user.updated", "Stale", 1500))
+    drain()
+    assert synced_user(db, clerk_id).first_name == "Current"
+    assert {event.status for event in events_of(db, clerk_id)} == {models.WebhookEventStatus.processed}
+
+def test_dead_letter_holds_back_later_events(client, db, monkeypatch):
+    clerk_id = f"user_{uuid.uuid4().hex}"
+    apply_user_change = clerk_events.apply_user_change
+
+    def failing(session, change):
+        if change.clerk_id == clerk_id:
+            raise RuntimeError("database unavailable")
+        return apply_user_change(session, change)
+
+    monkeypatch.setattr(clerk_events, "apply_user_change", failing)
+    monkeypatch.setattr(clerk_events, "WEBHOOK_MAX_ATTEMPTS", 1)
+    record(db, user_event(clerk_id, "user.created", "Created", 1000))
+    assert drain().dead == 1
+
+    # The update must not be applied without the creation before it
+    record(db, user_event(clerk_id, "user.updated", "Updated", 2000))
+    drain()
+    assert sorted(event.status.value for event in events_of(db, clerk_id)) == ["dead", "pending"]
+    assert synced_user(db, clerk_id) is None
+
+    monkeypatch.setattr(clerk_events, "apply_user_change", apply_user_change)
+    crud.requeue_dead_webhook_events(db)
+    drain()
+    assert synced_user(db, clerk_id).first_name == "Updated"
+    assert {event.status for event in events_of(db, clerk_id)} == {models.WebhookEventStatus.processed}
+
+def test_webhook_orders_events_without_updated_at_by_svix_timestamp(client, db, monkeypatch):
+    secret = "whsec_test"
+    monkeypatch.setenv("CLERK_SECRET_KEY", secret)
+    clerk_id = f"user_{uuid.uuid4().hex}"
+    body = json.dumps({"type": "user.deleted", "data": {"id": clerk_id, "deleted": True}})
+    timestamp = str(int(time.time()) - 60)
+    signature = hmac.new(secret.encode(), f"{timestamp}.{body}".encode(), hashlib.sha256).hexdigest()
+    response = client.post("/webhooks/clerk", content=body, headers={
+        "svix-id": f"msg_{clerk_id}", "svix-signature": f"t={timestamp},v1={signature}", "content-type": "application/json"
+    })
+    assert response.status_code == 200, response.text
+    [event] = events_of(db, clerk_id)
+    assert event.occurred_at == datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,94 @@
+"""
+CPU-heavy work stays off the event loop: while a slow password hash or check is
+running, other requests are still answered, and interviews are only ever scored
+by the analysis workers, never inside a request.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import passwords, scorers
+from app.jobs import AnalysisWorkerPool
+
+from .helpers import create_interview, create_template, register
+
+HASH_SECONDS = 1.0
+
+def slow(fn, started: threading.Event):
+    def wrapper(*args, **kwargs):
+        started.set()
+        time.sleep(HASH_SECONDS)
+        return fn(*args, **kwargs)
+    return wrapper
+
+def latency_while(client, started: threading.Event, request) -> float:
+    """Seconds GET /health takes while `request` runs in another thread and is inside the slow call."""
+    worker = threading.Thread(target=request)
+    worker.start()
+    assert started.wait(5)
+    begun = time.perf_counter()
+    assert client.get("/health").status_code == 200
+    elapsed = time.perf_counter() - begun
+    worker.join()
+    return elapsed
+
+def test_login_does_not_block_other_requests(client, recruiter, monkeypatch):
+    email, _ = recruiter
+    started = threading.Event()
+    monkeypatch.setattr(passwords, "verify_and_update", slow(passwords.verify_and_update, started))
+    responses = []
+
+    def login():
+        responses.append(client.post("/auth/token", data={"username": email, "password": "password"}))
+
+    assert latency_while(client, started, login) < HASH_SECONDS / 2
+    assert responses[0].status_code == 200, responses[0].text
+
+def test_registration_does_not_block_other_requests(client, monkeypatch):
+    started = threading.Event()
+    monkeypatch.setattr(passwords.pwd_context, "hash", slow(passwords.pwd_context.hash, started))
+    results = []
+
+    def signup():
+        results.append(register(client, "candidate"))
+
+    assert latency_while(client, started, signup) < HASH_SECONDS / 2
+    assert results
+
+def test_interviews_are_scored_by_workers_only(client, recruiter, candidate, monkeypatch):
+    calls = []
+
+    def record(fn):
+        def wrapper(self, *args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                calls.append("event loop")
+            except RuntimeError:
+                calls.append(threading.current_thread().name)
+            return fn(self, *args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(scorers.AIScorer, "analyze_responses", record(scorers.AIScorer.analyze_responses))
+    monkeypatch.setattr(scorers.AIScorer, "analyze_interview", record(scorers.AIScorer.analyze_interview))
+
+    _, recruiter_headers = recruiter
+    candidate_email, candidate_headers = candidate
+    template = create_template(client, recruiter_headers, questions=[
+        {"text": "Describe a project", "type": "text", "required": True, "order": 0}
+    ])
+    interview = create_interview(client, recruiter_headers, template["id"], candidate_email)
+    response = client.post(f"/interviews/{interview['id']}/submit", headers=candidate_headers, json={"responses": [
+        {"question_id": template["questions"][0]["id"], "text_response": "I rebuilt our billing pipeline"}
+    ]})
+    assert response.status_code == 200, response.text
+    assert client.get(f"/analytics/interview/{interview['id']}", headers=recruiter_headers).status_code == 202
+    assert calls == []
+
+    # Drained from this thread as a worker would; other tests may have queued jobs too
+    pool = AnalysisWorkerPool(workers=0)
+    while pool.run_next() is not None:
+        pass
+    assert calls and "event loop" not in calls
+    assert client.get(f"/analytics/interview/{interview['id']}", headers=recruiter_headers).status_code == 200
@@ -0,0 +1,17 @@
+"""Creating an interview reports its invitation as queued in the outbox, not as sent."""
+from app import models
+
+from .helpers import create_interview, create_template
+
+def test_interview_reports_its_queued_invitation(client, db, recruiter, candidate):
+    _, headers = recruiter
+    candidate_email, _ = candidate
+    template = create_template(client, headers)
+    interview = create_interview(client, headers, template["id"], candidate_email)
+    assert "email_sent" not in interview
+    invitation = interview["invitation"]
+    assert (invitation["status"], invitation["recipient"]) == ("pending", candidate_email)
+
+    email = db.get(models.OutboxEmail, invitation["id"])
+    assert email.recipient == candidate_email
+    assert email.context["interview_link"].endswith(f"/interview/{interview['id']}")
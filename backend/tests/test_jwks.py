@@ -0,0 +1,71 @@
+"""
+The JWKS refresher survives whatever the provider sends: a max-age of zero does
+not turn it into a tight loop, and a body that is not a key set, or an
+unexpected error, keeps the previous keys without stopping it.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from app import jwks
+
+URL = "https://issuer.test/.well-known/jwks.json"
+
+def key_set(kid: str = "key-1"):
+    public_key = rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+    return {"keys": [dict(json.loads(RSAAlgorithm.to_jwk(public_key)), kid=kid, use="sig")]}
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Replies the JWKS fetches get, in order (the last one repeats), and the number of fetches."""
+    replies, fetches = [], []
+
+    def handler(request):
+        fetches.append(request)
+        reply = replies[min(len(fetches), len(replies)) - 1]
+        if isinstance(reply, Exception):
+            raise reply
+        body, max_age = reply
+        return httpx.Response(200, content=json.dumps(body), headers={"Cache-Control": f"max-age={max_age}"})
+
+    client = httpx.AsyncClient
+    monkeypatch.setattr(jwks.httpx, "AsyncClient", lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs))
+    return replies, fetches
+
+def run_refresher(cache: jwks.JWKSCache, seconds: float):
+    async def scenario():
+        cache.start()
+        await asyncio.sleep(seconds)
+        running = not cache._refresher.done()
+        await cache.stop()
+        return running
+    return asyncio.run(scenario())
+
+def test_zero_max_age_refreshes_at_the_minimum_interval(provider, monkeypatch):
+    replies, fetches = provider
+    replies.append((key_set(), 0))
+    monkeypatch.setattr(jwks, "JWKS_MIN_REFRESH_SECONDS", 0.2)
+    cache = jwks.JWKSCache(URL)
+    assert run_refresher(cache, 0.5)
+    assert 2 <= len(fetches) <= 4
+    assert cache.status()["keys"] == 1
+
+@pytest.mark.parametrize("bad_reply", [
+    ([{"kid": "not a key set"}], 0),
+    ({"keys": "nope"}, 0),
+    ({"keys": [None, {"kty": "RSA", "kid": "broken", "n": "x"}]}, 0),
+    RuntimeError("provider exploded"),
+])
+def test_bad_replies_keep_the_previous_keys(provider, monkeypatch, bad_reply):
+    replies, fetches = provider
+    replies.extend([(key_set("key-1"), 0), bad_reply])
+    monkeypatch.setattr(jwks, "JWKS_MIN_REFRESH_SECONDS", 0.05)
+    cache = jwks.JWKSCache(URL)
+    assert run_refresher(cache, 0.3)
+    assert len(fetches) >= 2
+    assert cache.status()["failures"] >= 1
+    assert asyncio.run(cache.get_key("key-1")) is not None
@@ -0,0 +1,16 @@
+"""GET /metrics is only served to holders of METRICS_TOKEN, or to anyone in development."""
+from app import main
+
+def test_metrics_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "pools" in response.json()["database"]
+
+def test_metrics_without_a_token_are_development_only(client, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 200
+    monkeypatch.setenv("APP_ENV", "production")
+    assert client.get("/metrics").status_code == 403
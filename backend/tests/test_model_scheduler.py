@@ -0,0 +1,133 @@
+"""
+Model calls survive a misbehaving upstream: 429s, 5xx responses and timeouts
+injected by the stub model server (scripts/stub_model.py) are retried with
+backoff, and repeated failures open the circuit breaker until a probe succeeds.
+"""
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from app import ai_engine, model_scheduler
+from app.model_client import ModelClient
+from app.model_scheduler import CircuitBreaker, ModelScheduler, ModelUnavailableError
+from scripts.stub_model import Faults, create_app
+
+PAYLOAD = {"messages": [{"role": "user", "content": "Question: ?"}], "functions": [{"name": "analyze_response"}]}
+
+@pytest.fixture(scope="module")
+def stub():
+    """Base URL of a stub model server on a free port, and its Faults."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    faults = Faults(hang=2.0, retry_after=0.3)
+    server = uvicorn.Server(uvicorn.Config(create_app(latency=0.0, faults=faults), port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1", faults
+    server.should_exit = True
+    thread.join(5)
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(model_scheduler, "MODEL_BACKOFF_BASE_SECONDS", 0.01)
+
+def post(base_url, scheduler, timeout=None):
+    async def call():
+        async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+            return await scheduler.post(client, "/chat/completions", PAYLOAD, timeout=timeout)
+    return asyncio.run(call())
+
+def script(faults, *outcomes):
+    faults.script.clear()
+    faults.script.extend(outcomes)
+    return sum(faults.outcomes.values())
+
+def calls_since(faults, before) -> int:
+    return sum(faults.outcomes.values()) - before
+
+def test_errors_are_retried_honouring_retry_after(stub):
+    base_url, faults = stub
+    scheduler = ModelScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=3)
+    before = script(faults, 503, 429, "ok")
+    started = time.monotonic()
+    assert post(base_url, scheduler).status_code == 200
+    assert time.monotonic() - started >= faults.retry_after
+    assert calls_since(faults, before) == 3
+    assert (scheduler.retries, scheduler.failures) == (2, 2)
+    assert scheduler.breaker.state == "closed"
+
+def test_timeouts_are_retried(stub):
+    base_url, faults = stub
+    scheduler = ModelScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=2)
+    script(faults, "timeout", "ok")
+    assert post(base_url, scheduler, timeout=0.2).status_code == 200
+    assert scheduler.retries == 1
+
+def test_gives_up_after_max_retries(stub):
+    base_url, faults = stub
+    scheduler = ModelScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=2)
+    before = script(faults, 500, 502, 503)
+    with pytest.raises(httpx.HTTPStatusError):
+        post(base_url, scheduler)
+    assert calls_since(faults, before) == 3
+
+def test_rate_limiting_does_not_trip_the_breaker(stub):
+    base_url, faults = stub
+    faults.retry_after = 0
+    scheduler = ModelScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=3, breaker=CircuitBreaker(threshold=2))
+    script(faults, 429, 429, 429, 429)
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            post(base_url, scheduler)
+    finally:
+        faults.retry_after = 0.3
+    assert scheduler.breaker.state == "closed"
+
+def test_breaker_opens_fails_fast_and_closes_after_a_probe(stub):
+    base_url, faults = stub
+    breaker = CircuitBreaker(threshold=2, cooldown=0.3)
+    scheduler = ModelScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=1, breaker=breaker)
+    before = script(faults, 500, 503)
+    with pytest.raises(httpx.HTTPStatusError):
+        post(base_url, scheduler)
+    assert breaker.state == "open" and breaker.trips == 1
+
+    # Open: no request reaches the upstream
+    with pytest.raises(ModelUnavailableError):
+        post(base_url, scheduler)
+    assert calls_since(faults, before) == 2
+
+    # After the cooldown a failed probe reopens the circuit, a successful one closes it
+    time.sleep(breaker.cooldown)
+    script(faults, "timeout")
+    with pytest.raises(ModelUnavailableError):
+        post(base_url, scheduler, timeout=0.1)
+    assert breaker.state == "open" and breaker.trips == 2
+    time.sleep(breaker.cooldown)
+    script(faults, "ok")
+    assert post(base_url, scheduler).status_code == 200
+    assert breaker.state == "closed"
+
+def test_analysis_recovers_from_injected_errors(stub, monkeypatch):
+    base_url, faults = stub
+    client = ModelClient(base_url=base_url, timeout=0.5)
+    monkeypatch.setattr(ai_engine, "model_client", client)
+    monkeypatch.setattr(ai_engine, "scheduler", ModelScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=3))
+    monkeypatch.setenv("APP_ENV", "production")
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    items = [{"question_type": "text", "question_text": f"Question {index}", "response_text": "Answer"} for index in range(3)]
+    script(faults, 503, "timeout", 429)
+    try:
+        results = ai_engine.analyze_responses(items, mode="concurrent")
+    finally:
+        client.close()
+    assert [result["score"] for result in results] == [3, 3, 3]
+    assert ai_engine.scheduler.retries == 3
@@ -0,0 +1,36 @@
+"""The password hasher's admission count follows the hashes actually running, including abandoned ones."""
+import asyncio
+import threading
+
+import pytest
+
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+def test_cancelled_hash_stays_counted_until_it_finishes():
+    hasher = PasswordHasher(workers=1, queue_limit=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(password):
+        started.set()
+        release.wait(5)
+        return password
+
+    async def scenario():
+        request = asyncio.ensure_future(hasher._run(slow, "password"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        # The worker is still hashing for the cancelled request, so there is no room for another
+        assert hasher.pending == 1
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._run(slow, "password")
+        release.set()
+        await asyncio.get_running_loop().run_in_executor(None, hasher.close)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        hasher.close()
+    assert (hasher.pending, hasher.completed) == (0, 1)
@@ -0,0 +1,90 @@
+"""
+Video playback: playback tokens only open their video and are not access
+tokens, X-Accel-Redirect is only used when VIDEO_ACCEL_MAPPING configures it,
+and range and conditional requests are answered from the stored file.
+"""
+import hashlib
+import os
+import time
+
+import pytest
+from jose import jwt
+
+from app import auth, storage
+from app.playback import PLAYBACK_AUDIENCE, playback_token, video_player
+
+from .helpers import create_interview, create_template
+
+@pytest.fixture
+def video(client, recruiter, candidate):
+    """(upload id, its bytes, candidate headers) of a completed upload."""
+    _, recruiter_headers = recruiter
+    candidate_email, candidate_headers = candidate
+    template = create_template(client, recruiter_headers)
+    interview = create_interview(client, recruiter_headers, template["id"], candidate_email)
+    upload_id = client.post(f"/interviews/{interview['id']}/video-upload-url", headers=candidate_headers).json()["upload_id"]
+    content = os.urandom(20_000)
+    response = client.patch(f"/videos/uploads/{upload_id}", content=content, headers={**candidate_headers, "Upload-Offset": "0"})
+    assert response.status_code == 204, response.text
+    assert client.post(f"/videos/uploads/{upload_id}/complete", headers=candidate_headers).status_code == 200
+    return upload_id, content, candidate_headers
+
+def test_playback_token_opens_only_its_video(client, video):
+    upload_id, content, _ = video
+    token = playback_token(upload_id)
+    response = client.get(f"/videos/{upload_id}", params={"token": token})
+    assert response.status_code == 200
+    assert response.content == content
+    assert client.get(f"/videos/{'0' * 32}", params={"token": token}).status_code == 403
+
+def test_playback_token_is_not_an_access_token(client, candidate, video):
+    upload_id, _, candidate_headers = video
+    assert jwt.get_unverified_claims(playback_token(upload_id))["aud"] == PLAYBACK_AUDIENCE
+    # Signed with the same key, but for the playback audience
+    forged = jwt.encode({"sub": candidate[0], "aud": PLAYBACK_AUDIENCE, "exp": time.time() + 60}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {playback_token(upload_id)}"}).status_code == 401
+
+    # Nor is a token without the playback audience a playback token
+    access_token = candidate_headers["Authorization"].split()[1]
+    assert client.get(f"/videos/{upload_id}", params={"token": access_token}).status_code == 403
+    unscoped = jwt.encode({"sub": upload_id, "exp": time.time() + 60}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+    assert client.get(f"/videos/{upload_id}", params={"token": unscoped}).status_code == 403
+
+def test_accel_redirect_follows_configuration_not_request_headers(client, video, monkeypatch):
+    upload_id, content, headers = video
+    forged = {**headers, "X-Sendfile-Type": "X-Accel-Redirect", "X-Accel-Mapping": "/=/anything/"}
+    monkeypatch.setattr(video_player, "accel_mapping", "")
+    response = client.get(f"/videos/{upload_id}", headers=forged)
+    assert "x-accel-redirect" not in response.headers
+    assert response.content == content
+
+    monkeypatch.setattr(video_player, "accel_mapping", f"{storage.VIDEO_STORAGE_DIR}/=/protected-videos/")
+    response = client.get(f"/videos/{upload_id}", headers=headers)
+    assert response.headers["x-accel-redirect"].startswith("/protected-videos/videos/")
+    assert response.content == b""
+
+def test_range_and_conditional_requests(client, video):
+    upload_id, content, headers = video
+    response = client.get(f"/videos/{upload_id}", headers={**headers, "Range": "bytes=-100"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {len(content) - 100}-{len(content) - 1}/{len(content)}"
+    assert response.content == content[-100:]
+    etag = f'"{hashlib.sha256(content).hexdigest()}"'
+    assert response.headers["etag"] == etag
+
+    assert client.get(f"/videos/{upload_id}", headers={**headers, "If-None-Match": etag}).status_code == 304
+    # A stale If-Range gets the whole video
+    response = client.get(f"/videos/{upload_id}", headers={**headers, "Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200 and response.content == content
+    response = client.head(f"/videos/{upload_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(content))
+
+def test_operation_ids_are_unique(client):
+    operations = [
+        operation["operationId"]
+        for path in client.get("/openapi.json").json()["paths"].values()
+        for operation in path.values()
+    ]
+    assert len(operations) == len(set(operations))
@@ -0,0 +1,83 @@
+"""
+Every route that declares a query budget (database.query_budget) stays within
+it, whatever the page size: loading an interview's object graph lazily would
+add queries per row and fail here.
+"""
+import datetime
+
+import pytest
+
+from app import database, models
+from app.main import app
+
+from .helpers import register, user_id
+
+INTERVIEWS = 30
+
+# Route -> which seeded user requests it
+ENDPOINTS = {
+    ("GET", "/interviews/recruiter"): "recruiter",
+    ("GET", "/interviews/candidate"): "candidate",
+}
+
+def budgeted_routes():
+    budgets = {}
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        for dependency in dependant.dependencies if dependant else []:
+            budget = getattr(dependency.call, "max_queries", None)
+            if budget is not None:
+                budgets.update({(method, route.path): budget for method in route.methods})
+    return budgets
+
+@pytest.fixture(scope="module")
+def seeded(client):
+    """A recruiter with INTERVIEWS completed and analyzed interviews of one candidate."""
+    recruiter_email, recruiter_headers = register(client, "recruiter")
+    candidate_email, candidate_headers = register(client, "candidate")
+    with database.SessionLocal() as db:
+        template = models.InterviewTemplate(title="Budget", creator_id=user_id(db, recruiter_email))
+        db.add(template)
+        db.flush()
+        questions = [
+            models.Question(template_id=template.id, text=f"Question {i}", type=models.QuestionType.text, order=i)
+            for i in range(4)
+        ]
+        db.add_all(questions)
+        db.flush()
+        now = datetime.datetime.now()
+        for _ in range(INTERVIEWS):
+            interview = models.Interview(
+                template_id=template.id,
+                recruiter_id=template.creator_id,
+                candidate_email=candidate_email,
+                candidate_name="Candidate",
+                status=models.InterviewStatus.completed,
+                started_at=now - datetime.timedelta(minutes=30),
+                completed_at=now
+            )
+            db.add(interview)
+            db.flush()
+            for question in questions:
+                response = models.Response(interview_id=interview.id, question_id=question.id, text_response="An answer")
+                db.add(response)
+                db.flush()
+                db.add(models.ResponseAnalysis(response_id=response.id, score=3.0, strengths=["a"], weaknesses=["b"]))
+            db.add(models.InterviewAnalysis(interview_id=interview.id, overall_score=3.0, strengths=[], weaknesses=[]))
+        db.commit()
+    return {"recruiter": recruiter_headers, "candidate": candidate_headers}
+
+def test_every_budgeted_route_is_exercised():
+    assert set(budgeted_routes()) == set(ENDPOINTS)
+
+@pytest.mark.parametrize("limit", [1, 10, 100])
+@pytest.mark.parametrize("method, path", sorted(ENDPOINTS))
+def test_route_stays_within_query_budget(client, seeded, method, path, limit):
+    response = client.request(method, path, headers=seeded[ENDPOINTS[(method, path)]], params={"limit": limit})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == min(limit, INTERVIEWS)
+
+    count = int(response.headers["X-Query-Count"])
+    budget = budgeted_routes()[(method, path)]
+    assert response.headers["X-Query-Budget"] == str(budget)
+    assert count <= budget, f"{method} {path}?limit={limit} issued {count} queries; its budget is {budget}"
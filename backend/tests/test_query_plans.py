@@ -0,0 +1,200 @@
+"""
+The queries in crud.py are answered from indexes. A workload that calls every
+crud function runs with each statement EXPLAINed as it is issued; a plan that
+reads a whole table (SQLite "SCAN <table>", PostgreSQL "Seq Scan" even with
+sequential scans disabled) fails the test, naming the function and the plan.
+Run against PostgreSQL by setting TEST_DATABASE_URL.
+"""
+import datetime
+import inspect
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, database, models, schemas
+
+APP_DIRECTORY = os.path.dirname(crud.__file__)
+IGNORED_MODULES = {"database.py"}
+
+# (module, function) -> why reading the whole table is intended
+FULL_SCANS_ALLOWED = {
+    ("crud.py", "count_emails"): "per-status totals for /metrics, read from the covering status index",
+    ("crud.py", "count_webhook_events"): "per-status totals for /metrics, read from the covering status index",
+}
+
+# Tables read from a subquery or a table-valued function rather than from disk
+SQLITE_PSEUDO_TABLES = re.compile(r"^(SCAN|SEARCH) (CONSTANT ROW|\(subquery|\(join|json_each)")
+
+@dataclass
+class Plan:
+    module: str
+    function: str
+    statement: str
+    lines: List[str] = field(default_factory=list)
+
+    def full_scans(self, dialect: str) -> List[str]:
+        if dialect == "postgresql":
+            return [line for line in self.lines if "Seq Scan on " in line]
+        return [
+            line for line in self.lines
+            if line.startswith("SCAN ") and not SQLITE_PSEUDO_TABLES.match(line)
+        ]
+
+def _caller() -> Optional[tuple]:
+    """(module, function) of the innermost application frame issuing the current statement."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.dirname(filename) == APP_DIRECTORY and os.path.basename(filename) not in IGNORED_MODULES:
+            return os.path.basename(filename), frame.f_code.co_name
+        frame = frame.f_back
+    return None
+
+def _explain(conn, statement, parameters) -> List[str]:
+    cursor = conn.connection.cursor()
+    try:
+        if conn.dialect.name == "postgresql":
+            cursor.execute("SET enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            lines = [row[0].strip() for row in cursor.fetchall()]
+            cursor.execute("RESET enable_seqscan")
+            return lines
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+@pytest.fixture(scope="module")
+def plans(client):
+    """Run the workload and return the plan of every statement it issued from app code."""
+    recorded: List[Plan] = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        caller = _caller()
+        if executemany or caller is None or not re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", statement, re.I):
+            return
+        recorded.append(Plan(*caller, statement, _explain(conn, statement, parameters)))
+
+    event.listen(database.engine, "before_cursor_execute", explain)
+    try:
+        with database.SessionLocal() as db:
+            workload(db)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", explain)
+    return recorded
+
+def workload(db):
+    """Call every crud function that takes a session, in a plausible order."""
+    now = datetime.datetime.now()
+    suffix = now.strftime("%H%M%S%f")
+    recruiter = crud.create_user(db, schemas.UserCreate(
+        email=f"plans-recruiter-{suffix}@corp.io", password="password", first_name="R", last_name="X", user_type="recruiter"
+    ), hashed_password="x")
+    candidate = crud.create_oauth_user(db, schemas.UserCreate(
+        email=f"plans-candidate-{suffix}@corp.io", password="", first_name="C", last_name="Y", user_type="candidate"
+    ), "google", suffix)
+    crud.get_user(db, recruiter.id)
+    crud.get_user_by_email(db, recruiter.email)
+    crud.get_user_by_oauth_id(db, "google", suffix)
+    crud.set_password_hash(db, recruiter.id, "y")
+    crud.link_oauth_account(db, recruiter.id, "clerk", f"user_{suffix}")
+
+    questions = [
+        schemas.QuestionCreate(text="Tell us about a project", type="text", order=0),
+        schemas.QuestionCreate(text="Pick one", type="multiple_choice", options=["a", "b"], correct_options=["a"], order=1),
+    ]
+    template = crud.create_interview_template(db, schemas.InterviewTemplateCreate(title="Plans", questions=questions), recruiter.id)
+    template = crud.update_interview_template(db, template.id, schemas.InterviewTemplateCreate(title="Plans", questions=questions))
+    crud.get_interview_template(db, template.id)
+    page = crud.get_interview_templates(db, limit=1, user_id=recruiter.id)
+    crud.get_interview_templates(db, limit=1, user_id=recruiter.id, after_id=page[0].id)
+
+    interview, _ = crud.create_interview(db, schemas.InterviewCreate(
+        template_id=template.id, candidate_email=candidate.email, candidate_name="C"
+    ), recruiter.id)
+    bulk = crud.create_interviews(db, [
+        schemas.InterviewCreate(template_id=template.id, candidate_email=f"plans-bulk-{i}-{suffix}@corp.io", candidate_name="B")
+        for i in range(3)
+    ], recruiter.id)
+    crud.get_interview(db, interview.id)
+    crud.get_recruiter_interviews(db, recruiter.id, limit=2)
+    crud.get_recruiter_interviews(db, recruiter.id, limit=2, after_id=bulk[-1]["id"])
+    crud.get_recruiter_interviews(db, recruiter.id, skip=1, limit=2)
+    crud.get_candidate_interviews(db, candidate.id)
+    crud.get_interviews_by_email(db, candidate.email)
+
+    crud.update_interview_status(db, interview.id, models.InterviewStatus.in_progress)
+    question_ids = [question.id for question in template.questions]
+    crud.submit_interview_response(db, interview.id, schemas.InterviewResponseCreate(responses=[
+        schemas.ResponseCreate(question_id=question_ids[0], text_response="I led a migration"),
+        schemas.ResponseCreate(question_id=question_ids[1], selected_option="a"),
+    ]))
+    crud.create_response(db, schemas.ResponseCreate(question_id=question_ids[0], text_response="Another"), bulk[0]["id"])
+
+    while (job := crud.claim_analysis_job(db, lease_seconds=60)) is not None:
+        crud.analyze_interview(db, job.interview_id)
+        crud.finish_analysis_job(db, job.id)
+    job = crud.create_analysis_job(db, interview.id, regenerate=True)
+    crud.queue_analysis(db, interview.id)
+    crud.get_latest_analysis_job(db, interview.id)
+    job = crud.claim_analysis_job(db, lease_seconds=60)
+    crud.renew_analysis_job_lease(db, job.id, job.attempts)
+    crud.park_analysis_job(db, job.id, "model unavailable")
+    job = crud.claim_analysis_job(db, lease_seconds=60)
+    crud.finish_analysis_job(db, job.id, error="failed", max_attempts=1)
+
+    claimed = crud.claim_emails(db, limit=10, lease_seconds=60)
+    crud.finish_emails(db, claimed, {claimed[0].id: ("bounced", True)}, max_attempts=3, retry_seconds=1)
+    crud.requeue_dead_emails(db)
+    crud.count_emails(db)
+
+    for delivery in ("a", "b"):
+        crud.record_webhook_event(db, "plans", f"{delivery}-{suffix}", "user.updated", suffix, {"data": {"id": suffix}})
+    crud.record_webhook_event(db, "plans", f"a-{suffix}", "user.updated", suffix, {"data": {"id": suffix}})
+    claimed = crud.claim_webhook_events(db, "plans", limit=10, lease_seconds=60)
+    crud.finish_webhook_events(db, claimed, {claimed[-1].id: "failed"}, max_attempts=1, retry_seconds=1)
+    crud.requeue_dead_webhook_events(db)
+    crud.prune_webhook_events(db, now + datetime.timedelta(days=1))
+    crud.count_webhook_events(db)
+
+    upload = crud.create_video_upload(
+        db, interview.id, candidate.id, "video/webm", lambda upload_id: f"{upload_id}.webm",
+        now + datetime.timedelta(hours=1), question_id=question_ids[0]
+    )
+    crud.set_video_upload_progress(db, upload.id, 10, total_bytes=10)
+    crud.complete_video_upload(db, upload.id, "0" * 64)
+    db.execute(crud.select_video_upload(upload.id)).all()
+    db.execute(crud.select_video_playback(upload.id)).all()
+    expiring = crud.create_video_upload(
+        db, interview.id, candidate.id, "video/webm", lambda upload_id: f"{upload_id}.webm", now - datetime.timedelta(hours=1)
+    )
+    crud.abort_video_upload(db, expiring.id)
+    crud.abort_expired_video_uploads(db, now)
+
+    today = now.date()
+    crud.get_recruiter_dashboard(db, recruiter.id)
+    crud.get_score_percentiles(db, recruiter.id, today, today, by_template=True)
+    for group_by in schemas.AnalyticsGroupBy:
+        crud.get_recruiter_analytics(db, recruiter.id, today - datetime.timedelta(days=30), today, group_by=group_by)
+
+def test_workload_calls_every_crud_function(plans):
+    session_functions = {
+        name for name, function in inspect.getmembers(crud, inspect.isfunction)
+        if function.__module__ == crud.__name__ and "db" in inspect.signature(function).parameters
+    }
+    called = {plan.function for plan in plans if plan.module == "crud.py"}
+    assert session_functions <= called, f"not exercised: {sorted(session_functions - called)}"
+
+def test_crud_queries_use_indexes(plans):
+    dialect = database.engine.dialect.name
+    failures = [
+        f"{plan.module}:{plan.function}\n  {plan.statement}\n  " + "\n  ".join(plan.lines)
+        for plan in plans
+        if plan.full_scans(dialect) and (plan.module, plan.function) not in FULL_SCANS_ALLOWED
+    ]
+    assert not failures, "full table scans:\n" + "\n".join(failures)
@@ -0,0 +1,80 @@
+"""
+The analytics rollup maintained alongside interview changes matches what
+rollups.rebuild recomputes from the interviews and analyses, including after
+an analysis is regenerated and its score moves to another histogram bucket;
+and a model score of the wrong type is coerced before it reaches the rollup.
+"""
+import pytest
+
+from app import ai_engine, crud, models, rollups
+
+from .helpers import create_interview, create_template, user_id
+
+def stats_rows(db, recruiter_id: int) -> dict:
+    stats = models.RecruiterDailyStats
+    db.expire_all()
+    columns = [column.name for column in stats.__table__.columns if not column.primary_key]
+    return {
+        (row.template_id, row.day, column): getattr(row, column)
+        for row in db.query(stats).filter(stats.recruiter_id == recruiter_id)
+        for column in columns
+    }
+
+def test_incremental_rollup_matches_a_rebuild(client, db, recruiter, candidate, monkeypatch):
+    recruiter_email, recruiter_headers = recruiter
+    candidate_email, candidate_headers = candidate
+    recruiter_id = user_id(db, recruiter_email)
+    # First summaries, then the regenerated ones, each in a different bucket
+    scores = iter([1.2, 3.7, 4.6, 0.4])
+    monkeypatch.setattr(ai_engine, "analyze_full_interview", lambda interview_data: {
+        "overall_score": next(scores), "recommendation": "Consider", "strengths": [], "weaknesses": []
+    })
+
+    template = create_template(client, recruiter_headers, questions=[
+        {"text": "Describe a project", "type": "text", "required": True, "order": 0}
+    ])
+    create_interview(client, recruiter_headers, template["id"], candidate_email)
+    started = create_interview(client, recruiter_headers, template["id"], candidate_email)
+    assert client.post(f"/interviews/{started['id']}/start", headers=candidate_headers).status_code == 200
+    completed = []
+    for _ in range(2):
+        interview = create_interview(client, recruiter_headers, template["id"], candidate_email)
+        assert client.post(f"/interviews/{interview['id']}/start", headers=candidate_headers).status_code == 200
+        response = client.post(f"/interviews/{interview['id']}/submit", headers=candidate_headers, json={"responses": [
+            {"question_id": template["questions"][0]["id"], "text_response": "I rebuilt our billing pipeline"}
+        ]})
+        assert response.json()["status"] == "completed", response.text
+        completed.append(interview["id"])
+
+    for interview_id in completed:
+        crud.analyze_interview(db, interview_id)
+    for interview_id in completed:
+        assert client.post(f"/analytics/interview/{interview_id}/regenerate", headers=recruiter_headers).status_code == 202
+        crud.analyze_interview(db, interview_id)
+    db.expire_all()
+    assert sorted(
+        analysis.overall_score for analysis in db.query(models.InterviewAnalysis).filter(
+            models.InterviewAnalysis.interview_id.in_(completed)
+        )
+    ) == [0.4, 4.6]
+
+    incremental = stats_rows(db, recruiter_id)
+    dashboard = crud.get_recruiter_dashboard(db, recruiter_id)
+    assert rollups.rebuild(db, recruiter_id=recruiter_id) > 0
+    db.commit()
+    # SQLite's julianday keeps milliseconds, so rebuilt completion minutes may differ by about 1e-5
+    assert stats_rows(db, recruiter_id) == pytest.approx(incremental, abs=1e-3)
+    rebuilt = crud.get_recruiter_dashboard(db, recruiter_id)
+    assert rebuilt.avg_completion_time == pytest.approx(dashboard.avg_completion_time, abs=1e-3)
+    assert rebuilt.dict(exclude={"avg_completion_time"}) == dashboard.dict(exclude={"avg_completion_time"})
+
+@pytest.mark.parametrize("reported, stored", [("4.5", 4.5), (None, 0.0), ("excellent", 0.0), (7, 5.0), (-1, 0.0)])
+def test_model_overall_score_is_coerced_to_the_score_range(monkeypatch, reported, stored):
+    async def call_function(client, system_prompt, user_prompt, function, **kwargs):
+        return {"overall_score": reported, "recommendation": "Hire", "strengths": ["Clear"], "weaknesses": None}
+
+    monkeypatch.setattr(ai_engine, "_call_function", call_function)
+    monkeypatch.setattr(ai_engine, "use_mock_analysis", lambda: False)
+    result = ai_engine.analyze_full_interview({"responses": []})
+    assert result == {"overall_score": stored, "recommendation": "Hire", "strengths": ["Clear"], "weaknesses": []}
+    assert rollups.score_bucket_index(result["overall_score"]) in range(rollups.SCORE_BUCKETS)
@@ -0,0 +1,32 @@
+"""Scorer backends implement the whole interface, and the local scorer's worker processes are stopped on close."""
+import pytest
+
+from app import scorers
+
+def test_incomplete_scorer_cannot_be_created():
+    class Partial(scorers.Scorer):
+        name = "partial"
+
+        def version(self):
+            return "partial:1"
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_local_scorer_pool_is_shut_down_on_close():
+    scorer = scorers.LocalScorer(processes=2, parallel_min=1)
+    items = [
+        {"question_type": "text", "question_text": "Describe caching", "response_text": f"Cache entries expire {index}",
+         "reference_answer": "Entries expire after a TTL", "rubric": ["expire", "TTL"]}
+        for index in range(4)
+    ]
+    assert scorer.analyze_responses(items) == scorers.score_batch(items)
+    processes = list(scorer._pool._processes.values())
+    assert processes
+
+    scorer.close()
+    assert scorer._pool is None
+    assert not any(process.is_alive() for process in processes)
+    # Used again after closing, it starts a new pool
+    assert len(scorer.analyze_responses(items)) == 4
+    scorer.close()
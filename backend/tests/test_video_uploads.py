@@ -0,0 +1,110 @@
+"""
+Resumable video uploads: chunks are appended at the offset the server reports,
+a chunk failing its checksum does not count, an upload past its expiry is gone,
+and completed videos are published to local storage or, through the S3 stub
+(scripts/stub_s3.py), to an S3-compatible bucket.
+"""
+import base64
+import datetime
+import hashlib
+import os
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from app import models
+from app.storage import S3Storage, StorageError
+from scripts.stub_s3 import create_app
+
+from .helpers import create_interview, create_template
+
+@pytest.fixture
+def upload(client, recruiter, candidate):
+    """(upload id, candidate headers) of a new upload by the interview's candidate."""
+    _, recruiter_headers = recruiter
+    candidate_email, candidate_headers = candidate
+    template = create_template(client, recruiter_headers)
+    interview = create_interview(client, recruiter_headers, template["id"], candidate_email)
+    response = client.post(f"/interviews/{interview['id']}/video-upload-url", headers=candidate_headers)
+    assert response.status_code == 200, response.text
+    return response.json()["upload_id"], candidate_headers
+
+def patch(client, upload_id, headers, offset, chunk, **extra):
+    return client.patch(
+        f"/videos/uploads/{upload_id}", content=chunk, headers={**headers, "Upload-Offset": str(offset), **extra}
+    )
+
+def test_upload_resumes_from_the_reported_offset(client, upload):
+    upload_id, headers = upload
+    video = os.urandom(300_000)
+    assert patch(client, upload_id, headers, 0, video[:100_000]).status_code == 204
+
+    response = client.head(f"/videos/uploads/{upload_id}", headers=headers)
+    assert response.headers["Upload-Offset"] == "100000"
+    # A retry of the first chunk is refused with the offset to resume from
+    response = patch(client, upload_id, headers, 0, video[:100_000])
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "100000"
+    assert patch(client, upload_id, headers, 100_000, video[100_000:]).status_code == 204
+
+    response = client.post(f"/videos/uploads/{upload_id}/complete", headers=headers, json={"sha256": hashlib.sha256(video).hexdigest()})
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "complete"
+    response = client.get(f"/videos/{upload_id}", headers={**headers, "Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == video[100:200]
+
+def test_chunk_failing_its_checksum_is_not_counted(client, upload):
+    upload_id, headers = upload
+    chunk = os.urandom(10_000)
+    checksum = "sha256 " + base64.b64encode(hashlib.sha256(b"something else").digest()).decode()
+    response = patch(client, upload_id, headers, 0, chunk, **{"Upload-Checksum": checksum})
+    assert response.status_code == 400
+    assert client.head(f"/videos/uploads/{upload_id}", headers=headers).headers["Upload-Offset"] == "0"
+
+def test_expired_upload_is_gone(client, db, upload):
+    upload_id, headers = upload
+    assert patch(client, upload_id, headers, 0, b"x" * 1000).status_code == 204
+    db.query(models.VideoUpload).filter(models.VideoUpload.id == upload_id).update(
+        {"expires_at": datetime.datetime.now() - datetime.timedelta(minutes=1)}
+    )
+    db.commit()
+    assert client.head(f"/videos/uploads/{upload_id}", headers=headers).status_code == 410
+    assert patch(client, upload_id, headers, 1000, b"x" * 1000).status_code == 410
+    assert client.post(f"/videos/uploads/{upload_id}/complete", headers=headers).status_code == 410
+
+@pytest.fixture
+def s3_stub(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(str(tmp_path / "bucket")), port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(5)
+
+def test_s3_storage_publishes_verified_objects(s3_stub, tmp_path):
+    storage = S3Storage(endpoint_url=s3_stub, bucket="videos", access_key="key", secret_key="secret")
+    video = os.urandom(50_000)
+    staged = tmp_path / "staged"
+    staged.write_bytes(video)
+    storage.publish(str(staged), "videos/1/a.webm", hashlib.sha256(video).hexdigest(), "video/webm")
+    assert not staged.exists()
+    assert storage.exists("videos/1/a.webm")
+    with storage._client.stream("GET", storage.presigned_url("videos/1/a.webm", 60)) as response:
+        assert response.read() == video
+
+    # The bucket refuses content that does not match the declared hash
+    staged.write_bytes(video)
+    with pytest.raises(StorageError):
+        storage.publish(str(staged), "videos/1/b.webm", hashlib.sha256(b"other").hexdigest(), "video/webm")
+    assert not storage.exists("videos/1/b.webm")
+    storage.delete("videos/1/a.webm")
+    assert not storage.exists("videos/1/a.webm")
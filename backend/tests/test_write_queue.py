@@ -0,0 +1,81 @@
+"""
+Writes made while authenticating go through database.write_queue like every
+other API write, so concurrent sign-ins on SQLite queue up instead of racing
+for the database lock.
+"""
+import threading
+import uuid
+
+import pytest
+from passlib.hash import bcrypt
+
+from app import database, models, oauth
+
+from .helpers import register
+
+pytestmark = pytest.mark.skipif(not database.write_queue.enabled, reason="the write queue only runs on SQLite")
+
+def queued_writes(action) -> int:
+    before = database.write_queue.writes
+    action()
+    return database.write_queue.writes - before
+
+def test_outdated_hash_is_replaced_through_the_queue(client, db):
+    email = f"rehash-{uuid.uuid4().hex[:12]}@corp.io"
+    db.add(models.User(
+        email=email, hashed_password=bcrypt.using(rounds=5).hash("password"), first_name="Old", last_name="Hash",
+        user_type=models.UserType.recruiter
+    ))
+    db.commit()
+
+    def login():
+        response = client.post("/auth/token", data={"username": email, "password": "password"})
+        assert response.status_code == 200, response.text
+
+    assert queued_writes(login) == 1
+    db.expire_all()
+    stored = db.query(models.User.hashed_password).filter(models.User.email == email).scalar()
+    assert stored.startswith("$2b$04$")
+    # Up to date now: the next login writes nothing
+    assert queued_writes(login) == 0
+
+def test_demo_user_is_created_through_the_queue(client):
+    email = f"recruiter-{uuid.uuid4().hex[:12]}@example.com"
+
+    def login():
+        response = client.post("/auth/token", data={"username": email, "password": "anything"})
+        assert response.status_code == 200, response.text
+
+    assert queued_writes(login) == 1
+    assert queued_writes(login) == 0
+
+def test_oauth_link_goes_through_the_queue(client, db):
+    email, _ = register(client, "candidate")
+    user_info = {"email": email, "provider": "google", "provider_id": uuid.uuid4().hex}
+
+    async def sign_in():
+        async with database.AsyncSessionLocal() as session:
+            return await oauth.get_or_create_oauth_user(user_info, session)
+
+    assert queued_writes(lambda: client.portal.call(sign_in)) == 1
+    linked = client.portal.call(sign_in)
+    assert (linked.oauth_provider, linked.oauth_provider_id) == ("google", user_info["provider_id"])
+
+def test_concurrent_demo_and_password_logins(client):
+    accounts = [register(client, "candidate")[0] for _ in range(4)]
+    statuses = []
+
+    def login(username):
+        response = client.post("/auth/token", data={"username": username, "password": "password"})
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=login, args=(email,)) for email in accounts]
+    threads += [
+        threading.Thread(target=login, args=(f"candidate-{uuid.uuid4().hex[:12]}@example.com",))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * len(threads)
@@ -12,6 +12,7 @@ import {
 } from '@heroicons/react/24/outline';
 import Button from '../common/Button';
 import Card from '../common/Card';
+import videoUploadService from '../../services/videoUploadService';
 
 // Mock data - in a real app, this would come from an API
 const MOCK_INTERVIEW = {
@@ -57,6 +58,7 @@ const InterviewInterface = () => {
   const videoRef = useRef(null);
   const mediaRecorderRef = useRef(null);
   const chunksRef = useRef([]);
+  const uploadRef = useRef(null);
   
   // This would be fetched from an API in a real app
   useEffect(() => {
@@ -105,13 +107,31 @@ const InterviewInterface = () => {
       mediaRecorderRef.current = new MediaRecorder(stream);
       chunksRef.current = [];
       
+      // Upload the answer while it is recorded; the local copy is only for playback
+      uploadRef.current = null;
+      try {
+        uploadRef.current = await videoUploadService.start(interviewId, {
+          questionId: currentQuestion.id,
+          contentType: 'video/webm',
+        });
+      } catch (error) {
+        console.error('Error starting video upload:', error);
+      }
+      
       mediaRecorderRef.current.ondataavailable = (e) => {
         if (e.data.size > 0) {
           chunksRef.current.push(e.data);
+          uploadRef.current?.append(e.data).catch((error) => {
+            console.error('Error uploading video:', error);
+          });
         }
       };
       
       mediaRecorderRef.current.onstop = () => {
+        uploadRef.current?.finish().catch((error) => {
+          console.error('Error completing video upload:', error);
+        });
+        
         const blob = new Blob(chunksRef.current, { type: 'video/webm' });
         const url = URL.createObjectURL(blob);
         videoRef.current.srcObject = null;
@@ -125,8 +145,8 @@ const InterviewInterface = () => {
         }));
       };
       
-      // Start recording
-      mediaRecorderRef.current.start();
+      // Start recording, handing over data every second
+      mediaRecorderRef.current.start(1000);
       
       // Start timer
       let timeLeft = currentQuestion.timeLimit;
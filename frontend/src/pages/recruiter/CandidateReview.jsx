@@ -88,7 +88,7 @@ const MOCK_INTERVIEW = {
       id: 4,
       type: 'video',
       text: 'Tell us about a challenging project you worked on and how you overcame obstacles.',
-      videoUrl: 'https://example.com/mock-video-url',
+      videoUrl: null,
       score: 75,
       analysis: 'The candidate described a challenging e-commerce application refactoring project. They showed good problem-solving skills and team collaboration. The explanation of technical decisions was clear, though they could have elaborated more on specific technical challenges overcome.'
     }
@@ -182,11 +182,21 @@ const QuestionResponse = ({ question, index }) => {
           {question.type === 'video' && (
             <div>
               <p className="text-sm font-medium text-gray-700 mb-2">Video Response:</p>
-              <div className="bg-gray-800 rounded-md aspect-video flex items-center justify-center">
-                <button className="bg-white bg-opacity-20 rounded-full p-3 hover:bg-opacity-30 transition-colors">
-                  <PlayIcon className="h-8 w-8 text-white" />
-                </button>
-              </div>
+              {question.videoUrl ? (
+                // Only metadata is fetched up front; seeking requests just the bytes needed
+                <video
+                  className="w-full bg-gray-800 rounded-md aspect-video"
+                  src={question.videoUrl}
+                  controls
+                  preload="metadata"
+                />
+              ) : (
+                <div className="bg-gray-800 rounded-md aspect-video flex items-center justify-center">
+                  <button className="bg-white bg-opacity-20 rounded-full p-3 hover:bg-opacity-30 transition-colors">
+                    <PlayIcon className="h-8 w-8 text-white" />
+                  </button>
+                </div>
+              )}
             </div>
           )}
           
@@ -0,0 +1,128 @@
+import api from './api';
+
+// Recorded data is sent once this much has accumulated (and when recording stops)
+const CHUNK_BYTES = 4 * 1024 * 1024;
+const MAX_RETRIES = 5;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * SHA-256 of a Blob as an Upload-Checksum header value ("sha256 <base64>")
+ * @param {Blob} blob - Chunk to hash
+ * @returns {Promise<String|null>} - Header value, or null without WebCrypto
+ */
+const chunkChecksum = async (blob) => {
+  if (!window.crypto?.subtle) {
+    return null;
+  }
+  const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return `sha256 ${btoa(String.fromCharCode(...new Uint8Array(digest)))}`;
+};
+
+/**
+ * Resumable upload of a video answer while it is being recorded. Data from
+ * MediaRecorder is appended in chunks with offset-addressed PATCH requests;
+ * after a failure the offset the server has is fetched with HEAD and the
+ * upload continues from there.
+ */
+const videoUploadService = {
+  /**
+   * Start an upload for a video answer
+   * @param {String|Number} interviewId - Interview being answered
+   * @param {Object} options - questionId and contentType of the recording
+   * @returns {Promise<Object>} - Uploader with append(blob), finish() and abort()
+   */
+  start: async (interviewId, { questionId, contentType = 'video/webm' } = {}) => {
+    const response = await api.post(`/interviews/${interviewId}/video-upload-url`, null, {
+      params: { question_id: questionId, content_type: contentType },
+    });
+    const { upload_id: uploadId, upload_url: uploadUrl } = response.data;
+
+    let offset = response.data.offset || 0;
+    let pending = [];
+    let pendingBytes = 0;
+    // Chunks are sent one at a time, in order
+    let queue = Promise.resolve();
+
+    const send = async (chunk) => {
+      const checksum = await chunkChecksum(chunk);
+      for (let attempt = 0; ; attempt += 1) {
+        try {
+          const headers = {
+            'Content-Type': 'application/offset+octet-stream',
+            'Upload-Offset': String(offset),
+          };
+          if (checksum) {
+            headers['Upload-Checksum'] = checksum;
+          }
+          const result = await api.patch(uploadUrl, chunk, { headers });
+          offset = Number(result.headers['upload-offset']);
+          return;
+        } catch (error) {
+          if (attempt >= MAX_RETRIES || (error.response && error.response.status < 500 && error.response.status !== 409)) {
+            throw error.response?.data || error;
+          }
+          await sleep(1000 * 2 ** attempt);
+          // Part of the chunk may have arrived; continue from what the server has
+          const head = await api.head(uploadUrl);
+          const received = Number(head.headers['upload-offset']);
+          chunk = chunk.slice(received - offset);
+          offset = received;
+          if (chunk.size === 0) {
+            return;
+          }
+        }
+      }
+    };
+
+    const flush = () => {
+      if (pendingBytes === 0) {
+        return queue;
+      }
+      const chunk = new Blob(pending);
+      pending = [];
+      pendingBytes = 0;
+      queue = queue.then(() => send(chunk));
+      return queue;
+    };
+
+    return {
+      uploadId,
+
+      /**
+       * Queue recorded data for upload
+       * @param {Blob} blob - Data from a MediaRecorder dataavailable event
+       */
+      append: (blob) => {
+        pending.push(blob);
+        pendingBytes += blob.size;
+        if (pendingBytes >= CHUNK_BYTES) {
+          flush();
+        }
+        return queue;
+      },
+
+      /**
+       * Send what is left and complete the upload
+       * @returns {Promise<Object>} - The completed upload
+       */
+      finish: async () => {
+        await flush();
+        const result = await api.post(`/videos/uploads/${uploadId}/complete`, {});
+        return result.data;
+      },
+
+      /**
+       * Abandon the upload
+       */
+      abort: async () => {
+        pending = [];
+        pendingBytes = 0;
+        await queue.catch(() => {});
+        await api.delete(`/videos/uploads/${uploadId}`);
+      },
+    };
+  },
+};
+
+export default videoUploadService;